@@ -1,31 +1,36 @@
 # Mainkivy.py
 # carrega Sheets uma única vez ao iniciar, usa JSON depois, back = 1 passo
 # exportação por e-mail com confirmação e salvamento síncrono pré-envio
+# com NATABASE_SERVIDOR=http://host:8765 a app é só um cliente do servico_inventario.py
+# arranque rápido: nada pesado antes do primeiro frame, grelha de tipos a partir de um
+# índice minúsculo, catálogo lido fora da thread da UI, tempos por fase em arranque_tempos.jsonl
+
+# primeiro import: marca o instante de referência dos tempos de arranque
+from arranque import TemposArranque, ler_primeiro_ecra
+from metricas import contar, cronometrar, metricas
 
 from threading import Thread
 from datetime import datetime, date
 from pathlib import Path
-import json, os, tempfile
+import os
 
 from kivy.lang import Builder
 from kivy.clock import Clock
 from kivy.core.window import Window
-from kivy.metrics import Metrics
-from kivy.properties import StringProperty, NumericProperty
 from kivy.factory import Factory
+from kivy.metrics import Metrics, dp
+from kivy.properties import StringProperty, NumericProperty
 
 from kivymd.app import MDApp
 from kivymd.uix.card import MDCard
-from kivymd.uix.dialog import MDDialog
-from kivymd.uix.button import MDRaisedButton, MDFlatButton
-from kivymd.toast import toast
-
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 
 # --- seus módulos
-from Produtos import produto
-from salvarexecel import salvar_producao_diaria
+from product_store import ErroLote, LOTE_DEFINIR, LOTE_AUMENTAR
+from importacao_csv import ler_lote_csv, nomes_por_chave
+from email_outbox import ENVIADO, FALHOU
+from nucleo_producao import NucleoProducao, resumo_catalogo
+from teclado_producao import TecladoProducao
+from pesquisa import IndicePesquisa
 
 
 # ---------------------------- Tiles ----------------------------
@@ -41,8 +46,12 @@ class ProdutoTile(MDCard):
     quantity = NumericProperty(0)
 
 
+# resultados mostrados pela pesquisa (o RecycleView só cria os tiles visíveis)
+LIMITE_PESQUISA = 60
+
+
 # ---------------------------- App ----------------------------
-class AppCozinha(MDApp):
+class AppCozinha(MDApp, TecladoProducao):
     # responsividade (usados no KV)
     cols_grid = NumericProperty(4)
     tipo_font_sp = NumericProperty(22)
@@ -61,27 +70,67 @@ class AppCozinha(MDApp):
         super().__init__(**kwargs)
         self._base_dir = Path(__file__).resolve().parent
         self._kv_path = self._base_dir / "ui" / "screens.kv"
-        self._creds_json = self._base_dir / "projeto-ibersol-467808-eb721841ac2c.json"
+        self._tempos = TemposArranque(self._base_dir / "arranque_tempos.jsonl")
+        self._tempos.marcar("imports")
+        # tipos do índice do primeiro ecrã (até o catálogo chegar)
+        self._tipos_iniciais = []
 
-        # arquivo Excel completo da loja
-        self._xlsx_path = self._base_dir / "Loja012_2025.xlsx"
+        # dialogos
+        self._dialog_export = None
+        self._gestor_ficheiros = None
+
+        # resumo: posição de cada produto/total nos dados do RecycleView
+        self._resumo_pos_produto = {}
+        self._resumo_pos_total = {}
+
+        # pesquisa por nome no ecrã de Produção: índice acompanha o catálogo;
+        # várias teclas no mesmo frame dão uma só pesquisa
+        self._pesquisa = IndicePesquisa()
+        self._indice_a_construir = False
+        self._texto_pesquisa = ""
+        self._disparar_pesquisa = Clock.create_trigger(lambda dt: self._mostrar_pesquisa(), 0)
+
+        # de onde vem o estado: o serviço da loja (várias tablets) ou o núcleo local
+        self._servidor = os.getenv("NATABASE_SERVIDOR", "").strip()
+        if self._servidor:
+            from cliente_inventario import ClienteInventario
+            self._remoto = ClienteInventario(
+                self._servidor, agendar=self._na_ui, ao_aviso=self._set_status, base_dir=self._base_dir
+            )
+            self._fonte = self._remoto
+        else:
+            self._remoto = None
+            self._fonte = NucleoProducao(
+                self._base_dir,
+                agendar=self._na_ui,
+                ao_aviso=self._set_status,
+                ao_gravar=self._ao_gravar_excel,
+                ao_erro_gravacao=self._ao_erro_excel,
+                ao_estado_envio=self._ao_estado_envio,
+                tempos=self._tempos,
+            )
+        self._fonte.ouvir(self._ao_alterar_produtos)
 
-        # cache local
-        self._cache_path = self._base_dir / "cache_produtos.json"
-        self._versao_menu_cache = None
+    # dados em memória (catálogo indexado por tipo, com totais): do núcleo ou o espelho do serviço
+    @property
+    def dicionario_produtos(self):
+        return self._fonte.store
 
-        # flags
-        self._data_loaded = False      # já temos dados em memória (de JSON/Sheets)
-        self._loading = False          # há um carregamento em andamento?
+    @dicionario_produtos.setter
+    def dicionario_produtos(self, store):
+        self._fonte.definir_catalogo(store)
 
-        # dados em memória
-        self.dicionario_produtos = {}
+    @property
+    def _data_loaded(self):
+        return self._fonte.carregado
 
-        # dialogos
-        self._dialog_export = None
+    @_data_loaded.setter
+    def _data_loaded(self, valor: bool):
+        self._fonte.carregado = valor
 
-        # nome da planilha (uma por loja)
-        self._spreadsheet_title = "ProdutosdaLoja012"
+    @staticmethod
+    def _na_ui(fn):
+        Clock.schedule_once(lambda dt: fn(), 0)
 
     # ---------------- ciclo de vida ----------------
     def build(self):
@@ -94,33 +143,35 @@ class AppCozinha(MDApp):
 
         Window.bind(size=self.update_breakpoints)
         self.update_breakpoints()
+        self._tempos.marcar("build")
         return root
 
     def on_start(self):
         """
-        ARRANQUE:
-          1) tenta carregar JSON local p/ UI rápida;
-          2) em paralelo, checa versão no Sheets e atualiza JSON se mudou.
-        Depois disso, durante o uso, tudo vem do JSON em memória.
+        ARRANQUE (nada disto bloqueia a thread da UI):
+          1) lê o índice do primeiro ecrã (só os tipos) p/ a grelha aparecer já;
+          2) numa thread, lê o catálogo da base de dados e instala-o quando estiver pronto;
+          3) depois, checa versão no Sheets e atualiza se mudou.
+        Em modo cliente, o estado chega do serviço logo que o WebSocket liga.
         """
-        # 1) UI imediata via JSON (se existir)
-        if self._cache_path.exists():
-            try:
-                self._carregar_cache_local()
-                self._data_loaded = True
-            except Exception as e:
-                print("[cache] falha ao ler:", e)
+        self._tipos_iniciais = ler_primeiro_ecra(self._fonte.primeiro_ecra_path)
+        self._tempos.marcar("primeiro_ecra")
+        Clock.schedule_once(lambda dt: self._tempos.marcar("primeiro_frame"), 0)
+        self._fonte.iniciar()
 
-        # 2) em paralelo, tentativa de atualizar JSON a partir do Sheets (silencioso)
-        Thread(target=self._atualizar_cache_do_sheets_startup, daemon=True).start()
+    def on_stop(self):
+        # garante que ajustes ainda na janela de debounce chegam ao disco
+        self._fonte.parar()
 
     # ---------------- navegação ----------------
     def go(self, screen_name: str):
         """Navegação direta pelos botões da Home."""
         self.root.current = screen_name
         if screen_name == "producao":
-            # usa só o que já está em memória; agenda para o próximo frame
-            if self._data_loaded:
+            # usa só o que já está em memória (ou o índice dos tipos); agenda para o próximo frame
+            if self._texto_pesquisa:
+                self._disparar_pesquisa()
+            elif self._data_loaded or self._tipos_iniciais:
                 Clock.schedule_once(lambda dt: self._mostrar_tipos(), 0)
             else:
                 self._set_status("⏳ A carregar dados...")
@@ -129,11 +180,15 @@ class AppCozinha(MDApp):
         """Volta SEMPRE um passo."""
         cur = self.root.current
         if cur == "detalhe_produto":
-            if self.tipo_atual:
+            if self._texto_pesquisa:    # veio dos resultados da pesquisa
+                self._disparar_pesquisa()
+            elif self.tipo_atual:
                 self.abrir_tipo(self.tipo_atual)
             self.root.current = "producao"
         elif cur == "producao":
-            if self.tipo_atual:     # estava vendo produtos de um tipo
+            if self._texto_pesquisa:
+                self.limpar_pesquisa()
+            elif self.tipo_atual:     # estava vendo produtos de um tipo
                 self.voltar_aos_tipos()
             else:
                 self.root.current = "home"
@@ -141,6 +196,10 @@ class AppCozinha(MDApp):
             self.root.current = "home"
         elif cur == "resumo":
             self.root.current = "producao"
+        elif cur == "mapa":
+            self.root.current = "resumo"
+        elif cur == "diagnostico":
+            self.root.current = "home"
         else:
             pass
 
@@ -162,13 +221,14 @@ class AppCozinha(MDApp):
 
     def _toast(self, msg: str):
         try:
+            from kivymd.toast import toast
             toast(msg)
         except Exception:
             print(msg)
 
     def _limpar_grid(self):
         try:
-            self.root.get_screen("producao").ids.grid.clear_widgets()
+            self.root.get_screen("producao").ids.grid.data = []
         except Exception as e:
             print("[grid]", e)
 
@@ -206,135 +266,47 @@ class AppCozinha(MDApp):
             self.cols_grid = 2; self.tipo_font_sp = 20; self.produto_font_sp = 16
             self.tipo_card_height_dp = 170; self.produto_card_height_dp = 140
 
-    # --------------- cache JSON local ---------------
-    def _carregar_cache_local(self):
-        data = json.loads(self._cache_path.read_text(encoding="utf-8"))
-        self._versao_menu_cache = data.get("versao_menu")
-        itens = data.get("itens", {})
-        dicio = {}
-        for nome, info in itens.items():
-            dicio[nome] = produto(
-                nome,
-                info.get("tipo") or "Sem Tipo",
-                int(info.get("quantidade") or 0),
-            )
-        self.dicionario_produtos = dicio
-        # se já estamos na tela Produção, redesenha
-        if self.root.current == "producao":
-            Clock.schedule_once(lambda dt: self._mostrar_tipos(), 0)
-
-    def _salvar_cache_local(self, versao_menu: str):
-        data = {
-            "versao_menu": versao_menu,
-            "itens": {
-                n: {"tipo": p.gettipo(), "quantidade": p.getquantidade()}
-                for n, p in self.dicionario_produtos.items()
-            },
-        }
-        with tempfile.NamedTemporaryFile("w", delete=False, encoding="utf-8") as tf:
-            json.dump(data, tf, ensure_ascii=False)
-            tmp = tf.name
-        os.replace(tmp, self._cache_path)
-        self._versao_menu_cache = versao_menu
-
-    # --------------- Sheets: arranque (uma vez) ---------------
-    def _atualizar_cache_do_sheets_startup(self):
-        """No início do app: compara versão do Sheets com a do JSON.
-        Se mudou, baixa dados e regrava o JSON. Depois usamos só o JSON."""
-        if self._loading:
+    # --------------- alterações vindas do núcleo / serviço ---------------
+    def _ao_alterar_produtos(self, nomes):
+        """Na thread da UI, depois de cada alteração (local, de outra tablet ou de um lote)."""
+        if nomes is None:
+            # catálogo novo (cache, Sheets ou ligação ao serviço): índice e ecrã
+            self._atualizar_indice_pesquisa()
+            if self.root.current == "producao":
+                if self._texto_pesquisa:
+                    self._disparar_pesquisa()
+                elif self.tipo_atual:
+                    self.abrir_tipo(self.tipo_atual)
+                else:
+                    self._mostrar_tipos()
+            self._sync_qtd_display()
+            self.atualizar_resumo()
+            self._tempos.marcar("catalogo_pronto")
+            self._tempos.concluir()
             return
-        self._loading = True
-        try:
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive",
-            ]
-            creds = ServiceAccountCredentials.from_json_keyfile_name(
-                str(self._creds_json), scope
-            )
-            client = gspread.authorize(creds)
-
-            sh = client.open(self._spreadsheet_title)
-
-            # tenta achar 'Config' ou 'config'
-            try:
-                ws_cfg = sh.worksheet("Config")
-            except gspread.WorksheetNotFound:
-                try:
-                    ws_cfg = sh.worksheet("config")
-                except gspread.WorksheetNotFound:
-                    ws_cfg = None
-
-            versao_sheets = ""
-            if ws_cfg is not None:
-                try:
-                    versao_sheets = ws_cfg.acell("B1").value or ""
-                except Exception:
-                    versao_sheets = ""
-
-            precisa_baixar = not self._data_loaded or (
-                versao_sheets and versao_sheets != self._versao_menu_cache
-            )
-
-            if precisa_baixar:
-                ws = sh.sheet1  # 1ª aba: Nome | Tipo | Quantidade
-                registros = ws.get_all_records()
-
-                dicio = {}
-                for item in registros:
-                    nome = item.get("Nome")
-                    tipo = item.get("Tipo") or "Sem Tipo"
-                    try:
-                        qtd = int(item.get("Quantidade") or 0)
-                    except (ValueError, TypeError):
-                        qtd = 0
-                    if nome:
-                        dicio[nome] = produto(nome, tipo, qtd)
-
-                # atualiza memória e JSON (atômico)
-                self.dicionario_produtos = dicio
-                self._data_loaded = True
-                self._salvar_cache_local(
-                    versao_sheets or datetime.utcnow().isoformat()
-                )
-                Clock.schedule_once(lambda dt: self._mostrar_tipos(), 0)
-                print("[startup] cache atualizado a partir do Sheets.")
-            else:
-                # já temos cache da mesma versão
-                self._data_loaded = True
-                print("[startup] usando cache local (mesma versão).")
-
-        except Exception as e:
-            # offline ou outro erro: usa cache se existir
-            print("[startup] sem atualização do Sheets:", e)
-            if self._cache_path.exists():
-                self._data_loaded = True
-                Clock.schedule_once(lambda dt: self._mostrar_tipos(), 0)
-                Clock.schedule_once(
-                    lambda dt: self._set_status("⚠️ Offline. Usando dados locais."),
-                    0,
-                )
-            else:
-                Clock.schedule_once(
-                    lambda dt: self._set_status("❌ Sem internet e sem cache local."),
-                    0,
-                )
-        finally:
-            self._loading = False
-
-    # --------------- Suporte à tela de detalhe ---------------
-    def _sync_qtd_display(self):
-        """Atualiza a qtd para a tela de detalhe antes da tela aparecer."""
-        nome = self.produto_selecionado
-        qtd = 0
-        try:
-            if nome in self.dicionario_produtos:
-                qtd = int(self.dicionario_produtos[nome].getquantidade())
-        except Exception:
-            qtd = 0
-        self.qtd_atual_display = qtd
+        if self.produto_selecionado in nomes:
+            self._sync_qtd_display()
+        self._atualizar_tiles(nomes)
+        # se o resumo estiver aberto, atualiza só as linhas destes produtos e os totais
+        self.atualizar_resumo(nomes)
+
+    @cronometrar("ui.atualizar_tiles")
+    def _atualizar_tiles(self, nomes):
+        """Só os tiles (dados do RecycleView) dos produtos alterados, sem voltar ao topo."""
+        if self.root.current != "producao" or not (self.tipo_atual or self._texto_pesquisa):
+            return
+        grid = self.root.get_screen("producao").ids.grid
+        alvo = set(nomes)
+        store = self.dicionario_produtos
+        for i, d in enumerate(grid.data):
+            nome = d.get("nome")
+            if nome in alvo and nome in store:
+                qtd = store.getquantidade(nome)
+                if d["quantity"] != qtd:
+                    grid.data[i] = dict(d, quantity=qtd)
 
     # --------------- Construção dinâmica da tela ---------------
+    @cronometrar("ui.grelha_tipos")
     def _mostrar_tipos(self):
         self._set_status("Toque num TIPO para ver os produtos.")
         self._limpar_grid()
@@ -342,42 +314,113 @@ class AppCozinha(MDApp):
         self.tipo_atual = ""  # estamos na lista de tipos
         grid = self.root.get_screen("producao").ids.grid
 
-        tipos = sorted({p.gettipo() for p in self.dicionario_produtos.values()})
+        tipos = self.dicionario_produtos.tipos() if self._data_loaded else self._tipos_iniciais
         if not tipos:
             self._set_status("Nenhum tipo encontrado.")
             return
 
-        for tipo in tipos:
-            tile = TipoTile(title=tipo, tipo=tipo)
-            tile.ids.hit.on_release = (lambda t=tipo: self.abrir_tipo(t))
-            grid.add_widget(tile)
+        # RecycleView: só os tiles visíveis existem; os dados são reatribuídos
+        grid.data = [{"viewclass": "TipoTile", "title": tipo, "tipo": tipo} for tipo in tipos]
+        grid.scroll_y = 1
+        self._tempos.marcar("primeira_grelha")
 
+    @cronometrar("ui.abrir_tipo")
     def abrir_tipo(self, tipo: str):
         self.tipo_atual = tipo  # estamos dentro deste tipo
+        if not self._data_loaded:
+            # grelha veio do índice: os produtos aparecem quando o catálogo for instalado
+            self._limpar_grid()
+            self._set_status(f"⏳ A carregar [b]{tipo}[/b]...")
+            return
         self._set_status(f"Tipo: [b]{tipo}[/b]. Toque num produto.")
         self._limpar_grid()
         self._mostrar_botoes_acao(False)
         grid = self.root.get_screen("producao").ids.grid
 
-        produtos_tipo = sorted(
-            [
-                (n, p.getquantidade())
-                for n, p in self.dicionario_produtos.items()
-                if p.gettipo() == tipo
-            ],
-            key=lambda x: x[0].lower(),
-        )
-        for nome, qtd in produtos_tipo:
-            tile = ProdutoTile(title=nome, nome=nome, tipo=tipo, quantity=qtd)
-            # Abre a tela de detalhe com teclado numérico embutido
-            tile.ids.hit.on_release = (
-                lambda n=nome, t=tipo: self.abrir_detalhe_produto(n, t)
-            )
-            grid.add_widget(tile)
+        # índice por tipo já ordenado por nome: O(itens do tipo)
+        grid.data = [
+            {"viewclass": "ProdutoTile", "title": nome, "nome": nome, "tipo": tipo, "quantity": qtd}
+            for nome, qtd in self.dicionario_produtos.produtos_do_tipo(tipo)
+        ]
+        grid.scroll_y = 1
 
     def voltar_aos_tipos(self):
         self._mostrar_tipos()
 
+    # --------------- Pesquisa por nome ---------------
+    def _atualizar_indice_pesquisa(self):
+        """Catálogo novo: 1.ª vez constrói o índice numa thread; depois só indexa as diferenças."""
+        if self._indice_a_construir:
+            return
+        if len(self._pesquisa):
+            self._pesquisa.sincronizar(self.dicionario_produtos)
+            return
+        nomes = list(self.dicionario_produtos)
+        if not nomes:
+            return
+        self._indice_a_construir = True
+
+        def _job():
+            indice = IndicePesquisa(nomes)
+            self._na_ui(lambda: self._instalar_indice_pesquisa(indice))
+
+        Thread(target=_job, name="pesquisa", daemon=True).start()
+
+    def _instalar_indice_pesquisa(self, indice: IndicePesquisa):
+        # o catálogo pode ter mudado durante a construção
+        indice.sincronizar(self.dicionario_produtos)
+        self._pesquisa = indice
+        self._indice_a_construir = False
+        if self._texto_pesquisa:
+            self._disparar_pesquisa()
+
+    def pesquisar_produtos(self, texto: str):
+        """on_text do campo de pesquisa: resultados a cada tecla; vazio volta à grelha."""
+        texto = texto.strip()
+        if texto == self._texto_pesquisa:
+            return
+        self._texto_pesquisa = texto
+        self._disparar_pesquisa()
+
+    def limpar_pesquisa(self):
+        try:
+            # o on_text do campo volta a mostrar a grelha
+            self.root.get_screen("producao").ids.pesquisa.text = ""
+        except Exception as e:
+            print("[pesquisa]", e)
+
+    @cronometrar("ui.pesquisa")
+    def _mostrar_pesquisa(self):
+        if self.root.current != "producao":
+            return
+        texto = self._texto_pesquisa
+        if not texto:
+            if self.tipo_atual:
+                self.abrir_tipo(self.tipo_atual)
+            else:
+                self._mostrar_tipos()
+            return
+        self._mostrar_botoes_acao(False)
+        if not self._data_loaded or not len(self._pesquisa):
+            # o índice chega com o catálogo (e volta a pesquisar)
+            self._limpar_grid()
+            self._set_status("⏳ A carregar produtos...")
+            return
+
+        store = self.dicionario_produtos
+        nomes = [nome for nome in self._pesquisa.pesquisar(texto, LIMITE_PESQUISA) if nome in store]
+        grid = self.root.get_screen("producao").ids.grid
+        grid.data = [
+            {"viewclass": "ProdutoTile", "title": nome, "nome": nome,
+             "tipo": store.gettipo(nome), "quantity": store.getquantidade(nome)}
+            for nome in nomes
+        ]
+        grid.scroll_y = 1
+        if nomes:
+            self._set_status(f"Pesquisa: [b]{texto}[/b]. Toque num produto.")
+        else:
+            self._set_status(f"Nenhum produto encontrado para [b]{texto}[/b].")
+
     # --------------- Tela de DETALHE ---------------
     def abrir_detalhe_produto(self, nome: str, tipo: str):
         """Vai para a tela de detalhes do produto selecionado."""
@@ -387,71 +430,95 @@ class AppCozinha(MDApp):
         self._sync_qtd_display()
         self.root.current = "detalhe_produto"
 
-    def confirmar_ajuste_quantidade(self, direcao: int):
+    # --------------- Ajustes em lote (contagens, entregas, CSV) ---------------
+    def aplicar_ajustes_lote(self, ajustes, ignorar_desconhecidos: bool = False):
         """
-        Aplica o valor digitado ao produto (direcao: +1 adicionar, -1 subtrair),
-        salva no Excel e mantém na tela de detalhe.
-        Evita números negativos.
+        Aplica vários ajustes (op, nome, valor) como uma só transação:
+        tudo ou nada, um registo no diário, uma gravação e uma atualização da UI.
+        Lança ErroLote se algum ajuste for inválido. Devolve {nome: (antes, depois)}.
+        Em modo cliente espera pela resposta do serviço: chamar fora da thread da UI.
         """
-        try:
-            valor = int(self.keypad_value or "0")
-        except ValueError:
-            valor = 0
+        return self._fonte.aplicar_lote(ajustes, ignorar_desconhecidos)
 
-        if valor <= 0:
-            return
+    def importar_csv(self, caminho: str, contagem: bool = False):
+        """
+        Importa um CSV de entregas ("+") ou de contagem ("=") sem bloquear a UI:
+        a leitura corre numa thread e o lote é aplicado depois na thread da UI.
+        """
+        catalogo = nomes_por_chave(self.dicionario_produtos)
+        op_padrao = LOTE_DEFINIR if contagem else LOTE_AUMENTAR
 
-        nome = self.produto_selecionado
-        if nome not in self.dicionario_produtos:
-            return
+        def _job():
+            try:
+                lote = ler_lote_csv(caminho, catalogo=catalogo, op_padrao=op_padrao)
+            except Exception as e:
+                print("[importação] erro:", e)
+                # a mensagem é montada aqui: `e` deixa de existir no fim do except
+                msg = f"❌ Falha ao ler o CSV: {e}"
+                self._na_ui(lambda: (self._set_status(msg), self._toast(msg)))
+                return
+            if self._remoto is not None:
+                # o serviço aplica o lote; a resposta é esperada aqui, fora da UI
+                self._aplicar_importacao(lote)
+            else:
+                Clock.schedule_once(lambda dt: self._aplicar_importacao(lote), 0)
 
-        p = self.dicionario_produtos[nome]
-        atual = int(p.getquantidade() or 0)
+        self._set_status("⏳ A importar CSV...")
+        Thread(target=_job, daemon=True).start()
 
-        if direcao == 1:
-            p.aumentarquantidade(valor)
+    def _aplicar_importacao(self, lote):
+        try:
+            alterados = self.aplicar_ajustes_lote(lote)
+        except ErroLote as e:
+            print("[importação]", e)
+            msg = f"❌ CSV rejeitado (nada foi alterado): {e}"
+        except Exception as e:
+            # modo cliente: serviço em baixo ou pedido recusado
+            print("[importação] erro:", e)
+            msg = f"❌ Falha ao importar: {e}"
         else:
-            # nunca deixar negativo
-            decremento = min(valor, max(0, atual))
-            if decremento > 0:
-                p.diminuirquantidade(decremento)
+            msg = f"✅ {lote.n_ajustes} linha(s) importada(s), {len(alterados)} produto(s) alterado(s)."
+        self._na_ui(lambda: (self._set_status(msg), self._toast(msg)))
 
-        # atualiza display e limpa entrada
-        self._sync_qtd_display()
-        self.keypad_value = ""
+    def abrir_importacao_csv(self, contagem: bool = False):
+        """Escolha do ficheiro CSV (entregas ou contagem)."""
+        from kivymd.uix.filemanager import MDFileManager
 
-        # salva no Excel (e cache) em background
-        Thread(target=self._salvar_excel_bg, daemon=True).start()
+        def _escolhido(caminho):
+            self._gestor_ficheiros.close()
+            self.importar_csv(caminho, contagem=contagem)
 
-        # se o resumo estiver aberto, atualiza
-        self.atualizar_resumo()
+        self._gestor_ficheiros = MDFileManager(
+            exit_manager=lambda *a: self._gestor_ficheiros.close(),
+            select_path=_escolhido,
+            ext=[".csv", ".txt"],
+        )
+        self._gestor_ficheiros.show(os.path.expanduser("~"))
 
     def cancelar_entrada(self):
         """Ignora o valor digitado e volta a mostrar 0."""
         self.keypad_value = ""
 
-    # --------------- Teclado numérico ---------------
-    def keypad_add_digit(self, d: str):
-        novo = (self.keypad_value or "") + d
-        if len(novo) <= 6 and novo.isdigit():
-            self.keypad_value = str(int(novo)) if novo != "" else "0"
-
-    def keypad_backspace(self):
-        self.keypad_value = self.keypad_value[:-1] if self.keypad_value else ""
-
-    def keypad_clear(self):
-        self.keypad_value = ""
-
     # --------------- Tela resumo ------------------------------------------
     def abrir_resumo(self):
         self.root.current = "resumo"
         self._montar_resumo()
 
-    def atualizar_resumo(self):
-        # reconstrói a lista (ex.: após add/subtrair quantidade)
-        if self.root.current == "resumo":
+    def atualizar_resumo(self, nomes=None):
+        """
+        Atualiza a tabela de resumo, se estiver aberta.
+        - com `nomes`: só as linhas desses produtos, o total do tipo e o total geral;
+        - sem `nomes`: compara a tabela toda e só troca as linhas que mudaram
+          (ex.: catálogo novo vindo do Sheets).
+        """
+        if self.root.current != "resumo":
+            return
+        if nomes is not None and self._resumo_pos_produto:
+            self._patch_resumo_produtos(nomes)
+        else:
             self._montar_resumo()
 
+    @cronometrar("ui.resumo")
     def _montar_resumo(self):
         """Constrói a tabela agrupada por tipo, com alternância de linhas e totais."""
         try:
@@ -459,72 +526,209 @@ class AppCozinha(MDApp):
         except Exception:
             return
 
-        cont = scr.ids.table_container
-        cont.clear_widgets()
-
         # data no título
         self.data_hoje_str = datetime.today().strftime("%d/%m/%Y")
 
-        # agrupa por tipo
-        por_tipo = {}
-        for nome, prod in self.dicionario_produtos.items():
-            tipo = prod.gettipo() or "Sem Tipo"
-            por_tipo.setdefault(tipo, []).append((nome, int(prod.getquantidade() or 0)))
+        # o RecycleView só instancia as linhas visíveis; aqui montamos só os dados
+        rv = scr.ids.table_container
+        linhas, self._resumo_pos_produto, self._resumo_pos_total = self._linhas_resumo()
+
+        antigas = rv.data
+        mesma_estrutura = len(antigas) == len(linhas) and all(
+            a["viewclass"] == b["viewclass"] and a["left_text"] == b["left_text"]
+            for a, b in zip(antigas, linhas)
+        )
+        if not mesma_estrutura:
+            rv.data = linhas
+            return
+        # diff-and-patch: só as linhas com valores diferentes são reatribuídas
+        for i, (a, b) in enumerate(zip(antigas, linhas)):
+            if a != b:
+                rv.data[i] = b
+
+    def _patch_resumo_produtos(self, nomes):
+        """Ajuste pontual: uma linha por produto + total do tipo + total geral."""
+        try:
+            rv = self.root.get_screen("resumo").ids.table_container
+        except Exception:
+            return
+        store = self.dicionario_produtos
+        tipos = set()
+        for nome in nomes:
+            i = self._resumo_pos_produto.get(nome)
+            if i is None or nome not in store:
+                # produto novo/removido: a estrutura mudou
+                self._montar_resumo()
+                return
+            self._trocar_valor_resumo(rv, i, store.getquantidade(nome))
+            tipos.add(store.gettipo(nome))
+        for tipo in tipos:
+            self._trocar_valor_resumo(rv, self._resumo_pos_total[tipo], store.total_tipo(tipo))
+        self._trocar_valor_resumo(rv, self._resumo_pos_total[None], store.total_geral())
 
-        # ordena tipos e produtos
-        for tipo in sorted(por_tipo.keys(), key=str.lower):
-            items = sorted(por_tipo[tipo], key=lambda t: t[0].lower())
+    @staticmethod
+    def _trocar_valor_resumo(rv, i, valor):
+        texto = str(valor)
+        if rv.data[i]["right_text"] != texto:
+            rv.data[i] = dict(rv.data[i], right_text=texto)
 
+    def _linhas_resumo(self):
+        """
+        Linhas (dicts de dados) da tabela de resumo: cabeçalho, produtos em zebra,
+        total por tipo e TOTAL GERAL. Devolve também as posições de cada produto e
+        de cada total (chave None = total geral) para atualizações pontuais.
+        """
+        linhas, pos_produto, pos_total = [], {}, {}
+        # grupos e totais vêm dos índices do ProductStore (mesma agregação do serviço)
+        resumo = resumo_catalogo(self.dicionario_produtos)
+        for grupo in resumo["tipos"]:
+            tipo = grupo["tipo"]
             # cabeçalho do tipo
-            header = Factory.TableGroupHeader()
-            header.ids.left.text = tipo
-            header.ids.right.text = "Quantidade"
-            cont.add_widget(header)
-
-            # linhas alternadas
-            total_tipo = 0
-            for i, (nome, qtd) in enumerate(items):
-                row = Factory.TableRow()
-                # zebra (linhas alternadas)
-                row.bg_color = (1, 1, 1, 1) if (i % 2 == 0) else (0.97, 0.98, 1, 1)
-                row.ids.left.text = nome
-                row.ids.right.text = str(qtd)
-                cont.add_widget(row)
-                total_tipo += qtd
+            linhas.append({
+                "viewclass": "TableGroupHeader", "tam": (None, dp(40)),
+                "left_text": tipo, "right_text": "Quantidade",
+            })
+
+            # linhas alternadas (zebra)
+            for i, (nome, qtd) in enumerate(grupo["produtos"]):
+                pos_produto[nome] = len(linhas)
+                linhas.append({
+                    "viewclass": "TableRow", "tam": (None, dp(36)),
+                    "bg_color": (1, 1, 1, 1) if (i % 2 == 0) else (0.97, 0.98, 1, 1),
+                    "left_text": nome, "right_text": str(qtd),
+                })
 
             # total do tipo
-            total = Factory.TableTotal()
-            total.ids.left.text = f"Total {tipo}"
-            total.ids.right.text = str(total_tipo)
-            cont.add_widget(total)
+            pos_total[tipo] = len(linhas)
+            linhas.append({
+                "viewclass": "TableTotal", "tam": (None, dp(38)),
+                "left_text": f"Total {tipo}", "right_text": str(grupo["total"]),
+            })
+
+        # total geral
+        pos_total[None] = len(linhas)
+        linhas.append({
+            "viewclass": "TableTotal", "tam": (None, dp(38)),
+            "bg_color": (0.85, 0.89, 0.97, 1),
+            "left_text": "TOTAL GERAL", "right_text": str(resumo["total_geral"]),
+        })
+        return linhas, pos_produto, pos_total
+
+    # --------------- Mapa de produção: planeado vs produzido ---------------
+    def abrir_mapa(self):
+        """Tela com planeado / produzido / perdas por produto e por secção."""
+        rec = self._fonte.reconciliacao()
+        if rec is None:
+            self._toast("Mapa de produção não encontrado.")
+            return
+        self.root.current = "mapa"
+        self.root.get_screen("mapa").ids.mapa_container.data = self._linhas_mapa(rec)
+
+    def _linhas_mapa(self, rec):
+        linhas = []
+        mapa = rec.mapa
+        for s, seccao in enumerate(mapa.seccoes):
+            linhas.append({
+                "viewclass": "TableGroupHeader", "tam": (None, dp(40)),
+                "left_text": seccao, "right_text": "Plan. / Prod. / Perdas",
+            })
+            for j, i in enumerate(rec.linhas_seccao(s)):
+                linhas.append({
+                    "viewclass": "TableRow", "tam": (None, dp(36)),
+                    "bg_color": (1, 1, 1, 1) if (j % 2 == 0) else (0.97, 0.98, 1, 1),
+                    "left_text": mapa.produtos[i],
+                    "right_text": f"{rec.planeado[i]} / {rec.produzido[i]} / {rec.perdas[i]}",
+                })
+            linhas.append({
+                "viewclass": "TableTotal", "tam": (None, dp(38)),
+                "left_text": f"Total {seccao}",
+                "right_text": f"{rec.seccao_planeado[s]} / {rec.seccao_produzido[s]} / {rec.seccao_perdas[s]}",
+            })
+
+        plan, prod, perdas, _ = rec.totais()
+        linhas.append({
+            "viewclass": "TableTotal", "tam": (None, dp(38)),
+            "bg_color": (0.85, 0.89, 0.97, 1),
+            "left_text": "TOTAL GERAL", "right_text": f"{plan} / {prod} / {perdas}",
+        })
+        if rec.sem_mapa:
+            linhas.append({
+                "viewclass": "TableGroupHeader", "tam": (None, dp(40)),
+                "left_text": "Fora do mapa", "right_text": "Produzido",
+            })
+            for j, nome in enumerate(sorted(rec.sem_mapa, key=str.lower)):
+                linhas.append({
+                    "viewclass": "TableRow", "tam": (None, dp(36)),
+                    "bg_color": (1, 1, 1, 1) if (j % 2 == 0) else (0.97, 0.98, 1, 1),
+                    "left_text": nome,
+                    "right_text": str(self.dicionario_produtos.getquantidade(nome)),
+                })
+        return linhas
+
+    # --------------- Diagnóstico (escondido: 3 toques no texto da Home) ---------------
+    def abrir_diagnostico(self):
+        """Tempos por span, contadores, fases do arranque e memória (ver metricas.py)."""
+        self.root.current = "diagnostico"
+        self.root.get_screen("diagnostico").ids.diag_container.data = self._linhas_diagnostico()
+
+    def alternar_metricas(self):
+        metricas.ativar(not metricas.ativo)
+        self._toast("📈 Métricas ligadas." if metricas.ativo else "Métricas desligadas.")
+        self.abrir_diagnostico()
+
+    def fotografar_memoria(self):
+        """Fotografia do tracemalloc fora da thread da UI (liga-o se ainda não estiver)."""
+        if not metricas.memoria_ativa:
+            metricas.ativar(True, memoria=True)
+            self._toast("tracemalloc ligado: a memória conta a partir de agora.")
 
-    # --------------- Salvar Excel + cache (background) ---------------
-    def _salvar_excel_bg(self):
-        try:
-            salvar_producao_diaria(self.dicionario_produtos, data=date.today(), nome_arquivo=str(self._xlsx_path))
-            # persiste também no cache local para próximos arranques
-            self._salvar_cache_local(self._versao_menu_cache or datetime.utcnow().isoformat())
-            data_str = date.today().strftime("%d-%m-%Y")
-            msg = f"✅ Produção salva. Planilha atualizada na aba '{data_str}'."
-            Clock.schedule_once(lambda dt: self._set_status(msg), 0)
-        except Exception as e:
-            print("[Excel] erro:", e)
-            Clock.schedule_once(lambda dt: self._set_status(f"❌ Erro ao salvar: {e}"), 0)
+        def _job():
+            metricas.fotografia_memoria()
+            self._na_ui(self.abrir_diagnostico)
 
-    # --------------- Salvar Excel + cache (síncrono, para exportação) ---------------
-    def _salvar_excel_sync(self) -> str:
-        """
-        Salva a produção do dia no Excel de forma síncrona (bloqueante)
-        e retorna o caminho absoluto do arquivo gerado/atualizado.
-        """
-        salvar_producao_diaria(
-            self.dicionario_produtos,
-            data=date.today(),
-            nome_arquivo=str(self._xlsx_path),
-        )
-        # Atualiza também o cache local (mesma lógica usada no save em background)
-        self._salvar_cache_local(self._versao_menu_cache or datetime.utcnow().isoformat())
-        return str(self._xlsx_path)
+        Thread(target=_job, daemon=True).start()
+
+    def _linhas_diagnostico(self):
+        def cabecalho(esquerda, direita=""):
+            return {"viewclass": "TableGroupHeader", "tam": (None, dp(40)),
+                    "left_text": esquerda, "right_text": direita}
+
+        def linha(j, esquerda, direita):
+            return {"viewclass": "TableRow", "tam": (None, dp(36)),
+                    "bg_color": (1, 1, 1, 1) if (j % 2 == 0) else (0.97, 0.98, 1, 1),
+                    "left_text": esquerda, "right_text": direita}
+
+        resumo = metricas.resumo()
+        estado = "ligadas" if metricas.ativo else "desligadas (📈 para ligar)"
+        linhas = [cabecalho(f"Métricas {estado}", "n · p50 / p95 / máx ms")]
+        for j, (nome, r) in enumerate(resumo["spans"].items()):
+            erros = f" · {r['erros']} erro(s)" if r["erros"] else ""
+            linhas.append(linha(j, nome, f"{r['n']} · {r['p50_ms']:.1f} / {r['p95_ms']:.1f} / {r['max_ms']:.1f}{erros}"))
+
+        if resumo["contadores"]:
+            linhas.append(cabecalho("Contadores", "Total"))
+            for j, (nome, n) in enumerate(resumo["contadores"].items()):
+                linhas.append(linha(j, nome, str(n)))
+
+        linhas.append(cabecalho("Arranque", "ms desde o início"))
+        for j, (fase, ms) in enumerate(sorted(self._tempos.fases.items(), key=lambda f: f[1])):
+            linhas.append(linha(j, fase, f"{ms:.0f}"))
+
+        memoria = metricas.ultima_memoria
+        if memoria is not None:
+            linhas.append(cabecalho("Memória Python", f"{memoria['atual_kb']:.0f} KB (pico {memoria['pico_kb']:.0f})"))
+            for j, texto in enumerate(memoria["top"]):
+                onde, _, tamanho = texto.partition(" ")
+                linhas.append(linha(j, onde, tamanho))
+        return linhas
+
+    # --------------- Gravação do Excel (avisos do núcleo) ---------------
+    def _ao_gravar_excel(self):
+        data_str = date.today().strftime("%d-%m-%Y")
+        self._set_status(f"✅ Produção salva. Planilha atualizada na aba '{data_str}'.")
+
+    def _ao_erro_excel(self, e: Exception):
+        self._set_status(f"❌ Erro ao salvar: {e}")
 
     # --------------- Exportação por e-mail (com confirmação) ---------------
     def abrir_confirmacao_exportar(self):
@@ -536,9 +740,15 @@ class AppCozinha(MDApp):
                 pass
             self._dialog_export = None
 
+        # widgets do diálogo só na primeira exportação (não no arranque)
+        from kivymd.uix.dialog import MDDialog
+        from kivymd.uix.button import MDRaisedButton, MDFlatButton
+
+        opcoes = Factory.OpcoesExportacao()
         self._dialog_export = MDDialog(
             title="Deseja exportar produção?",
-            text="Será enviado por e-mail o Excel COMPLETO com todas as abas.",
+            type="custom",
+            content_cls=opcoes,
             buttons=[
                 MDFlatButton(
                     text="NÃO",
@@ -546,7 +756,7 @@ class AppCozinha(MDApp):
                 ),
                 MDRaisedButton(
                     text="SIM",
-                    on_release=lambda *a: self._confirmar_exportacao()
+                    on_release=lambda *a: self._confirmar_exportacao(opcoes.periodo, opcoes.comprimir)
                 ),
             ],
             auto_dismiss=False,
@@ -561,42 +771,36 @@ class AppCozinha(MDApp):
                 pass
             self._dialog_export = None
 
-    def _confirmar_exportacao(self):
+    def _confirmar_exportacao(self, periodo: str = "hoje", comprimir: bool = False):
         self._fechar_dialog_export()
-        self._executar_exportacao()
+        self._executar_exportacao(periodo, comprimir)
 
-    def _executar_exportacao(self):
+    def _executar_exportacao(self, periodo: str = "hoje", comprimir: bool = False):
         """
         Executa a exportação: salva sincronamente o Excel com os dados mais atuais
-        e em seguida envia por e-mail em background.
+        e coloca o envio na caixa de saída (o worker envia e repete se falhar).
+        Em modo cliente é o serviço que grava o Excel partilhado e envia o e-mail.
         """
         def _job():
             try:
-                # 1) Garante que o arquivo contém as últimas alterações
-                caminho = self._salvar_excel_sync()
-
-                # 2) Envia o ARQUIVO COMPLETO por e-mail
-                from email_service import EmailService
-                assunto = f"Produção — Loja 012 — {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-                corpo = (
-                    "Segue em anexo a planilha de produção completa.\n\n"
-                    "Este e-mail foi enviado automaticamente pelo app de Gestão da Cozinha."
-                )
-                EmailService().send_excel(
-                    filepath=caminho,
-                    subject=assunto,
-                    body=corpo,
-                )
-
-                # 3) Feedback para o usuário
-                Clock.schedule_once(lambda dt: self._toast("📧 Exportado e enviado com sucesso."), 0)
-
+                self._fonte.exportar(periodo, comprimir)
+                if self._remoto is not None:
+                    self._na_ui(lambda: self._set_status("📤 Envio pedido ao serviço da loja."))
             except Exception as e:
                 print("[Exportação] erro:", e)
-                Clock.schedule_once(lambda dt: self._toast(f"❌ Falha ao exportar/enviar: {e}"), 0)
+                contar("erros.exportacao")
+                msg = f"❌ Falha ao exportar/enviar: {e}"
+                Clock.schedule_once(lambda dt: self._toast(msg), 0)
 
         Thread(target=_job, daemon=True).start()
 
+    def _ao_estado_envio(self, job_id: str, estado: str, mensagem: str):
+        """Estado da caixa de saída (já na thread da UI, via núcleo)."""
+        if estado in (ENVIADO, FALHOU):
+            self._toast(mensagem)
+        else:
+            self._set_status(f"📤 {mensagem}")
+
 
 if __name__ == "__main__":
     AppCozinha().run()
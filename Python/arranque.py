@@ -0,0 +1,84 @@
+# arranque.py
+# Arranque rápido: tempos de cada fase (para apanhar regressões) e o índice do
+# "primeiro ecrã" — só a lista de tipos, num JSON minúsculo — para a grelha de tipos
+# aparecer antes de o catálogo inteiro ser lido da base de dados.
+# Não importa nada pesado: é o primeiro módulo que a app carrega.
+
+import json
+import time
+from pathlib import Path
+from threading import Lock
+from typing import List, Optional
+
+from escrita_atomica import gravar_json
+from metricas import evento
+
+# instante de referência: a importação deste módulo (≈ início do processo da app)
+T0 = time.perf_counter()
+
+
+class TemposArranque:
+    """
+    - `marcar(fase)` guarda os ms desde `t0` (pode ser chamado de qualquer thread).
+    - `concluir()` (só a primeira vez) imprime o resumo e acrescenta uma linha JSON
+      ao `registo`: {"quando", "fases": {fase: ms}}, para comparar entre versões.
+    """
+
+    def __init__(self, registo: Optional[Path] = None, t0: Optional[float] = None):
+        self.registo = Path(registo) if registo else None
+        self.t0 = T0 if t0 is None else t0
+        self.fases = {}
+        self._lock = Lock()
+        self._concluido = False
+
+    def marcar(self, fase: str) -> float:
+        ms = round((time.perf_counter() - self.t0) * 1000, 1)
+        with self._lock:
+            self.fases.setdefault(fase, ms)
+        return ms
+
+    def resumo(self) -> str:
+        with self._lock:
+            fases = sorted(self.fases.items(), key=lambda f: f[1])
+        partes, anterior = [], 0.0
+        for fase, ms in fases:
+            partes.append(f"{fase} {ms:.0f}ms (+{ms - anterior:.0f})")
+            anterior = ms
+        return " | ".join(partes)
+
+    def concluir(self):
+        with self._lock:
+            if self._concluido:
+                return
+            self._concluido = True
+            fases = dict(self.fases)
+        print("[arranque]", self.resumo())
+        # as mesmas fases no ficheiro de métricas (se estiverem ligadas)
+        evento("arranque", fases=fases)
+        if self.registo is None:
+            return
+        try:
+            with open(self.registo, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps({"quando": round(time.time()), "fases": fases}) + "\n")
+        except OSError as e:
+            print("[arranque] registo dos tempos:", e)
+
+
+# ---------------- índice do primeiro ecrã ----------------
+def ler_primeiro_ecra(caminho: Path) -> List[str]:
+    """Tipos do catálogo, pela ordem da grelha ([] se não houver índice)."""
+    try:
+        dados = json.loads(Path(caminho).read_text(encoding="utf-8"))
+        return [str(t) for t in dados.get("tipos") or ()]
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def gravar_primeiro_ecra(caminho: Path, store) -> bool:
+    """Regrava o índice se os tipos mudaram (escrita atómica). Devolve True se gravou."""
+    caminho = Path(caminho)
+    tipos = list(store.tipos())
+    if ler_primeiro_ecra(caminho) == tipos:
+        return False
+    gravar_json(caminho, {"tipos": tipos, "produtos": len(store)}, ensure_ascii=False)
+    return True
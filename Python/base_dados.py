@@ -0,0 +1,339 @@
+# base_dados.py
+# Base de dados da loja em SQLite (modo WAL): é aqui que vivem o catálogo, a produção
+# de cada dia e o registo de todos os ajustes. O Excel passa a ser só uma vista
+# gerada a partir de uma consulta (ver salvarexecel.salvar_producao_diaria).
+#
+#   catalogo(id, nome, tipo, quantidade, ativo)        quantidades atuais
+#   producao_diaria(dia, produto_id, tipo, quantidade)  uma linha por dia e produto
+#   eventos(id, t, produto_id, op, delta, quantidade, dev)  cada toque (auditoria)
+#   meta(chave, valor)                                  versão do menu, migração
+#
+# Cada toque é uma transação curta com SQL fixo (o sqlite3 guarda os statements já
+# preparados por ligação); os lotes e a troca de catálogo vão numa só transação.
+# Uma segunda ligação, só de leitura, serve as exportações sem travar os toques.
+
+import os
+import platform
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE TABLE IF NOT EXISTS catalogo (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE,
+    tipo TEXT NOT NULL,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    ativo INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS producao_diaria (
+    dia TEXT NOT NULL,
+    produto_id INTEGER NOT NULL REFERENCES catalogo(id),
+    tipo TEXT NOT NULL,
+    quantidade INTEGER NOT NULL,
+    PRIMARY KEY (dia, produto_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_producao_dia_tipo ON producao_diaria(dia, tipo);
+CREATE INDEX IF NOT EXISTS idx_producao_produto ON producao_diaria(produto_id, dia);
+CREATE TABLE IF NOT EXISTS eventos (
+    id INTEGER PRIMARY KEY,
+    t REAL NOT NULL,
+    produto_id INTEGER REFERENCES catalogo(id),
+    op TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    quantidade INTEGER NOT NULL,
+    dev TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_eventos_produto ON eventos(produto_id, t);
+"""
+
+# SQL do caminho de cada toque (texto fixo = statement preparado reaproveitado)
+_SQL_QUANTIDADE = (
+    "INSERT INTO catalogo (nome, tipo, quantidade) VALUES (?, ?, ?) "
+    "ON CONFLICT(nome) DO UPDATE SET quantidade = excluded.quantidade, ativo = 1"
+)
+_SQL_EVENTO = (
+    "INSERT INTO eventos (t, produto_id, op, delta, quantidade, dev) "
+    "VALUES (?, (SELECT id FROM catalogo WHERE nome = ?), ?, ?, ?, ?)"
+)
+_SQL_CATALOGO = (
+    "INSERT INTO catalogo (nome, tipo, quantidade, ativo) VALUES (?, ?, ?, 1) "
+    "ON CONFLICT(nome) DO UPDATE SET tipo = excluded.tipo, quantidade = excluded.quantidade, ativo = 1"
+)
+
+
+class BaseDados:
+    """
+    - `registar(op, nome, tipo, delta, quantidade)`: um toque (quantidade nova + evento).
+    - `registar_lote(...)`: vários ajustes numa só transação (tudo ou nada).
+    - `carregar()` / `gravar_snapshot(itens, versao)`: o catálogo inteiro, no mesmo
+      formato {nome: {"tipo", "quantidade"}} do antigo cache JSON.
+    - `registar_dia(dia)` copia as quantidades atuais para a produção do dia;
+      `producao_por_tipo(dia)` é a consulta de onde sai a aba do Excel.
+    - `migrar_ficheiros(...)`: importa uma vez o cache JSON + diário e as partições xlsx.
+    Thread-safe: escritas serializadas por um lock; leituras numa ligação à parte.
+    """
+
+    def __init__(self, caminho: Path, dispositivo: Optional[str] = None, sincrono: Optional[str] = None):
+        self.caminho = Path(caminho)
+        self.dispositivo = dispositivo or os.getenv("NATABASE_DISPOSITIVO") or platform.node() or "desconhecido"
+        # FULL: cada toque sobrevive a uma falha de energia (como o fsync do diário);
+        # NORMAL: só a uma falha da app, mas sem fsync por toque
+        sincrono = (sincrono or os.getenv("NATABASE_SQLITE_SYNC") or "FULL").upper()
+        if sincrono not in ("FULL", "NORMAL", "OFF"):
+            raise ValueError(f"NATABASE_SQLITE_SYNC inválido: {sincrono}")
+
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._lock_leitura = Lock()
+        # autocommit: as transações são abertas explicitamente com BEGIN IMMEDIATE
+        self._con = self._ligar(isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute(f"PRAGMA synchronous={sincrono}")
+        self._con.execute("PRAGMA foreign_keys=ON")
+        self._con.executescript(_ESQUEMA)
+        self._con_leitura = self._ligar(isolation_level=None)
+
+    def _ligar(self, **kw) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.caminho), check_same_thread=False, cached_statements=64, timeout=30, **kw)
+
+    def fechar(self):
+        with self._lock, self._lock_leitura:
+            self._con_leitura.close()
+            # junta o WAL ao ficheiro principal para a próxima abertura ser rápida
+            self._con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._con.close()
+
+    def _transacao(self, passos):
+        """Corre `passos(con)` numa transação de escrita (chamar com o lock)."""
+        con = self._con
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            passos(con)
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        con.execute("COMMIT")
+
+    # ---------------- meta ----------------
+    def _meta(self, chave: str) -> Optional[str]:
+        with self._lock_leitura:
+            linha = self._con_leitura.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+
+    @staticmethod
+    def _definir_meta(con, chave: str, valor: Optional[str]):
+        con.execute(
+            "INSERT INTO meta (chave, valor) VALUES (?, ?) ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+            (chave, valor),
+        )
+
+    def _tem_linhas(self, tabela: str) -> bool:
+        with self._lock_leitura:
+            return self._con_leitura.execute(f"SELECT 1 FROM {tabela} LIMIT 1").fetchone() is not None
+
+    # ---------------- toques ----------------
+    def registar(self, op: str, nome: str, tipo: str, delta: int, quantidade: int):
+        """Um toque: grava a quantidade nova e o evento na mesma transação."""
+        t = round(time.time(), 3)
+
+        def passos(con):
+            con.execute(_SQL_QUANTIDADE, (nome, tipo, int(quantidade)))
+            con.execute(_SQL_EVENTO, (t, nome, op, int(delta), int(quantidade), self.dispositivo))
+
+        with self._lock:
+            self._transacao(passos)
+
+    def registar_lote(self, ajustes: Iterable[Tuple[str, str, str, int, int]]):
+        """Vários (op, nome, tipo, delta, quantidade) numa transação: entram todos ou nenhum."""
+        ajustes = [(op, nome, tipo, int(delta), int(qtd)) for op, nome, tipo, delta, qtd in ajustes]
+        if not ajustes:
+            return
+        t = round(time.time(), 3)
+
+        def passos(con):
+            con.executemany(_SQL_QUANTIDADE, ((nome, tipo, qtd) for _, nome, tipo, _, qtd in ajustes))
+            con.executemany(
+                _SQL_EVENTO,
+                ((t, nome, op, delta, qtd, self.dispositivo) for op, nome, _, delta, qtd in ajustes),
+            )
+
+        with self._lock:
+            self._transacao(passos)
+
+    # ---------------- catálogo ----------------
+    def tem_catalogo(self) -> bool:
+        with self._lock_leitura:
+            return self._con_leitura.execute("SELECT 1 FROM catalogo WHERE ativo = 1 LIMIT 1").fetchone() is not None
+
+    def carregar(self) -> Tuple[Optional[str], Dict[str, dict]]:
+        """(versão do menu, {nome: {"tipo", "quantidade"}}) dos produtos ativos."""
+        with self._lock_leitura:
+            linhas = self._con_leitura.execute(
+                "SELECT nome, tipo, quantidade FROM catalogo WHERE ativo = 1 ORDER BY id"
+            ).fetchall()
+        itens = {nome: {"tipo": tipo, "quantidade": qtd} for nome, tipo, qtd in linhas}
+        return self._meta("versao_menu"), itens
+
+    def gravar_snapshot(self, itens: Dict[str, dict], versao: Optional[str]):
+        """
+        Substitui o catálogo (ex.: novo menu vindo do Sheets). Produtos que saíram
+        ficam inativos, para a produção dos dias anteriores continuar a apontar para eles.
+        """
+        linhas = [
+            (nome, info.get("tipo") or "Sem Tipo", int(info.get("quantidade") or 0))
+            for nome, info in itens.items()
+        ]
+
+        def passos(con):
+            con.execute("UPDATE catalogo SET ativo = 0")
+            con.executemany(_SQL_CATALOGO, linhas)
+            self._definir_meta(con, "versao_menu", versao)
+
+        with self._lock:
+            self._transacao(passos)
+
+    # ---------------- produção diária ----------------
+    def registar_dia(self, dia: date):
+        """A produção do dia passa a ser a do catálogo atual (uma instrução, sem passar por Python)."""
+        def passos(con):
+            con.execute("DELETE FROM producao_diaria WHERE dia = ?", (dia.isoformat(),))
+            con.execute(
+                "INSERT INTO producao_diaria (dia, produto_id, tipo, quantidade) "
+                "SELECT ?, id, tipo, quantidade FROM catalogo WHERE ativo = 1",
+                (dia.isoformat(),),
+            )
+
+        with self._lock:
+            self._transacao(passos)
+
+    def gravar_dia(self, dia: date, linhas: Iterable[Tuple[str, str, int]]):
+        """Grava a produção de um dia passado [(nome, tipo, quantidade)] (ex.: migração)."""
+        linhas = [(str(nome), str(tipo), int(qtd)) for nome, tipo, qtd in linhas]
+
+        def passos(con):
+            # produtos que já não estão no menu entram como inativos
+            con.executemany(
+                "INSERT INTO catalogo (nome, tipo, quantidade, ativo) VALUES (?, ?, 0, 0) "
+                "ON CONFLICT(nome) DO NOTHING",
+                ((nome, tipo) for nome, tipo, _ in linhas),
+            )
+            con.execute("DELETE FROM producao_diaria WHERE dia = ?", (dia.isoformat(),))
+            con.executemany(
+                "INSERT OR REPLACE INTO producao_diaria (dia, produto_id, tipo, quantidade) "
+                "SELECT ?, id, ?, ? FROM catalogo WHERE nome = ?",
+                ((dia.isoformat(), tipo, qtd, nome) for nome, tipo, qtd in linhas),
+            )
+
+        with self._lock:
+            self._transacao(passos)
+
+    def producao_por_tipo(self, dia: date) -> Dict[str, List[Tuple[str, int]]]:
+        """{tipo: [(nome, quantidade), ...]} do dia, por quantidade decrescente (índice dia+tipo)."""
+        with self._lock_leitura:
+            linhas = self._con_leitura.execute(
+                "SELECT p.tipo, c.nome, p.quantidade FROM producao_diaria p "
+                "JOIN catalogo c ON c.id = p.produto_id "
+                "WHERE p.dia = ? ORDER BY p.tipo, p.quantidade DESC, c.nome",
+                (dia.isoformat(),),
+            ).fetchall()
+        por_tipo: Dict[str, List[Tuple[str, int]]] = {}
+        for tipo, nome, qtd in linhas:
+            por_tipo.setdefault(tipo, []).append((nome, qtd))
+        return por_tipo
+
+    def serie_produto(self, nome: str, inicio: Optional[date] = None, fim: Optional[date] = None) -> List[Tuple[date, int]]:
+        """[(dia, quantidade)] de um produto (índice produto+dia)."""
+        with self._lock_leitura:
+            linhas = self._con_leitura.execute(
+                "SELECT p.dia, p.quantidade FROM producao_diaria p "
+                "JOIN catalogo c ON c.id = p.produto_id "
+                "WHERE c.nome = ? AND p.dia BETWEEN ? AND ? ORDER BY p.dia",
+                (nome, (inicio or date.min).isoformat(), (fim or date.max).isoformat()),
+            ).fetchall()
+        return [(date.fromisoformat(d), q) for d, q in linhas]
+
+    def quantidades_desde(self, t: float) -> Dict[str, int]:
+        """{nome: quantidade depois do último evento} dos produtos com eventos depois de `t`."""
+        with self._lock_leitura:
+            linhas = self._con_leitura.execute(
+                "SELECT c.nome, e.quantidade FROM eventos e JOIN catalogo c ON c.id = e.produto_id "
+                "WHERE e.t > ? ORDER BY e.id",
+                (t,),
+            ).fetchall()
+        return dict(linhas)
+
+    # ---------------- migração ----------------
+    def migrar_ficheiros(self, caminho_cache: Path, caminho_diario: Path, caminho_xlsx: Path) -> bool:
+        """
+        Corre uma vez: catálogo do cache JSON + cauda do diário, e a produção de cada
+        partição diária do Excel. Os ficheiros antigos ficam intactos (deixam de ser escritos).
+        As duas partes têm marcas próprias: o catálogo nunca é reimportado por cima dos
+        toques já gravados aqui, mesmo que a parte do Excel falhe e volte a correr.
+        Devolve True se migrou agora.
+        """
+        if self._meta("migrado"):
+            return False
+        # só aqui: o arranque normal não precisa destes módulos
+        from diario_ajustes import DiarioAjustes
+
+        t0 = time.perf_counter()
+        caminho_cache, caminho_diario = Path(caminho_cache), Path(caminho_diario)
+        # bases de dados anteriores a esta marca: catálogo com linhas = já migrado
+        if not self._meta("migrado_catalogo") and not self._tem_linhas("catalogo"):
+            if caminho_cache.exists() or caminho_diario.exists():
+                diario = DiarioAjustes(caminho_diario, caminho_cache)
+                versao, itens = diario.carregar()
+                diario.fechar()
+                self.gravar_snapshot(itens, versao)
+        with self._lock:
+            self._transacao(lambda con: self._definir_meta(con, "migrado_catalogo", date.today().isoformat()))
+
+        # numpy/openpyxl só fazem falta às partições: sem eles o catálogo acima já ficou
+        # migrado e a parte do Excel volta a ser tentada no próximo arranque
+        try:
+            from historico import ler_particao
+            from salvarexecel import listar_particoes, migrar_workbook_legado
+        except ImportError as e:
+            print("[base_dados] partições do Excel não migradas:", e)
+            return True
+
+        # um Excel antigo com uma aba por dia é partido primeiro (no-op se já foi);
+        # se falhar, as partições que já existem entram na mesma e tenta-se no próximo arranque
+        partido = True
+        try:
+            migrar_workbook_legado(str(caminho_xlsx))
+        except Exception as e:
+            partido = False
+            print("[base_dados] Excel antigo não partido:", e)
+
+        # dias que já têm produção aqui (ex.: nova tentativa) ficam como estão
+        with self._lock_leitura:
+            conhecidos = {d for (d,) in self._con_leitura.execute("SELECT DISTINCT dia FROM producao_diaria")}
+        dias = 0
+        try:
+            particoes = listar_particoes(str(caminho_xlsx))
+        except OSError as e:
+            partido, particoes = False, []
+            print("[base_dados] partições ilegíveis:", e)
+        for d, particao in particoes:
+            if d.isoformat() in conhecidos:
+                continue
+            try:
+                self.gravar_dia(d, ler_particao(particao))
+                dias += 1
+            except Exception as e:
+                print(f"[base_dados] partição {particao.name} não migrada:", e)
+
+        if partido:
+            with self._lock:
+                self._transacao(lambda con: self._definir_meta(con, "migrado", date.today().isoformat()))
+        print(f"[base_dados] migração: catálogo + {dias} dia(s) em {time.perf_counter() - t0:.2f}s")
+        return True
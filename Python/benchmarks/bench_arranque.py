@@ -0,0 +1,148 @@
+# bench_arranque.py
+# Arranque da app sem Kivy: custo dos imports (num interpretador novo, com e sem os
+# módulos pesados que antes eram carregados à cabeça) e o arranque do núcleo com um
+# catálogo sintético na base de dados. A "thread da UI" é simulada por uma fila:
+# mede-se quanto tempo ela fica bloqueada e quando o catálogo fica instalado.
+# Falha (código 1) se openpyxl/numpy/gspread voltarem a ser importados no arranque.
+#
+# Uso:  python benchmarks/bench_arranque.py [--produtos 300 5000] [--repeticoes 5]
+
+import argparse
+import queue
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ))
+
+PESADOS = ("openpyxl", "numpy", "gspread", "oauth2client", "aiohttp")
+TIPOS = ["PASTELARIA", "SALGADOS", "CROISSANTS", "TOSTAS / SANDUÍCHES", "REGIONAIS", "PÃO"]
+
+# o que a app importa antes do primeiro frame (sem Kivy)
+IMPORTS_APP = "import arranque, product_store, importacao_csv, email_outbox, nucleo_producao"
+# o mesmo, mais o que antes vinha junto à cabeça
+IMPORTS_ANTES = IMPORTS_APP + "; import salvarexecel, historico, mapa_producao, openpyxl.utils.cell"
+
+
+def medir_imports(codigo, repeticoes):
+    script = (
+        "import sys, time; t = time.perf_counter(); " + codigo + "; "
+        "print((time.perf_counter() - t) * 1000); "
+        f"print(','.join(m for m in {PESADOS!r} if m in sys.modules))"
+    )
+    tempos, pesados = [], ""
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, "-c", script], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.split("\n")
+        tempos.append(float(saida[0]))
+        pesados = saida[1]
+    return statistics.median(tempos), pesados
+
+
+def preparar_pasta(pasta: Path, n: int):
+    from base_dados import BaseDados
+
+    rnd = random.Random(19)
+    bd = BaseDados(pasta / "natabase.db", dispositivo="bench")
+    bd.gravar_snapshot(
+        {f"PRODUTO {i:05d}": {"tipo": rnd.choice(TIPOS), "quantidade": rnd.randint(0, 50)} for i in range(n)},
+        "v1",
+    )
+    # marca a migração como feita (como numa segunda abertura)
+    bd.migrar_ficheiros(pasta / "cache_produtos.json", pasta / "diario_ajustes.jsonl", pasta / "Loja012_2025.xlsx")
+    bd.fechar()
+
+
+def arranque_nucleo(pasta: Path):
+    """Arranca o núcleo como a app faz; devolve os tempos vistos pela "thread da UI"."""
+    from arranque import TemposArranque, ler_primeiro_ecra
+    from nucleo_producao import NucleoProducao
+
+    fila_ui = queue.Queue()
+    tempos = TemposArranque(None)
+    t0 = time.perf_counter()
+    nucleo = NucleoProducao(pasta, agendar=fila_ui.put, tempos=tempos)
+    t_construir = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    tipos = ler_primeiro_ecra(nucleo.primeiro_ecra_path)
+    t_indice = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    nucleo.iniciar(sheets=False)
+    t_iniciar = time.perf_counter() - t0
+
+    # "thread da UI": corre o que o núcleo agenda até o catálogo estar instalado
+    bloqueado = t_iniciar
+    inicio = time.perf_counter()
+    while not nucleo.carregado:
+        fn = fila_ui.get(timeout=30)
+        t0 = time.perf_counter()
+        fn()
+        bloqueado += time.perf_counter() - t0
+    t_pronto = time.perf_counter() - inicio + t_iniciar
+    nucleo.parar()
+    return {
+        "construir": t_construir,
+        "indice": t_indice,
+        "tipos_no_indice": len(tipos),
+        "iniciar": t_iniciar,
+        "pronto": t_pronto,
+        "ui_bloqueada": bloqueado,
+        "fases": tempos.resumo(),
+    }
+
+
+def carregar_na_ui(pasta: Path):
+    """O que a thread da UI pagava antes: ler e indexar o catálogo inteiro nela própria."""
+    from base_dados import BaseDados
+    from product_store import ProductStore
+
+    bd = BaseDados(pasta / "natabase.db", dispositivo="bench")
+    t0 = time.perf_counter()
+    _, itens = bd.carregar()
+    ProductStore.de_itens(itens)
+    t = time.perf_counter() - t0
+    bd.fechar()
+    return t
+
+
+def main(tamanhos, repeticoes):
+    ok = True
+    t_app, pesados_app = medir_imports(IMPORTS_APP, repeticoes)
+    t_antes, pesados_antes = medir_imports(IMPORTS_ANTES, repeticoes)
+    print(f"imports antes do 1.º frame: {t_app:.0f} ms (pesados: {pesados_app or 'nenhum'})")
+    print(f"  com os módulos pesados à cabeça (como antes): {t_antes:.0f} ms ({pesados_antes})")
+    if pesados_app:
+        ok = False
+        print(f"  !! regressão: {pesados_app} importado(s) no arranque")
+
+    for n in tamanhos:
+        with tempfile.TemporaryDirectory() as pasta:
+            pasta = Path(pasta)
+            preparar_pasta(pasta, n)
+            primeira = arranque_nucleo(pasta)     # grava o índice do primeiro ecrã
+            r = arranque_nucleo(pasta)
+            t_ui_antes = carregar_na_ui(pasta)
+        print(f"\n== {n} produtos ==")
+        print(f"  índice do 1.º ecrã: {r['tipos_no_indice']} tipos em {r['indice'] * 1000:.2f} ms "
+              f"(1.ª abertura: {primeira['tipos_no_indice']} tipos)")
+        print(f"  NucleoProducao(): {r['construir'] * 1000:.1f} ms | iniciar(): {r['iniciar'] * 1000:.1f} ms")
+        print(f"  catálogo instalado após {r['pronto'] * 1000:.1f} ms; UI bloqueada {r['ui_bloqueada'] * 1000:.1f} ms "
+              f"(antes, ler o catálogo na UI: {t_ui_antes * 1000:.1f} ms)")
+        print(f"  fases: {r['fases']}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--produtos", type=int, nargs="+", default=[300, 5000])
+    ap.add_argument("--repeticoes", type=int, default=5)
+    args = ap.parse_args()
+    sys.exit(main(args.produtos, args.repeticoes))
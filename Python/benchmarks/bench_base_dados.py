@@ -0,0 +1,166 @@
+# bench_base_dados.py
+# Caminho de cada toque: diário JSONL + cache JSON (anterior) contra a base de dados
+# SQLite em WAL (atual), com synchronous=FULL (fsync por toque, como o diário) e NORMAL.
+# Mede também lotes, a compactação/gravação do catálogo inteiro, a exportação da aba
+# do dia (a partir da memória vs. de uma consulta) e verifica a migração dos ficheiros
+# antigos (cache + diário + partições xlsx) para a base de dados.
+#
+# Uso:  python benchmarks/bench_base_dados.py [--produtos 300 5000] [--toques 2000]
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from base_dados import BaseDados
+from diario_ajustes import DiarioAjustes, OP_AUMENTAR
+from metricas import percentil
+from product_store import ProductStore
+from salvarexecel import salvar_producao_diaria
+
+TIPOS = ["PASTELARIA", "SALGADOS", "CROISSANTS", "TOSTAS / SANDUÍCHES", "REGIONAIS", "PÃO"]
+
+
+def catalogo(n, seed=18):
+    rnd = random.Random(seed)
+    return {f"PRODUTO {i:05d}": {"tipo": rnd.choice(TIPOS), "quantidade": rnd.randint(0, 50)} for i in range(n)}
+
+
+def linha(nome, tempos):
+    print(f"  {nome:<34} p50 {percentil(tempos, 50) * 1e6:>8.0f} µs | p95 {percentil(tempos, 95) * 1e6:>8.0f} µs")
+
+
+def toques_diario(pasta, itens, toques):
+    """Caminho anterior: um registo + fsync por toque; a cada 500, o cache JSON inteiro é regravado."""
+    # o diário já não se compacta (só serve a migração): a regravação do cache é medida à parte
+    diario = DiarioAjustes(pasta / "diario.jsonl", pasta / "cache.json")
+    diario.gravar_snapshot(itens, "v1")
+    nomes = list(itens)
+    rnd = random.Random(1)
+    tempos, compactacoes = [], []
+    for i in range(toques):
+        nome = rnd.choice(nomes)
+        t0 = time.perf_counter()
+        diario.registar(OP_AUMENTAR, nome, 1)
+        tempos.append(time.perf_counter() - t0)
+        if (i + 1) % 500 == 0:
+            t0 = time.perf_counter()
+            diario.gravar_snapshot(itens, "v1")
+            compactacoes.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    diario.registar_lote([(OP_AUMENTAR, n, 1) for n in nomes[:50]])
+    lote = time.perf_counter() - t0
+    diario.fechar()
+    return tempos, compactacoes, lote
+
+
+def toques_sqlite(pasta, itens, toques, sincrono):
+    bd = BaseDados(pasta / f"bench_{sincrono}.db", dispositivo="bench", sincrono=sincrono)
+    t0 = time.perf_counter()
+    bd.gravar_snapshot(itens, "v1")
+    snapshot = time.perf_counter() - t0
+    nomes = list(itens)
+    qtd = {n: info["quantidade"] for n, info in itens.items()}
+    rnd = random.Random(1)
+    tempos = []
+    for _ in range(toques):
+        nome = rnd.choice(nomes)
+        qtd[nome] += 1
+        t0 = time.perf_counter()
+        bd.registar(OP_AUMENTAR, nome, itens[nome]["tipo"], 1, qtd[nome])
+        tempos.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    bd.registar_lote([(OP_AUMENTAR, n, itens[n]["tipo"], 1, qtd[n] + 1) for n in nomes[:50]])
+    lote = time.perf_counter() - t0
+    return bd, tempos, snapshot, lote
+
+
+def exportacao(pasta, itens, bd):
+    store = ProductStore.de_itens(itens)
+    hoje = date.today()
+    t0 = time.perf_counter()
+    salvar_producao_diaria(store, data=hoje, nome_arquivo=str(pasta / "memoria.xlsx"))
+    t_memoria = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    bd.registar_dia(hoje)
+    por_tipo = bd.producao_por_tipo(hoje)
+    t_consulta = time.perf_counter() - t0
+    salvar_producao_diaria(data=hoje, nome_arquivo=str(pasta / "consulta.xlsx"), por_tipo=por_tipo)
+    t_total = time.perf_counter() - t0
+    return t_memoria, t_consulta, t_total
+
+
+def verificar_migracao(pasta, itens, dias=30):
+    """Ficheiros antigos -> base de dados: catálogo (com a cauda do diário) e cada dia igual."""
+    from historico import ler_particao
+
+    antigo = pasta / "antigo"
+    antigo.mkdir()
+    diario = DiarioAjustes(antigo / "diario_ajustes.jsonl", antigo / "cache_produtos.json")
+    diario.gravar_snapshot(itens, "v-antiga")
+    nomes = list(itens)
+    for nome in nomes[:20]:
+        diario.registar(OP_AUMENTAR, nome, 3)
+    diario.fechar()
+    esperado = DiarioAjustes(antigo / "diario_ajustes.jsonl", antigo / "cache_produtos.json").carregar()
+
+    xlsx = antigo / "Loja.xlsx"
+    store = ProductStore.de_itens(itens)
+    inicio = date.today() - timedelta(days=dias)
+    for k in range(dias):
+        salvar_producao_diaria(store, data=inicio + timedelta(days=k), nome_arquivo=str(xlsx))
+
+    bd = BaseDados(antigo / "natabase.db", dispositivo="bench")
+    bd.migrar_ficheiros(antigo / "cache_produtos.json", antigo / "diario_ajustes.jsonl", xlsx)
+    assert bd.carregar() == esperado, "catálogo migrado diferente do cache + diário"
+    from salvarexecel import caminho_particao
+    for k in (0, dias - 1):
+        d = inicio + timedelta(days=k)
+        linhas = sorted(ler_particao(caminho_particao(str(xlsx), d)))
+        migradas = sorted((n, t, q) for t, lst in bd.producao_por_tipo(d).items() for n, q in lst)
+        assert linhas == migradas, f"dia {d} migrado diferente da partição"
+    assert not bd.migrar_ficheiros(antigo / "cache_produtos.json", antigo / "diario_ajustes.jsonl", xlsx)
+    t0 = time.perf_counter()
+    serie = bd.serie_produto(nomes[0])
+    t_serie = time.perf_counter() - t0
+    bd.fechar()
+    return len(serie), t_serie
+
+
+def main(tamanhos, toques):
+    for n in tamanhos:
+        itens = catalogo(n)
+        print(f"\n== {n} produtos, {toques} toques ==")
+        with tempfile.TemporaryDirectory() as pasta:
+            pasta = Path(pasta)
+            t_diario, compact, lote_diario = toques_diario(pasta, itens, toques)
+            linha("diário JSONL + fsync (anterior)", t_diario)
+            if compact:
+                print(f"  {'  compactação do cache JSON':<34} média {sum(compact) / len(compact) * 1e3:>6.1f} ms "
+                      f"(x{len(compact)}, a cada 500 toques)")
+            for sincrono in ("FULL", "NORMAL"):
+                bd, t_sql, snapshot, lote_sql = toques_sqlite(pasta, itens, toques, sincrono)
+                linha(f"SQLite WAL synchronous={sincrono}", t_sql)
+                if sincrono == "FULL":
+                    print(f"  {'  catálogo inteiro (1 transação)':<34} {snapshot * 1e3:>8.1f} ms")
+                    print(f"  {'lote de 50: diário / SQLite':<34} {lote_diario * 1e3:>6.2f} ms / {lote_sql * 1e3:.2f} ms")
+                    t_mem, t_cons, t_total = exportacao(pasta, itens, bd)
+                    print(f"  {'aba do dia: da memória':<34} {t_mem * 1e3:>8.1f} ms")
+                    print(f"  {'aba do dia: consulta + render':<34} {t_total * 1e3:>8.1f} ms "
+                          f"(consulta {t_cons * 1e3:.1f} ms)")
+                bd.fechar()
+            n_dias, t_serie = verificar_migracao(pasta, itens)
+            print(f"  migração ok; série de um produto ({n_dias} dias, índice) {t_serie * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--produtos", type=int, nargs="+", default=[300, 5000])
+    ap.add_argument("--toques", type=int, default=2000)
+    args = ap.parse_args()
+    main(args.produtos, args.toques)
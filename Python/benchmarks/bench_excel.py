@@ -0,0 +1,125 @@
+# bench_excel.py
+# Compara a renderização da aba do dia: versão antiga (ws.cell + estilos por célula)
+# contra a atual (NamedStyle partilhados + workbook write-only).
+#
+# Uso:  python benchmarks/bench_excel.py [100 1000 10000]
+
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+
+from Produtos import produto
+from salvarexecel import (
+    TIPO_CORES, LINHA_ALTERNADA, agrupar_por_tipo, renderizar_aba_dia, _registar_estilos,
+)
+
+TIPOS = ["PASTELARIA", "SALGADOS", "CROISSANTS", "TOSTAS / SANDUÍCHES", "REGIONAIS", "PÃO"]
+
+
+def catalogo_sintetico(n, seed=12):
+    rnd = random.Random(seed)
+    return {
+        f"PRODUTO {i:05d}": produto(f"PRODUTO {i:05d}", rnd.choice(TIPOS), rnd.randint(0, 200))
+        for i in range(n)
+    }
+
+
+def render_legado(dicionario_produtos, destino):
+    """Cópia da renderização anterior de salvar_producao_diaria (só a parte da aba)."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "legado"
+
+    existentes = {}
+    for p in dicionario_produtos.values():
+        existentes[p.getnome()] = {'tipo': p.gettipo(), 'quantidade': p.getquantidade()}
+    por_tipo = defaultdict(list)
+    for nome, info in existentes.items():
+        por_tipo[info['tipo']].append((nome, info['quantidade']))
+    for tipo in por_tipo:
+        por_tipo[tipo].sort(key=lambda x: x[1], reverse=True)
+
+    headers = ["Nome", "Tipo", "Quantidade"]
+    start_row, start_col = 3, 5
+    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                         top=Side(style='thin'), bottom=Side(style='thin'))
+    for col_offset, header in enumerate(headers):
+        cell = ws.cell(row=start_row, column=start_col + col_offset, value=header)
+        cell.font = Font(bold=True, color="FFFFFF", size=11)
+        cell.fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+        cell.border = thin_border
+        ws.column_dimensions[openpyxl.utils.get_column_letter(start_col + col_offset)].width = [20, 15, 12][col_offset]
+
+    current_row = start_row + 1
+    total_geral = 0
+    for cor_index, tipo in enumerate(sorted(por_tipo.keys())):
+        cor = TIPO_CORES[cor_index % len(TIPO_CORES)]
+        cor_fill = PatternFill(start_color=cor, end_color=cor, fill_type="solid")
+        total_tipo = 0
+        for i, (nome, quantidade) in enumerate(por_tipo[tipo]):
+            for col_offset, value in enumerate([nome, tipo, quantidade]):
+                cell = ws.cell(row=current_row, column=start_col + col_offset, value=value)
+                cell.fill = PatternFill(start_color=LINHA_ALTERNADA[i % 2], end_color=LINHA_ALTERNADA[i % 2], fill_type="solid")
+                cell.border = thin_border
+                cell.alignment = Alignment(horizontal="center", vertical="center")
+            ws.row_dimensions[current_row].height = 18
+            total_tipo += quantidade
+            total_geral += quantidade
+            current_row += 1
+        for col_offset, value in enumerate([f"Total {tipo}", "", total_tipo]):
+            cell = ws.cell(row=current_row, column=start_col + col_offset, value=value)
+            cell.font = Font(bold=True, size=11)
+            cell.fill = cor_fill
+            cell.border = thin_border
+            cell.alignment = Alignment(horizontal="center" if col_offset != 2 else "right", vertical="center")
+        ws.row_dimensions[current_row].height = 20
+        current_row += 1
+    for col_offset, value in enumerate(["TOTAL GERAL", "", total_geral]):
+        cell = ws.cell(row=current_row, column=start_col + col_offset, value=value)
+        cell.font = Font(bold=True, color="FFFFFF", size=12)
+        cell.fill = PatternFill(start_color="000000", end_color="000000", fill_type="solid")
+        cell.border = thin_border
+        cell.alignment = Alignment(horizontal="center" if col_offset != 2 else "right", vertical="center")
+    ws.row_dimensions[current_row].height = 22
+    wb.save(destino)
+
+
+def render_atual(dicionario_produtos, destino):
+    wb = openpyxl.Workbook(write_only=True)
+    _registar_estilos(wb)
+    renderizar_aba_dia(wb, "atual", agrupar_por_tipo(dicionario_produtos))
+    wb.save(destino)
+
+
+def medir(fn, catalogo, destino, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn(catalogo, destino)
+        tempos.append(time.perf_counter() - t0)
+    return min(tempos), os.path.getsize(destino)
+
+
+def main(tamanhos):
+    print(f"{'produtos':>9} | {'legado (s)':>10} | {'atual (s)':>9} | {'ganho':>6} | {'xlsx legado':>11} | {'xlsx atual':>10}")
+    with tempfile.TemporaryDirectory() as pasta:
+        for n in tamanhos:
+            catalogo = catalogo_sintetico(n)
+            rep = 5 if n <= 1000 else 2
+            t_leg, tam_leg = medir(render_legado, catalogo, os.path.join(pasta, "legado.xlsx"), rep)
+            t_new, tam_new = medir(render_atual, catalogo, os.path.join(pasta, "atual.xlsx"), rep)
+            print(f"{n:>9} | {t_leg:>10.3f} | {t_new:>9.3f} | {t_leg / t_new:>5.1f}x | {tam_leg:>11} | {tam_new:>10}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1000, 10000])
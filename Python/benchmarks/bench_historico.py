@@ -0,0 +1,59 @@
+# bench_historico.py
+# Tempo das consultas do HistoricoProducao sobre um histórico sintético
+# (N dias × catálogo de 300 produtos), preenchido direto da memória.
+#
+# Uso:  python benchmarks/bench_historico.py [365 730 1825]
+
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from historico import HistoricoProducao
+from product_store import ProductStore
+
+TIPOS = ["PASTELARIA", "SALGADOS", "CROISSANTS", "TOSTAS / SANDUÍCHES", "REGIONAIS", "PÃO"]
+PRODUTOS = 300
+
+
+def preencher(historico, dias, seed=12):
+    rnd = random.Random(seed)
+    tipos = [rnd.choice(TIPOS) for _ in range(PRODUTOS)]
+    fim = date(2026, 1, 1)
+    for k in range(dias):
+        store = ProductStore(
+            (f"PRODUTO {i:03d}", tipos[i], rnd.randint(0, 200)) for i in range(PRODUTOS)
+        )
+        historico.registar_dia(fim - timedelta(days=k), store)
+    return fim
+
+
+def medir(fn, repeticoes=20):
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - t0)
+    return min(tempos) * 1000
+
+
+def main(tamanhos):
+    print(f"{'dias':>5} | {'linhas':>7} | {'por tipo':>8} | {'top 10':>7} | {'por mês':>7} | {'dia semana':>10} (ms)")
+    with tempfile.TemporaryDirectory() as pasta:
+        for dias in tamanhos:
+            h = HistoricoProducao(Path(pasta) / f"h{dias}.npz")
+            fim = preencher(h, dias)
+            inicio = fim - timedelta(weeks=8)
+            t_tipo = medir(lambda: h.total_por_tipo())
+            t_top = medir(lambda: h.top(10, tipo="PASTELARIA"))
+            t_mes = medir(lambda: h.total_por_mes(tipo="PÃO"))
+            t_sem = medir(lambda: h.media_por_dia_semana("PRODUTO 007", inicio, fim))
+            print(f"{dias:>5} | {dias * PRODUTOS:>7} | {t_tipo:>8.2f} | {t_top:>7.2f} | {t_mes:>7.2f} | {t_sem:>10.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [365, 730, 1825])
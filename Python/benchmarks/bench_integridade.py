@@ -0,0 +1,182 @@
+# bench_integridade.py
+# Selos de integridade (integridade.py) sobre uma loja sintética com `--dias` partições:
+#   selar_gravacao    custo extra de cada gravação do Excel (um dia + produtos alterados)
+#   verificar         arranque sem nada mudado no disco (só stat das partições)
+#   completo          verificação de tudo (o que custaria sem o manifesto incremental)
+# e verifica que se apanham as alterações: uma célula mudada numa partição (dia e
+# produto exatos), uma quantidade mudada no catálogo da base de dados, o manifesto
+# editado à mão; e que um toque legítimo depois do último selo não é reportado.
+# Falha (código 1) se alguma destas verificações falhar.
+#
+# Uso:  python benchmarks/bench_integridade.py [--produtos 300] [--dias 30] [--repeticoes 20]
+
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from base_dados import BaseDados
+from integridade import Integridade, linhas_do_dia
+from salvarexecel import caminho_particao, salvar_producao_diaria
+
+TIPOS = ["PASTELARIA", "SALGADOS", "CROISSANTS", "TOSTAS / SANDUÍCHES", "REGIONAIS", "PÃO"]
+
+
+def preparar(pasta: Path, produtos: int, dias: int):
+    rnd = random.Random(23)
+    bd = BaseDados(pasta / "natabase.db", dispositivo="bench")
+    catalogo = {f"PRODUTO {i:05d}": {"tipo": rnd.choice(TIPOS), "quantidade": 0} for i in range(produtos)}
+    bd.gravar_snapshot(catalogo, "v1")
+    xlsx = pasta / "Loja012_2025.xlsx"
+    hoje = date.today()
+    for k in range(dias, 0, -1):
+        dia = hoje - timedelta(days=k)
+        linhas = [(nome, info["tipo"], rnd.randint(0, 60)) for nome, info in catalogo.items()]
+        bd.gravar_dia(dia, linhas)
+        salvar_producao_diaria(data=dia, nome_arquivo=str(xlsx), por_tipo=bd.producao_por_tipo(dia))
+    return bd, xlsx, catalogo
+
+
+def gravar_hoje(bd: BaseDados, integ: Integridade, xlsx: Path):
+    """O que NucleoProducao._gravar_excel faz; devolve (s a gravar, s a selar)."""
+    hoje = date.today()
+    t0 = time.perf_counter()
+    selado_em = time.time()
+    bd.registar_dia(hoje)
+    por_tipo = bd.producao_por_tipo(hoje)
+    caminho = salvar_producao_diaria(data=hoje, nome_arquivo=str(xlsx), por_tipo=por_tipo)
+    t1 = time.perf_counter()
+    integ.selar_gravacao(hoje, linhas_do_dia(por_tipo), caminho, selado_em)
+    return t1 - t0, time.perf_counter() - t1
+
+
+def alterar_celula(caminho: Path, nome: str, quantidade: int):
+    import openpyxl
+    wb = openpyxl.load_workbook(caminho)
+    ws = wb.worksheets[0]
+    for linha in ws.iter_rows():
+        for celula in linha:
+            if celula.value == nome:
+                ws.cell(row=celula.row, column=celula.column + 2, value=quantidade)
+                wb.save(caminho)
+                return
+    raise AssertionError(f"{nome} não está em {caminho}")
+
+
+def main(produtos, dias, repeticoes):
+    falhas = []
+
+    def confirmar(condicao, mensagem):
+        print(("ok   " if condicao else "FALHA") + " " + mensagem)
+        if not condicao:
+            falhas.append(mensagem)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pasta = Path(tmp)
+        t0 = time.perf_counter()
+        bd, xlsx, catalogo = preparar(pasta, produtos, dias)
+        print(f"{produtos} produtos, {dias} dias preparados em {time.perf_counter() - t0:.1f} s\n")
+        nomes = list(catalogo)
+        rnd = random.Random(5)
+
+        integ = Integridade(pasta)
+        rel = integ.verificar(bd, xlsx)
+        print("1.º arranque:", rel.resumo())
+        confirmar(bool(rel), "1.º arranque sem manifesto: sela tudo sem alterações")
+
+        # ---- custo por gravação ----
+        gravar, selar = [], []
+        for _ in range(repeticoes):
+            for nome in rnd.sample(nomes, 5):
+                bd.registar("aumentar", nome, catalogo[nome]["tipo"], 1, rnd.randint(1, 40))
+            g, s = gravar_hoje(bd, integ, xlsx)
+            gravar.append(g * 1000)
+            selar.append(s * 1000)
+        bd.fechar()
+        integ.marcar_bd(bd.caminho)
+
+        # ---- arranques ----
+        bd = BaseDados(pasta / "natabase.db", dispositivo="bench")
+        verificar, completo = [], []
+        for _ in range(repeticoes):
+            integ = Integridade(pasta)
+            t0 = time.perf_counter()
+            rel = integ.verificar(bd, xlsx)
+            verificar.append((time.perf_counter() - t0) * 1000)
+        confirmar(bool(rel) and rel.dias_ignorados == dias + 1 and not rel.catalogo_verificado,
+                  f"arranque sem alterações não relê nada ({rel.resumo()})")
+        for _ in range(max(1, repeticoes // 5)):
+            t0 = time.perf_counter()
+            rel = integ.verificar(bd, xlsx, completo=True)
+            completo.append((time.perf_counter() - t0) * 1000)
+        confirmar(bool(rel), "verificação completa sem alterações")
+
+        print(f"\n{'caso':<34} | {'p50 ms':>8} | {'máx ms':>8}")
+        for nome, valores in (("gravação do dia (Excel + bd)", gravar), ("selar_gravacao", selar),
+                              ("arranque (incremental)", verificar), ("verificação completa", completo)):
+            print(f"{nome:<34} | {statistics.median(valores):>8.2f} | {max(valores):>8.2f}")
+        print()
+
+        # ---- alterações ----
+        dia = date.today() - timedelta(days=dias // 2)
+        alvo = nomes[7]
+        time.sleep(0.01)   # mtime diferente mesmo em sistemas de ficheiros grosseiros
+        alterar_celula(caminho_particao(str(xlsx), dia), alvo, 9999)
+        rel = Integridade(pasta).verificar(bd, xlsx)
+        confirmar(rel.dias_alterados == {dia.isoformat(): [alvo]} and not rel.dias_bd_alterados,
+                  f"célula alterada: {rel.linhas()}")
+        rel = Integridade(pasta).verificar(bd, xlsx)
+        confirmar(dia.isoformat() in rel.dias_alterados, "o dia alterado continua a ser reportado")
+        # repor a partição a partir da base de dados: volta a bater com o selo
+        salvar_producao_diaria(data=dia, nome_arquivo=str(xlsx), por_tipo=bd.producao_por_tipo(dia))
+        rel = Integridade(pasta).verificar(bd, xlsx)
+        confirmar(bool(rel), "partição reposta a partir da base de dados")
+
+        # toque legítimo depois do último selo (ex.: a app fechou a meio do debounce)
+        tocado = nomes[11]
+        bd.registar("aumentar", tocado, catalogo[tocado]["tipo"], 3, 4321)
+        bd.fechar()
+        bd = BaseDados(pasta / "natabase.db", dispositivo="bench")
+        rel = Integridade(pasta).verificar(bd, xlsx)
+        confirmar(bool(rel) and rel.produtos_por_selar == [tocado], f"toque por selar não é alteração: {rel.resumo()}")
+
+        alterado = nomes[13]
+        with sqlite3.connect(pasta / "natabase.db") as con:
+            con.execute("UPDATE catalogo SET quantidade = 777 WHERE nome = ?", (alterado,))
+        con.close()
+        bd.fechar()
+        bd = BaseDados(pasta / "natabase.db", dispositivo="bench")
+        rel = Integridade(pasta).verificar(bd, xlsx)
+        confirmar(rel.produtos_alterados == [alterado], f"quantidade alterada no catálogo: {rel.linhas()}")
+
+        manifesto = pasta / "integridade.json"
+        dados = json.loads(manifesto.read_text(encoding="utf-8"))
+        dados["catalogo"][nomes[0]] = "0" * 32
+        manifesto.write_text(json.dumps(dados), encoding="utf-8")
+        rel = Integridade(pasta).verificar(bd, xlsx)
+        confirmar(not rel.manifesto_ok, "manifesto editado à mão")
+        rel = Integridade(pasta).verificar(bd, xlsx)
+        confirmar(bool(rel), "manifesto selado de novo")
+        bd.fechar()
+
+    if falhas:
+        print(f"\n!! {len(falhas)} verificação(ões) falharam")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--produtos", type=int, default=300)
+    ap.add_argument("--dias", type=int, default=30)
+    ap.add_argument("--repeticoes", type=int, default=20)
+    args = ap.parse_args()
+    sys.exit(main(args.produtos, args.dias, args.repeticoes))
@@ -0,0 +1,109 @@
+# bench_metricas.py
+# Custo da instrumentação (metricas.py) por chamada, desligada e ligada: `with span()`,
+# função decorada com `cronometrar` e `contar()`, contra o mesmo código sem nada.
+# Verifica também o ficheiro: os registos chegam ao metricas.jsonl e a rotação
+# mantém no máximo `copias` ficheiros antigos.
+# Falha (código 1) se, desligada, um span custar mais do que `--limite-ns`.
+#
+# Uso:  python benchmarks/bench_metricas.py [--chamadas 200000] [--limite-ns 1000]
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from metricas import Metricas
+
+
+def por_chamada(fn, chamadas):
+    """ns por chamada (melhor de 5)."""
+    melhor = None
+    for _ in range(5):
+        t0 = time.perf_counter()
+        fn(chamadas)
+        t = (time.perf_counter() - t0) / chamadas * 1e9
+        melhor = t if melhor is None else min(melhor, t)
+    return melhor
+
+
+def medir(m: Metricas, chamadas):
+    @m.cronometrar("bench.decorada")
+    def decorada():
+        pass
+
+    def nada():
+        pass
+
+    def sem_instrumentacao(n):
+        for _ in range(n):
+            nada()
+
+    def com_span(n):
+        span = m.span
+        for _ in range(n):
+            with span("bench.span"):
+                nada()
+
+    def com_decorador(n):
+        for _ in range(n):
+            decorada()
+
+    def com_contar(n):
+        contar = m.contar
+        for _ in range(n):
+            contar("bench.contador")
+            nada()
+
+    base = por_chamada(sem_instrumentacao, chamadas)
+    return {
+        "span": por_chamada(com_span, chamadas) - base,
+        "cronometrar": por_chamada(com_decorador, chamadas) - base,
+        "contar": por_chamada(com_contar, chamadas) - base,
+    }
+
+
+def verificar_ficheiro():
+    with tempfile.TemporaryDirectory() as pasta:
+        m = Metricas(ativo=True)
+        m.configurar(Path(pasta), intervalo=3600)
+        m.tamanho_max = 20_000
+        for i in range(3000):
+            with m.span("bench.rotacao", i=i):
+                pass
+            m.contar("bench.toques")
+            if i % 200 == 0:
+                m.gravar()
+        m.parar()
+        ficheiros = sorted(p.name for p in Path(pasta).iterdir())
+        registos = [json.loads(linha) for p in Path(pasta).iterdir() for linha in p.read_text(encoding="utf-8").splitlines()]
+    assert ficheiros == ["metricas.1.jsonl", "metricas.2.jsonl", "metricas.3.jsonl", "metricas.jsonl"], ficheiros
+    assert any(r.get("contadores", {}).get("bench.toques") == 3000 for r in registos), "contadores finais em falta"
+    return ficheiros, len(registos)
+
+
+def main(chamadas, limite_ns):
+    desligada = medir(Metricas(ativo=False), chamadas)
+    ligada = medir(Metricas(ativo=True), chamadas)
+    print(f"{'custo extra por chamada':<26} | {'desligada':>10} | {'ligada':>10}")
+    for nome in desligada:
+        print(f"{nome:<26} | {desligada[nome]:>7.0f} ns | {ligada[nome]:>7.0f} ns")
+
+    ficheiros, n = verificar_ficheiro()
+    print(f"\nrotação ok: {', '.join(ficheiros)} ({n} registos mantidos)")
+
+    if desligada["span"] > limite_ns:
+        print(f"!! span desligado custa {desligada['span']:.0f} ns (> {limite_ns} ns)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chamadas", type=int, default=200_000)
+    ap.add_argument("--limite-ns", type=float, default=1000)
+    args = ap.parse_args()
+    sys.exit(main(args.chamadas, args.limite_ns))
@@ -0,0 +1,144 @@
+# bench_pesquisa.py
+# Pesquisa de produtos (pesquisa.py) sobre catálogos sintéticos com vocabulário grande
+# (palavras reais da pastelaria + palavras inventadas, como num catálogo de milhares de
+# referências): tempo de construção do índice, de `sincronizar` com uma alteração do
+# Sheets (algumas entradas/saídas) e de cada tecla ao escrever pesquisas letra a letra,
+# com e sem erros de digitação (letra trocada, em falta, a mais, troca de vizinhas).
+# Verifica também que a pesquisa com erros encontra o produto escrito sem eles.
+# Falha (código 1) se o p95 por tecla passar `--limite-ms` (um frame a 60 Hz) ou se
+# algum produto não for encontrado.
+#
+# Uso:  python benchmarks/bench_pesquisa.py [--produtos 300 10000 20000] [--limite-ms 16]
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from metricas import percentil
+from pesquisa import IndicePesquisa, normalizar
+
+PALAVRAS = (
+    "pastel nata croissant misto simples pão ló tosta mista bola berlim queijada sintra bolo "
+    "arroz fatia chocolate folhado salsicha rissol camarão empada frango travesseiro pudim "
+    "torta laranja sanduíche fiambre queijo manteiga integral centeio broa milho bica galão "
+    "sumo natural éclair palmier mil folhas jesuíta duchesse merengue scone muffin donut"
+).split()
+SILABAS = "ba be bi bo bu ca ce co cu da de do fa fe fi go la le li lo lu ma me mi mo na ne no pa pe pi po ra re ri ro sa se si so ta te ti to va ve vi".split()
+
+
+def catalogo(n: int, rnd: random.Random):
+    inventadas = ["".join(rnd.choice(SILABAS) for _ in range(rnd.randint(2, 4))) for _ in range(max(50, n // 3))]
+    nomes = set()
+    while len(nomes) < n:
+        k = rnd.randint(2, 4)
+        palavras = [rnd.choice(PALAVRAS if rnd.random() < 0.5 else inventadas) for _ in range(k)]
+        if rnd.random() < 0.3:
+            palavras.append(f"{rnd.choice((100, 200, 250, 500, 1000))}G")
+        nomes.add(" ".join(palavras).upper())
+    return sorted(nomes)
+
+
+def com_erro(texto: str, rnd: random.Random) -> str:
+    """Um erro de digitação numa palavra com 4+ letras (como a app o receberia)."""
+    palavras = texto.split()
+    candidatas = [i for i, p in enumerate(palavras) if len(p) >= 4 and p.isalpha()]
+    if not candidatas:
+        return texto
+    i = rnd.choice(candidatas)
+    p = palavras[i]
+    j = rnd.randrange(1, len(p) - 1)
+    tipo = rnd.choice(("troca", "falta", "mais", "vizinhas"))
+    if tipo == "troca":
+        p = p[:j] + rnd.choice("abcdefghijklmnopqrstuvwxyz") + p[j + 1:]
+    elif tipo == "falta":
+        p = p[:j] + p[j + 1:]
+    elif tipo == "mais":
+        p = p[:j] + rnd.choice("abcdefghijklmnopqrstuvwxyz") + p[j:]
+    else:
+        p = p[:j] + p[j + 1] + p[j] + p[j + 2:]
+    palavras[i] = p
+    return " ".join(palavras)
+
+
+def teclas(indice: IndicePesquisa, texto: str, limite: int):
+    """ms de cada tecla (a pesquisa inteira, como a app faz) e o resultado final."""
+    tempos, resultado = [], []
+    for k in range(1, len(texto) + 1):
+        t0 = time.perf_counter()
+        resultado = indice.pesquisar(texto[:k], limite)
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return tempos, resultado
+
+
+def medir(n: int, pesquisas: int, limite: int, rnd: random.Random):
+    nomes = catalogo(n, rnd)
+    t0 = time.perf_counter()
+    indice = IndicePesquisa(nomes)
+    construir = (time.perf_counter() - t0) * 1000
+
+    # alteração do Sheets: 1% sai, 1% entra
+    saem = set(rnd.sample(nomes, max(1, n // 100)))
+    novos = [n_ + " NOVO" for n_ in rnd.sample(nomes, max(1, n // 100))]
+    atualizados = [x for x in nomes if x not in saem] + novos
+    t0 = time.perf_counter()
+    entraram, sairam = indice.sincronizar(atualizados)
+    sincronizar = (time.perf_counter() - t0) * 1000
+    assert (entraram, sairam) == (len(novos), len(saem)), (entraram, sairam)
+
+    exatas, aproximadas, falhas = [], [], []
+    for alvo in rnd.sample(atualizados, pesquisas):
+        # como se escreve: em minúsculas, sem acentos, as duas primeiras palavras
+        texto = normalizar(" ".join(alvo.split()[:2]))
+        tempos, resultado = teclas(indice, texto, limite)
+        exatas.extend(tempos)
+        if alvo not in indice.pesquisar(texto, None):
+            falhas.append((texto, alvo))
+        errado = com_erro(texto, rnd)
+        tempos, resultado = teclas(indice, errado, limite)
+        aproximadas.extend(tempos)
+        if errado != texto and alvo not in indice.pesquisar(errado, None):
+            falhas.append((errado, alvo))
+    return {
+        "palavras": len(indice._palavras),
+        "construir": construir,
+        "sincronizar": sincronizar,
+        "exatas": exatas,
+        "aproximadas": aproximadas,
+        "falhas": falhas,
+    }
+
+
+def main(produtos, pesquisas, limite, limite_ms):
+    rnd = random.Random(24)
+    codigo = 0
+    print(f"{'produtos':>8} | {'palavras':>8} | {'índice ms':>9} | {'sinc. ms':>8} | "
+          f"{'tecla p50':>9} | {'tecla p95':>9} | {'c/ erro p95':>11} | {'máx ms':>7}")
+    for n in produtos:
+        r = medir(n, pesquisas, limite, rnd)
+        todas = r["exatas"] + r["aproximadas"]
+        print(f"{n:>8} | {r['palavras']:>8} | {r['construir']:>9.1f} | {r['sincronizar']:>8.2f} | "
+              f"{statistics.median(r['exatas']):>9.2f} | {percentil(r['exatas'], 95):>9.2f} | "
+              f"{percentil(r['aproximadas'], 95):>11.2f} | {max(todas):>7.2f}")
+        if percentil(todas, 95) > limite_ms:
+            print(f"!! {n} produtos: p95 por tecla {percentil(todas, 95):.2f} ms (> {limite_ms} ms)")
+            codigo = 1
+        for texto, alvo in r["falhas"][:5]:
+            print(f"!! '{texto}' não encontrou '{alvo}'")
+        if r["falhas"]:
+            codigo = 1
+    return codigo
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--produtos", type=int, nargs="+", default=[300, 10_000, 20_000])
+    ap.add_argument("--pesquisas", type=int, default=100)
+    ap.add_argument("--limite", type=int, default=50, help="resultados mostrados")
+    ap.add_argument("--limite-ms", type=float, default=16)
+    args = ap.parse_args()
+    sys.exit(main(args.produtos, args.pesquisas, args.limite, args.limite_ms))
@@ -0,0 +1,145 @@
+# bench_ui.py
+# Mede o tempo de frame nas telas Produção e Resumo com um catálogo sintético,
+# comparando o modo antigo (cards/linhas criados a cada navegação) com o RecycleView.
+# Precisa de janela (desktop ou tablet).
+#
+# Uso:  python benchmarks/bench_ui.py [--produtos 2000] [--modo recycle|legado]
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from kivy.clock import Clock
+from kivy.factory import Factory
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.scrollview import ScrollView
+
+from Mainkivy import AppCozinha, TipoTile, ProdutoTile
+from metricas import percentil
+from product_store import ProductStore
+
+TIPOS = ["PASTELARIA", "SALGADOS", "CROISSANTS", "TOSTAS / SANDUÍCHES", "REGIONAIS", "PÃO"]
+
+
+def catalogo_sintetico(n, seed=6):
+    rnd = random.Random(seed)
+    return ProductStore(
+        (f"PRODUTO {i:05d}", rnd.choice(TIPOS), rnd.randint(0, 200)) for i in range(n)
+    )
+
+
+class AppBenchUI(AppCozinha):
+    def __init__(self, n_produtos, modo, **kwargs):
+        super().__init__(**kwargs)
+        self._kv_path = self._base_dir / "screens.kv"
+        self._n = n_produtos
+        self._modo = modo
+        self._frames = []
+        self._ultimo = None
+        self._passos = []
+        self._legado_grid = None
+
+    def on_start(self):
+        # sem Sheets nem cache: só o catálogo sintético
+        self.dicionario_produtos = catalogo_sintetico(self._n)
+        self._data_loaded = True
+        if self._modo == "legado":
+            self._montar_legado()
+        self._passos = self._roteiro()
+        Clock.schedule_interval(self._medir_frame, 0)
+        Clock.schedule_once(self._proximo_passo, 1)
+
+    # ---------------- modo legado (como era antes do RecycleView) ----------------
+    def _montar_legado(self):
+        tela = self.root.get_screen("producao")
+        rv = tela.ids.grid
+        scroll = ScrollView(size_hint=rv.size_hint, pos_hint=rv.pos_hint, do_scroll_x=False)
+        self._legado_grid = GridLayout(cols=self.cols_grid, spacing=12, padding=12, size_hint_y=None)
+        self._legado_grid.bind(minimum_height=self._legado_grid.setter("height"))
+        scroll.add_widget(self._legado_grid)
+        rv.parent.add_widget(scroll)
+        rv.opacity = 0
+
+    def _legado_tipos(self):
+        self._legado_grid.clear_widgets()
+        for tipo in self.dicionario_produtos.tipos():
+            self._legado_grid.add_widget(TipoTile(title=tipo, tipo=tipo))
+
+    def _legado_tipo(self, tipo):
+        self._legado_grid.clear_widgets()
+        for nome, qtd in self.dicionario_produtos.produtos_do_tipo(tipo):
+            self._legado_grid.add_widget(ProdutoTile(title=nome, nome=nome, tipo=tipo, quantity=qtd))
+
+    def _legado_resumo(self):
+        self._legado_grid.clear_widgets()
+        self._legado_grid.cols = 1
+        for linha in self._linhas_resumo()[0]:
+            w = getattr(Factory, linha["viewclass"])()
+            w.left_text = linha["left_text"]
+            w.right_text = linha["right_text"]
+            if "bg_color" in linha:
+                w.bg_color = linha["bg_color"]
+            self._legado_grid.add_widget(w)
+        self._legado_grid.cols = self.cols_grid
+
+    # ---------------- roteiro ----------------
+    def _roteiro(self):
+        passos = []
+        legado = self._modo == "legado"
+        passos.append(("tipos", self._legado_tipos if legado else self.go_producao))
+        for tipo in self.dicionario_produtos.tipos():
+            passos.append((f"tipo {tipo}", (lambda t=tipo: self._legado_tipo(t)) if legado else (lambda t=tipo: self.abrir_tipo(t))))
+            for y in (0.75, 0.5, 0.25, 0.0):
+                passos.append(("scroll", lambda y=y: self._rolar(y)))
+        passos.append(("resumo", self._legado_resumo if legado else self.abrir_resumo))
+        for y in (0.8, 0.6, 0.4, 0.2, 0.0):
+            passos.append(("scroll resumo", lambda y=y: self._rolar(y, resumo=True)))
+        return passos
+
+    def go_producao(self):
+        self.go("producao")
+        self._mostrar_tipos()
+
+    def _rolar(self, y, resumo=False):
+        if self._legado_grid is not None:
+            self._legado_grid.parent.scroll_y = y
+        elif resumo:
+            self.root.get_screen("resumo").ids.table_container.scroll_y = y
+        else:
+            self.root.get_screen("producao").ids.grid.scroll_y = y
+
+    def _proximo_passo(self, dt):
+        if not self._passos:
+            self._relatorio()
+            self.stop()
+            return
+        _, fn = self._passos.pop(0)
+        fn()
+        Clock.schedule_once(self._proximo_passo, 0.25)
+
+    def _medir_frame(self, dt):
+        agora = time.perf_counter()
+        if self._ultimo is not None:
+            self._frames.append((agora - self._ultimo) * 1000)
+        self._ultimo = agora
+
+    def _relatorio(self):
+        f = sorted(self._frames)
+        if not f:
+            return
+        print(f"modo={self._modo} produtos={self._n} frames={len(f)}")
+        print(f"  frame ms: p50={statistics.median(f):.1f} p95={percentil(f, 95):.1f} max={f[-1]:.1f}")
+        print(f"  frames > 33ms (jank): {sum(1 for x in f if x > 33.3)}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--produtos", type=int, default=2000)
+    ap.add_argument("--modo", choices=["recycle", "legado"], default="recycle")
+    args = ap.parse_args()
+    AppBenchUI(args.produtos, args.modo).run()
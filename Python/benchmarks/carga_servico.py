@@ -0,0 +1,210 @@
+# carga_servico.py
+# Teste de carga do servico_inventario.py: arranca uma instância local (numa pasta
+# temporária, sem Sheets nem e-mail) e liga centenas de tablets simuladas, cada uma
+# com o seu WebSocket, a enviar ajustes ao mesmo tempo (uma parte por HTTP).
+# Mede a latência de cada ajuste (pedido -> resposta), o débito, o tamanho médio dos
+# lotes confirmados e verifica no fim que nenhum incremento se perdeu e que todas as
+# tablets ficaram com o mesmo estado que o serviço (só pelas notificações).
+#
+# Uso:  python benchmarks/carga_servico.py [--clientes 100 300] [--ajustes 20] [--produtos 300]
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from threading import Event, Thread
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import aiohttp
+from aiohttp import web
+
+from metricas import percentil
+from nucleo_producao import NucleoProducao
+from product_store import ProductStore
+from servico_inventario import ServicoInventario
+
+TIPOS = ["PASTELARIA", "SALGADOS", "CROISSANTS", "TOSTAS / SANDUÍCHES", "REGIONAIS", "PÃO"]
+
+
+class InstanciaLocal:
+    """Serviço numa thread com event loop próprio (como num processo à parte)."""
+
+    def __init__(self, pasta: Path, produtos: int):
+        self.pasta = pasta
+        self.produtos = produtos
+        self.loop = asyncio.new_event_loop()
+        self.porta = None
+        self.servico = None
+        self._pronto = None
+        self._runner = None
+        self._thread = Thread(target=self._correr, daemon=True)
+
+    def iniciar(self) -> str:
+        self._pronto = Event()
+        self._thread.start()
+        self._pronto.wait(30)
+        return f"http://127.0.0.1:{self.porta}"
+
+    def _correr(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._arrancar())
+        self._pronto.set()
+        self.loop.run_forever()
+
+    async def _arrancar(self):
+        nucleo = NucleoProducao(self.pasta, agendar=self.loop.call_soon_threadsafe)
+        rnd = random.Random(16)
+        nucleo.definir_catalogo(ProductStore(
+            (f"PRODUTO {i:04d}", rnd.choice(TIPOS), 0) for i in range(self.produtos)
+        ))
+        nucleo.salvar_cache_local("carga")
+        nucleo.carregado = True
+        self.servico = ServicoInventario(nucleo)
+        self._runner = web.AppRunner(self.servico.criar_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.porta = self._runner.addresses[0][1]
+
+    def estado(self):
+        return asyncio.run_coroutine_threadsafe(self._estado(), self.loop).result(30)
+
+    async def _estado(self):
+        return self.servico.nucleo.store.para_itens()
+
+    def parar(self):
+        async def _parar():
+            await self._runner.cleanup()
+        asyncio.run_coroutine_threadsafe(_parar(), self.loop).result(30)
+        self.servico.nucleo.parar()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(10)
+
+
+class TabletSimulada:
+    def __init__(self, n: int, url: str, sessao, nomes, ajustes: int, http: bool, seed: int):
+        self.n = n
+        self.url = url
+        self.sessao = sessao
+        self.nomes = nomes
+        self.ajustes = ajustes
+        self.http = http
+        self.rnd = random.Random(seed)
+        self.espelho = {}
+        self.enviados = {}
+        self.latencias = []
+        self.notificacoes = 0
+        self._respostas = {}
+        self._ws = None
+
+    async def ligar(self):
+        self._ws = await self.sessao.ws_connect(f"{self.url}/ws")
+        msg = await self._ws.receive_json()
+        self.espelho = {nome: info["quantidade"] for nome, info in msg["itens"].items()}
+        self._leitor = asyncio.ensure_future(self._ler())
+
+    async def _ler(self):
+        async for msg in self._ws:
+            dados = json.loads(msg.data)
+            if dados["tipo"] == "resposta":
+                self._respostas.pop(dados["id"]).set_result(dados)
+            elif dados["tipo"] == "alteracao":
+                self.notificacoes += 1
+                self.espelho.update(dados["produtos"])
+            elif dados["tipo"] == "estado":
+                self.espelho = {nome: info["quantidade"] for nome, info in dados["itens"].items()}
+
+    async def trabalhar(self):
+        for k in range(self.ajustes):
+            nome = self.rnd.choice(self.nomes)
+            valor = self.rnd.randint(1, 5)
+            pedido = {"nome": nome, "direcao": 1, "valor": valor}
+            t0 = time.perf_counter()
+            if self.http:
+                async with self.sessao.post(f"{self.url}/ajustes", json=pedido) as r:
+                    resposta = await r.json()
+            else:
+                fut = asyncio.get_running_loop().create_future()
+                self._respostas[k] = fut
+                await self._ws.send_str(json.dumps({"id": k, "acao": "ajustes", "dados": pedido}))
+                resposta = await fut
+            self.latencias.append(time.perf_counter() - t0)
+            assert resposta["ok"], resposta
+            self.enviados[nome] = self.enviados.get(nome, 0) + valor
+            # ritmo de uma pessoa a tocar: 0–20 ms entre ajustes
+            await asyncio.sleep(self.rnd.random() * 0.02)
+
+    async def fechar(self):
+        await self._ws.close()
+        self._leitor.cancel()
+
+
+async def rodada(url, nomes, clientes, ajustes, fracao_http, seed):
+    conector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=conector) as sessao:
+        tablets = [
+            TabletSimulada(i, url, sessao, nomes, ajustes, http=(i < clientes * fracao_http), seed=seed + i)
+            for i in range(clientes)
+        ]
+        await asyncio.gather(*(t.ligar() for t in tablets))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(t.trabalhar() for t in tablets))
+        duracao = time.perf_counter() - t0
+        # deixa chegar a última notificação agrupada
+        await asyncio.sleep(0.5)
+        espelhos = [dict(t.espelho) for t in tablets]
+        await asyncio.gather(*(t.fechar() for t in tablets))
+    return tablets, duracao, espelhos
+
+
+def main(lista_clientes, ajustes, produtos, fracao_http):
+    print(f"{'tablets':>7} | {'ajustes':>7} | {'ajustes/s':>9} | {'p50 ms':>7} | {'p95 ms':>7} | "
+          f"{'p99 ms':>7} | {'lote médio':>10} | {'notif./tablet':>13} | ok")
+    for clientes in lista_clientes:
+        with tempfile.TemporaryDirectory() as pasta:
+            inst = InstanciaLocal(Path(pasta), produtos)
+            url = inst.iniciar()
+            nomes = sorted(inst.estado())
+            lotes_antes = inst.servico.lotes_confirmados
+            tablets, duracao, espelhos = asyncio.run(
+                rodada(url, nomes, clientes, ajustes, fracao_http, seed=clientes)
+            )
+            final = {nome: info["quantidade"] for nome, info in inst.estado().items()}
+            esperado = {nome: 0 for nome in nomes}
+            for t in tablets:
+                for nome, v in t.enviados.items():
+                    esperado[nome] += v
+            sem_perdas = final == esperado
+            iguais = all(e == final for e in espelhos)
+            lotes = inst.servico.lotes_confirmados - lotes_antes
+            inst.parar()
+
+        latencias = [x for t in tablets for x in t.latencias]
+        total = len(latencias)
+        notif = statistics.mean(t.notificacoes for t in tablets)
+        print(
+            f"{clientes:>7} | {total:>7} | {total / duracao:>9.0f} | {percentil(latencias, 50) * 1000:>7.1f} | "
+            f"{percentil(latencias, 95) * 1000:>7.1f} | {percentil(latencias, 99) * 1000:>7.1f} | "
+            f"{total / max(1, lotes):>10.1f} | {notif:>13.1f} | "
+            f"{'sim' if sem_perdas and iguais else 'NÃO'}"
+        )
+        if not sem_perdas:
+            print("  !! totais do serviço diferentes da soma dos ajustes enviados")
+        if not iguais:
+            print("  !! há tablets com estado diferente do serviço")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clientes", type=int, nargs="+", default=[100, 300])
+    ap.add_argument("--ajustes", type=int, default=20, help="ajustes por tablet")
+    ap.add_argument("--produtos", type=int, default=300)
+    ap.add_argument("--http", type=float, default=0.1, help="fração de tablets que usa POST /ajustes")
+    args = ap.parse_args()
+    main(args.clientes, args.ajustes, args.produtos, args.http)
@@ -0,0 +1,174 @@
+# convergencia_contadores.py
+# Verificação por propriedades dos contadores PN (contadores.py) com cenários
+# aleatórios reprodutíveis (seed), e custo de uma troca em função do catálogo.
+#
+# Propriedades verificadas em cada cenário:
+#   - convergência: depois de trocas com mensagens atrasadas, fora de ordem,
+#     duplicadas ou perdidas, e de uma ronda final de anti-entropia, todas as
+#     réplicas têm exatamente o mesmo estado;
+#   - sem ajustes perdidos: ΣP e ΣN finais = soma do que cada réplica registou;
+#   - quantidades nunca negativas;
+#   - idempotência e comutatividade de `fundir`;
+#   - uma réplica sozinha comporta-se como o ProductStore (mesmo clamp a zero);
+#   - gravar/carregar não muda nada.
+#
+# Uso:  python benchmarks/convergencia_contadores.py [--cenarios 300] [--tamanhos 1000 10000 100000]
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from contadores import ContadoresPN
+from product_store import ProductStore
+
+
+def estado(r: ContadoresPN):
+    """Estado comparável (independente da ordem interna)."""
+    return {o: sorted(e) for o, e in r.para_json()["origens"].items()}
+
+
+def totais(r: ContadoresPN):
+    p = n = 0
+    for entradas in r.para_json()["origens"].values():
+        for _, pi, ni, _ in entradas:
+            p, n = p + pi, n + ni
+    return p, n
+
+
+def trocar(a: ContadoresPN, b: ContadoresPN):
+    """Uma troca completa nos dois sentidos, como no protocolo (cada lado manda o seu relógio)."""
+    b.fundir(a.delta_para(b.relogio()))
+    a.fundir(b.delta_para(a.relogio()))
+
+
+def cenario(seed: int) -> None:
+    rnd = random.Random(seed)
+    nomes = [f"P{i:03d}" for i in range(rnd.randint(1, 40))]
+    replicas = [ContadoresPN(f"d{i}") for i in range(rnd.randint(2, 6))]
+    registado_p = registado_n = 0
+    em_transito = []      # (destino, delta)
+    relogios_antigos = [dict() for _ in replicas]
+
+    for _ in range(rnd.randint(20, 400)):
+        acao = rnd.random()
+        r = rnd.randrange(len(replicas))
+        rep = replicas[r]
+        nome = rnd.choice(nomes)
+        if acao < 0.45:
+            op = rnd.random()
+            antes_p, antes_n = totais(rep)
+            if op < 0.5:
+                rep.aumentar(nome, rnd.randint(0, 9))
+            elif op < 0.9:
+                rep.diminuir(nome, rnd.randint(0, 9))
+            else:
+                rep.definir(nome, rnd.randint(0, 20))
+            depois_p, depois_n = totais(rep)
+            registado_p += depois_p - antes_p
+            registado_n += depois_n - antes_n
+        elif acao < 0.75:
+            # delta para outra réplica: às vezes com um relógio antigo dela (troca atrasada)
+            d = rnd.randrange(len(replicas))
+            relogio = replicas[d].relogio() if rnd.random() < 0.7 else relogios_antigos[d]
+            relogios_antigos[d] = replicas[d].relogio()
+            em_transito.append((d, rep.delta_para(relogio)))
+        elif em_transito:
+            # entrega fora de ordem; às vezes duplicada, às vezes perdida
+            i = rnd.randrange(len(em_transito))
+            d, delta = em_transito[i]
+            sorte = rnd.random()
+            if sorte < 0.15:
+                em_transito.pop(i)              # perdida
+                continue
+            if sorte > 0.3:
+                em_transito.pop(i)
+            replicas[d].fundir(delta)
+
+        for x in replicas:
+            assert all(x.valor(n) >= 0 for n in nomes), f"seed {seed}: quantidade negativa"
+
+    # idempotência / comutatividade sobre o estado a meio
+    a, b = replicas[0], replicas[-1]
+    d1, d2 = a.delta_para({}), b.delta_para({})
+    c1, c2 = ContadoresPN("x"), ContadoresPN("y")
+    c1.fundir(d1); c1.fundir(d2); c1.fundir(d1)
+    c2.fundir(d2); c2.fundir(d1)
+    assert estado(c1) == estado(c2), f"seed {seed}: fundir não comutativo/idempotente"
+
+    # anti-entropia final: rondas de trocas até estabilizar
+    for _ in range(len(replicas)):
+        for i in range(len(replicas)):
+            for j in range(len(replicas)):
+                if i != j:
+                    trocar(replicas[i], replicas[j])
+    ref = estado(replicas[0])
+    for x in replicas[1:]:
+        assert estado(x) == ref, f"seed {seed}: réplicas não convergiram"
+        assert all(x.valor(n) == replicas[0].valor(n) for n in nomes)
+    assert totais(replicas[0]) == (registado_p, registado_n), f"seed {seed}: ajustes perdidos"
+
+    # gravar/carregar
+    copia = ContadoresPN(replicas[0].dispositivo)
+    copia.carregar_json(replicas[0].para_json())
+    assert estado(copia) == ref and copia.relogio() == replicas[0].relogio()
+
+
+def cenario_sequencial(seed: int) -> None:
+    """Uma só réplica = mesmas quantidades que o ProductStore (clamp a zero incluído)."""
+    rnd = random.Random(seed)
+    nomes = [f"P{i:02d}" for i in range(10)]
+    store = ProductStore((n, "T", 0) for n in nomes)
+    rep = ContadoresPN("d0")
+    for _ in range(300):
+        nome, v, op = rnd.choice(nomes), rnd.randint(0, 12), rnd.random()
+        if op < 0.45:
+            store.aumentarquantidade(nome, v); rep.aumentar(nome, v)
+        elif op < 0.9:
+            store.diminuirquantidade(nome, v); rep.diminuir(nome, v)
+        else:
+            store._definir(nome, v); rep.definir(nome, v)
+        assert rep.valor(nome) == store.getquantidade(nome), f"seed {seed}: difere do ProductStore"
+
+
+def custo_troca(tamanhos, alterados=50, repeticoes=20):
+    print(f"{'catálogo':>9} | {'alterados':>9} | {'delta_para µs':>13} | {'fundir µs':>9}")
+    for n in tamanhos:
+        a, b = ContadoresPN("a"), ContadoresPN("b")
+        for i in range(n):
+            a.aumentar(f"PRODUTO {i:06d}", 1 + i % 7)
+        b.fundir(a.delta_para({}))
+        t_delta = t_fundir = float("inf")
+        rnd = random.Random(n)
+        for _ in range(repeticoes):
+            for nome in rnd.sample(range(n), alterados):
+                a.aumentar(f"PRODUTO {nome:06d}", 1)
+            relogio = b.relogio()
+            t0 = time.perf_counter()
+            delta = a.delta_para(relogio)
+            t1 = time.perf_counter()
+            b.fundir(delta)
+            t2 = time.perf_counter()
+            t_delta, t_fundir = min(t_delta, t1 - t0), min(t_fundir, t2 - t1)
+        assert b.valor("PRODUTO 000000") == a.valor("PRODUTO 000000")
+        print(f"{n:>9} | {alterados:>9} | {t_delta * 1e6:>13.0f} | {t_fundir * 1e6:>9.0f}")
+
+
+def main(cenarios, tamanhos):
+    t0 = time.perf_counter()
+    for seed in range(cenarios):
+        cenario(seed)
+        cenario_sequencial(seed)
+    print(f"{cenarios} cenários aleatórios OK ({time.perf_counter() - t0:.1f}s)")
+    custo_troca(tamanhos)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cenarios", type=int, default=300)
+    ap.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = ap.parse_args()
+    main(args.cenarios, args.tamanhos)
@@ -0,0 +1,555 @@
+# simulador_turno.py
+# Simulador de um turno inteiro de teclado, sem janela: reproduz um traço de eventos
+# (instante, produto, +/-, quantidade) com o mesmo código do teclado da AppCozinha
+# (teclado_producao.TecladoProducao) sobre um NucleoProducao numa pasta temporária.
+# A "thread da UI" é uma fila (como o Clock do Kivy): o núcleo agenda nela os avisos e
+# os toques entram nela tecla a tecla, enquanto a FilaGravacao grava em fundo e
+# refrescamentos do Sheets (simulados, com latência de rede) chegam a meio do turno.
+#
+# Mede:
+#   - toque -> UI: do "confirmar" até a quantidade nova chegar ao ouvinte da UI;
+#   - fila da UI: espera e duração de cada callback (frames acima de 16 ms);
+#   - gravação: atraso entre cada toque e o fim da gravação que o inclui, gravações
+#     sobrepostas (nunca deviam existir: um só escritor) e toques que nunca foram gravados;
+#   - estado final da memória, dos contadores, da base de dados e da aba do dia (Excel)
+#     contra um oráculo calculado só a partir do traço.
+# Falha (código 1) se houver gravações sobrepostas, toques sem gravação/eco ou estado
+# final diferente do oráculo.
+#
+# O traço é gerado (turno com picos de manhã e ao almoço, produtos com popularidade
+# desigual) ou lido de um JSONL; --de-base transforma os eventos de um dia de uma
+# natabase.db real num traço, para repetir um turno verdadeiro.
+#
+# Uso:  python benchmarks/simulador_turno.py [--toques 3000] [--horas 8] [--produtos 300]
+#           [--velocidade 600] [--refrescos 3] [--gravar-traco turno.jsonl]
+#       python benchmarks/simulador_turno.py --traco turno.jsonl [--velocidade 1]
+#       python benchmarks/simulador_turno.py --de-base natabase.db [--dia 2025-03-14]
+# --velocidade 1 = tempo real, 60 = uma hora por minuto, 0 = sem esperas (carga máxima).
+
+import argparse
+import bisect
+import json
+import os
+import queue
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import deque
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+from functools import partial
+from pathlib import Path
+from threading import Event, Lock, Thread
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from historico import ler_particao
+from metricas import percentil
+from nucleo_producao import NucleoProducao
+from product_store import ProductStore
+from salvarexecel import caminho_particao
+from sheets_catalogo import DiffCatalogo
+from teclado_producao import TecladoProducao
+
+TIPOS = ["PASTELARIA", "SALGADOS", "CROISSANTS", "TOSTAS / SANDUÍCHES", "REGIONAIS", "PÃO"]
+FRAME_S = 1 / 60
+
+
+# ---------------- traço ----------------
+def gerar_turno(produtos, horas, toques, refrescos, seed=21):
+    """
+    (catálogo, eventos) de um turno sintético: sessões de 1-6 toques seguidos no mesmo
+    tipo (um tabuleiro a sair do forno), concentradas na abertura e ao almoço.
+    """
+    rnd = random.Random(seed)
+    pesos_tipos = [1 / (k + 1) for k in range(len(TIPOS))]
+    catalogo = {
+        f"PRODUTO {i:05d}": {"tipo": rnd.choices(TIPOS, pesos_tipos)[0], "quantidade": rnd.randint(0, 20)}
+        for i in range(produtos)
+    }
+    nomes = list(catalogo)
+    rnd.shuffle(nomes)
+    popularidade = [1 / (k + 1) ** 0.8 for k in range(len(nomes))]
+    por_tipo = {}
+    for nome, info in catalogo.items():
+        por_tipo.setdefault(info["tipo"], []).append(nome)
+
+    duracao = horas * 3600
+    eventos = []
+    while len(eventos) < toques:
+        pico = rnd.random()
+        if pico < 0.4:
+            t = rnd.gauss(0.12 * duracao, 0.05 * duracao)
+        elif pico < 0.75:
+            t = rnd.gauss(0.55 * duracao, 0.08 * duracao)
+        else:
+            t = rnd.uniform(0, duracao)
+        primeiro = rnd.choices(nomes, popularidade)[0]
+        vizinhos = por_tipo[catalogo[primeiro]["tipo"]]
+        for k in range(rnd.randint(1, 6)):
+            if not 0 <= t < duracao or len(eventos) >= toques:
+                break
+            nome = primeiro if k == 0 else rnd.choice(vizinhos)
+            if rnd.random() < 0.12:
+                direcao, valor = -1, rnd.choice((1, 1, 2, 3, 5))
+            else:
+                direcao, valor = 1, rnd.choices((1, 2, 3, 4, 5, 6, 10, 12, 24), (8, 6, 5, 4, 4, 5, 3, 3, 1))[0]
+            eventos.append({"t": round(t, 3), "produto": nome, "direcao": direcao, "valor": valor})
+            t += rnd.uniform(1.5, 5)
+
+    # refrescamentos do Sheets: algumas linhas com quantidades antigas (os contadores
+    # locais têm de ganhar) e um produto novo no menu
+    for k in range(refrescos):
+        alterados = [[n, catalogo[n]["tipo"], rnd.randint(0, 50)] for n in rnd.sample(nomes, min(5, len(nomes)))]
+        novos = [[f"NOVO SHEETS {k + 1:02d}", rnd.choice(TIPOS), rnd.randint(0, 10)]]
+        eventos.append({"t": round(duracao * (k + 1) / (refrescos + 1), 3),
+                        "sheets": {"alterados": alterados, "novos": novos}})
+    eventos.sort(key=lambda ev: ev["t"])
+    return catalogo, eventos
+
+
+def gravar_traco(caminho, catalogo, eventos):
+    """JSONL: 1.ª linha {"catalogo": {...}}, depois um evento por linha."""
+    with open(caminho, "w", encoding="utf-8") as fh:
+        fh.write(json.dumps({"catalogo": catalogo}, ensure_ascii=False) + "\n")
+        for ev in eventos:
+            fh.write(json.dumps(ev, ensure_ascii=False) + "\n")
+
+
+def ler_traco(caminho):
+    catalogo, eventos = {}, []
+    with open(caminho, encoding="utf-8") as fh:
+        for linha in fh:
+            if not linha.strip():
+                continue
+            registo = json.loads(linha)
+            if "catalogo" in registo:
+                catalogo = registo["catalogo"]
+            else:
+                eventos.append(registo)
+    eventos.sort(key=lambda ev: ev["t"])
+    return catalogo, eventos
+
+
+def traco_da_base(caminho_db, dia):
+    """
+    Traço a partir dos eventos de um dia numa natabase.db (toques e lotes gravados).
+    A quantidade inicial de cada produto é a de antes do seu primeiro evento do dia.
+    """
+    inicio = datetime.combine(dia, datetime.min.time()).timestamp()
+    con = sqlite3.connect(f"file:{caminho_db}?mode=ro", uri=True)
+    try:
+        linhas = con.execute(
+            "SELECT e.t, c.nome, c.tipo, e.op, e.delta, e.quantidade FROM eventos e "
+            "JOIN catalogo c ON c.id = e.produto_id WHERE e.t >= ? AND e.t < ? ORDER BY e.id",
+            (inicio, inicio + 86400),
+        ).fetchall()
+        catalogo = {
+            nome: {"tipo": tipo, "quantidade": qtd}
+            for nome, tipo, qtd in con.execute("SELECT nome, tipo, quantidade FROM catalogo WHERE ativo = 1")
+        }
+    finally:
+        con.close()
+    if not linhas:
+        return catalogo, []
+    t0 = linhas[0][0]
+    eventos, vistos = [], set()
+    for t, nome, tipo, op, delta, qtd in linhas:
+        direcao = 1 if op == "+" else -1
+        if nome not in vistos:
+            vistos.add(nome)
+            catalogo[nome] = {"tipo": tipo, "quantidade": qtd - delta if direcao == 1 else qtd + delta}
+        if delta > 0:
+            eventos.append({"t": round(t - t0, 3), "produto": nome, "direcao": direcao, "valor": delta})
+    return catalogo, eventos
+
+
+def oraculo(catalogo, eventos):
+    """Quantidades finais esperadas: cada toque pela ordem do traço, nunca abaixo de 0."""
+    qtd = {nome: int(info["quantidade"]) for nome, info in catalogo.items()}
+    for ev in eventos:
+        if "sheets" in ev:
+            for nome, _, q in ev["sheets"].get("novos", ()):
+                qtd.setdefault(nome, int(q))
+            continue
+        nome = ev["produto"]
+        valor = valor_teclado(ev["valor"])
+        if nome not in qtd or valor <= 0:
+            continue
+        if ev["direcao"] == 1:
+            qtd[nome] += valor
+        else:
+            qtd[nome] -= min(valor, qtd[nome])
+    return qtd
+
+
+def valor_teclado(valor):
+    """O que fica no teclado depois de digitar `valor` (máx. 6 dígitos)."""
+    return int(str(int(valor))[:6])
+
+
+# ---------------- "thread da UI" ----------------
+class ThreadUI:
+    """Fila de callbacks numa só thread, como o Clock do Kivy; mede espera e duração."""
+
+    def __init__(self):
+        self._fila = queue.Queue()
+        self.esperas = []
+        self.duracoes = []
+        self.erros = []
+        self._thread = Thread(target=self._loop, name="ui", daemon=True)
+        self._thread.start()
+
+    def agendar(self, fn):
+        self._fila.put((time.perf_counter(), fn))
+
+    def _loop(self):
+        while True:
+            t_pedido, fn = self._fila.get()
+            if fn is None:
+                return
+            t0 = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                self.erros.append(repr(e))
+            t1 = time.perf_counter()
+            self.esperas.append(t0 - t_pedido)
+            self.duracoes.append(t1 - t0)
+
+    def esperar(self, timeout=60):
+        """Espera que tudo o que já está na fila tenha corrido."""
+        feito = Event()
+        self.agendar(feito.set)
+        return feito.wait(timeout)
+
+    def parar(self):
+        self._fila.put((time.perf_counter(), None))
+        self._thread.join(10)
+
+
+class CozinhaSemEcra(TecladoProducao):
+    """O ecrã de detalhe da AppCozinha sem Kivy: o teclado é o mesmo código da app."""
+
+    def __init__(self, fonte, ao_eco):
+        self._fonte = fonte
+        self._ao_eco = ao_eco
+        self.keypad_value = ""
+        self.produto_selecionado = ""
+        self.qtd_atual_display = 0
+        self.tipo_atual = ""
+        self.grid_data = []
+        fonte.ouvir(self._ao_alterar_produtos)
+
+    @property
+    def dicionario_produtos(self):
+        return self._fonte.store
+
+    def abrir_tipo(self, tipo):
+        # mesma construção de AppCozinha.abrir_tipo (grid.data do RecycleView)
+        self.tipo_atual = tipo
+        self.grid_data = [
+            {"viewclass": "ProdutoTile", "title": nome, "nome": nome, "tipo": tipo, "quantity": qtd}
+            for nome, qtd in self.dicionario_produtos.produtos_do_tipo(tipo)
+        ]
+
+    def abrir_detalhe_produto(self, nome, tipo):
+        if tipo != self.tipo_atual:
+            self.abrir_tipo(tipo)
+        self.produto_selecionado = nome
+        self.keypad_value = ""
+        self._sync_qtd_display()
+
+    def _ao_alterar_produtos(self, nomes):
+        # como AppCozinha._ao_alterar_produtos, com o ecrã de produção aberto
+        self._ao_eco(nomes)
+        if nomes is None:
+            if self.tipo_atual:
+                self.abrir_tipo(self.tipo_atual)
+            self._sync_qtd_display()
+            return
+        if self.produto_selecionado in nomes:
+            self._sync_qtd_display()
+        alvo = set(nomes)
+        store = self.dicionario_produtos
+        for i, d in enumerate(self.grid_data):
+            nome = d["nome"]
+            if nome in alvo and nome in store:
+                qtd = store.getquantidade(nome)
+                if d["quantity"] != qtd:
+                    self.grid_data[i] = dict(d, quantity=qtd)
+
+
+class _SessaoFalsa:
+    """O que `_aplicar_diff_catalogo` usa da SessaoSheets."""
+
+    def confirmar(self):
+        pass
+
+
+# ---------------- simulação ----------------
+class Simulacao:
+    def __init__(self, pasta, catalogo, latencia_sheets):
+        self.latencia_sheets = latencia_sheets
+        self.catalogo = catalogo
+        self.ui = ThreadUI()
+        self.nucleo = NucleoProducao(pasta, agendar=self.ui.agendar)
+        self.nucleo.definir_catalogo(ProductStore.de_itens(catalogo))
+        self.nucleo.salvar_cache_local("simulador")
+        self.nucleo.carregado = True
+        self.cozinha = CozinhaSemEcra(self.nucleo, self._eco)
+
+        # só na thread da UI
+        self.pendentes = {}        # nome -> deque de instantes de "confirmar" sem eco
+        self.latencias = []
+        self.aplicados = []        # instante em que cada toque com efeito ficou em memória
+        self.toques = 0
+
+        # gravações: envolve o escritor da FilaGravacao
+        self._lock = Lock()
+        self._ativas = 0
+        self.sobrepostas = 0
+        self.gravacoes = []        # (início, fim)
+        fila = self.nucleo._fila_gravacao
+        gravar = fila._gravar
+
+        def gravar_medido():
+            with self._lock:
+                self._ativas += 1
+                if self._ativas > 1:
+                    self.sobrepostas += 1
+                inicio = time.perf_counter()
+            try:
+                gravar()
+            finally:
+                with self._lock:
+                    self._ativas -= 1
+                    self.gravacoes.append((inicio, time.perf_counter()))
+
+        fila._gravar = gravar_medido
+        self._refrescos = []
+
+    # ---- na thread da UI ----
+    def _eco(self, nomes):
+        if nomes is None:
+            return
+        agora = time.perf_counter()
+        for nome in nomes:
+            pendentes = self.pendentes.get(nome)
+            while pendentes:
+                self.latencias.append(agora - pendentes.popleft())
+
+    def _confirmar(self, direcao, t_toque):
+        nome = self.cozinha.produto_selecionado
+        muda = direcao == 1 or self.nucleo.quantidade(nome) > 0
+        if muda:
+            self.pendentes.setdefault(nome, deque()).append(t_toque)
+        self.cozinha.confirmar_ajuste_quantidade(direcao)
+        if muda:
+            self.aplicados.append(time.perf_counter())
+        self.toques += 1
+
+    # ---- "mãos" do operador (thread principal) ----
+    def tocar(self, ev):
+        nome = ev["produto"]
+        info = self.catalogo.get(nome)
+        if info is None:
+            return
+        ui = self.ui
+        ui.agendar(partial(self.cozinha.abrir_detalhe_produto, nome, info["tipo"]))
+        for d in str(int(ev["valor"])):
+            ui.agendar(partial(self.cozinha.keypad_add_digit, d))
+        ui.agendar(partial(self._confirmar, ev["direcao"], time.perf_counter()))
+
+    def refrescar_sheets(self, dados, versao):
+        """Como atualizar_do_sheets: rede numa thread, diff aplicado na thread da UI."""
+        def trabalho():
+            time.sleep(self.latencia_sheets)
+            diff = DiffCatalogo()
+            diff.alterados = [tuple(linha) for linha in dados.get("alterados", ())]
+            diff.alterados += [tuple(linha) for linha in dados.get("novos", ())]
+            self.ui.agendar(lambda: self.nucleo._aplicar_diff_catalogo(_SessaoFalsa(), diff, versao))
+
+        t = Thread(target=trabalho, daemon=True)
+        t.start()
+        self._refrescos.append(t)
+
+    def correr(self, eventos, velocidade):
+        inicio = time.perf_counter()
+        for k, ev in enumerate(eventos):
+            if velocidade:
+                espera = inicio + ev["t"] / velocidade - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+            if "sheets" in ev:
+                self.refrescar_sheets(ev["sheets"], f"simulador-{k}")
+            else:
+                self.tocar(ev)
+        for t in self._refrescos:
+            t.join()
+        self.ui.esperar()
+        duracao = time.perf_counter() - inicio
+
+        # deixa a FilaGravacao terminar sozinha (debounce/latência máxima) e só depois força
+        fila = self.nucleo._fila_gravacao
+        limite = time.perf_counter() + fila.latencia_max * 2 + 5
+        while fila.pendente and time.perf_counter() < limite:
+            time.sleep(0.05)
+        fila.flush(forcar=True)
+        return duracao
+
+    def atrasos_gravacao(self):
+        """Para cada toque com efeito: fim da primeira gravação que começou depois dele."""
+        gravacoes = sorted(self.gravacoes)
+        inicios = [g[0] for g in gravacoes]
+        atrasos, sem_gravacao = [], 0
+        for t in self.aplicados:
+            i = bisect.bisect_left(inicios, t)
+            if i == len(gravacoes):
+                sem_gravacao += 1
+            else:
+                atrasos.append(gravacoes[i][1] - t)
+        return atrasos, sem_gravacao
+
+    def estado_final(self, esperado):
+        """{camada: [produtos diferentes do oráculo]} para memória, contadores, base e Excel."""
+        nucleo = self.nucleo
+        store = nucleo.store
+        _, itens = nucleo.bd.carregar()
+        excel = {nome: qtd for nome, _, qtd in ler_particao(caminho_particao(str(nucleo.xlsx_path), date.today()))}
+        camadas = {
+            "memória": {n: store.getquantidade(n) for n in store},
+            "contadores": {n: nucleo.contadores.valor(n) for n in store},
+            "base de dados": {n: info["quantidade"] for n, info in itens.items()},
+            "aba do dia": excel,
+        }
+        return {
+            camada: sorted(n for n in set(esperado) | set(valores) if valores.get(n, 0) != esperado.get(n, 0))
+            for camada, valores in camadas.items()
+        }
+
+    def parar(self):
+        self.nucleo.parar()
+        self.ui.parar()
+
+
+# ---------------- relatório ----------------
+def resumo_ms(valores):
+    return {
+        "p50_ms": round(percentil(valores, 50) * 1000, 3),
+        "p95_ms": round(percentil(valores, 95) * 1000, 3),
+        "p99_ms": round(percentil(valores, 99) * 1000, 3),
+        "max_ms": round(max(valores, default=0) * 1000, 3),
+    }
+
+
+def linha_ms(titulo, r):
+    print(f"  {titulo:<30} p50 {r['p50_ms']:>9.2f} | p95 {r['p95_ms']:>9.2f} | "
+          f"p99 {r['p99_ms']:>9.2f} | máx {r['max_ms']:>9.2f} ms")
+
+
+def main(catalogo, eventos, velocidade, latencia_sheets, saida):
+    esperado = oraculo(catalogo, eventos)
+    n_toques = sum(1 for ev in eventos if "sheets" not in ev)
+    n_refrescos = len(eventos) - n_toques
+    turno = eventos[-1]["t"] if eventos else 0
+    print(f"traço: {n_toques} toques, {n_refrescos} refrescamentos do Sheets, {len(catalogo)} produtos, "
+          f"turno de {turno / 3600:.1f} h a x{velocidade or '∞'}")
+
+    with tempfile.TemporaryDirectory() as pasta, open(os.devnull, "w") as nulo:
+        with redirect_stdout(nulo):
+            sim = Simulacao(Path(pasta), catalogo, latencia_sheets)
+            duracao = sim.correr(eventos, velocidade)
+            atrasos, sem_gravacao = sim.atrasos_gravacao()
+            diferencas = sim.estado_final(esperado)
+            fila = sim.nucleo._fila_gravacao
+            pedidos = fila.pedidos
+            sim.parar()
+
+    sem_eco = sum(len(d) for d in sim.pendentes.values())
+    duracoes_gravacao = [fim - inicio for inicio, fim in sim.gravacoes]
+    frames_perdidos = sum(1 for d in sim.ui.duracoes if d > FRAME_S)
+    resultado = {
+        "meta": {
+            "quando": datetime.now().isoformat(timespec="seconds"),
+            "toques": n_toques,
+            "refrescos": n_refrescos,
+            "produtos": len(catalogo),
+            "velocidade": velocidade,
+            "duracao_s": round(duracao, 2),
+        },
+        "toque_ui": resumo_ms(sim.latencias),
+        "fila_ui_espera": resumo_ms(sim.ui.esperas),
+        "callback_ui": resumo_ms(sim.ui.duracoes),
+        "frames_perdidos": frames_perdidos,
+        "gravacao_atraso": resumo_ms(atrasos),
+        "gravacao_duracao": resumo_ms(duracoes_gravacao),
+        "gravacoes": len(sim.gravacoes),
+        "pedidos_gravacao": pedidos,
+        "sobrepostas": sim.sobrepostas,
+        "sem_gravacao": sem_gravacao,
+        "sem_eco": sem_eco,
+        "erros_ui": sim.ui.erros[:10],
+        "diferencas": {camada: len(nomes) for camada, nomes in diferencas.items()},
+    }
+
+    print(f"\nreproduzido em {duracao:.1f} s ({sim.toques / duracao if duracao else 0:.0f} toques/s), "
+          f"{len(sim.ui.duracoes)} callbacks na thread da UI")
+    linha_ms("toque -> UI", resultado["toque_ui"])
+    linha_ms("espera na fila da UI", resultado["fila_ui_espera"])
+    linha_ms("callback na UI", resultado["callback_ui"])
+    print(f"  {'frames acima de 16 ms':<30} {frames_perdidos}")
+    linha_ms("toque -> gravado", resultado["gravacao_atraso"])
+    linha_ms("duração de cada gravação", resultado["gravacao_duracao"])
+    print(f"  {'gravações / pedidos':<30} {len(sim.gravacoes)} / {pedidos}")
+    print(f"  {'gravações sobrepostas':<30} {sim.sobrepostas}")
+    print(f"  {'toques sem gravação':<30} {sem_gravacao}")
+    print(f"  {'toques sem eco na UI':<30} {sem_eco}")
+    if sim.ui.erros:
+        print(f"  {'erros na thread da UI':<30} {len(sim.ui.erros)} (ex.: {sim.ui.erros[0]})")
+
+    print("\nestado final contra o oráculo:")
+    ok = not (sim.sobrepostas or sem_gravacao or sem_eco or sim.ui.erros)
+    for camada, nomes in diferencas.items():
+        if nomes:
+            ok = False
+            exemplos = ", ".join(f"{n} ({esperado.get(n, 0)})" for n in nomes[:3])
+            print(f"  {camada:<14} !! {len(nomes)} produto(s) diferente(s); esperado: {exemplos}")
+        else:
+            print(f"  {camada:<14} igual")
+
+    if saida:
+        Path(saida).write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nresultados gravados em {saida}")
+    print(f"\nturno consistente: {'sim' if ok else 'NÃO'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--traco", help="traço JSONL a reproduzir (em vez de gerar um)")
+    ap.add_argument("--de-base", help="natabase.db de onde tirar o traço de um dia real")
+    ap.add_argument("--dia", help="dia a tirar da base (AAAA-MM-DD; por omissão, ontem)")
+    ap.add_argument("--gravar-traco", help="grava o traço usado neste JSONL")
+    ap.add_argument("--produtos", type=int, default=300)
+    ap.add_argument("--horas", type=float, default=8)
+    ap.add_argument("--toques", type=int, default=3000)
+    ap.add_argument("--refrescos", type=int, default=3, help="refrescamentos do Sheets a meio do turno")
+    ap.add_argument("--seed", type=int, default=21)
+    ap.add_argument("--velocidade", type=float, default=600, help="1 = tempo real, 0 = sem esperas")
+    ap.add_argument("--latencia-sheets", type=float, default=0.5, help="s de 'rede' por refrescamento")
+    ap.add_argument("--saida", help="JSON com os resultados")
+    args = ap.parse_args()
+
+    if args.traco:
+        catalogo, eventos = ler_traco(args.traco)
+    elif args.de_base:
+        dia = date.fromisoformat(args.dia) if args.dia else date.today() - timedelta(days=1)
+        catalogo, eventos = traco_da_base(args.de_base, dia)
+    else:
+        catalogo, eventos = gerar_turno(args.produtos, args.horas, args.toques, args.refrescos, args.seed)
+    if args.gravar_traco:
+        gravar_traco(args.gravar_traco, catalogo, eventos)
+    sys.exit(main(catalogo, eventos, args.velocidade, args.latencia_sheets, args.saida))
@@ -0,0 +1,257 @@
+# suite.py
+# Suite de benchmarks dos caminhos quentes, sem janela Kivy, sobre um catálogo sintético
+# (n.º de produtos, n.º de tipos e n.º de dias já existentes no Excel configuráveis):
+#
+#   salvar_dia      produção do dia na base de dados + aba do dia (salvar_producao_diaria)
+#   exportar_mes    anexo do mês montado a partir das partições diárias (preparar_anexo)
+#   salvar_cache    catálogo inteiro gravado (BaseDados.gravar_snapshot, ex-cache JSON)
+#   carregar_cache  catálogo lido e indexado (BaseDados.carregar + ProductStore.de_itens)
+#   resumo          agrupamento do ecrã Resumo (resumo_catalogo)
+#   abrir_tipo      dados da grelha do maior tipo (como AppCozinha.abrir_tipo)
+#   toque           NucleoProducao.ajustar (memória + transação SQLite)
+#
+# Para cada caso: p50/p95 (ms), débito (operações/s e produtos/s) e pico de memória
+# Python (tracemalloc, numa execução à parte para não pesar nos tempos; não inclui a
+# memória interna do SQLite). Os resultados ficam num JSON; com --comparar, um caso
+# que fique mais lento (ou gaste mais memória) do que `--limite`, para além do ruído
+# medido no próprio caso, falha com código 1 (e também se não houver casos em comum).
+#
+# Uso:  python benchmarks/suite.py [--produtos 300 2000] [--tipos 6] [--dias 30]
+#           [--repeticoes 15] [--saida suite.json] [--comparar base.json] [--limite 0.25] [--ruido 1]
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# o worker do Excel não pode gravar a meio das medições dos toques
+os.environ.setdefault("NATABASE_SAVE_DEBOUNCE", "600")
+os.environ.setdefault("NATABASE_SAVE_LATENCIA_MAX", "600")
+
+from base_dados import BaseDados
+from exportacao import preparar_anexo
+from metricas import percentil
+from nucleo_producao import NucleoProducao, resumo_catalogo
+from product_store import ProductStore
+from salvarexecel import salvar_producao_diaria
+
+TIPOS_BASE = ["PASTELARIA", "SALGADOS", "CROISSANTS", "TOSTAS / SANDUÍCHES", "REGIONAIS", "PÃO"]
+
+
+# ---------------- gerador sintético ----------------
+def nomes_tipos(n):
+    return [TIPOS_BASE[i] if i < len(TIPOS_BASE) else f"TIPO {i:03d}" for i in range(n)]
+
+
+def gerar_catalogo(produtos, tipos, seed=20):
+    """{nome: {"tipo", "quantidade"}}; tipos com tamanhos desiguais (como numa loja real)."""
+    rnd = random.Random(seed)
+    lista = nomes_tipos(tipos)
+    pesos = [1 / (k + 1) for k in range(tipos)]
+    return {
+        f"PRODUTO {i:05d}": {"tipo": rnd.choices(lista, pesos)[0], "quantidade": rnd.randint(0, 200)}
+        for i in range(produtos)
+    }
+
+
+def gerar_dias(xlsx, itens, dias, hoje, seed=20):
+    """Partições dos `dias` anteriores a `hoje`, com quantidades diferentes em cada dia."""
+    rnd = random.Random(seed)
+    for k in range(dias, 0, -1):
+        store = ProductStore((n, i["tipo"], rnd.randint(0, 200)) for n, i in itens.items())
+        salvar_producao_diaria(store, data=hoje - timedelta(days=k), nome_arquivo=str(xlsx))
+
+
+# ---------------- medição ----------------
+def medir(fn, repeticoes, itens_por_op):
+    fn()  # aquecimento (imports, caches)
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    media = sum(tempos) / len(tempos)
+    return {
+        "p50_ms": round(percentil(tempos, 50) * 1000, 4),
+        "p95_ms": round(percentil(tempos, 95) * 1000, 4),
+        "ops_s": round(1 / media, 2) if media else None,
+        "produtos_s": round(itens_por_op / media) if media else None,
+        "pico_kb": round(pico / 1024, 1),
+        "repeticoes": repeticoes,
+    }
+
+
+class _Silencio:
+    """Cala os prints das funções medidas (ex.: "✅ Planilha atualizada")."""
+
+    def __enter__(self):
+        self._stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+
+    def __exit__(self, *exc):
+        sys.stdout.close()
+        sys.stdout = self._stdout
+
+
+def correr_config(produtos, tipos, dias, repeticoes, casos):
+    itens = gerar_catalogo(produtos, tipos)
+    hoje = date.today()
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta, _Silencio():
+        pasta = Path(pasta)
+        xlsx = pasta / "Loja012_2025.xlsx"
+        gerar_dias(xlsx, itens, dias, hoje)
+        bd = BaseDados(pasta / "suite.db", dispositivo="suite")
+        bd.gravar_snapshot(itens, "suite")
+        store = ProductStore.de_itens(itens)
+        foto = store.atual()
+        maior_tipo = max(store.tipos(), key=lambda t: len(store.nomes_do_tipo(t)))
+
+        def salvar_dia():
+            bd.registar_dia(hoje)
+            salvar_producao_diaria(data=hoje, nome_arquivo=str(xlsx), por_tipo=bd.producao_por_tipo(hoje))
+
+        def carregar_cache():
+            _, lidos = bd.carregar()
+            ProductStore.de_itens(lidos)
+
+        def abrir_tipo():
+            # mesma construção de AppCozinha.abrir_tipo (grid.data do RecycleView)
+            return [
+                {"viewclass": "ProdutoTile", "title": nome, "nome": nome, "tipo": maior_tipo, "quantity": qtd}
+                for nome, qtd in foto.produtos_do_tipo(maior_tipo)
+            ]
+
+        nucleo = NucleoProducao(pasta, agendar=lambda fn: None)
+        nucleo.definir_catalogo(ProductStore.de_itens(itens))
+        nucleo.salvar_cache_local("suite")
+        nucleo.carregado = True
+        nomes = list(itens)
+        rnd = random.Random(7)
+
+        def toque():
+            nucleo.ajustar(rnd.choice(nomes), rnd.choice((1, -1)), rnd.randint(1, 5))
+
+        pesados = max(3, repeticoes // 3)
+        definicoes = {
+            "salvar_dia": (salvar_dia, pesados, produtos),
+            "exportar_mes": (lambda: preparar_anexo(str(xlsx), periodo="mes", hoje=hoje), max(2, repeticoes // 5), produtos),
+            "salvar_cache": (lambda: bd.gravar_snapshot(itens, "suite"), repeticoes, produtos),
+            "carregar_cache": (carregar_cache, repeticoes, produtos),
+            "resumo": (lambda: resumo_catalogo(foto), repeticoes * 5, produtos),
+            "abrir_tipo": (abrir_tipo, repeticoes * 5, len(foto.nomes_do_tipo(maior_tipo))),
+            "toque": (toque, repeticoes * 20, 1),
+        }
+        for nome, (fn, rep, n_itens) in definicoes.items():
+            if casos and nome not in casos:
+                continue
+            resultados[nome] = medir(fn, rep, n_itens)
+        nucleo.parar()
+        bd.fechar()
+    return resultados
+
+
+# ---------------- relatório / comparação ----------------
+def chave(caso, produtos, tipos, dias):
+    return f"{caso}[produtos={produtos},tipos={tipos},dias={dias}]"
+
+
+def casos_em_comum(atual, base):
+    return [k for k in atual["casos"] if k in base.get("casos", {})]
+
+
+def casos_em_falta(atual, base):
+    """Casos da base que esta execução não mediu (não entram na comparação)."""
+    return [k for k in base.get("casos", {}) if k not in atual["casos"]]
+
+
+def comparar(atual, base, limite, ruido):
+    """
+    Lista de regressões: p50 ou pico de memória acima de (1 + limite) × base.
+    A diferença do p50 também tem de passar o ruído medido (`ruido` × a maior
+    dispersão p95 − p50 das duas execuções): nos casos rápidos a margem é a do próprio
+    caso, não um valor fixo que esconda regressões de 0,01 ms para 0,05 ms.
+    """
+    regressoes = []
+    for k in casos_em_comum(atual, base):
+        r, b = atual["casos"][k], base["casos"][k]
+        dispersao = max(r["p95_ms"] - r["p50_ms"], b["p95_ms"] - b["p50_ms"], 0.0)
+        if r["p50_ms"] > b["p50_ms"] * (1 + limite) and r["p50_ms"] - b["p50_ms"] > ruido * dispersao:
+            regressoes.append(f"{k}: p50 {b['p50_ms']:.3f} → {r['p50_ms']:.3f} ms "
+                              f"(+{(r['p50_ms'] / b['p50_ms'] - 1) * 100:.0f}%, ruído ±{dispersao:.3f} ms)")
+        if b.get("pico_kb") and r["pico_kb"] > b["pico_kb"] * (1 + limite) and r["pico_kb"] - b["pico_kb"] > 64:
+            regressoes.append(f"{k}: memória {b['pico_kb']:.0f} → {r['pico_kb']:.0f} KB "
+                              f"(+{(r['pico_kb'] / b['pico_kb'] - 1) * 100:.0f}%)")
+    return regressoes
+
+
+def main(lista_produtos, tipos, dias, repeticoes, saida, base, limite, ruido, casos):
+    resultado = {
+        "meta": {
+            "quando": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "tipos": tipos,
+            "dias": dias,
+            "repeticoes": repeticoes,
+        },
+        "casos": {},
+    }
+    print(f"{'caso':<52} | {'p50 ms':>9} | {'p95 ms':>9} | {'ops/s':>9} | {'produtos/s':>10} | {'pico KB':>8}")
+    for produtos in lista_produtos:
+        for caso, r in correr_config(produtos, tipos, dias, repeticoes, casos).items():
+            k = chave(caso, produtos, tipos, dias)
+            resultado["casos"][k] = r
+            print(f"{k:<52} | {r['p50_ms']:>9.3f} | {r['p95_ms']:>9.3f} | {r['ops_s']:>9.1f} | "
+                  f"{r['produtos_s']:>10} | {r['pico_kb']:>8.0f}")
+
+    if saida:
+        Path(saida).write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nresultados gravados em {saida}")
+
+    if base:
+        dados_base = json.loads(Path(base).read_text(encoding="utf-8"))
+        if not casos_em_comum(resultado, dados_base):
+            print(f"\n!! nenhum caso em comum com {base} (produtos/tipos/dias/casos diferentes?)")
+            return 1
+        faltam = casos_em_falta(resultado, dados_base)
+        if faltam:
+            print(f"\naviso: {len(faltam)} caso(s) de {base} não medidos agora (ex.: {faltam[0]})")
+        regressoes = comparar(resultado, dados_base, limite, ruido)
+        if regressoes:
+            print(f"\n!!!!! {len(regressoes)} REGRESSÃO(ÕES) acima de {limite:.0%} face a {base} !!!!!")
+            for linha in regressoes:
+                print("  !!", linha)
+            return 1
+        print(f"\nsem regressões acima de {limite:.0%} face a {base}")
+    return 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--produtos", type=int, nargs="+", default=[300, 2000])
+    ap.add_argument("--tipos", type=int, default=6, help="n.º de tipos distintos")
+    ap.add_argument("--dias", type=int, default=30, help="partições diárias já existentes no Excel")
+    ap.add_argument("--repeticoes", type=int, default=15)
+    ap.add_argument("--casos", nargs="+", help="só estes casos (ex.: salvar_dia toque)")
+    ap.add_argument("--saida", default="suite_resultados.json", help="JSON com os resultados ('' = não gravar)")
+    ap.add_argument("--comparar", help="JSON de uma execução anterior (base)")
+    ap.add_argument("--limite", type=float, default=0.25, help="abrandamento máximo aceite (0.25 = 25%%)")
+    ap.add_argument("--ruido", type=float, default=1.0,
+                    help="diferenças do p50 abaixo de ruido × (p95 − p50) não contam")
+    args = ap.parse_args()
+    sys.exit(main(args.produtos, args.tipos, args.dias, args.repeticoes, args.saida,
+                  args.comparar, args.limite, args.ruido, args.casos))
@@ -0,0 +1,178 @@
+# verificar_email_outbox.py
+# Caixa de saída de e-mails (email_outbox.py + email_service.py) contra um servidor
+# SMTP local (aiosmtpd, no mesmo processo), com um relógio falso para o backoff:
+#   duplicados   o mesmo pedido (mesma chave) enfileirado várias vezes -> um só e-mail,
+#                com o conteúdo do último
+#   ligação      vários e-mails num só `processar` -> uma só ligação SMTP
+#   backoff      servidor em baixo (ligação recusada): o pedido fica pendente, a espera
+#                dobra a cada falha, e segue quando o servidor volta; sem servidor até
+#                `max_tentativas` fica FALHOU
+#   anexo        o anexo chega igual ao ficheiro (binário, com linhas começadas por ".")
+#   falhados     só os `max_falhados` mais recentes ficam em disco
+# Falha (código 1) se alguma verificação falhar.
+#
+# Uso:  python benchmarks/verificar_email_outbox.py
+
+import random
+import socket
+import sys
+import tempfile
+from email import message_from_bytes, policy
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from aiosmtpd.controller import Controller
+
+from email_outbox import FALHOU, PENDENTE, EmailOutbox
+from email_service import EmailService
+
+
+class Caixa:
+    """Handler do aiosmtpd: guarda cada mensagem e a ligação (porta do cliente) de onde veio."""
+
+    def __init__(self):
+        self.mensagens = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.mensagens.append((session.peer, envelope.content))
+        return "250 OK"
+
+    def ligacoes(self):
+        return len({peer for peer, _ in self.mensagens})
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1_000_000.0
+
+    def __call__(self):
+        return self.agora
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def servico(porta: int):
+    def criar():
+        return EmailService(
+            sender_email="loja@teste.local", sender_app_password="x", to_addresses=["gerente@teste.local"],
+            smtp_host="127.0.0.1", smtp_port_ssl=porta, usar_ssl=False, timeout=5,
+        )
+    return criar
+
+
+def anexo(pasta: Path, nome: str, tamanho: int = 300_000) -> Path:
+    rnd = random.Random(10)
+    dados = bytes(rnd.getrandbits(8) for _ in range(tamanho))
+    # linhas começadas por "." (dot-stuffing) e um CRLF solto no meio do binário
+    dados = b".\r\n..linha\r\n.\r\n" + dados + b"\r\n.\r\n"
+    caminho = pasta / nome
+    caminho.write_bytes(dados)
+    return caminho
+
+
+def anexo_recebido(conteudo: bytes):
+    msg = message_from_bytes(conteudo, policy=policy.default)
+    for parte in msg.iter_attachments():
+        return msg, parte.get_filename(), parte.get_payload(decode=True)
+    return msg, None, None
+
+
+def verificar(pasta: Path, confirmar):
+    porta = porta_livre()
+    caixa = Caixa()
+    controller = Controller(caixa, hostname="127.0.0.1", port=porta)
+    relogio = Relogio()
+    estados = []
+    outbox = EmailOutbox(pasta / "outbox", servico(porta), ao_estado=lambda *a: estados.append(a),
+                         backoff_base=15, backoff_max=120, max_tentativas=4, max_falhados=2, relogio=relogio)
+    xlsx = anexo(pasta, "Loja012_2025.xlsx")
+
+    # ---- servidor em baixo: ligação recusada, backoff ----
+    job = outbox.enfileirar(str(xlsx), "Fecho 1", "corpo 1", chave="fecho-1")
+    espera1 = outbox.processar()
+    pendente = outbox.listar(PENDENTE)
+    confirmar(espera1 == 15 and len(pendente) == 1 and pendente[0]["tentativas"] == 1 and pendente[0]["erro"],
+              f"ligação recusada: pedido pendente, nova tentativa em {espera1} s")
+    relogio.agora += 5
+    confirmar(outbox.processar() == 10 and outbox.listar(PENDENTE)[0]["tentativas"] == 1,
+              "antes do fim da espera não tenta")
+    relogio.agora += 10
+    espera2 = outbox.processar()
+    confirmar(espera2 == 30, f"a espera dobra a cada falha ({espera2} s)")
+
+    controller.start()
+    try:
+        relogio.agora += espera2
+        outbox.processar()
+        confirmar(len(caixa.mensagens) == 1 and not outbox.listar(), "servidor de volta: enviado e fora da fila")
+        if caixa.mensagens:
+            msg, nome, dados = anexo_recebido(caixa.mensagens[0][1])
+            confirmar(msg["Subject"] == "Fecho 1" and nome == xlsx.name, f"assunto e nome do anexo ({nome})")
+            confirmar(dados == xlsx.read_bytes(), f"anexo intacto ({len(dados or b'')} de {xlsx.stat().st_size} bytes)")
+
+        # ---- duplicados ----
+        for k in range(3):
+            outbox.enfileirar(str(xlsx), f"Fecho 2 (v{k})", f"corpo 2 v{k}", chave="fecho-2")
+        confirmar(len(outbox.listar(PENDENTE)) == 1, "mesma chave 3 vezes: um só pedido na fila")
+        n = len(caixa.mensagens)
+        outbox.processar()
+        enviados = caixa.mensagens[n:]
+        confirmar(len(enviados) == 1 and anexo_recebido(enviados[0][1])[0]["Subject"] == "Fecho 2 (v2)",
+                  "um só e-mail, com o conteúdo do último pedido")
+
+        # ---- uma ligação por processar ----
+        outbox._fechar_ligacao()
+        n, ligacoes = len(caixa.mensagens), outbox.ligacoes_abertas
+        for k in range(5):
+            outbox.enfileirar(str(xlsx), f"Envio {k}", "corpo", chave=f"envio-{k}")
+        outbox.processar()
+        novos = caixa.mensagens[n:]
+        confirmar(len(novos) == 5 and len({peer for peer, _ in novos}) == 1 and outbox.ligacoes_abertas == ligacoes + 1,
+                  f"5 e-mails, {len({peer for peer, _ in novos})} ligação SMTP")
+        confirmar(all(anexo_recebido(c)[2] == xlsx.read_bytes() for _, c in novos), "todos os anexos intactos")
+        outbox.parar()
+    finally:
+        controller.stop()
+
+    # ---- sem servidor até ao fim: FALHOU, e só os mais recentes ficam em disco ----
+    falhados = []
+    for k in range(4):
+        falhados.append(outbox.enfileirar(str(xlsx), f"Sem rede {k}", "corpo", chave=f"sem-rede-{k}"))
+        for _ in range(outbox.max_tentativas):
+            outbox.processar()
+            relogio.agora += outbox.backoff_max
+    em_disco = outbox.listar(FALHOU)
+    confirmar(not outbox.listar(PENDENTE) and [j["id"] for j in em_disco] == falhados[-2:],
+              f"falhados: {len(em_disco)} em disco (máximo 2, os mais recentes)")
+    confirmar(any(e[0] == falhados[-1] and e[1] == FALHOU for e in estados), "a UI é avisada da falha definitiva")
+    relogio.agora += outbox.guardar_falhados + 1
+    outbox.iniciar()
+    outbox.parar()
+    confirmar(not outbox.listar(FALHOU), "falhados antigos apagados no arranque")
+    confirmar(job not in {p.stem for p in (pasta / "outbox").glob("*.json")}, "o pedido enviado não ficou em disco")
+
+
+def main():
+    falhas = []
+
+    def confirmar(condicao, mensagem):
+        print(("ok   " if condicao else "FALHA") + " " + mensagem)
+        if not condicao:
+            falhas.append(mensagem)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        verificar(Path(tmp), confirmar)
+
+    if falhas:
+        print(f"\n!! {len(falhas)} verificação(ões) falharam")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
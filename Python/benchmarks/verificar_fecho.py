@@ -0,0 +1,206 @@
+# verificar_fecho.py
+# Fecho automático do dia (fecho_dia.py) com um relógio falso, sem esperar pela hora:
+#   calendário   1.ª execução não fecha dias antigos; o dia só fica por fechar à hora;
+#                não fecha duas vezes; dias perdidos saem num só fecho (no máximo
+#                `max_dias`); um fecho que falha não avança a marca; gravação a decorrer
+#                adia o fecho; a marca sobrevive a um reinício
+#   worker       a thread fecha quando o relógio passa a hora (e pára a pedido)
+#   núcleo       NucleoProducao.fechar_dias sobre uma base de dados com três dias em
+#                atraso (um sem produção, um sem partição): um só e-mail na caixa de
+#                saída, com as abas dos dias com produção e o resumo no corpo; uma
+#                gravação falhada não adia o fecho (o erro é reportado)
+# Falha (código 1) se alguma verificação falhar.
+#
+# Uso:  python benchmarks/verificar_fecho.py
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fecho_dia import AgendadorFecho, hora_fecho
+
+
+class Relogio:
+    """Relógio injetável: `avancar` faz passar o tempo."""
+
+    def __init__(self, agora: datetime):
+        self.agora = agora
+
+    def __call__(self) -> datetime:
+        return self.agora
+
+    def avancar(self, **kw):
+        self.agora += timedelta(**kw)
+
+
+def verificar_calendario(pasta: Path, confirmar):
+    relogio = Relogio(datetime(2026, 10, 18, 10, 0))
+    fechados, falhar, ocupado = [], [False], [False]
+
+    def fechar(dias):
+        if falhar[0]:
+            raise OSError("sem disco")
+        fechados.append(list(dias))
+
+    marca = pasta / "fecho_dia.json"
+    ag = AgendadorFecho(fechar, marca, hora=hora_fecho("22:00"), relogio=relogio, ocupado=lambda: ocupado[0], max_dias=31)
+    d = date(2026, 10, 18)
+
+    confirmar(ag.pendentes() == [] and ag.ultimo_fechado == d - timedelta(days=1),
+              "1.ª execução: nada por fechar, marca no último dia já devido")
+    relogio.agora = datetime(2026, 10, 18, 21, 59, 59)
+    confirmar(ag.executar() == [] and not fechados, "antes da hora não fecha")
+    confirmar(ag.proximo() == datetime(2026, 10, 18, 22, 0), "próximo fecho às 22:00")
+    relogio.agora = datetime(2026, 10, 18, 22, 0)
+    confirmar(ag.executar() == [d] and fechados == [[d]], "à hora fecha o dia")
+    relogio.avancar(minutes=30)
+    confirmar(ag.executar() == [] and len(fechados) == 1, "não fecha o mesmo dia duas vezes")
+    confirmar(ag.proximo() == datetime(2026, 10, 19, 22, 0), "próximo fecho no dia seguinte")
+
+    # tablet desligado três noites: um só fecho com os três dias
+    relogio.agora = datetime(2026, 10, 22, 8, 15)
+    dias = [d + timedelta(days=k) for k in (1, 2, 3)]
+    confirmar(ag.executar() == dias and fechados[-1] == dias, f"dias perdidos num só fecho: {fechados[-1]}")
+
+    # falha: a marca não avança e os mesmos dias voltam no fecho seguinte
+    relogio.agora = datetime(2026, 10, 23, 22, 5)
+    falhar[0] = True
+    espera = ag._passo()
+    confirmar(ag.ultimo_fechado == date(2026, 10, 21) and espera == ag.adiar and ag.ultimo_erro,
+              "fecho que falha não avança a marca")
+    falhar[0] = False
+    relogio.agora = datetime(2026, 10, 24, 7, 0)
+    confirmar(ag.executar() == [date(2026, 10, 22), date(2026, 10, 23)], "depois da falha fecha os dias em atraso")
+
+    # hora calma: com gravação a decorrer espera
+    relogio.agora = datetime(2026, 10, 24, 22, 1)
+    ocupado[0] = True
+    n = len(fechados)
+    confirmar(ag._passo() == ag.adiar and len(fechados) == n, "gravação a decorrer adia o fecho")
+    ocupado[0] = False
+    espera = ag._passo()
+    confirmar(len(fechados) == n + 1 and 0 < espera <= ag.espera_max, "sem gravações fecha e volta a dormir")
+
+    # reinício: a marca fica em disco; muitos dias em atraso ficam limitados
+    ag2 = AgendadorFecho(fechar, marca, hora=hora_fecho("22:00"), relogio=relogio, max_dias=31)
+    confirmar(ag2.ultimo_fechado == date(2026, 10, 24), "marca lida depois de reiniciar")
+    relogio.agora = datetime(2027, 1, 10, 23, 0)
+    dias = ag2.executar()
+    confirmar(len(dias) == 31 and dias[-1] == date(2027, 1, 10), f"atraso limitado a 31 dias ({len(dias)})")
+
+    confirmar(hora_fecho("off") is None and hora_fecho("25:00") is None and hora_fecho("6:30").hour == 6,
+              "NATABASE_FECHO: off/inválido desliga, HH:MM")
+
+
+def verificar_worker(pasta: Path, confirmar):
+    relogio = Relogio(datetime(2026, 10, 18, 21, 0))
+    fechados = []
+    ag = AgendadorFecho(fechados.append, pasta / "fecho_worker.json", relogio=relogio, espera_max=0.05)
+    ag.iniciar()
+    time.sleep(0.2)
+    vazio = not fechados
+    relogio.agora = datetime(2026, 10, 18, 22, 0, 1)
+    limite = time.monotonic() + 5
+    while not fechados and time.monotonic() < limite:
+        time.sleep(0.01)
+    ag.parar(timeout=5)
+    confirmar(vazio and fechados == [[date(2026, 10, 18)]], "o worker fecha quando o relógio passa a hora")
+    confirmar(ag._thread is None, "o worker pára")
+
+
+def verificar_nucleo(pasta: Path, confirmar):
+    import openpyxl
+    from base_dados import BaseDados
+    from nucleo_producao import NucleoProducao
+    from salvarexecel import caminho_particao, salvar_producao_diaria
+
+    catalogo = {
+        "PASTEL DE NATA": {"tipo": "PASTELARIA", "quantidade": 0},
+        "CROISSANT MISTO": {"tipo": "CROISSANTS", "quantidade": 0},
+        "RISSOL DE CAMARÃO": {"tipo": "SALGADOS", "quantidade": 0},
+    }
+    d1, d2, d3 = date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 3)
+    xlsx = pasta / "Loja012_2025.xlsx"
+    bd = BaseDados(pasta / "natabase.db", dispositivo="verificar")
+    bd.gravar_snapshot(catalogo, "v1")
+    bd.migrar_ficheiros(pasta / "cache_produtos.json", pasta / "diario_ajustes.jsonl", xlsx)
+    bd.gravar_dia(d1, [("PASTEL DE NATA", "PASTELARIA", 120), ("CROISSANT MISTO", "CROISSANTS", 40)])
+    bd.gravar_dia(d3, [("PASTEL DE NATA", "PASTELARIA", 95), ("RISSOL DE CAMARÃO", "SALGADOS", 30)])
+    # d1 já tem partição (gravada nesse dia); d3 não (a app fechou antes de gravar); d2 sem produção
+    salvar_producao_diaria(data=d1, nome_arquivo=str(xlsx), por_tipo=bd.producao_por_tipo(d1))
+    bd.fechar()
+
+    relogio = Relogio(datetime(2026, 2, 28, 23, 0))
+    nucleo = NucleoProducao(pasta, agendar=lambda fn: fn(), relogio=relogio)
+    try:
+        ag = nucleo._fecho
+        confirmar(ag is not None and ag.pendentes() == [], "núcleo: fecho ligado (22:00 por omissão)")
+        relogio.agora = datetime(2026, 3, 4, 9, 0)
+
+        # gravação falhada (sem disco): não adia o fecho para sempre; o fecho tenta, reporta
+        # o erro e não avança a marca
+        fila = nucleo._fila_gravacao
+        gravar = fila._gravar
+
+        def sem_disco():
+            raise OSError("sem disco")
+
+        fila._gravar = sem_disco
+        fila.agendar()
+        limite = time.monotonic() + 5
+        while not fila._falhas and time.monotonic() < limite:
+            time.sleep(0.01)
+        confirmar(fila.pendente and not fila.ocupada, "núcleo: gravação falhada fica pendente sem ocupar a fila")
+        ag._passo()
+        confirmar(ag.ultimo_erro and "sem disco" in ag.ultimo_erro and ag.ultimo_fechado == date(2026, 2, 28),
+                  f"núcleo: fecho com gravação falhada reporta o erro ({ag.ultimo_erro})")
+        fila._gravar = gravar
+
+        dias = ag.executar()
+        confirmar(dias == [d1, d2, d3], f"núcleo: três dias num só fecho ({dias})")
+        confirmar(caminho_particao(str(xlsx), d3).exists(), "núcleo: partição em falta gerada da base de dados")
+        jobs = nucleo._outbox.listar()
+        confirmar(len(jobs) == 1, f"núcleo: um só e-mail na caixa de saída ({len(jobs)})")
+        if jobs:
+            job = jobs[0]
+            wb = openpyxl.load_workbook(job["filepath"], read_only=True)
+            abas = wb.sheetnames
+            wb.close()
+            confirmar(abas == ["01-03-2026", "03-03-2026"], f"núcleo: anexo com os dias com produção ({abas})")
+            confirmar("TOTAL GERAL: 160" in job["body"] and "TOTAL GERAL: 125" in job["body"]
+                      and "Sem produção registada: 02/03/2026" in job["body"],
+                      "núcleo: resumo de cada dia no corpo do e-mail")
+            confirmar(job["subject"].endswith("01/03/2026 a 03/03/2026"), f"núcleo: assunto ({job['subject']})")
+    finally:
+        nucleo.parar()
+
+
+def main():
+    falhas = []
+
+    def confirmar(condicao, mensagem):
+        print(("ok   " if condicao else "FALHA") + " " + mensagem)
+        if not condicao:
+            falhas.append(mensagem)
+
+    os.environ.setdefault("NATABASE_FECHO", "22:00")
+    with tempfile.TemporaryDirectory() as tmp:
+        verificar_calendario(Path(tmp), confirmar)
+    with tempfile.TemporaryDirectory() as tmp:
+        verificar_worker(Path(tmp), confirmar)
+    with tempfile.TemporaryDirectory() as tmp:
+        verificar_nucleo(Path(tmp), confirmar)
+
+    if falhas:
+        print(f"\n!! {len(falhas)} verificação(ões) falharam")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+# verificar_sheets_sync.py
+# Envio para o Sheets (sheets_sync.py) contra a PlanilhaFalsa, sem rede:
+#   lote         muitos toques em poucos produtos -> um só batch_update, só as células
+#                alteradas, com a última quantidade de cada produto
+#   429          o limite de taxa não envia nada antes do backoff, que cresce a cada
+#                falha; depois do backoff envia tudo
+#   offline      sem rede a fila fica em disco; um novo sincronizador (reinício da app)
+#                lê-a e envia-a quando a ligação volta; a fila em disco desaparece
+#   ligação      a planilha que falha a abrir (sem rede no arranque) é tentada de novo
+#                pelo worker, sem ninguém chamar `ligar`
+#   ligar        `ligar` noutra thread a meio dos envios não rebenta o flush
+# Falha (código 1) se alguma verificação falhar.
+#
+# Uso:  python benchmarks/verificar_sheets_sync.py
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sheets_sync import PlanilhaFalsa, SincronizadorSheets
+
+PRODUTOS = [f"PRODUTO {i:03d}" for i in range(200)]
+
+
+def planilha_loja(**kw) -> PlanilhaFalsa:
+    return PlanilhaFalsa([["Nome", "Tipo", "Quantidade"]] + [[n, "PASTELARIA", 0] for n in PRODUTOS], **kw)
+
+
+def celula(planilha: PlanilhaFalsa, nome: str):
+    return planilha.linhas[PRODUTOS.index(nome) + 1][2]
+
+
+class PlanilhaSemRede(PlanilhaFalsa):
+    """Falha com erro de rede enquanto `offline` for verdadeiro."""
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self.offline = True
+        self.tentativas = 0
+
+    def ler_valores(self):
+        self.tentativas += 1
+        if self.offline:
+            raise ConnectionError("sem rede (falso)")
+        return super().ler_valores()
+
+    def batch_update(self, atualizacoes):
+        if self.offline:
+            raise ConnectionError("sem rede (falso)")
+        return super().batch_update(atualizacoes)
+
+
+def verificar_lote(pasta: Path, confirmar):
+    qtd = {}
+    planilha = planilha_loja()
+    sync = SincronizadorSheets(qtd.get, pasta / "fila_lote.json", planilha=planilha)
+    alterados = PRODUTOS[:10]
+    for k in range(500):
+        nome = alterados[k % len(alterados)]
+        qtd[nome] = k
+        sync.marcar(nome)
+    enviados = sync.flush()
+    confirmar(enviados == 10 and planilha.chamadas_batch == 1 and planilha.celulas_escritas == 10,
+              f"500 toques em 10 produtos: {planilha.chamadas_batch} batch_update, {planilha.celulas_escritas} células")
+    confirmar(all(celula(planilha, n) == qtd[n] for n in alterados) and celula(planilha, PRODUTOS[50]) == 0,
+              "só as células alteradas, com a última quantidade")
+    confirmar(sync.flush() == 0 and planilha.chamadas_batch == 1, "sem alterações não há chamada")
+    confirmar(sync.pendentes == 0 and not (pasta / "fila_lote.json").exists(), "fila vazia depois do envio")
+
+
+def verificar_429(pasta: Path, confirmar):
+    qtd = {PRODUTOS[0]: 7, PRODUTOS[1]: 8}
+    planilha = planilha_loja(falhas_429=2)
+    sync = SincronizadorSheets(qtd.get, pasta / "fila_429.json", planilha=planilha, backoff_base=2.0)
+    sync.marcar(PRODUTOS[0])
+    sync.marcar(PRODUTOS[1])
+
+    t = 1000.0
+    confirmar(sync.tentar_flush(agora=t) == 0 and sync._falhas_seguidas == 1, "1.º 429: nada enviado")
+    espera1 = sync._proxima_tentativa - t
+    confirmar(1.0 <= espera1 <= 2.0, f"backoff depois do 1.º 429: {espera1:.2f} s")
+    confirmar(sync.tentar_flush(agora=t + espera1 / 2) == 0 and planilha.falhas_429 == 1,
+              "antes do fim do backoff nem tenta")
+    t += espera1
+    confirmar(sync.tentar_flush(agora=t) == 0 and sync._falhas_seguidas == 2, "2.º 429: nada enviado")
+    espera2 = sync._proxima_tentativa - t
+    confirmar(2.0 <= espera2 <= 4.0, f"backoff cresce: {espera2:.2f} s")
+    confirmar((pasta / "fila_429.json").exists(), "a fila fica em disco durante o backoff")
+    t += espera2
+    enviados = sync.tentar_flush(agora=t)
+    confirmar(enviados == 2 and planilha.chamadas_batch == 1 and celula(planilha, PRODUTOS[1]) == 8,
+              "depois do backoff envia tudo num só batch_update")
+    confirmar(sync._falhas_seguidas == 0 and sync._proxima_tentativa == 0.0, "backoff reposto depois do envio")
+
+    sync.backoff_max = 5.0
+    sync._falhas_seguidas = 30
+    confirmar(sync._atraso_backoff() <= 5.0, "backoff limitado a backoff_max")
+
+
+def verificar_offline(pasta: Path, confirmar):
+    caminho = pasta / "sheets_pendentes.json"
+    qtd = {PRODUTOS[3]: 12, PRODUTOS[4]: 30}
+    planilha = PlanilhaSemRede(planilha_loja().linhas)
+    sync = SincronizadorSheets(qtd.get, caminho, planilha=planilha)
+    sync.marcar(PRODUTOS[3])
+    sync.marcar(PRODUTOS[4])
+    confirmar(sync.tentar_flush() == 0 and caminho.exists(), "sem rede: a fila vai para o disco")
+    qtd[PRODUTOS[4]] = 31
+    sync.marcar(PRODUTOS[4])
+    sync.parar()   # a app fecha sem rede
+
+    # reinício: quantidades só na fila em disco (o catálogo ainda não foi lido)
+    planilha.offline = False
+    sync2 = SincronizadorSheets(lambda nome: None, caminho, planilha=planilha)
+    confirmar(sync2.pendentes == 2, f"fila lida depois do reinício ({sync2.pendentes})")
+    enviados = sync2.flush()
+    confirmar(enviados == 2 and celula(planilha, PRODUTOS[3]) == 12 and celula(planilha, PRODUTOS[4]) == 31,
+              "fila enviada quando a rede volta (com a última quantidade)")
+    confirmar(not caminho.exists() and sync2.pendentes == 0, "fila em disco apagada depois do envio")
+
+
+def verificar_ligacao(pasta: Path, confirmar):
+    qtd = {PRODUTOS[5]: 3}
+    planilha = PlanilhaSemRede(planilha_loja().linhas)
+    sync = SincronizadorSheets(qtd.get, pasta / "fila_ligacao.json", planilha=planilha,
+                               intervalo=0.01, backoff_base=0.02, backoff_max=0.05)
+    sync.marcar(PRODUTOS[5])
+    sync.iniciar()
+    limite = time.monotonic() + 5
+    while planilha.tentativas < 3 and time.monotonic() < limite:
+        time.sleep(0.01)
+    confirmar(planilha.tentativas >= 3 and sync.pendentes == 1, f"sem rede o worker volta a tentar ({planilha.tentativas}x)")
+    planilha.offline = False
+    while sync.pendentes and time.monotonic() < limite:
+        time.sleep(0.01)
+    sync.parar(timeout=5)
+    confirmar(sync.pendentes == 0 and celula(planilha, PRODUTOS[5]) == 3, "a ligação volta e o worker envia sozinho")
+
+
+class SincronizadorReligado(SincronizadorSheets):
+    """`ligar` (ex.: fim da autenticação noutra thread) chega logo depois de mapear as linhas."""
+
+    def _mapear_linhas(self, planilha):
+        mapa = super()._mapear_linhas(planilha)
+        self.ligar(planilha_loja())
+        return mapa
+
+
+def verificar_ligar_concorrente(pasta: Path, confirmar):
+    qtd = {PRODUTOS[6]: 4}
+    sync = SincronizadorReligado(qtd.get, pasta / "fila_ligar.json", planilha=planilha_loja())
+    sync.marcar(PRODUTOS[6])
+    try:
+        enviados, erro = sync.flush(), None
+    except Exception as e:
+        enviados, erro = 0, e
+    confirmar(erro is None and enviados == 1, f"ligar a meio do flush: {erro!r}" if erro else "ligar a meio do flush")
+
+
+def main():
+    falhas = []
+
+    def confirmar(condicao, mensagem):
+        print(("ok   " if condicao else "FALHA") + " " + mensagem)
+        if not condicao:
+            falhas.append(mensagem)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pasta = Path(tmp)
+        verificar_lote(pasta, confirmar)
+        verificar_429(pasta, confirmar)
+        verificar_offline(pasta, confirmar)
+        verificar_ligacao(pasta, confirmar)
+        verificar_ligar_concorrente(pasta, confirmar)
+
+    if falhas:
+        print(f"\n!! {len(falhas)} verificação(ões) falharam")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+# cliente_inventario.py
+# Cliente do servico_inventario.py para a app em modo "thin client" (NATABASE_SERVIDOR):
+# uma thread com event loop próprio mantém o WebSocket aberto (com reconexão) e espelha
+# o estado do serviço num ProductStore local, só de leitura para a UI. Os ajustes
+# seguem para o serviço; a tela só muda quando chega a notificação de volta, por isso
+# todas as tablets mostram sempre o mesmo valor.
+# Sem ligação (ex.: no armazém), os toques ficam nos contadores PN deste dispositivo
+# e seguem como um delta quando o WebSocket volta; o serviço funde sem perder nada.
+
+import asyncio
+import itertools
+import json
+from pathlib import Path
+from threading import Thread
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+
+from product_store import ErroLote, LOTE_DEFINIR, LoteAjustes, ProductStore
+from contadores import ContadoresPN, id_dispositivo
+from arranque import gravar_primeiro_ecra
+from metricas import contar, metricas
+
+
+class ErroServico(Exception):
+    """O serviço recusou o pedido (ou não respondeu)."""
+
+
+class SemLigacao(ConnectionError):
+    """Pedido não enviado: não há WebSocket aberto (seguro repetir ou guardar offline)."""
+
+
+class ClienteInventario:
+    """
+    Mesma interface que o NucleoProducao usa na app (store, carregado, ouvir,
+    ajustar, aplicar_lote, exportar), mas o estado vive no serviço.
+    - `ajustar()` não bloqueia (toque na UI); o resultado chega pelo `ouvir`.
+      Offline, aplica-se ao espelho e fica nos contadores até à próxima ligação.
+    - `aplicar_lote()` e `exportar()` esperam pela resposta: chamar fora da thread da UI.
+    - Ouvintes e avisos correm sempre via `agendar` (thread da UI).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        agendar: Callable[[Callable[[], None]], None],
+        ao_aviso: Optional[Callable[[str], None]] = None,
+        base_dir: Optional[Path] = None,
+        espera_max: float = 10.0,
+        timeout: float = 30.0,
+    ):
+        self.url = url.rstrip("/")
+        self._agendar = agendar
+        self._ao_aviso = ao_aviso
+        self.espera_max = espera_max
+        self.timeout = timeout
+        base_dir = Path(base_dir or Path(__file__).resolve().parent)
+        self.base_dir = base_dir
+        # o mapa de produção é lido localmente (se a tablet tiver uma cópia)
+        self._mapa_path: Optional[Path] = None
+        # tipos do último estado recebido: a grelha aparece antes de o WebSocket ligar
+        self.primeiro_ecra_path = base_dir / "primeiro_ecra.json"
+        metricas.configurar(base_dir)
+
+        # ajustes feitos sem ligação (contadores PN deste dispositivo, em disco)
+        self.contadores = ContadoresPN(id_dispositivo(base_dir / "dispositivo.txt"))
+        self._contadores_path = base_dir / "contadores.json"
+        self.contadores.carregar(self._contadores_path)
+
+        # espelho do estado do serviço (só a thread da UI escreve)
+        self.store = ProductStore()
+        self.carregado = False
+        self.ligado = False
+        self._ouvintes: List[Callable[[Optional[List[str]]], None]] = []
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[Thread] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._respostas: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._tarefas = set()
+        self._parar = False
+
+    # ---------------- ciclo de vida ----------------
+    def iniciar(self, sheets: bool = True):
+        # `sheets` só existe por compatibilidade com o NucleoProducao: é o serviço que sincroniza
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = Thread(target=self._correr, name="cliente-inventario", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._parar = True
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread is not None:
+            self._thread.join(5)
+        self.contadores.gravar(self._contadores_path)
+        metricas.gravar()
+
+    def _correr(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._ligar())
+        finally:
+            self._loop.close()
+
+    async def _ligar(self):
+        """Liga (e volta a ligar, com backoff) ao /ws do serviço."""
+        espera = 0.5
+        async with aiohttp.ClientSession() as sessao:
+            while not self._parar:
+                try:
+                    async with sessao.ws_connect(f"{self.url}/ws", heartbeat=30) as ws:
+                        self._ws = ws
+                        self.ligado = True
+                        espera = 0.5
+                        self._avisar("🔗 Ligado ao serviço da loja.")
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self._receber(json.loads(msg.data))
+                except (aiohttp.ClientError, OSError, ValueError) as e:
+                    print("[cliente] ligação ao serviço:", e)
+                finally:
+                    self._ws = None
+                    self._falhar_pendentes()
+                if self._parar:
+                    break
+                if self.ligado:
+                    self.ligado = False
+                    self._avisar("⚠️ Sem ligação ao serviço. A tentar de novo...")
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, self.espera_max)
+
+    def _falhar_pendentes(self):
+        pendentes, self._respostas = self._respostas, {}
+        for fut in pendentes.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("ligação ao serviço perdida"))
+
+    # ---------------- mensagens do serviço ----------------
+    def _receber(self, msg: dict):
+        tipo = msg.get("tipo")
+        if tipo == "resposta":
+            fut = self._respostas.pop(msg.get("id"), None)
+            if fut is not None and not fut.done():
+                fut.set_result(msg)
+        elif tipo == "estado":
+            itens = msg.get("itens") or {}
+            self._agendar(lambda: self._aplicar_estado(itens))
+            # o que foi feito offline e o serviço ainda não tem segue já
+            delta = self.contadores.delta_para(msg.get("relogio") or {})
+            if delta:
+                t = asyncio.ensure_future(self._enviar_offline(delta))
+                self._tarefas.add(t)
+                t.add_done_callback(self._tarefas.discard)
+        elif tipo == "alteracao":
+            produtos = msg.get("produtos") or {}
+            self._agendar(lambda: self._aplicar_alteracao(produtos))
+
+    async def _enviar_offline(self, delta: dict):
+        n = sum(len(parte["e"]) for parte in delta.values())
+        try:
+            await self._pedir("sincronizar", {"delta": delta})
+        except Exception as e:
+            # fica nos contadores; vai outra vez na próxima ligação
+            print("[cliente] envio dos ajustes offline falhou:", e)
+            return
+        self._avisar(f"✅ Ajustes feitos offline enviados ({n} produto(s)).")
+
+    def _aplicar_estado(self, itens: Dict[str, dict]):
+        # (re)ligação ou catálogo novo no serviço: troca o espelho inteiro
+        self.definir_catalogo(ProductStore.de_itens(itens))
+        self.carregado = True
+        self._notificar(None)
+        try:
+            gravar_primeiro_ecra(self.primeiro_ecra_path, self.store.atual())
+        except OSError as e:
+            print("[cliente] índice do primeiro ecrã:", e)
+
+    def _aplicar_alteracao(self, produtos: Dict[str, int]):
+        alterados = self.store.aplicar_lote(
+            ((LOTE_DEFINIR, nome, qtd) for nome, qtd in produtos.items()),
+            ignorar_desconhecidos=True,
+        )
+        if alterados:
+            self._notificar(list(alterados))
+
+    # ---------------- observadores ----------------
+    def ouvir(self, callback: Callable[[Optional[List[str]]], None]):
+        self._ouvintes.append(callback)
+
+    def _notificar(self, nomes: Optional[List[str]]):
+        for cb in self._ouvintes:
+            cb(nomes)
+
+    def _avisar(self, msg: str):
+        if self._ao_aviso is not None:
+            self._agendar(lambda: self._ao_aviso(msg))
+
+    def definir_catalogo(self, store: ProductStore):
+        self.store = store
+
+    # ---------------- pedidos ----------------
+    async def _pedir(self, acao: str, dados) -> dict:
+        ws = self._ws
+        if ws is None or ws.closed:
+            raise SemLigacao("sem ligação ao serviço")
+        pedido_id = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._respostas[pedido_id] = fut
+        try:
+            await ws.send_str(json.dumps({"id": pedido_id, "acao": acao, "dados": dados}, ensure_ascii=False))
+            resposta = await asyncio.wait_for(fut, self.timeout)
+        finally:
+            self._respostas.pop(pedido_id, None)
+        if not resposta.get("ok"):
+            if resposta.get("erros"):
+                raise ErroLote([tuple(e) for e in resposta["erros"]], resposta.get("total"))
+            raise ErroServico(resposta.get("erro") or "pedido recusado")
+        return resposta
+
+    def _pedir_bloqueante(self, acao: str, dados) -> dict:
+        if self._loop is None:
+            raise ConnectionError("cliente não iniciado")
+        return asyncio.run_coroutine_threadsafe(self._pedir(acao, dados), self._loop).result(self.timeout + 5)
+
+    # ---------------- mesma API do NucleoProducao ----------------
+    def quantidade(self, nome: str) -> int:
+        return int(self.store.getquantidade(nome)) if nome in self.store else 0
+
+    def ajustar(self, nome: str, direcao: int, valor: int) -> None:
+        """Envia o ajuste sem esperar; o valor novo chega pela notificação do serviço."""
+        if valor <= 0 or nome not in self.store:
+            return None
+        contar("toques")
+        if self._loop is None or not self.ligado:
+            contar("toques.offline")
+            self._ajustar_offline(nome, direcao, valor)
+            return None
+        fut = asyncio.run_coroutine_threadsafe(
+            self._pedir("ajustes", {"nome": nome, "direcao": direcao, "valor": valor}), self._loop
+        )
+
+        def _feito(f):
+            e = f.exception()
+            if isinstance(e, SemLigacao):
+                # nem chegou a sair: guarda-se offline (sem risco de contar duas vezes)
+                self._agendar(lambda: self._ajustar_offline(nome, direcao, valor))
+            elif e is not None:
+                print("[cliente] ajuste falhou:", e)
+                contar("erros.ajuste")
+                self._avisar(f"❌ Ajuste não aplicado ({nome}): {e}")
+
+        fut.add_done_callback(_feito)
+        return None
+
+    def _ajustar_offline(self, nome: str, direcao: int, valor: int):
+        """Na thread da UI: aplica ao espelho e regista nos contadores deste dispositivo."""
+        atual = self.quantidade(nome)
+        if direcao == 1:
+            self.contadores.aumentar(nome, valor)
+            novo = atual + valor
+        else:
+            # nunca abaixo do que a tablet está a mostrar
+            novo = atual - self.contadores.diminuir(nome, valor, visivel=atual)
+        self.contadores.gravar(self._contadores_path)
+        self._aplicar_alteracao({nome: novo})
+
+    def aplicar_lote(self, ajustes, ignorar_desconhecidos: bool = False) -> Dict[str, tuple]:
+        """Bloqueante. O serviço valida e aplica tudo ou nada (ErroLote se inválido)."""
+        lote = ajustes if isinstance(ajustes, LoteAjustes) else LoteAjustes(ajustes)
+        if lote.n_erros:
+            raise ErroLote(lote.erros, lote.n_erros)
+        resposta = self._pedir_bloqueante(
+            "lote", {"lote": lote.composicao(), "ignorar_desconhecidos": ignorar_desconhecidos}
+        )
+        return {nome: tuple(v) for nome, v in resposta.get("alterados", {}).items()}
+
+    def exportar(self, periodo: str = "hoje", comprimir: bool = False) -> str:
+        """Bloqueante. O serviço grava o Excel partilhado e põe o e-mail na sua caixa de saída."""
+        return self._pedir_bloqueante("exportar", {"periodo": periodo, "comprimir": comprimir})["job"]
+
+    @property
+    def mapa_path(self) -> Path:
+        if self._mapa_path is None:
+            from mapa_producao import caminho_mapa
+            self._mapa_path = caminho_mapa(self.base_dir)
+        return self._mapa_path
+
+    def reconciliacao(self, foto=None):
+        from mapa_producao import reconciliar
+        return reconciliar(self.mapa_path, foto if foto is not None else self.store.atual())
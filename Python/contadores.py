@@ -0,0 +1,253 @@
+# contadores.py
+# Quantidades como contadores PN por dispositivo (CRDT): cada tablet/serviço só
+# incrementa os seus próprios totais P (entradas) e N (saídas) de cada produto, e a
+# quantidade é max(0, ΣP − ΣN). Fundir dois estados é o máximo ponto a ponto, por isso
+# a ordem, a repetição ou o atraso das trocas não importa: todos convergem, sem lock
+# central e sem perder ajustes feitos offline.
+#
+# As trocas são deltas: cada origem numera as suas alterações (seq) e cada réplica
+# guarda o maior seq visto por origem (relógio vetorial). `delta_para(relogio)` só
+# percorre as alterações posteriores ao relógio do outro lado, por isso custa o n.º
+# de produtos alterados, não o tamanho do catálogo.
+
+import json
+import os
+import socket
+import uuid
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional
+
+from escrita_atomica import gravar_json
+
+
+def id_dispositivo(caminho: Path) -> str:
+    """Id estável deste dispositivo: NATABASE_DISPOSITIVO ou gerado uma vez e guardado."""
+    fixo = os.getenv("NATABASE_DISPOSITIVO", "").strip()
+    if fixo:
+        return fixo
+    caminho = Path(caminho)
+    try:
+        guardado = caminho.read_text(encoding="utf-8").strip()
+        if guardado:
+            return guardado
+    except OSError:
+        pass
+    novo = f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+    caminho.write_text(novo, encoding="utf-8")
+    return novo
+
+
+def _inteiro(valor, o_que: str, minimo: int = 0) -> int:
+    # bool é int em Python, mas true/false no JSON é um erro de quem envia
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor < minimo:
+        raise ValueError(f"{o_que} deve ser um inteiro >= {minimo}: {valor!r}")
+    return valor
+
+
+def validar_delta(delta) -> Dict[str, dict]:
+    """
+    Confere a forma de um delta vindo de outra réplica antes de mexer em qualquer estado:
+    {origem: {"desde": int, "e": [[nome, p, n, seq], ...]}}. Lança ValueError.
+    """
+    if delta is None:
+        return {}
+    if not isinstance(delta, dict):
+        raise ValueError("delta deve ser um objeto {origem: {desde, e}}")
+    for origem, parte in delta.items():
+        if not isinstance(parte, dict):
+            raise ValueError(f"parte de {origem!r} deve ser um objeto")
+        _inteiro(parte.get("desde", 0), f"{origem!r}: desde")
+        entradas = parte.get("e") or []
+        if not isinstance(entradas, list):
+            raise ValueError(f"{origem!r}: 'e' deve ser uma lista")
+        for k, e in enumerate(entradas):
+            if not isinstance(e, list) or len(e) != 4:
+                raise ValueError(f"{origem!r}: entrada #{k} deve ser [nome, p, n, seq]: {e!r}")
+            nome, p, n, seq = e
+            if not isinstance(nome, str):
+                raise ValueError(f"{origem!r}: entrada #{k}: nome inválido: {nome!r}")
+            _inteiro(p, f"{origem!r}: entrada #{k}: p")
+            _inteiro(n, f"{origem!r}: entrada #{k}: n")
+            _inteiro(seq, f"{origem!r}: entrada #{k}: seq", minimo=1)
+    return delta
+
+
+def validar_relogio(relogio) -> Dict[str, int]:
+    """{origem: seq} de outra réplica; lança ValueError."""
+    if not isinstance(relogio, dict):
+        raise ValueError("relogio deve ser um objeto {origem: seq}")
+    for origem, seq in relogio.items():
+        _inteiro(seq, f"relogio[{origem!r}]")
+    return relogio
+
+
+class ContadoresPN:
+    """
+    Réplica de contadores PN.
+    - `aumentar`/`diminuir`/`definir` alteram só a entrada deste dispositivo; as
+      saídas ficam limitadas ao que se vê (nunca se desconta abaixo de zero localmente).
+    - `delta_para(relogio)` / `fundir(delta)` trocam só as entradas que o outro lado
+      ainda não tem; `fundir` devolve os produtos cuja quantidade visível mudou.
+    - Se duas réplicas descontarem offline as mesmas unidades, ΣP − ΣN fica negativo
+      e a quantidade mostra 0 em todas (o resultado não depende da ordem das trocas);
+      `definir` parte sempre do valor visível, por isso uma contagem repõe o saldo.
+    - Thread-safe (lock interno): a thread dona altera, o worker de gravação serializa.
+
+    Formato do delta: {origem: {"desde": seq, "e": [[nome, p, n, seq], ...]}},
+    com as entradas por ordem de seq.
+    """
+
+    def __init__(self, dispositivo: str):
+        self.dispositivo = dispositivo
+        # origem -> {nome: [p, n, seq]}, sempre por ordem crescente de seq
+        self._entradas: Dict[str, Dict[str, List[int]]] = {}
+        self._relogio: Dict[str, int] = {}      # origem -> maior seq conhecido
+        self._bruto: Dict[str, int] = {}        # nome -> ΣP − ΣN
+        self._lock = Lock()
+
+    # ---------------- leitura ----------------
+    def valor(self, nome: str) -> int:
+        return max(0, self._bruto.get(nome, 0))
+
+    def conhece(self, nome: str) -> bool:
+        return nome in self._bruto
+
+    def nomes(self) -> List[str]:
+        return list(self._bruto)
+
+    def relogio(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._relogio)
+
+    def __len__(self) -> int:
+        return len(self._bruto)
+
+    # ---------------- alterações locais ----------------
+    def _registar(self, nome: str, dp: int, dn: int):
+        # chamado com o lock: a entrada deste dispositivo passa para o fim (maior seq)
+        proprias = self._entradas.setdefault(self.dispositivo, {})
+        p, n, _ = proprias.pop(nome, (0, 0, 0))
+        seq = self._relogio.get(self.dispositivo, 0) + 1
+        self._relogio[self.dispositivo] = seq
+        proprias[nome] = [p + dp, n + dn, seq]
+        self._bruto[nome] = self._bruto.get(nome, 0) + dp - dn
+
+    def aumentar(self, nome: str, valor: int):
+        v = max(0, int(valor or 0))
+        if v:
+            with self._lock:
+                self._registar(nome, v, 0)
+
+    def diminuir(self, nome: str, valor: int, visivel: Optional[int] = None) -> int:
+        """
+        Desconta até `valor`, nunca abaixo do que se vê (`visivel`, por omissão o valor
+        desta réplica). Devolve o que foi descontado.
+        """
+        with self._lock:
+            limite = self.valor(nome) if visivel is None else max(0, int(visivel))
+            v = min(max(0, int(valor or 0)), limite)
+            if v:
+                self._registar(nome, 0, v)
+            return v
+
+    def definir(self, nome: str, alvo: int):
+        """Contagem ("=") ou zerar: regista a diferença para a quantidade visível ficar `alvo`."""
+        alvo = max(0, int(alvo or 0))
+        with self._lock:
+            bruto = self._bruto.get(nome, 0)
+            if alvo > max(0, bruto):
+                # cobre também um eventual saldo negativo de descontos concorrentes
+                self._registar(nome, alvo - bruto, 0)
+            elif alvo < bruto:
+                self._registar(nome, 0, bruto - alvo)
+            elif nome not in self._bruto:
+                self._bruto[nome] = 0
+
+    # ---------------- trocas ----------------
+    def delta_para(self, relogio_remoto: Optional[Dict[str, int]] = None) -> dict:
+        """Entradas que uma réplica com `relogio_remoto` ainda não viu (vazio = tudo)."""
+        relogio_remoto = relogio_remoto or {}
+        delta = {}
+        with self._lock:
+            for origem, entradas in self._entradas.items():
+                desde = int(relogio_remoto.get(origem, 0))
+                if self._relogio.get(origem, 0) <= desde:
+                    continue
+                novas = []
+                # as entradas estão por ordem de seq: basta andar de trás para a frente
+                for nome, (p, n, seq) in reversed(entradas.items()):
+                    if seq <= desde:
+                        break
+                    novas.append([nome, p, n, seq])
+                novas.reverse()
+                delta[origem] = {"desde": desde, "e": novas}
+        return delta
+
+    def fundir(self, delta: dict) -> List[str]:
+        """
+        Junta um delta (idempotente, comutativo). Partes que começam depois do que
+        esta réplica já tem ("desde" > relógio local) são ignoradas: virão completas
+        na troca seguinte. Devolve os nomes cuja quantidade visível mudou.
+        Um delta mal formado (ver `validar_delta`) lança ValueError sem fundir nada.
+        """
+        delta = validar_delta(delta)
+        mudaram = []
+        with self._lock:
+            for origem, parte in delta.items():
+                # também as próprias: um dispositivo que perdeu o ficheiro recupera-as
+                # e continua a numeração a partir daí
+                atual = self._relogio.get(origem, 0)
+                if parte.get("desde", 0) > atual:
+                    continue
+                entradas = self._entradas.setdefault(origem, {})
+                for nome, p, n, seq in sorted(parte.get("e") or (), key=lambda e: e[3]):
+                    if seq <= atual:
+                        continue     # já conhecido (réplica completa até `atual`)
+                    p0, n0, _ = entradas.pop(nome, (0, 0, 0))
+                    p, n = max(p, p0), max(n, n0)
+                    entradas[nome] = [p, n, seq]
+                    antes = self._bruto.get(nome)
+                    depois = (antes or 0) + (p - p0) - (n - n0)
+                    self._bruto[nome] = depois
+                    if antes is None or max(0, antes) != max(0, depois):
+                        mudaram.append(nome)
+                    atual = seq
+                self._relogio[origem] = atual
+        return list(dict.fromkeys(mudaram))
+
+    # ---------------- persistência ----------------
+    def para_json(self) -> dict:
+        with self._lock:
+            return {
+                "dispositivo": self.dispositivo,
+                "origens": {
+                    origem: [[nome, p, n, seq] for nome, (p, n, seq) in entradas.items()]
+                    for origem, entradas in self._entradas.items()
+                },
+            }
+
+    def carregar_json(self, dados: dict):
+        with self._lock:
+            self._entradas, self._relogio, self._bruto = {}, {}, {}
+            for origem, lista in (dados.get("origens") or {}).items():
+                entradas = self._entradas[origem] = {}
+                for nome, p, n, seq in sorted(lista, key=lambda e: e[3]):
+                    entradas[nome] = [int(p), int(n), int(seq)]
+                    self._bruto[nome] = self._bruto.get(nome, 0) + int(p) - int(n)
+                    self._relogio[origem] = int(seq)
+
+    def gravar(self, caminho: Path):
+        gravar_json(caminho, self.para_json(), ensure_ascii=False)
+
+    def carregar(self, caminho: Path) -> bool:
+        caminho = Path(caminho)
+        if not caminho.exists():
+            return False
+        try:
+            self.carregar_json(json.loads(caminho.read_text(encoding="utf-8")))
+            return True
+        except (ValueError, OSError, TypeError) as e:
+            print("[contadores] ficheiro ilegível:", e)
+            return False
+
@@ -0,0 +1,185 @@
+# diario_ajustes.py
+# Diário (journal) só de acréscimo com os ajustes de quantidade.
+# Cada toque vira uma linha pequena + fsync, em vez de regravar o catálogo inteiro.
+# O snapshot continua a ser o cache_produtos.json.
+# Desde a base de dados SQLite (base_dados.py) a app já não escreve aqui: o diário só
+# é lido uma vez, por BaseDados.migrar_ficheiros, por isso deixou de ser compactado.
+
+import json
+import os
+import platform
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
+
+from escrita_atomica import gravar_json
+
+# operações registadas
+OP_AUMENTAR = "+"
+OP_DIMINUIR = "-"
+OP_ZERAR = "0"
+
+
+def _aplicar(itens: Dict[str, dict], op: str, nome: str, delta: int):
+    """Aplica um registo do diário ao dicionário de itens (mesmas regras do `produto`)."""
+    info = itens.get(nome)
+    if info is None:
+        # produto já não existe no catálogo atual: ignora
+        return
+    atual = int(info.get("quantidade") or 0)
+    if op == OP_ZERAR:
+        info["quantidade"] = 0
+    elif op == OP_AUMENTAR:
+        info["quantidade"] = atual + max(0, int(delta))
+    elif op == OP_DIMINUIR:
+        info["quantidade"] = max(0, atual - max(0, int(delta)))
+
+
+def _operacoes(reg: dict):
+    """(op, nome, delta) de um registo: simples ou lote (`l`: [[op, nome, delta], ...])."""
+    lote = reg.get("l")
+    if lote is None:
+        yield reg.get("o"), reg.get("p"), reg.get("d") or 0
+        return
+    for op, nome, delta in lote:
+        yield op, nome, delta or 0
+
+
+class DiarioAjustes:
+    """
+    - `registar()` acrescenta um registo {s, t, p, d, o, dev} e faz fsync.
+    - `registar_lote()` grava vários ajustes numa só linha {s, t, l, dev}: na
+      reposição o lote entra inteiro ou não entra (linha cortada é ignorada).
+    - `carregar()` lê o último snapshot e reaplica a cauda do diário (e o `.1` deixado
+      por uma compactação de versões anteriores).
+    - `gravar_snapshot()` substitui o estado todo (ex.: novo catálogo vindo do Sheets).
+    """
+
+    def __init__(
+        self,
+        caminho_diario: Path,
+        caminho_snapshot: Path,
+        dispositivo: Optional[str] = None,
+    ):
+        self.caminho_diario = Path(caminho_diario)
+        self.caminho_snapshot = Path(caminho_snapshot)
+        self._caminho_rodado = self.caminho_diario.with_name(self.caminho_diario.name + ".1")
+        self.dispositivo = dispositivo or os.getenv("NATABASE_DISPOSITIVO") or platform.node() or "desconhecido"
+
+        self._lock = Lock()  # protege seq + ficheiro aberto
+        self._seq = 0
+        self._fh = None
+
+    # ---------------- escrita ----------------
+    def registar(self, op: str, nome: str, delta: int = 0):
+        """Acrescenta um registo ao diário de forma durável (O(1) por toque)."""
+        with self._lock:
+            self._seq += 1
+            registo = {
+                "s": self._seq,
+                "t": round(time.time(), 3),
+                "p": nome,
+                "d": int(delta),
+                "o": op,
+                "dev": self.dispositivo,
+            }
+            self._escrever(registo)
+
+    def registar_lote(self, operacoes: Iterable[Tuple[str, str, int]]):
+        """Acrescenta um lote de ajustes (op, nome, delta) numa única linha e num único fsync."""
+        lote = [[op, nome, int(delta)] for op, nome, delta in operacoes]
+        if not lote:
+            return
+        with self._lock:
+            self._seq += 1
+            self._escrever({
+                "s": self._seq,
+                "t": round(time.time(), 3),
+                "l": lote,
+                "dev": self.dispositivo,
+            })
+
+    def _escrever(self, registo: dict):
+        # chamar com o lock
+        fh = self._abrir()
+        fh.write(json.dumps(registo, ensure_ascii=False, separators=(",", ":")) + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+
+    def _abrir(self):
+        if self._fh is None or self._fh.closed:
+            self._fh = open(self.caminho_diario, "a", encoding="utf-8")
+        return self._fh
+
+    def _fechar(self):
+        if self._fh is not None and not self._fh.closed:
+            self._fh.close()
+        self._fh = None
+
+    def fechar(self):
+        with self._lock:
+            self._fechar()
+
+    # ---------------- leitura ----------------
+    def _ler_snapshot(self) -> Tuple[Optional[str], Dict[str, dict], int]:
+        if not self.caminho_snapshot.exists():
+            return None, {}, 0
+        data = json.loads(self.caminho_snapshot.read_text(encoding="utf-8"))
+        itens = {
+            nome: {"tipo": info.get("tipo") or "Sem Tipo", "quantidade": int(info.get("quantidade") or 0)}
+            for nome, info in data.get("itens", {}).items()
+        }
+        return data.get("versao_menu"), itens, int(data.get("seq") or 0)
+
+    @staticmethod
+    def _ler_registos(caminho: Path):
+        if not caminho.exists():
+            return
+        with open(caminho, encoding="utf-8") as fh:
+            for linha in fh:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    yield json.loads(linha)
+                except ValueError:
+                    # última linha cortada (queda de energia a meio da escrita)
+                    continue
+
+    def _reaplicar(self, itens: Dict[str, dict], seq_base: int) -> int:
+        """Reaplica os registos com seq > seq_base. Devolve o último seq."""
+        ultimo = seq_base
+        for caminho in (self._caminho_rodado, self.caminho_diario):
+            for reg in self._ler_registos(caminho):
+                s = int(reg.get("s") or 0)
+                if s <= seq_base:
+                    continue
+                for op, nome, delta in _operacoes(reg):
+                    _aplicar(itens, op, nome, delta)
+                ultimo = max(ultimo, s)
+        return ultimo
+
+    def carregar(self) -> Tuple[Optional[str], Dict[str, dict]]:
+        """Reconstrói o estado: último snapshot + cauda do diário."""
+        with self._lock:
+            versao, itens, seq = self._ler_snapshot()
+            self._seq = self._reaplicar(itens, seq)
+        return versao, itens
+
+    def historico(self):
+        """Todos os registos do diário (trilho de auditoria: quem mudou o quê)."""
+        for caminho in (self._caminho_rodado, self.caminho_diario):
+            yield from self._ler_registos(caminho)
+
+    # ---------------- snapshot ----------------
+    def gravar_snapshot(self, itens: Dict[str, dict], versao: Optional[str]):
+        """
+        Substitui todo o estado (novo catálogo). Os registos anteriores ficam no diário:
+        o `seq` do snapshot faz com que a reposição os salte.
+        """
+        with self._lock:
+            # registos escritos por outra instância também ficam para trás
+            self._seq = self._reaplicar({}, self._seq)
+            data = {"versao_menu": versao, "seq": self._seq, "itens": itens}
+            gravar_json(self.caminho_snapshot, data, ensure_ascii=False)
@@ -0,0 +1,269 @@
+# email_outbox.py
+# Caixa de saída de e-mails: os pedidos de exportação vão para uma fila em disco
+# e um worker envia-os por uma única ligação SMTP autenticada e reutilizada.
+# Falhas são repetidas com backoff exponencial; nada se perde se a app fechar.
+
+import json
+import smtplib
+import time
+import uuid
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Callable, List, Optional
+
+from escrita_atomica import gravar_json
+from metricas import contar, span
+
+# estados de um envio
+PENDENTE = "pendente"
+ENVIADO = "enviado"
+FALHOU = "falhou"
+
+
+class EmailOutbox:
+    """
+    - `enfileirar(...)` grava o pedido em `pasta/<id>.json` e acorda o worker.
+      Pedidos com a mesma `chave` (ex.: o mesmo dia) ainda pendentes são substituídos,
+      por isso carregar várias vezes em "exportar" gera um só e-mail.
+    - O worker mantém a ligação SMTP aberta entre envios (NOOP antes de reutilizar)
+      e fecha-a ao fim de `inatividade_max` segundos sem trabalho.
+    - `ao_estado(id, estado, mensagem)` informa a UI (pendente/enviado/falhou).
+    - Os pedidos que falharam de vez ficam em disco para diagnóstico, mas só os
+      `max_falhados` mais recentes e no máximo `guardar_falhados` segundos.
+    """
+
+    def __init__(
+        self,
+        pasta: Path,
+        criar_servico: Callable,
+        ao_estado: Optional[Callable[[str, str, str], None]] = None,
+        backoff_base: float = 15.0,
+        backoff_max: float = 1800.0,
+        max_tentativas: int = 8,
+        inatividade_max: float = 60.0,
+        max_falhados: int = 20,
+        guardar_falhados: float = 7 * 24 * 3600.0,
+        relogio: Callable[[], float] = time.time,
+    ):
+        self.pasta = Path(pasta)
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        self._criar_servico = criar_servico       # callable() -> EmailService
+        self._ao_estado = ao_estado
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_tentativas = max_tentativas
+        self.inatividade_max = inatividade_max
+        self.max_falhados = max_falhados
+        self.guardar_falhados = guardar_falhados
+        self._relogio = relogio
+
+        self._lock = Lock()
+        self._acordar = Event()
+        self._parar = Event()
+        self._thread: Optional[Thread] = None
+
+        self._servico = None
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._ultimo_uso = 0.0
+
+        # estatísticas (diagnóstico)
+        self.ligacoes_abertas = 0
+        self.enviados = 0
+
+    # ---------------- fila em disco ----------------
+    def _caminho(self, job_id: str) -> Path:
+        return self.pasta / f"{job_id}.json"
+
+    def _gravar(self, job: dict):
+        gravar_json(self._caminho(job["id"]), job, sufixo=".tmp", ensure_ascii=False)
+
+    def _ler_todos(self) -> List[dict]:
+        jobs = []
+        for f in self.pasta.glob("*.json"):
+            try:
+                jobs.append(json.loads(f.read_text(encoding="utf-8")))
+            except (ValueError, OSError):
+                continue
+        jobs.sort(key=lambda j: j.get("criado", 0))
+        return jobs
+
+    def _podar_falhados(self, jobs: List[dict]) -> int:
+        """Apaga os falhados a mais ou antigos (chamado com o lock). Devolve quantos."""
+        limite = self._relogio() - self.guardar_falhados
+        falhados = [j for j in jobs if j.get("estado") == FALHOU]
+        falhados.sort(key=lambda j: j.get("falhou_em", j.get("criado", 0)), reverse=True)
+        apagados = 0
+        for k, j in enumerate(falhados):
+            if k >= self.max_falhados or j.get("falhou_em", j.get("criado", 0)) < limite:
+                try:
+                    self._caminho(j["id"]).unlink()
+                    apagados += 1
+                except OSError:
+                    pass
+        return apagados
+
+    def listar(self, estado: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            return [j for j in self._ler_todos() if estado is None or j.get("estado") == estado]
+
+    def enfileirar(self, filepath: str, subject: str, body: str, chave: Optional[str] = None,
+                   html: Optional[str] = None) -> str:
+        """Coloca um envio na fila (com deduplicação por `chave`). Devolve o id."""
+        agora = self._relogio()
+        with self._lock:
+            job = None
+            if chave:
+                for j in self._ler_todos():
+                    if j.get("chave") == chave and j.get("estado") == PENDENTE:
+                        job = j
+                        break
+            if job is None:
+                job = {"id": uuid.uuid4().hex[:12], "chave": chave, "criado": agora, "tentativas": 0}
+            job.update({
+                "filepath": str(filepath),
+                "subject": subject,
+                "body": body,
+                "html": html,
+                "estado": PENDENTE,
+                "proxima": agora,
+                "erro": "",
+            })
+            self._gravar(job)
+        self._notificar(job["id"], PENDENTE, "Na fila de envio.")
+        self._acordar.set()
+        return job["id"]
+
+    def _notificar(self, job_id: str, estado: str, mensagem: str):
+        if self._ao_estado:
+            try:
+                self._ao_estado(job_id, estado, mensagem)
+            except Exception as e:
+                print("[outbox] erro no callback de estado:", e)
+
+    # ---------------- ligação SMTP reutilizada ----------------
+    def _ligacao(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._fechar_ligacao()
+        if self._servico is None:
+            self._servico = self._criar_servico()
+        self._smtp = self._servico.abrir_conexao()
+        self.ligacoes_abertas += 1
+        return self._smtp
+
+    def _fechar_ligacao(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                self._smtp.close()
+            except OSError:
+                pass
+        self._smtp = None
+
+    # ---------------- worker ----------------
+    def iniciar(self):
+        # falhados de execuções anteriores (ex.: com limites maiores)
+        with self._lock:
+            self._podar_falhados(self._ler_todos())
+        if self._thread is None:
+            self._thread = Thread(target=self._loop, name="email-outbox", daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: Optional[float] = None):
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._fechar_ligacao()
+
+    def processar(self) -> Optional[float]:
+        """
+        Envia todos os pedidos vencidos. Devolve quantos segundos faltam para o
+        próximo pedido em espera (backoff) ou None se a fila ficou vazia.
+        """
+        agora = self._relogio()
+        proxima = None
+        for job in self.listar(PENDENTE):
+            if job["proxima"] > agora:
+                espera = job["proxima"] - agora
+                proxima = espera if proxima is None else min(proxima, espera)
+                continue
+            espera = self._enviar(job)
+            if espera is not None:
+                proxima = espera if proxima is None else min(proxima, espera)
+        return proxima
+
+    def _enviar(self, job: dict) -> Optional[float]:
+        try:
+            with span("email.enviar", tentativa=int(job.get("tentativas", 0)) + 1):
+                smtp = self._ligacao()
+                self._servico.enviar_com_conexao(smtp, job["filepath"], job["subject"], job["body"],
+                                              html=job.get("html"))
+        except FileNotFoundError as e:
+            # sem ficheiro não adianta repetir
+            return self._falhar(job, str(e), definitivo=True)
+        except Exception as e:
+            self._fechar_ligacao()
+            return self._falhar(job, str(e))
+
+        self._ultimo_uso = self._relogio()
+        self.enviados += 1
+        contar("email.enviados")
+        with self._lock:
+            atual = self._ler_job(job["id"])
+            # se o mesmo pedido foi atualizado durante o envio, fica para reenviar
+            if atual is not None and atual.get("subject") == job["subject"] and atual.get("body") == job["body"]:
+                self._caminho(job["id"]).unlink()
+        self._notificar(job["id"], ENVIADO, "📧 Exportado e enviado com sucesso.")
+        return None
+
+    def _ler_job(self, job_id: str) -> Optional[dict]:
+        try:
+            return json.loads(self._caminho(job_id).read_text(encoding="utf-8"))
+        except (ValueError, OSError):
+            return None
+
+    def _falhar(self, job: dict, erro: str, definitivo: bool = False) -> Optional[float]:
+        with self._lock:
+            # relê: o pedido pode ter sido atualizado (deduplicação) durante o envio
+            atual = self._ler_job(job["id"]) or job
+            atual["tentativas"] = int(atual.get("tentativas", 0)) + 1
+            atual["erro"] = erro
+            if definitivo or atual["tentativas"] >= self.max_tentativas:
+                atual["estado"] = FALHOU
+                atual["falhou_em"] = self._relogio()
+                espera = None
+                contar("email.falhados")
+            else:
+                contar("email.novas_tentativas")
+                espera = min(self.backoff_max, self.backoff_base * (2 ** (atual["tentativas"] - 1)))
+                atual["proxima"] = self._relogio() + espera
+            self._gravar(atual)
+            if espera is None:
+                self._podar_falhados(self._ler_todos())
+        if espera is None:
+            self._notificar(job["id"], FALHOU, f"❌ Falha ao enviar: {erro}")
+        else:
+            self._notificar(job["id"], PENDENTE, f"⚠️ Envio falhou, nova tentativa em {int(espera)} s.")
+        return espera
+
+    def _loop(self):
+        while not self._parar.is_set():
+            try:
+                espera = self.processar()
+            except Exception as e:
+                print("[outbox] erro:", e)
+                espera = self.backoff_base
+            # fecha a ligação se estiver parada há muito tempo
+            if self._smtp is not None and self._relogio() - self._ultimo_uso > self.inatividade_max:
+                self._fechar_ligacao()
+            timeout = self.inatividade_max if espera is None else min(espera, self.inatividade_max)
+            self._acordar.wait(timeout)
+            self._acordar.clear()
@@ -2,12 +2,29 @@
 # Serviço de envio de e-mail para anexar o Excel completo.
 # Implementação simples com SMTP Gmail (SSL). Pensado para ser reutilizado.
 
+import base64
 import os
 import smtplib
+from email import policy
+from email.generator import BytesGenerator
 from email.message import EmailMessage
+from io import BytesIO
 from pathlib import Path
 from typing import List, Optional
 
+# Tipos MIME dos anexos suportados
+MIME_ANEXOS = {
+    ".xlsx": ("application", "vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    ".zip": ("application", "zip"),
+}
+
+# Conteúdo provisório do anexo: no envio em stream é trocado pelo ficheiro real.
+# 18 bytes (múltiplo de 3) -> base64 sem padding, fácil de localizar na mensagem.
+_MARCADOR_ANEXO = b"@@NATABASE-ANEXO@@"
+
+# Lido do disco em blocos múltiplos de 57 bytes (= linhas base64 de 76 caracteres)
+_BLOCO_ANEXO = 57 * 1024
+
 
 class EmailService:
     """
@@ -21,6 +38,8 @@ class EmailService:
         # Remetente Gmail (de preferência uma conta técnica)
         "SMTP_HOST": "smtp.gmail.com",
         "SMTP_PORT_SSL": 465,
+        # SSL direto (Gmail). Desligar só para servidores locais de teste (ex.: aiosmtpd)
+        "SMTP_SSL": os.getenv("SMTP_SSL", "1") != "0",
         "SENDER_EMAIL": os.getenv("GMAIL_USER", "relatorioloja012@gmail.com"),
         # Senha de APP do Gmail (NÃO a senha normal). Pode vir por env: GMAIL_APP_PASSWORD
         "SENDER_APP_PASSWORD": os.getenv("GMAIL_APP_PASSWORD", "cwvt qgcg etrd ydzw"),
@@ -37,10 +56,14 @@ class EmailService:
         to_addresses: Optional[List[str]] = None,
         smtp_host: Optional[str] = None,
         smtp_port_ssl: Optional[int] = None,
+        usar_ssl: Optional[bool] = None,
+        timeout: float = 30.0,
     ):
         cfg = self.DEFAULTS
         self.smtp_host = smtp_host or cfg["SMTP_HOST"]
         self.smtp_port_ssl = smtp_port_ssl or cfg["SMTP_PORT_SSL"]
+        self.usar_ssl = cfg["SMTP_SSL"] if usar_ssl is None else usar_ssl
+        self.timeout = timeout
         self.sender_email = sender_email or cfg["SENDER_EMAIL"]
         self.sender_app_password = sender_app_password or cfg["SENDER_APP_PASSWORD"]
         self.to_addresses = to_addresses or cfg["TO_ADDRESSES"]
@@ -51,7 +74,12 @@ class EmailService:
         if not self.to_addresses:
             raise ValueError("Nenhum destinatário configurado.")
 
-    def _build_message(self, subject: str, body: str, filepath: str) -> EmailMessage:
+    def _build_message(self, subject: str, body: str, filepath: str, html: Optional[str] = None,
+                       anexo: Optional[bytes] = None) -> EmailMessage:
+        """
+        Monta a mensagem (texto + HTML opcional + anexo).
+        Com `anexo` dado, esse conteúdo substitui o do ficheiro (usado pelo envio em stream).
+        """
         p = Path(filepath)
         if not p.exists() or not p.is_file():
             raise FileNotFoundError(f"Arquivo para envio não encontrado: {filepath}")
@@ -61,25 +89,109 @@ class EmailService:
         msg["From"] = self.sender_email
         msg["To"] = ", ".join(self.to_addresses)
         msg.set_content(body)
+        if html:
+            msg.add_alternative(html, subtype="html")
 
-        # Anexo: Excel
-        with p.open("rb") as f:
-            data = f.read()
-        # MIME para .xlsx
+        # Anexo: Excel (ou .zip)
+        if anexo is None:
+            with p.open("rb") as f:
+                anexo = f.read()
+        maintype, subtype = MIME_ANEXOS.get(p.suffix.lower(), ("application", "octet-stream"))
         msg.add_attachment(
-            data,
-            maintype="application",
-            subtype="vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            anexo,
+            maintype=maintype,
+            subtype=subtype,
             filename=p.name,
         )
         return msg
 
-    def send_excel(self, filepath: str, subject: str, body: str):
+    def _enviar_em_stream(self, smtp: smtplib.SMTP, msg: EmailMessage, filepath: str):
         """
-        Envia o Excel como anexo.
+        Envia `msg` pelo comando DATA lendo o anexo do disco bloco a bloco,
+        em vez de ter o ficheiro inteiro (e a sua versão base64) em memória.
         """
-        msg = self._build_message(subject=subject, body=body, filepath=filepath)
+        buf = BytesIO()
+        BytesGenerator(buf, policy=policy.SMTP).flatten(msg)
+        marcador = base64.b64encode(_MARCADOR_ANEXO)
+        cabeca, cauda = buf.getvalue().split(marcador, 1)
+
+        def dot_stuff(dados: bytes) -> bytes:
+            # linhas começadas por "." têm de ser duplicadas no DATA (RFC 5321)
+            if dados.startswith(b"."):
+                dados = b"." + dados
+            return dados.replace(b"\r\n.", b"\r\n..")
+
+        smtp.ehlo_or_helo_if_needed()
+        code, resp = smtp.mail(self.sender_email)
+        if code != 250:
+            raise smtplib.SMTPSenderRefused(code, resp, self.sender_email)
+        recusados = {}
+        for dest in self.to_addresses:
+            code, resp = smtp.rcpt(dest)
+            if code not in (250, 251):
+                recusados[dest] = (code, resp)
+        if len(recusados) == len(self.to_addresses):
+            smtp.rset()
+            raise smtplib.SMTPRecipientsRefused(recusados)
+
+        code, resp = smtp.docmd("DATA")
+        if code != 354:
+            raise smtplib.SMTPDataError(code, resp)
 
-        with smtplib.SMTP_SSL(self.smtp_host, self.smtp_port_ssl) as smtp:
-            smtp.login(self.sender_email, self.sender_app_password)
-            smtp.send_message(msg)
+        smtp.send(dot_stuff(cabeca))
+        primeiro = True
+        with open(filepath, "rb") as f:
+            while True:
+                bloco = f.read(_BLOCO_ANEXO)
+                if not bloco:
+                    break
+                linhas = base64.encodebytes(bloco).rstrip(b"\n").replace(b"\n", b"\r\n")
+                # o marcador já tinha a quebra de linha seguinte na cauda
+                smtp.send(linhas if primeiro else b"\r\n" + linhas)
+                primeiro = False
+        if not cauda.endswith(b"\r\n"):
+            cauda += b"\r\n"
+        smtp.send(dot_stuff(cauda) + b".\r\n")
+        code, resp = smtp.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, resp)
+        return recusados
+
+    def abrir_conexao(self) -> smtplib.SMTP:
+        """
+        Abre uma ligação SMTP autenticada, que pode ser reutilizada para vários envios
+        (ver EmailOutbox). Quem abre é responsável por fechar (`quit()`).
+        """
+        if self.usar_ssl:
+            smtp = smtplib.SMTP_SSL(self.smtp_host, self.smtp_port_ssl, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.smtp_host, self.smtp_port_ssl, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            # servidores locais de teste podem não anunciar AUTH
+            if self.usar_ssl or smtp.has_extn("auth"):
+                smtp.login(self.sender_email, self.sender_app_password)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    def enviar_com_conexao(self, smtp: smtplib.SMTP, filepath: str, subject: str, body: str,
+                           html: Optional[str] = None):
+        """Envia o Excel (ou .zip) como anexo usando uma ligação já aberta; anexo lido em stream."""
+        msg = self._build_message(subject=subject, body=body, filepath=filepath, html=html,
+                                  anexo=_MARCADOR_ANEXO)
+        self._enviar_em_stream(smtp, msg, filepath)
+
+    def send_excel(self, filepath: str, subject: str, body: str, html: Optional[str] = None):
+        """
+        Envia o Excel como anexo.
+        """
+        smtp = self.abrir_conexao()
+        try:
+            self.enviar_com_conexao(smtp, filepath, subject, body, html=html)
+        finally:
+            try:
+                smtp.quit()
+            except smtplib.SMTPException:
+                smtp.close()
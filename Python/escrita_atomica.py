@@ -0,0 +1,60 @@
+# escrita_atomica.py
+# Escrita atómica partilhada por todos os ficheiros de estado da app (índice do
+# arranque, contadores, caixa de saída, marca do fecho, histórico, fila do Sheets,
+# manifesto de integridade, partições do Excel...): escreve num temporário na mesma
+# pasta, faz fsync e só depois troca com os.replace. Sem o fsync, uma falha de energia
+# logo a seguir ao rename pode deixar o ficheiro novo vazio em vez do antigo.
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Callable
+
+
+def _fsync_pasta(pasta: Path):
+    """Torna o rename durável (POSIX); no Windows não se abre uma pasta para fsync."""
+    if os.name != "posix":
+        return
+    try:
+        fd = os.open(pasta, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def gravar_atomico(caminho, escrever: Callable[[IO], object], binario: bool = False,
+                   encoding: str = "utf-8", sufixo: str = ""):
+    """
+    `escrever(fh)` escreve o conteúdo num temporário; `caminho` só passa a ter o
+    conteúdo novo depois do fsync. Se `escrever` falhar, o temporário é apagado e o
+    ficheiro antigo fica como estava.
+    """
+    caminho = Path(caminho)
+    if binario:
+        tf = tempfile.NamedTemporaryFile("wb", delete=False, dir=caminho.parent, suffix=sufixo)
+    else:
+        tf = tempfile.NamedTemporaryFile("w", delete=False, encoding=encoding, dir=caminho.parent, suffix=sufixo)
+    try:
+        with tf:
+            escrever(tf)
+            tf.flush()
+            os.fsync(tf.fileno())
+        os.replace(tf.name, caminho)
+    except BaseException:
+        try:
+            os.unlink(tf.name)
+        except OSError:
+            pass
+        raise
+    _fsync_pasta(caminho.parent)
+
+
+def gravar_json(caminho, dados, sufixo: str = "", **opcoes):
+    """`json.dump(dados, fh, **opcoes)` com gravar_atomico."""
+    gravar_atomico(caminho, lambda fh: json.dump(dados, fh, **opcoes), sufixo=sufixo)
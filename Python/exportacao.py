@@ -0,0 +1,115 @@
+# exportacao.py
+# Preparação do relatório a enviar por e-mail:
+# - só as abas do período escolhido (hoje / semana / mês / tudo);
+# - compressão zip opcional;
+# - resumo em texto e HTML gerado direto dos totais em memória (ProductStore).
+
+import zipfile
+from datetime import date, timedelta
+from html import escape
+from pathlib import Path
+from typing import Optional, Tuple
+
+PERIODOS = {
+    "hoje": "Hoje",
+    "semana": "Esta semana",
+    "mes": "Este mês",
+    "tudo": "Tudo (todas as abas)",
+}
+
+
+def intervalo_periodo(periodo: str, hoje: Optional[date] = None) -> Tuple[Optional[date], Optional[date]]:
+    """(início, fim) inclusivos do período; (None, None) = todas as abas."""
+    hoje = hoje or date.today()
+    if periodo == "hoje":
+        return hoje, hoje
+    if periodo == "semana":
+        return hoje - timedelta(days=hoje.weekday()), hoje
+    if periodo == "mes":
+        return hoje.replace(day=1), hoje
+    if periodo == "tudo":
+        return None, None
+    raise ValueError(f"Período desconhecido: {periodo}")
+
+
+def preparar_anexo(
+    nome_arquivo,
+    periodo: str = "hoje",
+    comprimir: bool = False,
+    hoje: Optional[date] = None,
+    pasta_saida: Optional[Path] = None,
+) -> str:
+    """
+    Monta o Excel só com as abas do período e, opcionalmente, comprime-o em .zip.
+    "tudo" reaproveita o Excel completo da loja. Devolve o caminho do anexo.
+    """
+    # openpyxl só quando se exporta (não no arranque da app)
+    from salvarexecel import montar_workbook_completo
+
+    hoje = hoje or date.today()
+    inicio, fim = intervalo_periodo(periodo, hoje)
+    base = Path(nome_arquivo)
+    pasta_saida = Path(pasta_saida or base.parent / "exportacoes")
+    pasta_saida.mkdir(parents=True, exist_ok=True)
+
+    if periodo == "tudo":
+        caminho = Path(montar_workbook_completo(str(base)))
+    else:
+        destino = pasta_saida / f"{base.stem}_{periodo}_{hoje.strftime('%d-%m-%Y')}.xlsx"
+        caminho = Path(montar_workbook_completo(str(base), inicio=inicio, fim=fim, destino=destino))
+
+    if not comprimir:
+        return str(caminho)
+
+    destino_zip = pasta_saida / (caminho.stem + ".zip")
+    with zipfile.ZipFile(destino_zip, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+        zf.write(caminho, arcname=caminho.name)
+    return str(destino_zip)
+
+
+def preparar_anexo_dias(nome_arquivo, inicio: date, fim: date, pasta_saida: Optional[Path] = None) -> str:
+    """Excel com as abas de `inicio` a `fim` (fecho do dia, ou de vários dias em atraso)."""
+    from salvarexecel import montar_workbook_completo
+
+    base = Path(nome_arquivo)
+    pasta_saida = Path(pasta_saida or base.parent / "exportacoes")
+    pasta_saida.mkdir(parents=True, exist_ok=True)
+    dias = inicio.strftime("%d-%m-%Y") if inicio == fim else f"{inicio.strftime('%d-%m-%Y')}_a_{fim.strftime('%d-%m-%Y')}"
+    destino = pasta_saida / f"{base.stem}_fecho_{dias}.xlsx"
+    return montar_workbook_completo(str(base), inicio=inicio, fim=fim, destino=destino)
+
+
+# ---------------------- Resumo no corpo do e-mail ----------------------
+def resumo_texto(store, dia: Optional[date] = None) -> str:
+    """Totais por tipo e total geral (texto simples), a partir dos índices do ProductStore."""
+    dia = dia or date.today()
+    linhas = [f"Resumo da produção — {dia.strftime('%d/%m/%Y')}", ""]
+    for tipo in sorted(store.tipos(), key=str.lower):
+        linhas.append(f"{tipo}: {store.total_tipo(tipo)}")
+    linhas += ["", f"TOTAL GERAL: {store.total_geral()}"]
+    return "\n".join(linhas)
+
+
+def resumo_html(store, dia: Optional[date] = None, top_por_tipo: int = 5) -> str:
+    """Tabela HTML leve: total por tipo e os produtos mais produzidos de cada tipo."""
+    dia = dia or date.today()
+    partes = [
+        f"<h3>Resumo da produção — {dia.strftime('%d/%m/%Y')}</h3>",
+        '<table cellpadding="4" cellspacing="0" border="1" style="border-collapse:collapse">',
+        '<tr style="background:#4F81BD;color:#fff"><th align="left">Tipo / Produto</th><th align="right">Quantidade</th></tr>',
+    ]
+    for tipo in sorted(store.tipos(), key=str.lower):
+        partes.append(
+            f'<tr style="background:#F2F2F2"><td><b>{escape(tipo)}</b></td>'
+            f'<td align="right"><b>{store.total_tipo(tipo)}</b></td></tr>'
+        )
+        top = sorted(store.produtos_do_tipo(tipo), key=lambda x: x[1], reverse=True)[:top_por_tipo]
+        for nome, qtd in top:
+            if qtd:
+                partes.append(f'<tr><td>&nbsp;&nbsp;{escape(nome)}</td><td align="right">{qtd}</td></tr>')
+    partes.append(
+        f'<tr style="background:#000;color:#fff"><td><b>TOTAL GERAL</b></td>'
+        f'<td align="right"><b>{store.total_geral()}</b></td></tr>'
+    )
+    partes.append("</table>")
+    return "\n".join(partes)
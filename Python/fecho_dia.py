@@ -0,0 +1,163 @@
+# fecho_dia.py
+# Fecho automático do dia: a uma hora configurável (NATABASE_FECHO="HH:MM", "off"
+# desliga), numa thread própria, corre o fecho (no núcleo: grava o pendente, gera as
+# partições em falta e põe o Excel na caixa de saída de e-mails).
+# A marca do último dia fechado fica em disco (fecho_dia.json): os dias que ficaram
+# por fechar (tablet desligado, app fechada à hora do fecho) saem todos juntos no
+# fecho seguinte, num só e-mail. Sem rede, o e-mail espera na caixa de saída.
+# O relógio é injetável (`relogio() -> datetime`) e `pendentes(agora)` / `executar(agora)`
+# não dependem da thread: dá para verificar o calendário sem esperar pela hora
+# (benchmarks/verificar_fecho.py).
+
+import json
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from threading import Event, Thread
+from typing import Callable, List, Optional
+
+from escrita_atomica import gravar_json
+from metricas import contar, span
+
+
+def hora_fecho(texto: Optional[str]) -> Optional[time]:
+    """"22:00" -> time(22, 0); vazio/"off"/"0" (ou inválido) -> None (fecho desligado)."""
+    texto = (texto or "").strip().lower()
+    if texto in ("", "0", "off", "nao", "não", "false"):
+        return None
+    try:
+        return datetime.strptime(texto, "%H:%M").time()
+    except ValueError:
+        print("[fecho] hora inválida (esperado HH:MM):", texto)
+        return None
+
+
+class AgendadorFecho:
+    """
+    - `fechar(dias)` é chamado com os dias por fechar (ordenados, sem repetições);
+      só depois de terminar sem erro é que a marca avança.
+    - O dia D fica por fechar a partir de D às `hora`. Na primeira execução (sem marca)
+      não se fecham dias antigos: a marca começa no último dia que já devia estar fechado.
+    - Em atraso, fecham-se no máximo os últimos `max_dias` dias.
+    - Hora calma: com `ocupado()` verdadeiro (ex.: gravação a decorrer) o fecho espera
+      `adiar` segundos; a thread nunca dorme mais do que `espera_max` (o relógio do
+      tablet pode saltar, ou o tablet suspender).
+    """
+
+    def __init__(
+        self,
+        fechar: Callable[[List[date]], object],
+        caminho_marca: Path,
+        hora: time = time(22, 0),
+        relogio: Callable[[], datetime] = datetime.now,
+        ocupado: Optional[Callable[[], bool]] = None,
+        max_dias: int = 31,
+        adiar: float = 60.0,
+        espera_max: float = 300.0,
+    ):
+        self._fechar = fechar
+        self.caminho = Path(caminho_marca)
+        self.hora = hora
+        self._relogio = relogio
+        self._ocupado = ocupado
+        self.max_dias = max_dias
+        self.adiar = adiar
+        self.espera_max = espera_max
+
+        self.ultimo_fechado: Optional[date] = None
+        self.fechos = 0
+        self.ultimo_erro: Optional[str] = None
+        self._carregar()
+
+        self._parar = Event()
+        self._thread: Optional[Thread] = None
+
+    # ---------------- marca em disco ----------------
+    def _carregar(self):
+        try:
+            dados = json.loads(self.caminho.read_text(encoding="utf-8"))
+            self.ultimo_fechado = date.fromisoformat(dados["ultimo_dia"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print("[fecho] marca ilegível:", e)
+
+    def _gravar_marca(self, agora: datetime):
+        dados = {"ultimo_dia": self.ultimo_fechado.isoformat(), "fechado_em": agora.isoformat(timespec="seconds")}
+        gravar_json(self.caminho, dados)
+
+    # ---------------- calendário ----------------
+    def ultimo_devido(self, agora: datetime) -> date:
+        """Último dia cuja hora de fecho já passou."""
+        hoje = agora.date()
+        return hoje if agora.time() >= self.hora else hoje - timedelta(days=1)
+
+    def pendentes(self, agora: Optional[datetime] = None) -> List[date]:
+        agora = agora or self._relogio()
+        devido = self.ultimo_devido(agora)
+        if self.ultimo_fechado is None:
+            # primeira execução: começa a contar daqui
+            self.ultimo_fechado = devido
+            self._gravar_marca(agora)
+            return []
+        primeiro = max(self.ultimo_fechado + timedelta(days=1), devido - timedelta(days=self.max_dias - 1))
+        return [primeiro + timedelta(days=k) for k in range((devido - primeiro).days + 1)]
+
+    def proximo(self, agora: Optional[datetime] = None) -> datetime:
+        """Quando há (ou haverá) dias por fechar."""
+        agora = agora or self._relogio()
+        if self.pendentes(agora):
+            return agora
+        return datetime.combine(self.ultimo_devido(agora) + timedelta(days=1), self.hora)
+
+    # ---------------- fecho ----------------
+    def executar(self, agora: Optional[datetime] = None) -> List[date]:
+        """Fecha já os dias pendentes (um só `fechar`); devolve-os. Os erros sobem."""
+        agora = agora or self._relogio()
+        dias = self.pendentes(agora)
+        if not dias:
+            return []
+        with span("fecho.dias", dias=len(dias)):
+            self._fechar(dias)
+        self.ultimo_fechado = dias[-1]
+        self._gravar_marca(agora)
+        self.fechos += 1
+        contar("fecho.dias", len(dias))
+        return dias
+
+    def _passo(self) -> float:
+        """Uma volta do worker; devolve quantos segundos esperar até à próxima."""
+        agora = self._relogio()
+        if self.pendentes(agora):
+            if self._ocupado is not None and self._ocupado():
+                return self.adiar
+            try:
+                dias = self.executar(agora)
+                self.ultimo_erro = None
+                print(f"[fecho] {len(dias)} dia(s) fechado(s):", dias[0] if len(dias) == 1 else f"{dias[0]} a {dias[-1]}")
+            except Exception as e:
+                # a marca não avança: os mesmos dias voltam a ser tentados
+                self.ultimo_erro = repr(e)
+                contar("erros.fecho")
+                print("[fecho] falhou:", e)
+                return self.adiar
+            agora = self._relogio()
+        espera = (self.proximo(agora) - agora).total_seconds()
+        return min(max(espera, 1.0), self.espera_max)
+
+    # ---------------- worker ----------------
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = Thread(target=self._loop, name="fecho-dia", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._parar.is_set():
+            self._parar.wait(self._passo())
+
+    def parar(self, timeout: Optional[float] = None):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
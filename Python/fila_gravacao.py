@@ -0,0 +1,215 @@
+# fila_gravacao.py
+# Worker único de persistência: junta rajadas de ajustes numa só gravação.
+# Evita várias threads a abrir/gravar o mesmo Excel ao mesmo tempo.
+
+import queue
+import time
+from threading import Event, Lock, Thread
+from typing import Callable, Optional
+
+from metricas import contar, span
+
+
+class _Pedido:
+    """Pedido colocado na fila (gravação normal ou flush com espera)."""
+    __slots__ = ("flush", "forcar", "evento", "erro")
+
+    def __init__(self, flush: bool = False, forcar: bool = False):
+        self.flush = flush
+        self.forcar = forcar
+        self.evento = Event() if flush else None
+        self.erro = None
+
+
+_PARAR = object()
+
+
+class FilaGravacao:
+    """
+    Fila de gravação com um único escritor.
+    - `agendar()` marca que há alterações; nunca bloqueia a thread da UI.
+    - Pedidos seguidos são agrupados: grava quando a fila fica `debounce` segundos
+      sem novos pedidos, mas nunca espera mais do que `latencia_max` segundos.
+    - `flush()` força a gravação pendente e espera que termine (ex.: antes do e-mail).
+    - Uma gravação que falha volta a ser tentada sozinha, com espera crescente
+      (`nova_tentativa`, o dobro a cada falha, no máximo `nova_tentativa_max` segundos).
+    """
+
+    def __init__(
+        self,
+        gravar: Callable[[], None],
+        debounce: float = 0.8,
+        latencia_max: float = 5.0,
+        tamanho_max: int = 256,
+        ao_gravar: Optional[Callable[[], None]] = None,
+        ao_erro: Optional[Callable[[Exception], None]] = None,
+        nova_tentativa: float = 1.0,
+        nova_tentativa_max: float = 60.0,
+    ):
+        if debounce < 0 or latencia_max < debounce:
+            raise ValueError("Requer 0 <= debounce <= latencia_max.")
+        self._gravar = gravar
+        self.debounce = debounce
+        self.latencia_max = latencia_max
+        self._ao_gravar = ao_gravar
+        self._ao_erro = ao_erro
+        self.nova_tentativa = nova_tentativa
+        self.nova_tentativa_max = max(nova_tentativa, nova_tentativa_max)
+
+        self._fila = queue.Queue(maxsize=max(1, tamanho_max))
+        self._lock = Lock()
+        self._sujo = False            # há alterações ainda não gravadas?
+        self._parada = False
+        self._em_curso = False        # pedidos a juntar (debounce) ou gravação a decorrer
+        self._falhas = 0              # falhas seguidas (espera da próxima tentativa)
+
+        # estatísticas simples (úteis para diagnóstico)
+        self.pedidos = 0
+        self.gravacoes = 0
+        self.novas_tentativas = 0
+
+        self._thread = Thread(target=self._loop, name="fila-gravacao", daemon=True)
+        self._thread.start()
+
+    # ---------------- API pública ----------------
+    def agendar(self):
+        """Regista que há alterações por gravar (chamado a cada ajuste)."""
+        if self._parada:
+            return
+        with self._lock:
+            self.pedidos += 1
+            self._sujo = True
+        contar("gravacao.pedidos")
+        try:
+            self._fila.put_nowait(_Pedido())
+        except queue.Full:
+            # a fila já tem pedidos pendentes; esses vão gravar o estado mais recente
+            pass
+
+    def flush(self, forcar: bool = False, timeout: Optional[float] = None) -> bool:
+        """
+        Grava já o que estiver pendente e espera pelo fim da gravação.
+        Com `forcar=True` grava mesmo sem alterações pendentes.
+        Devolve False se o tempo de espera esgotar; relança o erro da gravação.
+        """
+        if self._parada:
+            if forcar or self._sujo:
+                erro = self._executar_gravacao()
+                if erro is not None:
+                    raise erro
+            return True
+        pedido = _Pedido(flush=True, forcar=forcar)
+        try:
+            self._fila.put(pedido, timeout=timeout)
+        except queue.Full:
+            return False
+        if not pedido.evento.wait(timeout):
+            return False
+        if pedido.erro is not None:
+            raise pedido.erro
+        return True
+
+    def parar(self, timeout: Optional[float] = None):
+        """Grava o que faltar e termina o worker."""
+        if self._parada:
+            return
+        self._fila.put(_PARAR)
+        self._thread.join(timeout)
+        self._parada = True
+
+    @property
+    def pendente(self) -> bool:
+        return self._sujo
+
+    @property
+    def ocupada(self) -> bool:
+        """Gravação a decorrer ou pedidos à espera do fim do debounce (não conta a espera
+        entre tentativas depois de uma falha)."""
+        return self._em_curso
+
+    def _espera_nova_tentativa(self) -> Optional[float]:
+        if not self._falhas:
+            return None
+        return min(self.nova_tentativa * 2 ** (self._falhas - 1), self.nova_tentativa_max)
+
+    # ---------------- worker ----------------
+    def _loop(self):
+        while True:
+            try:
+                pedido = self._fila.get(timeout=self._espera_nova_tentativa())
+            except queue.Empty:
+                if not self._sujo:
+                    self._falhas = 0
+                    continue
+                # a última gravação falhou e ninguém pediu outra: tenta de novo
+                self.novas_tentativas += 1
+                contar("gravacao.novas_tentativas")
+                pedido = _Pedido()
+            if pedido is _PARAR:
+                if self._sujo:
+                    self._executar_gravacao()
+                return
+
+            self._em_curso = True
+            flushes = []
+            parar = False
+            inicio = time.monotonic()
+
+            # junta os pedidos que chegarem dentro da janela de debounce
+            while True:
+                if pedido.flush:
+                    flushes.append(pedido)
+                    break
+                restante = min(self.debounce, inicio + self.latencia_max - time.monotonic())
+                if restante <= 0:
+                    break
+                try:
+                    pedido = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if pedido is _PARAR:
+                    parar = True
+                    break
+
+            # flushes que já estejam na fila são servidos pela mesma gravação
+            while True:
+                try:
+                    extra = self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is _PARAR:
+                    parar = True
+                elif extra.flush:
+                    flushes.append(extra)
+
+            erro = None
+            if self._sujo or any(f.forcar for f in flushes):
+                erro = self._executar_gravacao()
+
+            self._em_curso = False
+            self._falhas = self._falhas + 1 if erro is not None else 0
+
+            for f in flushes:
+                f.erro = erro
+                f.evento.set()
+
+            if parar:
+                return
+
+    def _executar_gravacao(self) -> Optional[Exception]:
+        with self._lock:
+            self._sujo = False
+        try:
+            with span("gravacao.executar"):
+                self._gravar()
+        except Exception as e:
+            # volta a marcar como sujo: o worker tenta de novo (ver `_loop`)
+            with self._lock:
+                self._sujo = True
+            if self._ao_erro:
+                self._ao_erro(e)
+            return e
+        self.gravacoes += 1
+        if self._ao_gravar:
+            self._ao_gravar()
+        return None
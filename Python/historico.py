@@ -0,0 +1,256 @@
+# historico.py
+# Histórico de produção em colunas (NumPy) para consultas rápidas sobre todos os dias.
+# Uma linha por (dia, produto): dia (ordinal), produto, tipo e quantidade em arrays
+# paralelos, ordenados por dia. As partições diárias do Excel só são lidas uma vez
+# (controlo por mtime); o dia corrente é atualizado direto da memória a cada gravação.
+
+from datetime import date
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import openpyxl
+
+from escrita_atomica import gravar_atomico
+from salvarexecel import COLUNA_INICIAL, LINHA_INICIAL, listar_particoes
+
+DIAS_SEMANA = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
+
+
+def ler_particao(caminho) -> List[Tuple[str, str, int]]:
+    """[(nome, tipo, quantidade)] de uma aba de dia (ignora totais e cabeçalho)."""
+    wb = openpyxl.load_workbook(caminho, read_only=True)
+    try:
+        ws = wb.worksheets[0]
+        linhas = []
+        for nome, tipo, qtd in ws.iter_rows(
+            min_row=LINHA_INICIAL + 1,
+            min_col=COLUNA_INICIAL,
+            max_col=COLUNA_INICIAL + 2,
+            values_only=True,
+        ):
+            # linhas de total têm o tipo vazio
+            if not nome or not tipo:
+                continue
+            try:
+                linhas.append((str(nome), str(tipo), int(qtd or 0)))
+            except (ValueError, TypeError):
+                continue
+        return linhas
+    finally:
+        wb.close()
+
+
+class HistoricoProducao:
+    """
+    - `ingerir_particoes(xlsx)`: lê só as partições novas/alteradas desde a última vez.
+    - `registar_dia(data, store)`: substitui as linhas de um dia a partir do ProductStore.
+    - Consultas (limites de data inclusivos, None = sem limite): `total_por_tipo`,
+      `total_por_produto`, `top`, `total_por_mes`, `media_por_dia_semana`, `serie`.
+    - `gravar()` guarda tudo num único .npz (escrita atómica).
+    """
+
+    def __init__(self, caminho: Path):
+        self.caminho = Path(caminho)
+        self._lock = Lock()
+
+        self._dia = np.empty(0, dtype=np.int32)
+        self._prod = np.empty(0, dtype=np.int32)
+        self._tipo = np.empty(0, dtype=np.int32)
+        self._qtd = np.empty(0, dtype=np.int64)
+
+        # dicionários nome <-> código
+        self._produtos: List[str] = []
+        self._tipos: List[str] = []
+        self._cod_produto: Dict[str, int] = {}
+        self._cod_tipo: Dict[str, int] = {}
+
+        # ordinal do dia -> mtime da partição já lida
+        self._mtimes: Dict[int, float] = {}
+        self._alterado = False
+
+        if self.caminho.exists():
+            try:
+                self._carregar()
+            except (ValueError, OSError, KeyError) as e:
+                print("[historico] ficheiro ilegível, será reconstruído:", e)
+
+    # ---------------- persistência ----------------
+    def _carregar(self):
+        with np.load(self.caminho, allow_pickle=False) as z:
+            self._dia = z["dia"].astype(np.int32)
+            self._prod = z["prod"].astype(np.int32)
+            self._tipo = z["tipo"].astype(np.int32)
+            self._qtd = z["qtd"].astype(np.int64)
+            self._produtos = [str(s) for s in z["produtos"]]
+            self._tipos = [str(s) for s in z["tipos"]]
+            self._mtimes = dict(zip(z["mtime_dia"].tolist(), z["mtime"].tolist()))
+        self._cod_produto = {n: i for i, n in enumerate(self._produtos)}
+        self._cod_tipo = {n: i for i, n in enumerate(self._tipos)}
+
+    def gravar(self):
+        """Grava o .npz se houve alterações desde a última gravação."""
+        with self._lock:
+            if not self._alterado:
+                return
+            dados = {
+                "dia": self._dia,
+                "prod": self._prod,
+                "tipo": self._tipo,
+                "qtd": self._qtd,
+                "produtos": np.array(self._produtos, dtype=str),
+                "tipos": np.array(self._tipos, dtype=str),
+                "mtime_dia": np.array(list(self._mtimes.keys()), dtype=np.int32),
+                "mtime": np.array(list(self._mtimes.values()), dtype=np.float64),
+            }
+            self._alterado = False
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        gravar_atomico(self.caminho, lambda fh: np.savez(fh, **dados), binario=True, sufixo=".npz")
+
+    # ---------------- escrita ----------------
+    def _codigo(self, nome: str, tabela: List[str], codigos: Dict[str, int]) -> int:
+        c = codigos.get(nome)
+        if c is None:
+            c = codigos[nome] = len(tabela)
+            tabela.append(nome)
+        return c
+
+    def _substituir_dia(self, ordinal: int, linhas: List[Tuple[str, str, int]]):
+        """Troca todas as linhas de um dia (chamar com o lock)."""
+        n = len(linhas)
+        prod = np.fromiter((self._codigo(nm, self._produtos, self._cod_produto) for nm, _, _ in linhas), np.int32, n)
+        tipo = np.fromiter((self._codigo(tp, self._tipos, self._cod_tipo) for _, tp, _ in linhas), np.int32, n)
+        qtd = np.fromiter((q for _, _, q in linhas), np.int64, n)
+
+        # os dias estão ordenados: o dia ocupa a fatia [a, b) e as novas linhas entram no seu lugar
+        a = int(np.searchsorted(self._dia, ordinal, side="left"))
+        b = int(np.searchsorted(self._dia, ordinal, side="right"))
+        self._dia = np.concatenate([self._dia[:a], np.full(n, ordinal, np.int32), self._dia[b:]])
+        self._prod = np.concatenate([self._prod[:a], prod, self._prod[b:]])
+        self._tipo = np.concatenate([self._tipo[:a], tipo, self._tipo[b:]])
+        self._qtd = np.concatenate([self._qtd[:a], qtd, self._qtd[b:]])
+        self._alterado = True
+
+    def ingerir_particoes(self, nome_arquivo) -> int:
+        """Lê as partições diárias novas ou alteradas. Devolve quantas foram lidas."""
+        lidas = 0
+        for d, caminho in listar_particoes(nome_arquivo):
+            try:
+                mtime = caminho.stat().st_mtime
+            except OSError:
+                continue
+            ordinal = d.toordinal()
+            if self._mtimes.get(ordinal) == mtime:
+                continue
+            try:
+                linhas = ler_particao(caminho)
+            except Exception as e:
+                print(f"[historico] falha ao ler {caminho.name}:", e)
+                continue
+            with self._lock:
+                self._substituir_dia(ordinal, linhas)
+                self._mtimes[ordinal] = mtime
+            lidas += 1
+        return lidas
+
+    def registar_dia(self, data: date, store, caminho_particao: Optional[Path] = None):
+        """
+        Atualiza o dia a partir da memória (sem reler o Excel).
+        Com `caminho_particao`, guarda o mtime para a próxima ingestão saltar esse ficheiro.
+        """
+        linhas = [(nome, store.gettipo(nome), store.getquantidade(nome)) for nome in store]
+        ordinal = data.toordinal()
+        with self._lock:
+            self._substituir_dia(ordinal, linhas)
+            if caminho_particao is not None:
+                try:
+                    self._mtimes[ordinal] = Path(caminho_particao).stat().st_mtime
+                except OSError:
+                    self._mtimes.pop(ordinal, None)
+
+    # ---------------- consultas ----------------
+    def _fatia(self, inicio: Optional[date], fim: Optional[date]) -> slice:
+        a = 0 if inicio is None else int(np.searchsorted(self._dia, inicio.toordinal(), side="left"))
+        b = len(self._dia) if fim is None else int(np.searchsorted(self._dia, fim.toordinal(), side="right"))
+        return slice(a, b)
+
+    def _filtrar(self, inicio, fim, tipo=None, produto=None):
+        """(dia, prod, tipo, qtd) da janela de datas, com filtro opcional por tipo/produto."""
+        with self._lock:
+            s = self._fatia(inicio, fim)
+            dia, prod, tp, qtd = self._dia[s], self._prod[s], self._tipo[s], self._qtd[s]
+            cod_tipo = self._cod_tipo.get(tipo, -1) if tipo is not None else None
+            cod_prod = self._cod_produto.get(produto, -1) if produto is not None else None
+        if cod_tipo is not None:
+            m = tp == cod_tipo
+            dia, prod, tp, qtd = dia[m], prod[m], tp[m], qtd[m]
+        if cod_prod is not None:
+            m = prod == cod_prod
+            dia, prod, tp, qtd = dia[m], prod[m], tp[m], qtd[m]
+        return dia, prod, tp, qtd
+
+    def dias(self, inicio: Optional[date] = None, fim: Optional[date] = None) -> List[date]:
+        dia, _, _, _ = self._filtrar(inicio, fim)
+        return [date.fromordinal(int(o)) for o in np.unique(dia)]
+
+    def total_por_tipo(self, inicio: Optional[date] = None, fim: Optional[date] = None) -> Dict[str, int]:
+        _, _, tp, qtd = self._filtrar(inicio, fim)
+        somas = np.bincount(tp, weights=qtd, minlength=len(self._tipos))
+        presentes = np.flatnonzero(np.bincount(tp, minlength=len(self._tipos)))
+        return {self._tipos[i]: int(somas[i]) for i in presentes}
+
+    def total_por_produto(self, inicio: Optional[date] = None, fim: Optional[date] = None,
+                          tipo: Optional[str] = None) -> Dict[str, int]:
+        _, prod, _, qtd = self._filtrar(inicio, fim, tipo=tipo)
+        somas = np.bincount(prod, weights=qtd, minlength=len(self._produtos))
+        presentes = np.flatnonzero(np.bincount(prod, minlength=len(self._produtos)))
+        return {self._produtos[i]: int(somas[i]) for i in presentes}
+
+    def top(self, n: int = 10, inicio: Optional[date] = None, fim: Optional[date] = None,
+            tipo: Optional[str] = None) -> List[Tuple[str, int]]:
+        """Os `n` produtos com mais produção na janela, por ordem decrescente."""
+        _, prod, _, qtd = self._filtrar(inicio, fim, tipo=tipo)
+        if not len(prod):
+            return []
+        somas = np.bincount(prod, weights=qtd)
+        n = min(n, len(somas))
+        idx = np.argpartition(-somas, n - 1)[:n]
+        idx = idx[np.argsort(-somas[idx], kind="stable")]
+        return [(self._produtos[i], int(somas[i])) for i in idx if somas[i] > 0]
+
+    def total_por_mes(self, inicio: Optional[date] = None, fim: Optional[date] = None,
+                      tipo: Optional[str] = None, produto: Optional[str] = None) -> Dict[str, int]:
+        """{"AAAA-MM": total}, por ordem cronológica."""
+        dia, _, _, qtd = self._filtrar(inicio, fim, tipo=tipo, produto=produto)
+        if not len(dia):
+            return {}
+        # converte só os dias distintos (poucas centenas) e agrega por índice
+        unicos, inv = np.unique(dia, return_inverse=True)
+        meses = np.array([date.fromordinal(int(o)).strftime("%Y-%m") for o in unicos], dtype=str)
+        chaves, cod_mes = np.unique(meses, return_inverse=True)
+        somas = np.bincount(cod_mes[inv], weights=qtd, minlength=len(chaves))
+        return {str(k): int(v) for k, v in zip(chaves, somas)}
+
+    def media_por_dia_semana(self, produto: Optional[str] = None, inicio: Optional[date] = None,
+                             fim: Optional[date] = None, tipo: Optional[str] = None) -> Dict[str, float]:
+        """
+        Média diária por dia da semana (Segunda..Domingo) na janela. A média conta
+        todos os dias registados, incluindo aqueles em que o produto ficou a zero.
+        """
+        todos, _, _, _ = self._filtrar(inicio, fim)
+        dias_registados = np.unique(todos)
+        # date.fromordinal(1) é uma segunda-feira
+        n_dias = np.bincount((dias_registados - 1) % 7, minlength=7)
+
+        dia, _, _, qtd = self._filtrar(inicio, fim, tipo=tipo, produto=produto)
+        somas = np.bincount((dia - 1) % 7, weights=qtd, minlength=7)
+        return {
+            DIAS_SEMANA[i]: float(somas[i] / n_dias[i])
+            for i in range(7) if n_dias[i]
+        }
+
+    def serie(self, produto: str, inicio: Optional[date] = None, fim: Optional[date] = None) -> List[Tuple[date, int]]:
+        """[(dia, quantidade)] de um produto, por ordem cronológica."""
+        dia, _, _, qtd = self._filtrar(inicio, fim, produto=produto)
+        return [(date.fromordinal(int(d)), int(q)) for d, q in zip(dia, qtd)]
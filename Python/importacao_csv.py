@@ -0,0 +1,103 @@
+# importacao_csv.py
+# Importação de contagens/entregas a partir de CSV (fornecedores, leitor de códigos).
+# O ficheiro é lido linha a linha e acumulado num LoteAjustes: memória constante
+# mesmo com dezenas de milhares de linhas. O lote é aplicado depois, de uma vez,
+# com ProductStore.aplicar_lote (tudo ou nada).
+
+import csv
+import math
+from typing import Dict, Optional
+
+from product_store import LOTE_AUMENTAR, LOTE_DEFINIR, LOTE_DIMINUIR, LOTE_ZERAR, LoteAjustes
+
+# nomes de coluna aceites no cabeçalho (comparados em minúsculas)
+COLUNAS_NOME = ("nome", "produto", "artigo", "descricao", "descrição")
+COLUNAS_QTD = ("quantidade", "qtd", "qt", "quant", "unidades")
+COLUNAS_OP = ("op", "operacao", "operação", "movimento")
+
+# valores aceites na coluna da operação
+OPERACOES = {
+    "+": LOTE_AUMENTAR, "entrada": LOTE_AUMENTAR,
+    "-": LOTE_DIMINUIR, "saida": LOTE_DIMINUIR, "saída": LOTE_DIMINUIR,
+    "=": LOTE_DEFINIR, "contagem": LOTE_DEFINIR,
+    "0": LOTE_ZERAR, "zerar": LOTE_ZERAR,
+}
+
+
+def nomes_por_chave(nomes) -> Dict[str, str]:
+    """{nome em minúsculas: nome do catálogo}, para aceitar "pastel de nata" == "Pastel de Nata"."""
+    return {n.strip().lower(): n for n in nomes}
+
+
+def _coluna(cab, aceites) -> Optional[int]:
+    for i, c in enumerate(cab):
+        if c in aceites:
+            return i
+    return None
+
+
+def _quantidade(texto: str):
+    texto = (texto or "").strip().replace(",", ".")
+    if not texto:
+        return 0
+    valor = float(texto)
+    # "inf"/"nan" passam no float() mas não são quantidades
+    if not math.isfinite(valor) or valor != int(valor):
+        raise ValueError(texto)
+    return int(valor)
+
+
+def ler_lote_csv(
+    caminho,
+    catalogo: Optional[Dict[str, str]] = None,
+    op_padrao: str = LOTE_AUMENTAR,
+    encoding: str = "utf-8-sig",
+) -> LoteAjustes:
+    """
+    Lê Nome ; Quantidade [; Op] (separador , ; ou TAB detetado) para um LoteAjustes.
+    - Sem coluna de operação usa `op_padrao` (entregas: "+", contagens: "=").
+    - `catalogo` (ver nomes_por_chave) resolve nomes sem diferenciar maiúsculas.
+    Linhas inválidas ficam em `lote.erros` com o n.º da linha; o lote só é aplicável sem erros.
+    """
+    lote = LoteAjustes()
+    with open(caminho, newline="", encoding=encoding) as fh:
+        amostra = fh.read(4096)
+        fh.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.reader(fh, dialeto)
+
+        col_nome, col_qtd, col_op = 0, 1, None
+        primeira = True
+        for linha in leitor:
+            if not linha or not any(c.strip() for c in linha):
+                continue
+            n = leitor.line_num
+            if primeira:
+                # cabeçalho opcional: sem ele, Nome na 1.ª coluna e Quantidade na 2.ª
+                primeira = False
+                cab = [c.strip().lower() for c in linha]
+                i_nome, i_qtd = _coluna(cab, COLUNAS_NOME), _coluna(cab, COLUNAS_QTD)
+                if i_nome is not None and i_qtd is not None:
+                    col_nome, col_qtd, col_op = i_nome, i_qtd, _coluna(cab, COLUNAS_OP)
+                    continue
+
+            nome = linha[col_nome].strip() if col_nome < len(linha) else ""
+            if not nome:
+                lote.rejeitar(n, nome, "linha sem nome de produto")
+                continue
+            if catalogo is not None:
+                nome = catalogo.get(nome.lower(), nome)
+            op = op_padrao
+            if col_op is not None and col_op < len(linha) and linha[col_op].strip():
+                op = OPERACOES.get(linha[col_op].strip().lower(), linha[col_op].strip())
+            texto = linha[col_qtd] if col_qtd < len(linha) else ""
+            try:
+                qtd = _quantidade(texto)
+            except ValueError:
+                lote.rejeitar(n, nome, f"quantidade inválida: {texto!r}")
+                continue
+            lote.adicionar(op, nome, qtd, posicao=n)
+    return lote
@@ -0,0 +1,359 @@
+# integridade.py
+# Evidência de adulteração, incremental, para o Excel (uma partição por dia) e para o
+# catálogo na base de dados (o que era o cache_produtos.json).
+#
+# Manifesto (integridade.json) em forma de árvore de Merkle com HMAC-SHA256 e uma
+# chave local (integridade.chave, ou NATABASE_CHAVE_INTEGRIDADE):
+#   folha de produto   HMAC(nome | tipo | quantidade)              uma por produto do catálogo
+#   dia                raiz = HMAC(folhas das linhas do dia), MAC dos bytes da partição,
+#                      tamanho e mtime do ficheiro
+#   raiz               HMAC(raiz do catálogo, raiz dos dias, estado da base de dados)
+# Gravar um dia só volta a calcular esse dia (linhas + bytes da partição), as folhas dos
+# produtos que mudaram e as raízes. No arranque só se verifica o que mudou desde o último
+# estado verificado: partições com tamanho/mtime diferentes e o catálogo se o ficheiro
+# da base de dados mudou (ex.: a app não fechou bem). `verificar(completo=True)` vê tudo.
+#
+# Dia alterado: a partição é comparada com a produção desse dia na base de dados; se a
+# base ainda bate com a raiz selada, os produtos diferentes são os alterados no Excel.
+# Produto do catálogo diferente do selo: só é alteração se o registo de eventos não o
+# explicar (toques depois da última gravação, ex.: a app fechou a meio do debounce).
+# A chave fica no próprio dispositivo: deteta edições ao Excel/base de dados feitas fora
+# da app, não protege contra quem tiver acesso à chave.
+
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from escrita_atomica import gravar_atomico, gravar_json
+
+_SEP = "\x1f"
+_TAM_FOLHA = 32   # hex: folhas truncadas a 128 bits (as raízes levam os 256)
+
+
+def linhas_do_dia(por_tipo: Dict[str, List[Tuple[str, int]]]) -> List[Tuple[str, str, int]]:
+    """{tipo: [(nome, qtd)]} (BaseDados.producao_por_tipo) -> [(nome, tipo, qtd)]."""
+    return [(nome, tipo, int(qtd)) for tipo, lista in por_tipo.items() for nome, qtd in lista]
+
+
+def linhas_do_catalogo(itens: Dict[str, dict]) -> List[Tuple[str, str, int]]:
+    """{nome: {"tipo", "quantidade"}} (BaseDados.carregar) -> [(nome, tipo, qtd)]."""
+    return [(nome, info["tipo"], int(info["quantidade"])) for nome, info in itens.items()]
+
+
+def estado_bd(caminho: Path) -> Optional[List[int]]:
+    """
+    Estado do ficheiro da base de dados e do WAL (só se tiver alguma coisa: abrir e ler
+    cria um WAL vazio, escrever sem checkpoint deixa-o com páginas).
+    """
+    estado = estado_ficheiro(caminho)
+    wal = estado_ficheiro(Path(f"{caminho}-wal"))
+    if estado is not None and wal is not None and wal[0] > 0:
+        estado = estado + wal
+    return estado
+
+
+def estado_ficheiro(caminho: Path) -> Optional[List[int]]:
+    """[tamanho, mtime_ns] (None se não existir): o que decide se é preciso voltar a verificar."""
+    try:
+        st = os.stat(caminho)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _ler_chave(caminho: Path) -> bytes:
+    env = os.getenv("NATABASE_CHAVE_INTEGRIDADE")
+    if env:
+        try:
+            return binascii.unhexlify(env)
+        except (binascii.Error, ValueError):
+            return env.encode("utf-8")
+    try:
+        return binascii.unhexlify(caminho.read_text(encoding="ascii").strip())
+    except (OSError, binascii.Error, ValueError):
+        pass
+    chave = os.urandom(32)
+    gravar_atomico(caminho, lambda fh: fh.write(binascii.hexlify(chave).decode("ascii")), encoding="ascii")
+    return chave
+
+
+class RelatorioIntegridade:
+    """Resultado de uma verificação; `bool(relatorio)` é True se não há alterações."""
+
+    def __init__(self):
+        self.manifesto_ok = True
+        self.dias_alterados: Dict[str, List[str]] = {}   # dia -> produtos alterados no Excel
+        self.dias_bd_alterados: List[str] = []          # produção do dia alterada na base de dados
+        self.dias_em_falta: List[str] = []
+        self.dias_sem_selo: List[str] = []
+        self.produtos_alterados: List[str] = []
+        self.produtos_em_falta: List[str] = []
+        self.produtos_por_selar: List[str] = []          # explicados por eventos (não é alteração)
+        self.dias_verificados = 0
+        self.dias_ignorados = 0                          # tamanho/mtime iguais ao último estado
+        self.catalogo_verificado = False
+        self.segundos = 0.0
+
+    def __bool__(self):
+        return self.manifesto_ok and not (
+            self.dias_alterados or self.dias_bd_alterados or self.dias_em_falta
+            or self.produtos_alterados or self.produtos_em_falta
+        )
+
+    def linhas(self) -> List[str]:
+        """Descrição legível de cada problema (vazia se estiver tudo bem)."""
+        linhas = []
+        if not self.manifesto_ok:
+            linhas.append("manifesto adulterado ou de outra chave (selado de novo a partir do estado atual)")
+        for dia, nomes in sorted(self.dias_alterados.items()):
+            if nomes:
+                linhas.append(f"dia {dia}: Excel alterado em {len(nomes)} produto(s): {', '.join(nomes[:10])}")
+            else:
+                linhas.append(f"dia {dia}: Excel alterado")
+        for dia in self.dias_bd_alterados:
+            linhas.append(f"dia {dia}: produção alterada na base de dados")
+        for dia in self.dias_em_falta:
+            linhas.append(f"dia {dia}: partição do Excel em falta")
+        if self.produtos_alterados:
+            linhas.append(f"catálogo: {len(self.produtos_alterados)} produto(s) alterado(s): "
+                          f"{', '.join(self.produtos_alterados[:10])}")
+        if self.produtos_em_falta:
+            linhas.append(f"catálogo: {len(self.produtos_em_falta)} produto(s) em falta: "
+                          f"{', '.join(self.produtos_em_falta[:10])}")
+        return linhas
+
+    def resumo(self) -> str:
+        partes = [f"{self.dias_verificados} dia(s) verificados, {self.dias_ignorados} sem alterações no disco"]
+        partes.append("catálogo verificado" if self.catalogo_verificado else "catálogo sem alterações no disco")
+        if self.dias_sem_selo:
+            partes.append(f"{len(self.dias_sem_selo)} dia(s) selados pela 1.ª vez")
+        if self.produtos_por_selar:
+            partes.append(f"{len(self.produtos_por_selar)} produto(s) com toques por selar")
+        return f"{'ok' if self else 'ALTERAÇÕES'}: " + ", ".join(partes) + f" ({self.segundos * 1000:.0f} ms)"
+
+
+class Integridade:
+    """
+    - `selar_gravacao(dia, linhas, particao)`: a cada gravação do Excel (worker único);
+      `selar_catalogo(linhas)`: quando o catálogo inteiro é regravado (ex.: Sheets).
+    - `marcar_bd(caminho)`: depois de fechar a base de dados (estado verificado).
+    - `verificar(bd, xlsx)`: no arranque, fora da thread da UI.
+    """
+
+    def __init__(self, pasta: Path):
+        pasta = Path(pasta)
+        self.caminho = pasta / "integridade.json"
+        self._chave = _ler_chave(pasta / "integridade.chave")
+        self._lock = Lock()
+        self._catalogo: Dict[str, str] = {}       # nome -> folha
+        self._selados: Dict[str, tuple] = {}      # nome -> (tipo, qtd) da folha (evita refazer HMACs)
+        self._dias: Dict[str, dict] = {}
+        self._bd: Optional[List[int]] = None
+        self.selado_em = 0.0
+        self.manifesto_ok = True
+        self.existe = self._carregar()
+
+    # ---------------- MACs ----------------
+    def _mac(self, texto: str) -> str:
+        return hmac.new(self._chave, texto.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def folha_produto(self, nome: str, tipo: str, quantidade: int) -> str:
+        return self._mac(f"p{_SEP}{nome}{_SEP}{tipo}{_SEP}{int(quantidade)}")[:_TAM_FOLHA]
+
+    def raiz_dia(self, dia: str, linhas: Iterable[Tuple[str, str, int]]) -> str:
+        folhas = sorted(self._mac(f"d{_SEP}{dia}{_SEP}{n}{_SEP}{t}{_SEP}{int(q)}")[:_TAM_FOLHA] for n, t, q in linhas)
+        return self._mac(f"dia{_SEP}{dia}{_SEP}" + "".join(folhas))
+
+    def _mac_ficheiro(self, caminho: Path) -> str:
+        return hmac.new(self._chave, Path(caminho).read_bytes(), hashlib.sha256).hexdigest()
+
+    def _raiz(self) -> str:
+        catalogo = self._mac("catalogo" + _SEP + "".join(
+            nome + _SEP + folha for nome, folha in sorted(self._catalogo.items())
+        ))
+        dias = self._mac("dias" + _SEP + "".join(
+            f"{dia}{_SEP}{e['raiz']}{_SEP}{e['ficheiro']}{_SEP}{e['estado']}" for dia, e in sorted(self._dias.items())
+        ))
+        return self._mac(f"raiz{_SEP}{catalogo}{_SEP}{dias}{_SEP}{self._bd}{_SEP}{self.selado_em!r}")
+
+    # ---------------- manifesto ----------------
+    def _carregar(self) -> bool:
+        try:
+            dados = json.loads(self.caminho.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print("[integridade] manifesto ilegível:", e)
+            self.manifesto_ok = False
+            return False
+        self._catalogo = dict(dados.get("catalogo") or {})
+        self._dias = dict(dados.get("dias") or {})
+        self._bd = dados.get("bd")
+        self.selado_em = float(dados.get("selado_em") or 0.0)
+        if not hmac.compare_digest(str(dados.get("raiz", "")), self._raiz()):
+            # editado à mão ou outra chave: não se pode confiar em nada do que lá está
+            self.manifesto_ok = False
+            self._catalogo, self._dias, self._bd, self.selado_em = {}, {}, None, 0.0
+            return False
+        return True
+
+    def _gravar(self):
+        """Escrita atómica (chamar com o lock)."""
+        dados = {
+            "versao": 1,
+            "selado_em": self.selado_em,
+            "bd": self._bd,
+            "dias": self._dias,
+            "catalogo": self._catalogo,
+            "raiz": self._raiz(),
+        }
+        gravar_json(self.caminho, dados, ensure_ascii=False, separators=(",", ":"))
+
+    # ---------------- selar ----------------
+    def _selar_linhas_catalogo(self, linhas, completo: bool):
+        """Refaz só as folhas dos produtos que mudaram; com `completo`, quem saiu perde a folha."""
+        vistos = set()
+        for nome, tipo, qtd in linhas:
+            vistos.add(nome)
+            chave = (tipo, int(qtd))
+            if self._selados.get(nome) != chave or nome not in self._catalogo:
+                self._catalogo[nome] = self.folha_produto(nome, tipo, qtd)
+                self._selados[nome] = chave
+        if completo:
+            for nome in [n for n in self._catalogo if n not in vistos]:
+                del self._catalogo[nome]
+                self._selados.pop(nome, None)
+
+    def _selar_dia(self, dia: str, linhas, particao: Optional[Path]):
+        entrada = {"raiz": self.raiz_dia(dia, linhas), "ficheiro": "", "estado": None}
+        if particao is not None and Path(particao).exists():
+            entrada["ficheiro"] = self._mac_ficheiro(particao)
+            entrada["estado"] = estado_ficheiro(particao)
+        self._dias[dia] = entrada
+
+    def selar_gravacao(self, dia: date, linhas: List[Tuple[str, str, int]], particao: Path, selado_em: float):
+        """
+        Depois de gravar o dia: `linhas` são as da base de dados (= catálogo ativo nesse
+        instante), `selado_em` o instante antes de as fixar (toques depois dele ficam por selar).
+        """
+        with self._lock:
+            self._selar_linhas_catalogo(linhas, completo=True)
+            self._selar_dia(dia.isoformat(), linhas, particao)
+            self.selado_em = selado_em
+            self._gravar()
+
+    def selar_catalogo(self, linhas: Iterable[Tuple[str, str, int]]):
+        """Catálogo inteiro regravado (snapshot): folhas novas, quem saiu deixa de ter folha."""
+        with self._lock:
+            self._selar_linhas_catalogo(linhas, completo=True)
+            self.selado_em = time.time()
+            self._gravar()
+
+    def marcar_bd(self, caminho_bd: Path):
+        """Estado do ficheiro da base de dados depois de a fechar: no próximo arranque, igual = catálogo por ver."""
+        with self._lock:
+            self._bd = estado_bd(caminho_bd)
+            self._gravar()
+
+    # ---------------- verificar ----------------
+    def verificar(self, bd, caminho_xlsx: Path, completo: bool = False) -> RelatorioIntegridade:
+        """
+        Compara o disco com o manifesto e volta a selar o que for legítimo (dias nunca
+        selados, partições regravadas sem alterações, toques por selar). Na primeira vez
+        (sem manifesto) só sela o estado atual.
+        Um dia alterado continua a ser reportado até a partição voltar a bater com o selo
+        (a produção do dia na base de dados serve para a corrigir); o catálogo alterado é
+        reportado uma vez e passa a ser a referência.
+        """
+        from salvarexecel import listar_particoes
+
+        t0 = time.perf_counter()
+        rel = RelatorioIntegridade()
+        rel.manifesto_ok = self.manifesto_ok
+        with self._lock:
+            primeira = not self._dias and not self._catalogo
+
+            # ---- catálogo (base de dados) ----
+            caminho_bd = Path(bd.caminho)
+            if completo or primeira or self._bd is None or estado_bd(caminho_bd) != self._bd:
+                rel.catalogo_verificado = True
+                agora = time.time()
+                linhas = linhas_do_catalogo(bd.carregar()[1])
+                if not primeira:
+                    self._verificar_catalogo(bd, linhas, rel)
+                # o que foi reportado passa a ser a referência (não há outra cópia do catálogo)
+                self._selar_linhas_catalogo(linhas, completo=True)
+                self.selado_em = agora
+
+            # ---- dias (partições do Excel) ----
+            particoes = {d.isoformat(): caminho for d, caminho in listar_particoes(str(caminho_xlsx))}
+            for dia, caminho in particoes.items():
+                entrada = self._dias.get(dia)
+                if entrada is None:
+                    # dia anterior ao manifesto (ou migrado): sela-se a partir da base de dados
+                    linhas_bd = linhas_do_dia(bd.producao_por_tipo(date.fromisoformat(dia)))
+                    if linhas_bd or primeira:
+                        self._selar_dia(dia, linhas_bd or _ler_linhas(caminho), caminho)
+                        if not primeira:
+                            rel.dias_sem_selo.append(dia)
+                    continue
+                if not completo and estado_ficheiro(caminho) == entrada["estado"]:
+                    rel.dias_ignorados += 1
+                    continue
+                rel.dias_verificados += 1
+                self._verificar_dia(bd, dia, caminho, entrada, rel)
+            rel.dias_em_falta = sorted(d for d in self._dias if d not in particoes)
+
+            self._bd = estado_bd(caminho_bd)
+            self.manifesto_ok = True
+            self._gravar()
+        rel.segundos = time.perf_counter() - t0
+        return rel
+
+    def _verificar_catalogo(self, bd, linhas, rel: RelatorioIntegridade):
+        suspeitos = {}
+        vistos = set()
+        for nome, tipo, qtd in linhas:
+            vistos.add(nome)
+            folha = self._catalogo.get(nome)
+            if folha is None or not hmac.compare_digest(folha, self.folha_produto(nome, tipo, qtd)):
+                suspeitos[nome] = qtd
+        rel.produtos_em_falta = sorted(n for n in self._catalogo if n not in vistos)
+        if not suspeitos:
+            return
+        # toques gravados depois do último selo explicam a diferença
+        depois = bd.quantidades_desde(self.selado_em)
+        for nome, qtd in sorted(suspeitos.items()):
+            if depois.get(nome) == qtd:
+                rel.produtos_por_selar.append(nome)
+            else:
+                rel.produtos_alterados.append(nome)
+
+    def _verificar_dia(self, bd, dia: str, caminho: Path, entrada: dict, rel: RelatorioIntegridade):
+        if hmac.compare_digest(self._mac_ficheiro(caminho), entrada["ficheiro"]):
+            entrada["estado"] = estado_ficheiro(caminho)      # só o mtime mudou
+            return
+        linhas_xlsx = _ler_linhas(caminho)
+        if hmac.compare_digest(self.raiz_dia(dia, linhas_xlsx), entrada["raiz"]):
+            # regravado (ex.: aberto e guardado no Excel) com o mesmo conteúdo
+            self._selar_dia(dia, linhas_xlsx, caminho)
+            return
+        linhas_bd = linhas_do_dia(bd.producao_por_tipo(date.fromisoformat(dia)))
+        xlsx = {n: (t, q) for n, t, q in linhas_xlsx}
+        base = {n: (t, q) for n, t, q in linhas_bd}
+        diferentes = sorted(n for n in set(xlsx) | set(base) if xlsx.get(n) != base.get(n))
+        if not hmac.compare_digest(self.raiz_dia(dia, linhas_bd), entrada["raiz"]):
+            rel.dias_bd_alterados.append(dia)
+        rel.dias_alterados[dia] = diferentes
+
+
+def _ler_linhas(caminho: Path) -> List[Tuple[str, str, int]]:
+    from historico import ler_particao
+    return ler_particao(caminho)
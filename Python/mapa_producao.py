@@ -0,0 +1,252 @@
+# mapa_producao.py
+# Leitura do "mapa produção.xlsx" (produção planeada por lotes, perdas e sobras)
+# e reconciliação com o catálogo da app: planeado vs produzido vs perdas,
+# por produto e por secção. O mapa só é relido quando o ficheiro muda (mtime).
+
+import os
+import re
+import unicodedata
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+from salvarexecel import COLUNA_INICIAL, LINHA_INICIAL, TIPO_CORES
+
+# Layout do mapa: secção em A (só na 1.ª linha, células unidas), produto em B,
+# validade em C, Produção 1–5 em pares Qt/Hr (D..M), PERDAS em N, SOBRAS em O.
+MAPA_LINHA_INICIAL = 6
+COL_SECCAO, COL_PRODUTO, COL_VALIDADE = 0, 1, 2
+COLS_LOTES_QT = (3, 5, 7, 9, 11)
+COL_PERDAS, COL_SOBRAS = 13, 14
+
+
+def normalizar_nome(texto: str) -> str:
+    """
+    Chave de junção entre o mapa e o catálogo: sem acentos, maiúsculas, sem pontuação,
+    palavras sem plural simples e por ordem alfabética
+    ("Empanadas" + "Frango" == "EMPANADA FRANGO").
+    """
+    s = unicodedata.normalize("NFKD", str(texto or ""))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).upper()
+    palavras = []
+    for p in re.split(r"[^A-Z0-9]+", s):
+        if not p:
+            continue
+        if len(p) > 3 and p.endswith("S"):
+            p = p[:-1]
+        palavras.append(p)
+    return " ".join(sorted(palavras))
+
+
+def _numero(valor) -> int:
+    try:
+        return int(float(valor or 0))
+    except (ValueError, TypeError):
+        return 0
+
+
+class MapaProducao:
+    """Mapa já lido: colunas em arrays, índice por nome normalizado."""
+
+    def __init__(self, linhas: List[tuple]):
+        self.seccoes: List[str] = []
+        self.produtos: List[str] = []
+        self.validades: List[str] = []
+        lotes, perdas, sobras, cod_seccao = [], [], [], []
+        cod: Dict[str, int] = {}
+
+        seccao = ""
+        for row in linhas:
+            row = tuple(row) + (None,) * (COL_SOBRAS + 1 - len(row))
+            if row[COL_SECCAO]:
+                seccao = str(row[COL_SECCAO]).strip()
+            nome = str(row[COL_PRODUTO] or "").strip()
+            if not nome or not seccao:
+                continue
+            if seccao not in cod:
+                cod[seccao] = len(self.seccoes)
+                self.seccoes.append(seccao)
+            cod_seccao.append(cod[seccao])
+            self.produtos.append(nome)
+            self.validades.append(str(row[COL_VALIDADE] or "").strip())
+            lotes.append([_numero(row[c]) for c in COLS_LOTES_QT])
+            perdas.append(_numero(row[COL_PERDAS]))
+            sobras.append(_numero(row[COL_SOBRAS]))
+
+        self.cod_seccao = np.array(cod_seccao, dtype=np.int32)
+        self.lotes = np.array(lotes, dtype=np.int64).reshape(-1, len(COLS_LOTES_QT))
+        self.planeado = self.lotes.sum(axis=1)
+        self.perdas = np.array(perdas, dtype=np.int64)
+        self.sobras = np.array(sobras, dtype=np.int64)
+        self.indice: Dict[str, int] = {normalizar_nome(n): i for i, n in enumerate(self.produtos)}
+
+    def __len__(self):
+        return len(self.produtos)
+
+    def procurar(self, nome: str, tipo: str = "") -> Optional[int]:
+        """Linha do mapa para um produto da app: pelo nome, ou por "tipo + nome"."""
+        i = self.indice.get(normalizar_nome(nome))
+        if i is None and tipo:
+            i = self.indice.get(normalizar_nome(f"{tipo} {nome}"))
+        return i
+
+
+def ler_mapa(caminho) -> MapaProducao:
+    wb = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        return MapaProducao(ws.iter_rows(min_row=MAPA_LINHA_INICIAL, max_col=COL_SOBRAS + 1, values_only=True))
+    finally:
+        wb.close()
+
+
+# cache por caminho: (mtime, mapa)
+_cache_mapas: Dict[str, Tuple[float, MapaProducao]] = {}
+_cache_lock = Lock()
+
+
+def carregar_mapa(caminho) -> Optional[MapaProducao]:
+    """Mapa lido (do cache se o ficheiro não mudou); None se o ficheiro não existir."""
+    chave = os.fspath(caminho)
+    try:
+        mtime = os.stat(chave).st_mtime
+    except OSError:
+        return None
+    with _cache_lock:
+        em_cache = _cache_mapas.get(chave)
+        if em_cache and em_cache[0] == mtime:
+            return em_cache[1]
+    mapa = ler_mapa(chave)
+    with _cache_lock:
+        _cache_mapas[chave] = (mtime, mapa)
+    return mapa
+
+
+def caminho_mapa(base_dir) -> Path:
+    """Mapa da loja: NATABASE_MAPA ou ../Data/mapa produção.xlsx ao lado da pasta da app."""
+    return Path(os.getenv("NATABASE_MAPA", str(Path(base_dir).parent / "Data" / "mapa produção.xlsx")))
+
+
+# ---------------------- Reconciliação ----------------------
+class Reconciliacao:
+    """
+    Planeado (soma dos lotes) vs produzido (app) vs perdas/sobras, alinhados pela
+    ordem do mapa. Produtos do mapa que a app não tem contam como produzido 0.
+    """
+
+    def __init__(self, mapa: MapaProducao, store):
+        self.mapa = mapa
+        n = len(mapa)
+        self.nome_app: List[Optional[str]] = [None] * n
+        produzido = np.zeros(n, dtype=np.int64)
+        self.sem_mapa: List[str] = []
+
+        for nome in store:
+            i = mapa.procurar(nome, store.gettipo(nome))
+            if i is None:
+                self.sem_mapa.append(nome)
+                continue
+            self.nome_app[i] = nome
+            produzido[i] += store.getquantidade(nome)
+
+        self.produzido = produzido
+        self.planeado = mapa.planeado
+        self.perdas = mapa.perdas
+        self.sobras = mapa.sobras
+        self.diferenca = self.produzido - self.planeado
+        # % de perdas sobre o produzido (0 quando nada foi produzido)
+        self.taxa_perdas = np.divide(
+            self.perdas * 100.0, self.produzido,
+            out=np.zeros(n), where=self.produzido > 0,
+        )
+
+        # agregados por secção (mesmo índice de mapa.seccoes)
+        k = len(mapa.seccoes)
+        por = lambda v: np.bincount(mapa.cod_seccao, weights=v, minlength=k).astype(np.int64)
+        self.seccao_planeado = por(self.planeado)
+        self.seccao_produzido = por(self.produzido)
+        self.seccao_perdas = por(self.perdas)
+        self.seccao_sobras = por(self.sobras)
+
+    def linhas_seccao(self, s: int) -> np.ndarray:
+        """Índices (ordem do mapa) dos produtos de uma secção."""
+        return np.flatnonzero(self.mapa.cod_seccao == s)
+
+    def totais(self) -> Tuple[int, int, int, int]:
+        return (int(self.planeado.sum()), int(self.produzido.sum()),
+                int(self.perdas.sum()), int(self.sobras.sum()))
+
+
+def reconciliar(caminho, store) -> Optional[Reconciliacao]:
+    """Reconciliação com o mapa em `caminho` (None se o mapa não existir ou não puder ser lido)."""
+    try:
+        mapa = carregar_mapa(caminho)
+    except Exception as e:
+        print("[mapa] falha ao ler:", e)
+        return None
+    if mapa is None:
+        return None
+    return Reconciliacao(mapa, store)
+
+
+# ---------------------- Aba no Excel do dia ----------------------
+CABECALHOS_MAPA = ["Produto", "Secção", "Planeado", "Produzido", "Diferença", "Perdas", "Sobras"]
+LARGURAS_MAPA = [30, 20, 11, 11, 11, 9, 9]
+
+
+def renderizar_aba_mapa(wb, titulo: str, rec: Reconciliacao):
+    """
+    Aba "Mapa dd-mm-aaaa" ao lado da aba do dia (workbook write-only),
+    com os mesmos NamedStyle `nb_` da aba de produção.
+    """
+    ws = wb.create_sheet(title=titulo)
+    for offset, largura in enumerate(LARGURAS_MAPA):
+        ws.column_dimensions[get_column_letter(COLUNA_INICIAL + offset)].width = largura
+
+    vazio = [None] * (COLUNA_INICIAL - 1)
+
+    def escrever(valores, estilos):
+        celulas = []
+        for valor, estilo in zip(valores, estilos):
+            c = WriteOnlyCell(ws, value=valor)
+            c.style = estilo
+            celulas.append(c)
+        ws.append(vazio + celulas)
+
+    for _ in range(LINHA_INICIAL - 1):
+        ws.append([])
+    escrever(CABECALHOS_MAPA, ["nb_cabecalho"] * len(CABECALHOS_MAPA))
+
+    mapa = rec.mapa
+    for s, seccao in enumerate(mapa.seccoes):
+        for j, i in enumerate(rec.linhas_seccao(s)):
+            estilo = f"nb_linha_{j % 2}"
+            escrever(
+                [mapa.produtos[i], seccao, int(rec.planeado[i]), int(rec.produzido[i]),
+                 int(rec.diferenca[i]), int(rec.perdas[i]), int(rec.sobras[i])],
+                [estilo] * len(CABECALHOS_MAPA),
+            )
+        k = s % len(TIPO_CORES)
+        plan, prod = int(rec.seccao_planeado[s]), int(rec.seccao_produzido[s])
+        escrever(
+            [f"Total {seccao}", "", plan, prod, prod - plan,
+             int(rec.seccao_perdas[s]), int(rec.seccao_sobras[s])],
+            [f"nb_total_tipo_{k}"] * 2 + [f"nb_total_tipo_{k}_qtd"] * 5,
+        )
+
+    plan, prod, perdas, sobras = rec.totais()
+    escrever(
+        ["TOTAL GERAL", "", plan, prod, prod - plan, perdas, sobras],
+        ["nb_total_geral"] * 2 + ["nb_total_geral_qtd"] * 5,
+    )
+    if rec.sem_mapa:
+        ws.append([])
+        escrever([f"Fora do mapa: {len(rec.sem_mapa)} produto(s)"], ["nb_linha_1"])
+        for nome in sorted(rec.sem_mapa, key=str.lower):
+            escrever([nome], ["nb_linha_0"])
+    return ws
@@ -0,0 +1,292 @@
+# metricas.py
+# Instrumentação leve da app: spans cronometrados (fases do arranque, Sheets, gravação
+# do Excel e do catálogo, e-mails, redesenhos da UI), contadores (toques, gravações
+# pedidas, novas tentativas, erros) e, opcionalmente, fotografias do tracemalloc.
+# Os registos vão, em lotes, para um JSONL local com rotação (metricas.jsonl,
+# metricas.1.jsonl, ...) e ficam em memória para o ecrã de diagnóstico da app.
+#
+# Desligada (por omissão), `span()` devolve um objeto partilhado que não faz nada e
+# `contar()` sai logo: fica só o custo de uma chamada de função.
+# Ligar: NATABASE_METRICAS=1 (ou `metricas.ativar()`, ex.: no ecrã de diagnóstico);
+# NATABASE_METRICAS_MEMORIA=1 liga também o tracemalloc (pesado: só para diagnóstico).
+# Como arranque.py, não importa nada pesado.
+
+import json
+import os
+import time
+from collections import deque
+from functools import wraps
+from pathlib import Path
+from threading import Event, Lock, Thread, current_thread
+from typing import Dict, List, Optional
+
+
+def percentil(valores, p: float) -> float:
+    """Percentil `p` (0-100) pelo método do vizinho mais próximo; 0.0 sem valores.
+    Usado também pelos benchmarks (um só cálculo para todos os relatórios)."""
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def _ligado(variavel: str) -> bool:
+    return os.getenv(variavel, "").strip().lower() not in ("", "0", "false", "nao", "não")
+
+
+class _SpanNulo:
+    """O que `span()` devolve com as métricas desligadas."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _SpanNulo()
+
+
+class _Span:
+    __slots__ = ("_metricas", "nome", "atributos", "_t0")
+
+    def __init__(self, metricas, nome: str, atributos: dict):
+        self._metricas = metricas
+        self.nome = nome
+        self.atributos = atributos
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, erro, tb):
+        self._metricas._fechar(self, time.perf_counter() - self._t0, erro)
+        return False
+
+
+class Metricas:
+    """
+    - `span(nome, **atributos)`: `with` que mede o bloco (e regista a exceção, se houver);
+      `cronometrar(nome)` faz o mesmo como decorador.
+    - `contar(nome, n)`: contador monotónico; `evento(tipo, **dados)`: registo avulso.
+    - `configurar(pasta)` escolhe o ficheiro; um worker grava os registos pendentes a
+      cada `intervalo` segundos e roda o ficheiro acima de `tamanho_max` bytes.
+    - `resumo()` / `recentes()` / `fotografia_memoria()` alimentam o ecrã de diagnóstico.
+    """
+
+    def __init__(self, ativo: bool = False, janela: int = 256, max_recentes: int = 200):
+        self.ativo = ativo
+        self.caminho: Optional[Path] = None
+        self.tamanho_max = 1_000_000
+        self.copias = 3
+        self.intervalo = 5.0
+        self.intervalo_memoria = 300.0
+
+        self._lock = Lock()
+        self._janela = janela
+        self._duracoes: Dict[str, deque] = {}    # nome -> últimas durações (ms)
+        self._totais: Dict[str, list] = {}       # nome -> [n, soma ms, máx ms, erros]
+        self.contadores: Dict[str, int] = {}
+        self._contadores_gravados: Dict[str, int] = {}
+        self._recentes = deque(maxlen=max_recentes)
+        # por gravar; sem ficheiro (ou com o disco lento) ficam só os mais recentes
+        self._pendentes = deque(maxlen=20_000)
+        self.ultima_memoria: Optional[dict] = None
+
+        self._acordar = Event()
+        self._parar = Event()
+        self._thread: Optional[Thread] = None
+
+    # ---------------- configuração ----------------
+    def configurar(self, pasta: Path, intervalo: Optional[float] = None):
+        """Ficheiro em `pasta/metricas.jsonl` (a última pasta configurada ganha)."""
+        self.caminho = Path(pasta) / "metricas.jsonl"
+        if intervalo is not None:
+            self.intervalo = intervalo
+        if self.ativo:
+            self._arrancar_worker()
+
+    def ativar(self, ligado: bool = True, memoria: Optional[bool] = None):
+        self.ativo = ligado
+        if memoria is not None:
+            import tracemalloc
+            if memoria and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            elif not memoria and tracemalloc.is_tracing():
+                tracemalloc.stop()
+        if ligado and self.caminho is not None:
+            self._arrancar_worker()
+
+    @property
+    def memoria_ativa(self) -> bool:
+        import tracemalloc
+        return tracemalloc.is_tracing()
+
+    # ---------------- registo ----------------
+    def span(self, nome: str, **atributos):
+        if not self.ativo:
+            return _NULO
+        return _Span(self, nome, atributos)
+
+    def cronometrar(self, nome: str):
+        def decorador(fn):
+            @wraps(fn)
+            def envolvida(*args, **kwargs):
+                if not self.ativo:
+                    return fn(*args, **kwargs)
+                with _Span(self, nome, {}):
+                    return fn(*args, **kwargs)
+            return envolvida
+        return decorador
+
+    def contar(self, nome: str, n: int = 1):
+        if not self.ativo:
+            return
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + n
+
+    def evento(self, tipo: str, **dados):
+        if not self.ativo:
+            return
+        registo = {"t": round(time.time(), 3), "evento": tipo, **dados}
+        with self._lock:
+            self._recentes.append(registo)
+            self._pendentes.append(registo)
+
+    def _fechar(self, span: _Span, duracao: float, erro: Optional[BaseException]):
+        ms = round(duracao * 1000, 3)
+        registo = {"t": round(time.time(), 3), "span": span.nome, "ms": ms, "thread": current_thread().name}
+        if span.atributos:
+            registo.update(span.atributos)
+        if erro is not None:
+            registo["erro"] = repr(erro)
+        with self._lock:
+            duracoes = self._duracoes.get(span.nome)
+            if duracoes is None:
+                duracoes = self._duracoes[span.nome] = deque(maxlen=self._janela)
+                self._totais[span.nome] = [0, 0.0, 0.0, 0]
+            duracoes.append(ms)
+            total = self._totais[span.nome]
+            total[0] += 1
+            total[1] += ms
+            total[2] = max(total[2], ms)
+            if erro is not None:
+                total[3] += 1
+            self._recentes.append(registo)
+            self._pendentes.append(registo)
+
+    # ---------------- leitura (ecrã de diagnóstico) ----------------
+    def resumo(self) -> dict:
+        """{"spans": {nome: {n, media_ms, p50_ms, p95_ms, max_ms, erros}}, "contadores": {...}}."""
+        with self._lock:
+            janelas = {nome: sorted(d) for nome, d in self._duracoes.items()}
+            totais = {nome: list(t) for nome, t in self._totais.items()}
+            contadores = dict(self.contadores)
+        spans = {}
+        for nome, valores in sorted(janelas.items()):
+            n, soma, maximo, erros = totais[nome]
+            spans[nome] = {
+                "n": n,
+                "media_ms": round(soma / n, 3) if n else 0.0,
+                "p50_ms": percentil(valores, 50),
+                "p95_ms": percentil(valores, 95),
+                "max_ms": maximo,
+                "erros": erros,
+            }
+        return {"spans": spans, "contadores": dict(sorted(contadores.items()))}
+
+    def recentes(self, n: int = 50) -> List[dict]:
+        with self._lock:
+            return list(self._recentes)[-n:]
+
+    def fotografia_memoria(self, top: int = 8) -> Optional[dict]:
+        """Memória Python atual/pico e as linhas que mais alocam (None sem tracemalloc)."""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return None
+        atual, pico = tracemalloc.get_traced_memory()
+        estatisticas = tracemalloc.take_snapshot().statistics("lineno")[:top]
+        registo = {
+            "t": round(time.time(), 3),
+            "memoria": {
+                "atual_kb": round(atual / 1024, 1),
+                "pico_kb": round(pico / 1024, 1),
+                "top": [f"{e.traceback[0].filename.rsplit(os.sep, 1)[-1]}:{e.traceback[0].lineno} "
+                        f"{e.size / 1024:.0f} KB x{e.count}" for e in estatisticas],
+            },
+        }
+        with self._lock:
+            self._recentes.append(registo)
+            self._pendentes.append(registo)
+            self.ultima_memoria = registo["memoria"]
+        return registo["memoria"]
+
+    # ---------------- ficheiro ----------------
+    def _arrancar_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = Thread(target=self._loop, name="metricas", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        ultima_memoria = time.monotonic()
+        while not self._parar.is_set():
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            # com o tracemalloc ligado, uma fotografia a cada `intervalo_memoria` segundos
+            if time.monotonic() - ultima_memoria >= self.intervalo_memoria and self.memoria_ativa:
+                ultima_memoria = time.monotonic()
+                self.fotografia_memoria()
+            self.gravar()
+
+    def parar(self, timeout: Optional[float] = None):
+        """Grava o que faltar e termina o worker."""
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.gravar()
+
+    def gravar(self):
+        """Acrescenta os registos pendentes (e os contadores, se mudaram) ao ficheiro."""
+        with self._lock:
+            pendentes = list(self._pendentes)
+            self._pendentes.clear()
+            if self.contadores != self._contadores_gravados:
+                self._contadores_gravados = dict(self.contadores)
+                pendentes.append({"t": round(time.time(), 3), "contadores": self._contadores_gravados})
+        if not pendentes or self.caminho is None:
+            return
+        bloco = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in pendentes)
+        try:
+            if self.caminho.exists() and self.caminho.stat().st_size + len(bloco) > self.tamanho_max:
+                self._rodar()
+            with open(self.caminho, "a", encoding="utf-8") as fh:
+                fh.write(bloco)
+        except OSError as e:
+            print("[metricas] falha ao gravar:", e)
+
+    def _copia(self, i: int) -> Path:
+        return self.caminho.with_name(f"{self.caminho.stem}.{i}{self.caminho.suffix}")
+
+    def _rodar(self):
+        """metricas.jsonl -> .1 -> .2 ...; a mais antiga (além de `copias`) desaparece."""
+        for i in range(self.copias - 1, 0, -1):
+            if self._copia(i).exists():
+                os.replace(self._copia(i), self._copia(i + 1))
+        os.replace(self.caminho, self._copia(1))
+
+
+# instância do processo: os módulos usam `span`, `contar`, `cronometrar` diretamente
+metricas = Metricas(ativo=_ligado("NATABASE_METRICAS"))
+if metricas.ativo and _ligado("NATABASE_METRICAS_MEMORIA"):
+    metricas.ativar(memoria=True)
+
+span = metricas.span
+contar = metricas.contar
+cronometrar = metricas.cronometrar
+evento = metricas.evento
@@ -0,0 +1,671 @@
+# nucleo_producao.py
+# Lógica de produção sem UI: catálogo em memória, base de dados SQLite (registo de
+# cada ajuste), Excel do dia gerado a partir dela, histórico, mapa de produção,
+# sync com o Sheets e caixa de saída.
+# Usado pela app (modo local) e pelo servico_inventario.py (várias tablets, um estado).
+# Só uma thread altera o catálogo (a da UI na app, a do event loop no serviço);
+# as threads de fundo passam o trabalho para ela com `agendar(fn)`.
+# Módulos pesados (openpyxl, numpy, gspread) só são importados no primeiro uso,
+# sempre fora da thread dona: o arranque não paga por eles.
+
+import os
+import time
+from datetime import date, datetime
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Callable, Dict, List, Optional
+
+from product_store import LOTE_DEFINIR, ProductStore
+from sheets_sync import SincronizadorSheets, PlanilhaGspread
+from sheets_catalogo import SessaoSheets
+from email_outbox import EmailOutbox
+from exportacao import PERIODOS, preparar_anexo, preparar_anexo_dias, resumo_texto, resumo_html
+from fila_gravacao import FilaGravacao
+from diario_ajustes import OP_AUMENTAR, OP_DIMINUIR, OP_ZERAR
+from base_dados import BaseDados
+from integridade import Integridade, linhas_do_catalogo, linhas_do_dia
+from contadores import ContadoresPN, id_dispositivo, validar_delta, validar_relogio
+from arranque import TemposArranque, gravar_primeiro_ecra
+from fecho_dia import AgendadorFecho, hora_fecho
+from metricas import contar, metricas, span
+
+
+def resumo_catalogo(store) -> dict:
+    """
+    Resumo agrupado por tipo (tipos por ordem alfabética, produtos já ordenados por nome):
+    {"tipos": [{"tipo", "produtos": [[nome, qtd], ...], "total"}], "total_geral"}.
+    Só usa os índices e totais do ProductStore (ou de uma versão publicada).
+    """
+    return {
+        "tipos": [
+            {
+                "tipo": tipo,
+                "produtos": [[nome, qtd] for nome, qtd in store.produtos_do_tipo(tipo)],
+                "total": store.total_tipo(tipo),
+            }
+            for tipo in sorted(store.tipos(), key=str.lower)
+        ],
+        "total_geral": store.total_geral(),
+    }
+
+
+class NucleoProducao:
+    """
+    Estado de produção de uma loja.
+    - `ajustar()` / `aplicar_lote()` mudam quantidades, gravam-nas na base de dados
+      (uma transação) e agendam o Excel; só podem ser chamados na thread dona do catálogo.
+    - `ouvir(cb)`: cb(nomes) depois de cada alteração; nomes=None quando o catálogo
+      inteiro mudou (carregado do cache ou do Sheets).
+    - Cada alteração entra também nos contadores PN deste dispositivo; `sincronizar()`
+      troca deltas com outra réplica e converge sem perder ajustes feitos offline.
+    - Os avisos (`ao_aviso`, `ao_gravar`, `ao_erro_gravacao`, `ao_estado_envio`)
+      chegam sempre pela função `agendar`, nunca diretamente das threads de fundo.
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        agendar: Callable[[Callable[[], None]], None],
+        ao_aviso: Optional[Callable[[str], None]] = None,
+        ao_gravar: Optional[Callable[[], None]] = None,
+        ao_erro_gravacao: Optional[Callable[[Exception], None]] = None,
+        ao_estado_envio: Optional[Callable[[str, str, str], None]] = None,
+        tempos: Optional[TemposArranque] = None,
+        relogio: Callable[[], datetime] = datetime.now,
+    ):
+        self.base_dir = Path(base_dir)
+        self._agendar = agendar
+        self._ao_aviso = ao_aviso
+        self._ao_gravar = ao_gravar
+        self._ao_erro_gravacao = ao_erro_gravacao
+        self._ao_estado_envio = ao_estado_envio
+
+        self._creds_json = self.base_dir / "projeto-ibersol-467808-eb721841ac2c.json"
+        # key da planilha, token de acesso e hashes das linhas do catálogo
+        self._sheets_estado_path = self.base_dir / "sheets_estado.json"
+        # nome da planilha (uma por loja)
+        self._spreadsheet_title = "ProdutosdaLoja012"
+        # uma só sessão (arranque + envio ao longo do dia): o estado em disco tem um só dono
+        self._sessao: Optional[SessaoSheets] = None
+        self._lock_sessao = Lock()
+
+        # arquivo Excel completo da loja
+        self.xlsx_path = self.base_dir / "Loja012_2025.xlsx"
+
+        # as mesmas quantidades como contadores PN por dispositivo: é o que se troca
+        # com as outras réplicas (serviço, tablets que estiveram offline)
+        dispositivo = id_dispositivo(self.base_dir / "dispositivo.txt")
+        self.contadores = ContadoresPN(dispositivo)
+        self._contadores_path = self.base_dir / "contadores.json"
+        self.contadores.carregar(self._contadores_path)
+
+        # base de dados da loja (catálogo, produção diária, eventos); substitui o
+        # cache JSON + diário, que só são lidos uma vez para a migração
+        self.cache_path = self.base_dir / "cache_produtos.json"
+        self._diario_path = self.base_dir / "diario_ajustes.jsonl"
+        self.bd = BaseDados(self.base_dir / "natabase.db", dispositivo=dispositivo)
+        # selos HMAC do catálogo e de cada partição do Excel (edições feitas fora da app)
+        self.integridade = Integridade(self.base_dir)
+        self.versao_menu = None
+        # tipos do catálogo num JSON minúsculo: a app desenha a grelha antes do catálogo chegar
+        self.primeiro_ecra_path = self.base_dir / "primeiro_ecra.json"
+        self.tempos = tempos or TemposArranque(self.base_dir / "arranque_tempos.jsonl")
+        # métricas (desligadas por omissão): metricas.jsonl ao lado da base de dados
+        metricas.configurar(self.base_dir)
+
+        # flags
+        self.carregado = False      # já temos dados em memória (da base de dados/Sheets)
+        self._loading = False       # há um carregamento em andamento?
+        self._parado = False
+        self._lido_local = False    # catálogo lido da base de dados (talvez ainda não instalado)
+
+        # dados em memória (catálogo indexado por tipo, com totais)
+        self.store = ProductStore()
+        self._ouvintes: List[Callable[[Optional[List[str]]], None]] = []
+
+        # envio das alterações para o Sheets (só células alteradas, fila offline em disco);
+        # a worksheet só é aberta no primeiro envio e, sem rede, o worker volta a tentar
+        # sozinho (não depende de a verificação do arranque ter corrido bem)
+        self._sync_sheets = SincronizadorSheets(
+            self._quantidade_ou_none,
+            self.base_dir / "sheets_pendentes.json",
+            planilha=PlanilhaGspread(obter_worksheet=lambda: self._sessao_sheets().worksheet_producao()),
+            intervalo=float(os.getenv("NATABASE_SHEETS_SYNC_S", "30")),
+        )
+
+        # caixa de saída de e-mails: fila em disco + worker com ligação SMTP reutilizada
+        self._outbox = EmailOutbox(
+            self.base_dir / "outbox",
+            self._criar_email_service,
+            ao_estado=self._estado_envio,
+        )
+
+        # mapa de produção (planeado por lotes, perdas, sobras) e histórico em colunas:
+        # criados no primeiro uso (ver as propriedades)
+        self._mapa_path: Optional[Path] = None
+        self._historico = None
+        self._lock_historico = Lock()
+
+        # Excel do dia: um único worker junta rajadas de ajustes numa só escrita
+        self._fila_gravacao = FilaGravacao(
+            self._gravar_excel,
+            debounce=float(os.getenv("NATABASE_SAVE_DEBOUNCE", "0.8")),
+            latencia_max=float(os.getenv("NATABASE_SAVE_LATENCIA_MAX", "5")),
+            ao_gravar=lambda: self._avisar(self._ao_gravar),
+            ao_erro=self._erro_gravacao,
+        )
+
+        # fecho automático do dia (NATABASE_FECHO="HH:MM", "off" desliga): arranca no fim
+        # do arranque; espera enquanto há uma gravação a decorrer ou no debounce (depois de
+        # uma gravação falhada não espera: o flush de `fechar_dias` tenta e o erro é reportado)
+        hora = hora_fecho(os.getenv("NATABASE_FECHO", "22:00"))
+        self._fecho = None
+        if hora is not None:
+            self._fecho = AgendadorFecho(
+                self.fechar_dias,
+                self.base_dir / "fecho_dia.json",
+                hora=hora,
+                relogio=relogio,
+                ocupado=lambda: self._fila_gravacao.ocupada,
+            )
+
+    # ---------------- ciclo de vida ----------------
+    def iniciar(self, sheets: bool = True):
+        """
+        Não bloqueia: numa thread de arranque,
+        1) lê o catálogo da base de dados e instala-o na thread dona (via `agendar`);
+           na primeira vez, migra antes o cache JSON + diário e as partições do Excel;
+        2) depois, checa a versão no Sheets e o histórico.
+        Os workers (sync, caixa de saída) arrancam já.
+        """
+        Thread(target=self._arrancar, args=(sheets,), name="arranque", daemon=True).start()
+        if sheets:
+            self._sync_sheets.iniciar()
+        # envios que ficaram pendentes da última execução seguem já
+        self._outbox.iniciar()
+
+    def _arrancar(self, sheets: bool):
+        try:
+            self.bd.migrar_ficheiros(self.cache_path, self._diario_path, self.xlsx_path)
+        except Exception as e:
+            print("[base_dados] falha na migração:", e)
+        if self.bd.tem_catalogo():
+            try:
+                self.carregar_cache_local()
+            except Exception as e:
+                print("[cache] falha ao ler:", e)
+        # antes do Sheets: só o que a app escreveu até aqui entra na comparação
+        self._verificar_integridade()
+
+        if sheets:
+            self.atualizar_do_sheets()
+        # histórico: lê só as partições diárias que ainda não conhece
+        self._atualizar_historico()
+        # dias por fechar (ex.: o tablet esteve desligado à hora do fecho) saem já
+        if self._fecho is not None:
+            self._fecho.iniciar()
+
+    def parar(self):
+        # o Kivy chama on_stop duas vezes quando a app sai por App.stop()
+        if self._parado:
+            return
+        self._parado = True
+        if self._fecho is not None:
+            self._fecho.parar(timeout=30)
+        # garante que ajustes ainda na janela de debounce chegam ao disco
+        self._fila_gravacao.parar(timeout=30)
+        self.bd.fechar()
+        try:
+            self.integridade.marcar_bd(self.bd.caminho)
+        except OSError as e:
+            print("[integridade] falha ao gravar:", e)
+        self._sync_sheets.parar(timeout=5)
+        self._outbox.parar(timeout=5)
+        if self._historico is not None:
+            self._historico.gravar()
+        self.contadores.gravar(self._contadores_path)
+        metricas.gravar()
+
+    # ---------------- observadores ----------------
+    def ouvir(self, callback: Callable[[Optional[List[str]]], None]):
+        self._ouvintes.append(callback)
+
+    def _notificar(self, nomes: Optional[List[str]]):
+        for cb in self._ouvintes:
+            cb(nomes)
+
+    def _avisar(self, cb, *args):
+        if cb is not None:
+            self._agendar(lambda: cb(*args))
+
+    def _verificar_integridade(self):
+        """Compara o Excel e o catálogo com os selos da última execução (só o que mudou no disco)."""
+        try:
+            with span("integridade.verificar"):
+                rel = self.integridade.verificar(self.bd, self.xlsx_path)
+        except Exception as e:
+            print("[integridade] falha ao verificar:", e)
+            return
+        print("[integridade]", rel.resumo())
+        problemas = rel.linhas()
+        for linha in problemas:
+            print("[integridade]", linha)
+        if problemas:
+            contar("integridade.alteracoes", len(problemas))
+            self._avisar(self._ao_aviso, "⚠️ Integridade: " + "; ".join(problemas[:3]))
+
+    def _erro_gravacao(self, e: Exception):
+        print("[Excel] erro:", e)
+        contar("erros.excel")
+        self._avisar(self._ao_erro_gravacao, e)
+
+    # --------------- catálogo local (base de dados) ---------------
+    def carregar_cache_local(self):
+        """
+        Lê e indexa o catálogo na thread que chama (a de arranque); só a troca do
+        catálogo e a notificação correm na thread dona.
+        """
+        # cada toque já está na base de dados: não há diário para reaplicar
+        with span("arranque.ler_catalogo"):
+            versao, itens = self.bd.carregar()
+            store = ProductStore.de_itens(itens)
+        self.tempos.marcar("catalogo_lido")
+        self.versao_menu = versao
+        self._lido_local = True
+        self._agendar(lambda: self._instalar_catalogo(store))
+
+    def _instalar_catalogo(self, store: ProductStore):
+        self.definir_catalogo(store)
+        self.carregado = True
+        self._notificar(None)
+        self.tempos.marcar("catalogo_pronto")
+        self.tempos.concluir()
+        self._atualizar_primeiro_ecra()
+
+    def _atualizar_primeiro_ecra(self):
+        try:
+            gravar_primeiro_ecra(self.primeiro_ecra_path, self.store.atual())
+        except OSError as e:
+            print("[arranque] índice do primeiro ecrã:", e)
+
+    def definir_catalogo(self, store: ProductStore, alinhar: bool = True):
+        """
+        Troca o catálogo em memória e liga os observadores (sync com o Sheets).
+        Com `alinhar`, as quantidades do novo catálogo passam para os contadores.
+        """
+        store.ouvir(self._sync_sheets.marcar)
+        self.store = store
+        if alinhar:
+            self._alinhar_contadores()
+
+    def _quantidade_ou_none(self, nome: str):
+        # chamado pelo worker do sync: lê a versão publicada, nunca o catálogo em edição
+        foto = self.store.atual()
+        return foto.getquantidade(nome) if nome in foto else None
+
+    def salvar_cache_local(self, versao_menu: str):
+        """Grava o catálogo completo (só quando muda, ex.: vindo do Sheets), numa transação."""
+        with span("catalogo.gravar", produtos=len(self.store)):
+            self.bd.gravar_snapshot(self.store.para_itens(), versao_menu)
+        try:
+            self.integridade.selar_catalogo(linhas_do_catalogo(self.bd.carregar()[1]))
+        except OSError as e:
+            print("[integridade] falha ao selar o catálogo:", e)
+        self.versao_menu = versao_menu
+        self._atualizar_primeiro_ecra()
+
+    def _aplicar_diff_catalogo(self, sessao, diff, versao: str):
+        """Na thread dona: aplica só as linhas alteradas do Sheets e grava o snapshot."""
+        with span("sheets.aplicar_diff", alterados=len(diff.alterados), removidos=len(diff.removidos)):
+            if not self.carregado:
+                self.definir_catalogo(ProductStore(diff.completo), alinhar=False)
+                self._impor_contadores([nome for nome, _, _ in diff.completo])
+            elif diff:
+                diff.aplicar(self.store)
+                self._impor_contadores([nome for nome, _, _ in diff.alterados])
+        self.carregado = True
+        self.salvar_cache_local(versao)
+        sessao.confirmar()
+        self._notificar(None)
+        print("[startup] cache atualizado a partir do Sheets.")
+
+    # --------------- contadores PN ---------------
+    def _alinhar_contadores(self):
+        """
+        O catálogo carregado manda (ex.: cache + diário no arranque): toques que chegaram
+        ao diário mas ainda não ao ficheiro dos contadores (gravado com a planilha)
+        entram agora como ajustes deste dispositivo. Custa O(catálogo), só ao trocar.
+        """
+        store = self.store
+        for nome in store:
+            qtd = store.getquantidade(nome)
+            if self.contadores.valor(nome) != qtd or not self.contadores.conhece(nome):
+                self.contadores.definir(nome, qtd)
+
+    def _impor_contadores(self, nomes):
+        """
+        Linhas vindas do Sheets: a quantidade lá é só um espelho do que alguma tablet
+        enviou, por isso não pode apagar ajustes locais. Produtos que os contadores já
+        conhecem ficam com o valor dos contadores; só os nunca vistos adotam o do Sheets.
+        """
+        store = self.store
+        ajustes = []
+        for nome in nomes:
+            if nome not in store:
+                continue
+            if self.contadores.conhece(nome):
+                ajustes.append((LOTE_DEFINIR, nome, self.contadores.valor(nome)))
+            else:
+                self.contadores.definir(nome, store.getquantidade(nome))
+        if ajustes:
+            store.aplicar_lote(ajustes)
+
+    def fundir(self, delta: dict) -> List[str]:
+        """
+        Junta o delta de outra réplica e aplica as quantidades que mudaram como um lote
+        (diário, gravação, notificação). Devolve os produtos alterados.
+        """
+        mudaram = self.contadores.fundir(delta)
+        ajustes = [(LOTE_DEFINIR, nome, self.contadores.valor(nome)) for nome in mudaram if nome in self.store]
+        if ajustes:
+            self.aplicar_lote(ajustes)
+        return mudaram
+
+    def sincronizar(self, delta: dict, relogio: Optional[Dict[str, int]] = None) -> dict:
+        """
+        Uma troca com outra réplica: funde o `delta` dela e, se mandou o seu `relogio`,
+        devolve o que lhe falta (sem lhe reenviar o que acabou de chegar dela).
+        Pedido mal formado: ValueError antes de fundir o que quer que seja.
+        """
+        delta = validar_delta(delta)
+        if relogio is not None:
+            validar_relogio(relogio)
+        self.fundir(delta)
+        resposta = {"relogio": self.contadores.relogio(), "delta": {}}
+        if relogio is not None:
+            visto = dict(relogio)
+            for origem, parte in delta.items():
+                for *_, seq in parte.get("e") or ():
+                    visto[origem] = max(visto.get(origem, 0), seq)
+            resposta["delta"] = self.contadores.delta_para(visto)
+        return resposta
+
+    # --------------- Sheets: arranque (uma vez) ---------------
+    def _sessao_sheets(self) -> SessaoSheets:
+        with self._lock_sessao:
+            if self._sessao is None:
+                self._sessao = SessaoSheets(self._creds_json, self._spreadsheet_title, self._sheets_estado_path)
+            return self._sessao
+
+    def atualizar_do_sheets(self):
+        """No arranque: compara versão do Sheets com a do JSON.
+        Se mudou, aplica só as linhas diferentes e regrava o JSON. Depois usamos só o JSON."""
+        if self._loading:
+            return
+        self._loading = True
+        try:
+            # key da planilha + token ficam guardados: sem pesquisa no Drive nem nova auth
+            sessao = self._sessao_sheets()
+
+            # uma única leitura de intervalo (Config!B1)
+            versao_sheets = sessao.ler_versao()
+
+            # o catálogo local pode já estar lido mas ainda não instalado na thread dona
+            tem_local = self.carregado or self._lido_local
+            precisa_baixar = not tem_local or (
+                versao_sheets and versao_sheets != self.versao_menu
+            )
+
+            if precisa_baixar:
+                if not tem_local:
+                    sessao.esquecer_hashes()
+                diff = sessao.diff_catalogo()
+                versao = versao_sheets or datetime.utcnow().isoformat()
+                self._agendar(lambda: self._aplicar_diff_catalogo(sessao, diff, versao))
+                print(f"[startup] Sheets: {len(diff.alterados)} linhas alteradas, {len(diff.removidos)} removidas.")
+            else:
+                # já temos o catálogo local da mesma versão (instalado pela thread de arranque)
+                sessao.confirmar()
+                print("[startup] usando cache local (mesma versão).")
+
+        except Exception as e:
+            # offline ou outro erro: usa cache se existir
+            print("[startup] sem atualização do Sheets:", e)
+            contar("erros.sheets")
+            if self._lido_local:
+                self._avisar(self._ao_aviso, "⚠️ Offline. Usando dados locais.")
+            else:
+                self._avisar(self._ao_aviso, "❌ Sem internet e sem cache local.")
+        finally:
+            self._loading = False
+
+    # --------------- Ajustes ---------------
+    def quantidade(self, nome: str) -> int:
+        return int(self.store.getquantidade(nome)) if nome in self.store else 0
+
+    def ajustar(self, nome: str, direcao: int, valor: int) -> Optional[int]:
+        """
+        Aplica `valor` ao produto (direcao: +1 adicionar, -1 subtrair), sem nunca
+        deixar negativo. Grava na base de dados e agenda a gravação do Excel.
+        Devolve a nova quantidade (None se o produto não existir).
+        """
+        store = self.store
+        if nome not in store:
+            return None
+        if valor <= 0:
+            return self.quantidade(nome)
+
+        atual = int(store.getquantidade(nome) or 0)
+        if direcao == 1:
+            store.aumentarquantidade(nome, valor)
+            self.bd.registar(OP_AUMENTAR, nome, store.gettipo(nome), valor, store.getquantidade(nome))
+            self.contadores.definir(nome, store.getquantidade(nome))
+        else:
+            # nunca deixar negativo
+            decremento = min(valor, max(0, atual))
+            if decremento <= 0:
+                return atual
+            store.diminuirquantidade(nome, decremento)
+            self.bd.registar(OP_DIMINUIR, nome, store.gettipo(nome), decremento, store.getquantidade(nome))
+            self.contadores.definir(nome, store.getquantidade(nome))
+
+        contar("toques")
+        # o Excel é gerado em background; rajadas viram uma só gravação
+        self._fila_gravacao.agendar()
+        self._notificar([nome])
+        return self.quantidade(nome)
+
+    def aplicar_lote(self, ajustes, ignorar_desconhecidos: bool = False) -> Dict[str, tuple]:
+        """
+        Aplica vários ajustes (op, nome, valor) como uma só transação:
+        tudo ou nada, uma transação na base de dados, uma gravação e uma notificação.
+        Lança ErroLote se algum ajuste for inválido. Devolve {nome: (antes, depois)}.
+        """
+        alterados = self.store.aplicar_lote(ajustes, ignorar_desconhecidos)
+        if not alterados:
+            return alterados
+
+        # um evento por produto com o efeito líquido do lote
+        store = self.store
+        operacoes = []
+        for nome, (antes, depois) in alterados.items():
+            self.contadores.definir(nome, depois)
+            if depois == 0:
+                op, delta = OP_ZERAR, antes
+            elif depois > antes:
+                op, delta = OP_AUMENTAR, depois - antes
+            else:
+                op, delta = OP_DIMINUIR, antes - depois
+            operacoes.append((op, nome, store.gettipo(nome), delta, depois))
+        self.bd.registar_lote(operacoes)
+        contar("lotes")
+
+        self._fila_gravacao.agendar()
+        self._notificar(list(alterados))
+        return alterados
+
+    # --------------- Mapa de produção: planeado vs produzido ---------------
+    @property
+    def mapa_path(self) -> Path:
+        if self._mapa_path is None:
+            from mapa_producao import caminho_mapa
+            self._mapa_path = caminho_mapa(self.base_dir)
+        return self._mapa_path
+
+    def reconciliacao(self, foto=None):
+        """Reconciliação com o mapa (None se o mapa não existir ou não puder ser lido)."""
+        from mapa_producao import reconciliar
+        return reconciliar(self.mapa_path, foto if foto is not None else self.store.atual())
+
+    # --------------- Excel do dia (background) ---------------
+    def _gravar_excel(self):
+        """
+        Executado só pelo worker da FilaGravacao (nunca em paralelo).
+        A produção do dia é fixada na base de dados e a aba sai de uma consulta;
+        o mapa e o histórico usam uma versão publicada e imutável do catálogo.
+        """
+        from mapa_producao import renderizar_aba_mapa
+        from salvarexecel import salvar_producao_diaria
+
+        hoje = date.today()
+        foto = self.store.atual()
+        # aba "Mapa dd-mm-aaaa" ao lado da do dia, se houver mapa de produção
+        abas_extra = []
+        rec = self.reconciliacao(foto)
+        if rec is not None:
+            titulo = f"Mapa {hoje.strftime('%d-%m-%Y')}"
+            abas_extra.append(lambda wb: renderizar_aba_mapa(wb, titulo, rec))
+        # toques depois deste instante ficam fora do selo (o arranque sabe explicá-los)
+        selado_em = time.time()
+        with span("bd.registar_dia"):
+            self.bd.registar_dia(hoje)
+        por_tipo = self.bd.producao_por_tipo(hoje)
+        caminho = salvar_producao_diaria(
+            data=hoje, nome_arquivo=str(self.xlsx_path), abas_extra=abas_extra,
+            por_tipo=por_tipo,
+        )
+        # só este dia e os produtos que mudaram voltam a ser selados
+        with span("integridade.selar"):
+            self.integridade.selar_gravacao(hoje, linhas_do_dia(por_tipo), caminho, selado_em)
+        # o dia corrente entra no histórico a partir da memória (sem reler o Excel)
+        with span("historico.registar_dia"):
+            self.historico.registar_dia(hoje, foto, caminho)
+        self.contadores.gravar(self._contadores_path)
+
+    @property
+    def historico(self):
+        """Histórico em colunas (consultas por período/tipo/dia da semana); NumPy só aqui."""
+        with self._lock_historico:
+            if self._historico is None:
+                from historico import HistoricoProducao
+                self._historico = HistoricoProducao(self.base_dir / "historico_producao.npz")
+            return self._historico
+
+    def _atualizar_historico(self):
+        try:
+            lidas = self.historico.ingerir_particoes(str(self.xlsx_path))
+            if lidas:
+                print(f"[historico] {lidas} dia(s) novo(s) importado(s)")
+            self.historico.gravar()
+        except Exception as e:
+            print("[historico] falha ao atualizar:", e)
+
+    # --------------- Salvar Excel (síncrono, para exportação) ---------------
+    def salvar_excel_sync(self, periodo: str = "tudo", comprimir: bool = False) -> str:
+        """
+        Salva a produção do dia no Excel de forma síncrona (bloqueante)
+        e retorna o caminho absoluto do anexo gerado.
+        A gravação passa pelo mesmo worker, por isso nunca colide com o save em background.
+        O anexo só leva as abas do `periodo` (montadas a partir das partições diárias)
+        e, com `comprimir`, vai num .zip.
+        """
+        self._fila_gravacao.flush(forcar=True)
+        return preparar_anexo(str(self.xlsx_path), periodo=periodo, comprimir=comprimir)
+
+    # --------------- Exportação por e-mail ---------------
+    def exportar(self, periodo: str = "hoje", comprimir: bool = False) -> str:
+        """
+        Bloqueante (correr fora da thread dona): salva o Excel com os dados mais atuais
+        e coloca o envio na caixa de saída (o worker envia e repete se falhar).
+        O corpo do e-mail leva o resumo do dia (texto + HTML) da versão publicada.
+        Devolve o id do envio.
+        """
+        hoje = date.today()
+        foto = self.store.atual()
+        texto = resumo_texto(foto, hoje)
+        html = resumo_html(foto, hoje)
+
+        # 1) Garante que o arquivo contém as últimas alterações
+        with span("exportacao.anexo", periodo=periodo):
+            caminho = self.salvar_excel_sync(periodo, comprimir)
+
+        # 2) Fila de envio; vários toques no mesmo dia/período = um envio
+        assunto = f"Produção — Loja 012 — {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+        corpo = (
+            f"Segue em anexo a planilha de produção ({PERIODOS[periodo].lower()}).\n\n"
+            f"{texto}\n\n"
+            "Este e-mail foi enviado automaticamente pelo app de Gestão da Cozinha."
+        )
+        return self._outbox.enfileirar(
+            filepath=caminho,
+            subject=assunto,
+            body=corpo,
+            html=html,
+            chave=f"producao-{periodo}-{hoje.isoformat()}",
+        )
+
+    # --------------- Fecho do dia (automático) ---------------
+    def fechar_dias(self, dias: List[date]) -> Optional[str]:
+        """
+        Chamado pelo AgendadorFecho, fora da thread dona. Grava o que estiver pendente,
+        gera a partição dos dias que ainda não a tenham (a partir da base de dados) e põe
+        um só e-mail na caixa de saída com todos os dias. Devolve o id do envio (None se
+        nenhum dos dias tiver produção).
+        """
+        from salvarexecel import caminho_particao, salvar_producao_diaria
+
+        self._fila_gravacao.flush()
+        com_producao, sem_producao = [], []
+        for dia in dias:
+            por_tipo = self.bd.producao_por_tipo(dia)
+            if not por_tipo:
+                sem_producao.append(dia)
+                continue
+            if not caminho_particao(str(self.xlsx_path), dia).exists():
+                salvar_producao_diaria(data=dia, nome_arquivo=str(self.xlsx_path), por_tipo=por_tipo)
+            # o resumo do e-mail sai dos mesmos índices do catálogo, com as linhas do dia
+            com_producao.append((dia, ProductStore(linhas_do_dia(por_tipo))))
+        if not com_producao:
+            print(f"[fecho] sem produção de {dias[0]} a {dias[-1]}: nada a enviar")
+            return None
+
+        inicio, fim = com_producao[0][0], com_producao[-1][0]
+        with span("fecho.anexo", dias=len(com_producao)):
+            caminho = preparar_anexo_dias(str(self.xlsx_path), inicio, fim)
+
+        datas = inicio.strftime("%d/%m/%Y") if inicio == fim else f"{inicio.strftime('%d/%m/%Y')} a {fim.strftime('%d/%m/%Y')}"
+        texto = "\n\n".join(resumo_texto(foto, dia) for dia, foto in com_producao)
+        html = "".join(resumo_html(foto, dia) for dia, foto in com_producao)
+        if sem_producao:
+            texto += "\n\nSem produção registada: " + ", ".join(d.strftime("%d/%m/%Y") for d in sem_producao)
+        corpo = (
+            f"Segue em anexo a planilha de produção do fecho ({datas}).\n\n"
+            f"{texto}\n\n"
+            "Este e-mail foi enviado automaticamente pelo app de Gestão da Cozinha."
+        )
+        return self._outbox.enfileirar(
+            filepath=caminho,
+            subject=f"Fecho do dia — Loja 012 — {datas}",
+            body=corpo,
+            html=html,
+            chave=f"fecho-{inicio.isoformat()}-{fim.isoformat()}",
+        )
+
+    @staticmethod
+    def _criar_email_service():
+        from email_service import EmailService
+        return EmailService()
+
+    def _estado_envio(self, job_id: str, estado: str, mensagem: str):
+        """Chamado pelo worker da caixa de saída; segue para a thread dona."""
+        self._avisar(self._ao_estado_envio, job_id, estado, mensagem)
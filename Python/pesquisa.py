@@ -0,0 +1,218 @@
+# pesquisa.py
+# Pesquisa de produtos por nome enquanto se escreve (campo no ecrã de Produção).
+# Nomes normalizados (sem acentos, minúsculas, só letras e números) partidos em palavras:
+#   prefixos    lista ordenada das palavras distintas: cada palavra da pesquisa é um
+#               intervalo (bisect), "pas nat" encontra "PASTEL DE NATA"
+#   erros       bigramas das palavras -> candidatas (com a mesma primeira letra),
+#               filtradas por distância de edição ao prefixo (Damerau, 1 erro até 5
+#               letras, 2 a partir daí): só entra se a pesquisa exata não encher a
+#               lista ("croisant", "pastle", "tsota"); as palavras aproximadas de cada
+#               palavra da pesquisa ficam em cache entre teclas
+# O índice acompanha o catálogo com `sincronizar(nomes)`: só os nomes que entraram ou
+# saíram são (des)indexados. Sem dependências: corre na thread da UI.
+
+import heapq
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def normalizar(texto: str) -> str:
+    """"Pão de Ló / Bolo" -> "pao de lo bolo"."""
+    decomposto = unicodedata.normalize("NFKD", texto.casefold())
+    limpo = "".join(
+        c if c.isalnum() else " "
+        for c in decomposto if not unicodedata.combining(c)
+    )
+    return " ".join(limpo.split())
+
+
+def _bigramas(palavra: str) -> Set[str]:
+    # "$" marca o início: o prefixo da pesquisa pesa nas candidatas
+    p = "$" + palavra
+    return {p[i:i + 2] for i in range(len(p) - 1)}
+
+
+def _erros_permitidos(palavra: str) -> int:
+    if len(palavra) < 3:
+        return 0
+    return 1 if len(palavra) <= 5 else 2
+
+
+def distancia_prefixo(q: str, palavra: str, maximo: int) -> int:
+    """
+    Menor distância de edição (com trocas de letras adjacentes) entre `q` e um prefixo de
+    `palavra`; acima de `maximo` devolve `maximo + 1` sem acabar as contas.
+    """
+    t = palavra[:len(q) + maximo]
+    anterior2 = None
+    anterior = list(range(len(t) + 1))
+    for i in range(1, len(q) + 1):
+        c = q[i - 1]
+        atual = [i] + [0] * len(t)
+        for j in range(1, len(t) + 1):
+            d = t[j - 1]
+            custo = anterior[j - 1] + (c != d)
+            if anterior[j] + 1 < custo:
+                custo = anterior[j] + 1
+            if atual[j - 1] + 1 < custo:
+                custo = atual[j - 1] + 1
+            if anterior2 is not None and j > 1 and c == t[j - 2] and q[i - 2] == d and anterior2[j - 2] + 1 < custo:
+                custo = anterior2[j - 2] + 1
+            atual[j] = custo
+        if min(atual) > maximo:
+            return maximo + 1
+        anterior2, anterior = anterior, atual
+    return min(anterior)
+
+
+class IndicePesquisa:
+    """
+    - `sincronizar(nomes)`: acompanha o catálogo (só indexa/desindexa o que mudou);
+      `adicionar(nome)` / `remover(nome)` para alterações avulsas.
+    - `pesquisar(texto, limite)`: [nome] por relevância (exatos antes dos com erros,
+      nomes que começam pela pesquisa primeiro, depois os mais curtos).
+    """
+
+    def __init__(self, nomes: Iterable[str] = ()):
+        self._palavras_do_nome: Dict[str, Tuple[str, ...]] = {}
+        self._nomes_da_palavra: Dict[str, Set[str]] = {}
+        self._palavras: List[str] = []               # distintas, ordenadas (prefixos)
+        self._por_bigrama: Dict[str, Set[str]] = {}  # bigrama -> palavras
+        self._cache_aproximadas: Dict[str, Dict[str, int]] = {}
+        for nome in nomes:
+            self.adicionar(nome)
+
+    def __len__(self) -> int:
+        return len(self._palavras_do_nome)
+
+    def __contains__(self, nome) -> bool:
+        return nome in self._palavras_do_nome
+
+    # ---------------- manutenção ----------------
+    def adicionar(self, nome: str):
+        if nome in self._palavras_do_nome:
+            return
+        palavras = tuple(normalizar(nome).split())
+        self._palavras_do_nome[nome] = palavras
+        for palavra in set(palavras):
+            nomes = self._nomes_da_palavra.get(palavra)
+            if nomes is None:
+                nomes = self._nomes_da_palavra[palavra] = set()
+                insort(self._palavras, palavra)
+                self._cache_aproximadas.clear()
+                for bi in _bigramas(palavra):
+                    self._por_bigrama.setdefault(bi, set()).add(palavra)
+            nomes.add(nome)
+
+    def remover(self, nome: str):
+        palavras = self._palavras_do_nome.pop(nome, None)
+        if palavras is None:
+            return
+        for palavra in set(palavras):
+            nomes = self._nomes_da_palavra[palavra]
+            nomes.discard(nome)
+            if nomes:
+                continue
+            del self._nomes_da_palavra[palavra]
+            del self._palavras[bisect_left(self._palavras, palavra)]
+            self._cache_aproximadas.clear()
+            for bi in _bigramas(palavra):
+                com_bi = self._por_bigrama[bi]
+                com_bi.discard(palavra)
+                if not com_bi:
+                    del self._por_bigrama[bi]
+
+    def sincronizar(self, nomes: Iterable[str]) -> Tuple[int, int]:
+        """Põe o índice igual a `nomes`; devolve (entraram, saíram)."""
+        atuais = set(nomes)
+        saiu = [n for n in self._palavras_do_nome if n not in atuais]
+        entrou = [n for n in atuais if n not in self._palavras_do_nome]
+        for nome in saiu:
+            self.remover(nome)
+        for nome in entrou:
+            self.adicionar(nome)
+        return len(entrou), len(saiu)
+
+    # ---------------- pesquisa ----------------
+    def _com_prefixo(self, q: str) -> Dict[str, int]:
+        i = bisect_left(self._palavras, q)
+        fim = bisect_left(self._palavras, q + "\uffff", i)
+        return dict.fromkeys(self._palavras[i:fim], 0)
+
+    def _aproximadas(self, q: str) -> Dict[str, int]:
+        """{palavra: erros} com um prefixo a no máximo `_erros_permitidos(q)` edições de `q`."""
+        maximo = _erros_permitidos(q)
+        if not maximo:
+            return {}
+        encontradas = self._cache_aproximadas.get(q)
+        if encontradas is not None:
+            return encontradas
+        bis = _bigramas(q)
+        # cada edição (ou troca de duas letras) estraga no máximo 3 bigramas
+        minimo = max(1, len(bis) - 3 * maximo)
+        contagem: Dict[str, int] = {}
+        for bi in bis:
+            for palavra in self._por_bigrama.get(bi, ()):
+                contagem[palavra] = contagem.get(palavra, 0) + 1
+        encontradas = {}
+        primeira = q[0]
+        for palavra, n in contagem.items():
+            # erros na primeira letra são raros e deixariam entrar metade do vocabulário
+            if n >= minimo and palavra[0] == primeira:
+                erros = distancia_prefixo(q, palavra, maximo)
+                if erros <= maximo:
+                    encontradas[palavra] = erros
+        if len(self._cache_aproximadas) > 256:
+            self._cache_aproximadas.clear()
+        self._cache_aproximadas[q] = encontradas
+        return encontradas
+
+    def _procurar(self, consulta: List[str], aproximada: bool) -> Dict[str, int]:
+        """{nome: erros} dos nomes em que cada palavra da consulta casa com uma palavra do nome."""
+        por_q = []
+        for q in consulta:
+            casadas = self._com_prefixo(q)
+            if aproximada:
+                for palavra, erros in self._aproximadas(q).items():
+                    casadas.setdefault(palavra, erros)
+            if not casadas:
+                return {}
+            por_q.append(casadas)
+
+        # candidatos a partir da palavra da consulta mais seletiva; as outras só filtram
+        por_q.sort(key=lambda casadas: sum(len(self._nomes_da_palavra[p]) for p in casadas))
+        primeira, resto = por_q[0], por_q[1:]
+        resultado: Dict[str, int] = {}
+        for palavra, erros in primeira.items():
+            for nome in self._nomes_da_palavra[palavra]:
+                anterior = resultado.get(nome)
+                if anterior is None or erros < anterior:
+                    resultado[nome] = erros
+        for casadas in resto:
+            for nome in list(resultado):
+                melhor = min((casadas[p] for p in self._palavras_do_nome[nome] if p in casadas), default=None)
+                if melhor is None:
+                    del resultado[nome]
+                else:
+                    resultado[nome] += melhor
+        return resultado
+
+    def pesquisar(self, texto: str, limite: Optional[int] = 50) -> List[str]:
+        consulta = normalizar(texto).split()
+        if not consulta:
+            return []
+        encontrados = self._procurar(consulta, aproximada=False)
+        if limite is None or len(encontrados) < limite:
+            for nome, erros in self._procurar(consulta, aproximada=True).items():
+                encontrados.setdefault(nome, erros)
+
+        primeira = consulta[0]
+
+        def relevancia(nome):
+            palavras = self._palavras_do_nome[nome]
+            return (encontrados[nome], not palavras[0].startswith(primeira), len(palavras), len(nome), nome)
+
+        if limite is None:
+            return sorted(encontrados, key=relevancia)
+        return heapq.nsmallest(limite, encontrados, key=relevancia)
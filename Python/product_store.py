@@ -0,0 +1,477 @@
+# product_store.py
+# Catálogo em memória com índices: substitui o dict simples de `produto`.
+# Registos em arrays paralelos + índice secundário por tipo (já ordenado por nome)
+# + totais por tipo e total geral, todos atualizados a cada ajuste de quantidade.
+# Cada alteração publica uma versão imutável (SnapshotCatalogo) que as threads de
+# gravação/exportação/sync leem sem locks; as quantidades vivem em blocos
+# partilhados entre versões (copy-on-write), por isso publicar custa O(n/64).
+
+from array import array
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# quantidades guardadas em blocos de _BLOCO registos (potência de 2)
+_BLOCO = 64
+_DESLOC = 6
+
+
+# operações de um lote (as três primeiras são as mesmas do diário de ajustes)
+LOTE_AUMENTAR = "+"
+LOTE_DIMINUIR = "-"
+LOTE_ZERAR = "0"
+LOTE_DEFINIR = "="   # contagem: fixa a quantidade
+
+
+class ErroLote(ValueError):
+    """Lote inválido: nenhum ajuste foi aplicado. `erros` = [(posição, nome, motivo)]."""
+
+    MAX_ERROS = 50
+
+    def __init__(self, erros: List[Tuple[int, str, str]], total: Optional[int] = None):
+        self.erros = erros[:self.MAX_ERROS]
+        self.total = len(erros) if total is None else total
+        detalhe = "; ".join(f"#{pos} {nome!r}: {motivo}" for pos, nome, motivo in self.erros[:5])
+        super().__init__(f"{self.total} ajuste(s) inválido(s): {detalhe}")
+
+
+class LoteAjustes:
+    """
+    Ajustes acumulados por produto, sem guardar a lista de operações:
+    a sequência de cada produto é composta numa só função
+        q -> fixo                    (depois de "=" ou "0")
+        q -> max(piso, q + delta)    (só "+" e "-", com o "-" a parar no zero)
+    por isso a memória cresce com o n.º de produtos, não com o n.º de linhas.
+    """
+    __slots__ = ("_f", "erros", "n_erros", "n_ajustes")
+
+    def __init__(self, ajustes: Iterable[Tuple[str, str, int]] = ()):
+        self._f: Dict[str, Tuple[Optional[int], int, int]] = {}
+        self.erros: List[Tuple[int, str, str]] = []
+        self.n_erros = 0
+        self.n_ajustes = 0
+        for op, nome, valor in ajustes:
+            self.adicionar(op, nome, valor)
+
+    def rejeitar(self, posicao: int, nome: str, motivo: str):
+        """Regista um ajuste inválido (o lote deixa de poder ser aplicado)."""
+        self.n_erros += 1
+        if len(self.erros) < ErroLote.MAX_ERROS:
+            self.erros.append((posicao, nome, motivo))
+
+    def adicionar(self, op: str, nome: str, valor=0, posicao: Optional[int] = None):
+        """
+        Valida e acumula um ajuste. Inválidos ficam em `erros` (e o lote deixa de
+        poder ser aplicado). `posicao` (ex.: n.º da linha do CSV) só serve para os erros.
+        """
+        self.n_ajustes += 1
+        posicao = self.n_ajustes if posicao is None else posicao
+        try:
+            v = int(valor or 0)
+        except (ValueError, TypeError):
+            return self.rejeitar(posicao, nome, f"quantidade inválida: {valor!r}")
+        if v < 0:
+            return self.rejeitar(posicao, nome, "quantidade negativa")
+        if op not in (LOTE_AUMENTAR, LOTE_DIMINUIR, LOTE_ZERAR, LOTE_DEFINIR):
+            return self.rejeitar(posicao, nome, f"operação desconhecida: {op!r}")
+
+        fixo, piso, delta = self._f.get(nome, (None, 0, 0))
+        if op == LOTE_ZERAR:
+            fixo = 0
+        elif op == LOTE_DEFINIR:
+            fixo = v
+        elif op == LOTE_AUMENTAR:
+            if fixo is not None:
+                fixo += v
+            else:
+                piso, delta = piso + v, delta + v
+        else:
+            if fixo is not None:
+                fixo = max(0, fixo - v)
+            else:
+                piso, delta = max(0, piso - v), delta - v
+        self._f[nome] = (fixo, piso, delta)
+
+    def resultado(self, nome: str, atual: int) -> int:
+        fixo, piso, delta = self._f[nome]
+        return fixo if fixo is not None else max(piso, atual + delta)
+
+    def nomes(self) -> List[str]:
+        return list(self._f)
+
+    def composicao(self) -> Dict[str, Tuple[Optional[int], int, int]]:
+        """{nome: (fixo, piso, delta)}: o lote já composto, serializável (ex.: para o serviço)."""
+        return dict(self._f)
+
+    @classmethod
+    def de_composicao(cls, composicao: Dict[str, Iterable]) -> "LoteAjustes":
+        """Inverso de `composicao()`; valores inválidos ficam em `erros`."""
+        lote = cls()
+        for nome, f in composicao.items():
+            try:
+                fixo, piso, delta = f
+                fixo = None if fixo is None else int(fixo)
+                piso, delta = int(piso), int(delta)
+            except (ValueError, TypeError):
+                lote.rejeitar(-1, nome, f"ajuste inválido: {f!r}")
+                continue
+            if (fixo is not None and fixo < 0) or piso < 0:
+                lote.rejeitar(-1, nome, "quantidade negativa")
+                continue
+            lote._f[nome] = (fixo, piso, delta)
+            lote.n_ajustes += 1
+        return lote
+
+    def __len__(self) -> int:
+        return len(self._f)
+
+
+def _chave(nome: str) -> Tuple[str, str]:
+    # mesma ordem usada nas telas (nome.lower()), com desempate estável pelo nome
+    return (nome.lower(), nome)
+
+
+class ProdutoRef:
+    """
+    Vista leve de um registo do ProductStore com a mesma interface de `produto`
+    (getnome/gettipo/getquantidade/aumentarquantidade/diminuirquantidade/zerar).
+    """
+    __slots__ = ("_store", "_nome")
+
+    def __init__(self, store: "ProductStore", nome: str):
+        self._store = store
+        self._nome = nome
+
+    def getnome(self): return self._nome
+    def gettipo(self): return self._store.gettipo(self._nome)
+    def getquantidade(self): return self._store.getquantidade(self._nome)
+
+    def aumentarquantidade(self, valor):
+        self._store.aumentarquantidade(self._nome, valor)
+
+    def diminuirquantidade(self, valor):
+        self._store.diminuirquantidade(self._nome, valor)
+
+    def zerar(self):
+        self._store.zerar(self._nome)
+
+    def exibirDetalhes(self):
+        return print(f"Nome: {self.getnome()}\n "
+                     f"Tipo: {self.gettipo()}\n "
+                     f"Quantidade:{self.getquantidade()}\n ")
+
+
+class _LeituraCatalogo(Mapping):
+    """
+    Consultas comuns ao ProductStore e às suas versões publicadas.
+    Funciona como Mapping nome -> ProdutoRef, por isso o código que usava
+    `dicionario_produtos` (values()/items()/[nome]) continua a funcionar.
+    """
+
+    # ---------------- Mapping ----------------
+    def __getitem__(self, nome: str) -> ProdutoRef:
+        if nome not in self._idx:
+            raise KeyError(nome)
+        return ProdutoRef(self, nome)
+
+    def __contains__(self, nome) -> bool:
+        return nome in self._idx
+
+    def __iter__(self):
+        return iter(list(self._idx))
+
+    def __len__(self) -> int:
+        return len(self._idx)
+
+    # ---------------- leitura por nome ----------------
+    def gettipo(self, nome: str) -> str:
+        return self._tipos[self._idx[nome]]
+
+    def getquantidade(self, nome: str) -> int:
+        i = self._idx[nome]
+        return self._qtd[i >> _DESLOC][i & (_BLOCO - 1)]
+
+    # ---------------- consultas indexadas ----------------
+    def tipos(self) -> List[str]:
+        """Tipos existentes, já ordenados."""
+        return list(self._tipos_ordenados)
+
+    def nomes_do_tipo(self, tipo: str) -> List[str]:
+        return [nome for _, nome in self._por_tipo.get(tipo, ())]
+
+    def produtos_do_tipo(self, tipo: str) -> List[Tuple[str, int]]:
+        """[(nome, quantidade)] do tipo, ordenado por nome; O(itens do tipo)."""
+        idx, qtd = self._idx, self._qtd
+        resultado = []
+        for _, nome in self._por_tipo.get(tipo, ()):
+            i = idx[nome]
+            resultado.append((nome, qtd[i >> _DESLOC][i & (_BLOCO - 1)]))
+        return resultado
+
+    def total_tipo(self, tipo: str) -> int:
+        return self._total_tipo.get(tipo, 0)
+
+    def total_geral(self) -> int:
+        return self._total_geral
+
+    def para_itens(self) -> Dict[str, dict]:
+        """Formato do cache JSON: {nome: {"tipo", "quantidade"}}."""
+        qtd = self._qtd
+        return {
+            nome: {"tipo": self._tipos[i], "quantidade": qtd[i >> _DESLOC][i & (_BLOCO - 1)]}
+            for nome, i in self._idx.items()
+        }
+
+
+class SnapshotCatalogo(_LeituraCatalogo):
+    """
+    Versão imutável do catálogo, publicada pelo ProductStore a cada alteração.
+    Pode ser lida de qualquer thread: nada do que referencia volta a ser alterado
+    (o store copia um bloco/estrutura antes de escrever nele).
+    """
+
+    def __init__(self, versao, nomes, tipos, idx, qtd, por_tipo, tipos_ordenados, total_tipo, total_geral):
+        self.versao = versao
+        self._nomes = nomes
+        self._tipos = tipos
+        self._idx = idx
+        self._qtd = qtd
+        self._por_tipo = por_tipo
+        self._tipos_ordenados = tipos_ordenados
+        self._total_tipo = total_tipo
+        self._total_geral = total_geral
+
+    def __iter__(self):
+        # imutável: não é preciso copiar as chaves
+        return iter(self._idx)
+
+    def atual(self) -> "SnapshotCatalogo":
+        return self
+
+
+class ProductStore(_LeituraCatalogo):
+    """
+    Catálogo indexado e mutável (só a thread da UI escreve).
+    - `produtos_do_tipo(tipo)` custa O(itens do tipo), já vem ordenado por nome.
+    - `tipos()`, `total_tipo()`, `total_geral()` não percorrem o catálogo.
+    - `atual()` devolve a última versão publicada (SnapshotCatalogo), para leitores
+      noutras threads; `edicao()` agrupa várias alterações numa só publicação.
+    """
+
+    def __init__(self, itens: Optional[Iterable[Tuple[str, str, int]]] = None):
+        self._nomes: List[str] = []
+        self._tipos: List[str] = []
+        self._qtd: List[array] = []      # blocos de _BLOCO quantidades
+        self._dono: List[int] = []       # geração em que cada bloco foi copiado
+        self._idx: Dict[str, int] = {}
+
+        # índice secundário: tipo -> chaves ordenadas (nome.lower(), nome)
+        self._por_tipo: Dict[str, List[Tuple[str, str]]] = {}
+        self._tipos_ordenados: List[str] = []
+        self._total_tipo: Dict[str, int] = {}
+        self._total_geral = 0
+
+        # callbacks chamados com o nome do produto sempre que a quantidade muda
+        self._ouvintes: List[Callable[[str], None]] = []
+        self._por_notificar: List[str] = []
+
+        # versões: blocos com dono < geração (e a estrutura, se marcada) estão partilhados
+        self._geracao = 0
+        self._estrutura_partilhada = False
+        self._versao = 0
+        self._edicoes = 0
+        self._publicado: Optional[SnapshotCatalogo] = None
+
+        with self.edicao():
+            for nome, tipo, quantidade in itens or ():
+                self.adicionar(nome, tipo, quantidade)
+
+    @classmethod
+    def de_itens(cls, itens: Dict[str, dict]) -> "ProductStore":
+        """Constrói a partir do formato do cache JSON: {nome: {"tipo", "quantidade"}}."""
+        return cls(
+            (nome, info.get("tipo") or "Sem Tipo", int(info.get("quantidade") or 0))
+            for nome, info in itens.items()
+        )
+
+    # ---------------- versões publicadas ----------------
+    @contextmanager
+    def edicao(self):
+        """Agrupa alterações: só no fim se publica a nova versão e se avisam os ouvintes."""
+        self._edicoes += 1
+        try:
+            yield self
+        finally:
+            self._edicoes -= 1
+            if not self._edicoes:
+                self._publicar()
+
+    def _publicar(self):
+        if self._publicado is None or self._publicado.versao != self._versao:
+            # a partir daqui os blocos e a estrutura atuais pertencem também à versão publicada
+            self._geracao += 1
+            self._estrutura_partilhada = True
+            self._publicado = SnapshotCatalogo(
+                self._versao, self._nomes, self._tipos, self._idx, tuple(self._qtd),
+                self._por_tipo, self._tipos_ordenados, dict(self._total_tipo), self._total_geral,
+            )
+        # ouvintes só depois de publicar: quem ler atual() já vê o valor novo
+        if self._por_notificar:
+            nomes, self._por_notificar = self._por_notificar, []
+            for nome in dict.fromkeys(nomes):
+                for cb in self._ouvintes:
+                    cb(nome)
+
+    def atual(self) -> SnapshotCatalogo:
+        """Última versão publicada; leitura de uma referência, sem locks."""
+        return self._publicado
+
+    @property
+    def versao(self) -> int:
+        return self._versao
+
+    def _bloco_gravavel(self, b: int) -> array:
+        if self._dono[b] != self._geracao:
+            self._qtd[b] = array("q", self._qtd[b])
+            self._dono[b] = self._geracao
+        return self._qtd[b]
+
+    def _estrutura_gravavel(self):
+        # catálogo a mudar (raro): copia nomes/tipos/índices partilhados com a versão publicada
+        if self._estrutura_partilhada:
+            self._nomes = list(self._nomes)
+            self._tipos = list(self._tipos)
+            self._idx = dict(self._idx)
+            self._por_tipo = {t: list(c) for t, c in self._por_tipo.items()}
+            self._tipos_ordenados = list(self._tipos_ordenados)
+            self._estrutura_partilhada = False
+
+    def _escrever_qtd(self, i: int, valor: int):
+        self._bloco_gravavel(i >> _DESLOC)[i & (_BLOCO - 1)] = valor
+
+    # ---------------- observadores ----------------
+    def ouvir(self, callback: Callable[[str], None]):
+        """Regista um callback(nome) para mudanças de quantidade (ex.: sync com o Sheets)."""
+        self._ouvintes.append(callback)
+
+    # ---------------- catálogo ----------------
+    def adicionar(self, nome: str, tipo: str, quantidade: int = 0):
+        """Acrescenta (ou substitui) um produto, mantendo os índices."""
+        with self.edicao():
+            if nome in self._idx:
+                self.remover(nome)
+            self._estrutura_gravavel()
+            tipo = tipo or "Sem Tipo"
+            quantidade = max(0, int(quantidade or 0))
+
+            i = len(self._nomes)
+            self._idx[nome] = i
+            self._nomes.append(nome)
+            self._tipos.append(tipo)
+            if i >> _DESLOC == len(self._qtd):
+                self._qtd.append(array("q", [quantidade]))
+                self._dono.append(self._geracao)
+            else:
+                self._bloco_gravavel(i >> _DESLOC).append(quantidade)
+
+            if tipo not in self._por_tipo:
+                self._por_tipo[tipo] = []
+                self._total_tipo[tipo] = 0
+                insort(self._tipos_ordenados, tipo)
+            insort(self._por_tipo[tipo], _chave(nome))
+            self._total_tipo[tipo] += quantidade
+            self._total_geral += quantidade
+            self._versao += 1
+
+    def remover(self, nome: str):
+        with self.edicao():
+            self._estrutura_gravavel()
+            i = self._idx.pop(nome)
+            tipo = self._tipos[i]
+            qtd = self._qtd_pos(i)
+
+            chaves = self._por_tipo[tipo]
+            del chaves[bisect_left(chaves, _chave(nome))]
+            self._total_tipo[tipo] -= qtd
+            self._total_geral -= qtd
+            if not chaves:
+                del self._por_tipo[tipo]
+                del self._total_tipo[tipo]
+                self._tipos_ordenados.remove(tipo)
+
+            # tapa o buraco com o último registo (O(1))
+            ultimo = len(self._nomes) - 1
+            if i != ultimo:
+                self._nomes[i] = self._nomes[ultimo]
+                self._tipos[i] = self._tipos[ultimo]
+                self._escrever_qtd(i, self._qtd_pos(ultimo))
+                self._idx[self._nomes[i]] = i
+            self._nomes.pop()
+            self._tipos.pop()
+            bloco = self._bloco_gravavel(ultimo >> _DESLOC)
+            bloco.pop()
+            if not bloco:
+                self._qtd.pop()
+                self._dono.pop()
+            self._versao += 1
+
+    def _qtd_pos(self, i: int) -> int:
+        return self._qtd[i >> _DESLOC][i & (_BLOCO - 1)]
+
+    # ---------------- mesmas operações de `produto`, por nome ----------------
+    def _definir(self, nome: str, nova: int):
+        with self.edicao():
+            i = self._idx[nome]
+            bloco = self._bloco_gravavel(i >> _DESLOC)
+            o = i & (_BLOCO - 1)
+            delta = nova - bloco[o]
+            if delta:
+                bloco[o] = nova
+                self._total_tipo[self._tipos[i]] += delta
+                self._total_geral += delta
+                self._versao += 1
+                self._por_notificar.append(nome)
+
+    def aplicar_lote(self, ajustes, ignorar_desconhecidos: bool = False) -> Dict[str, Tuple[int, int]]:
+        """
+        Aplica N ajustes de uma vez: (op, nome, valor) ou um LoteAjustes já montado.
+        Tudo é validado antes de mexer em qualquer quantidade; havendo erros, lança
+        ErroLote e o catálogo fica como estava. Publica uma só versão e os ouvintes
+        são chamados uma vez por produto alterado, só no fim.
+        Devolve {nome: (antes, depois)} dos alterados.
+        """
+        lote = ajustes if isinstance(ajustes, LoteAjustes) else LoteAjustes(ajustes)
+        erros = list(lote.erros)
+        total = lote.n_erros
+        if not ignorar_desconhecidos:
+            for nome in lote.nomes():
+                if nome not in self._idx:
+                    total += 1
+                    erros.append((-1, nome, "produto desconhecido"))
+        if total:
+            raise ErroLote(erros, total)
+
+        alterados: Dict[str, Tuple[int, int]] = {}
+        with self.edicao():
+            for nome in lote.nomes():
+                if nome not in self._idx:
+                    continue
+                antes = self.getquantidade(nome)
+                depois = lote.resultado(nome, antes)
+                if depois != antes:
+                    self._definir(nome, depois)
+                    alterados[nome] = (antes, depois)
+        return alterados
+
+    def aumentarquantidade(self, nome: str, valor):
+        v = max(0, int(valor or 0))   # ignora números negativos
+        self._definir(nome, self.getquantidade(nome) + v)
+
+    def diminuirquantidade(self, nome: str, valor):
+        v = max(0, int(valor or 0))   # ignora números negativos
+        # nunca deixa ir abaixo de zero
+        self._definir(nome, max(0, self.getquantidade(nome) - v))
+
+    def zerar(self, nome: str):
+        self._definir(nome, 0)
@@ -1,30 +1,207 @@
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
-from datetime import datetime
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+from datetime import datetime, date
 import os
 from collections import defaultdict
+from copy import copy
+from pathlib import Path
+
+from escrita_atomica import gravar_atomico
+from metricas import cronometrar
 
 # Cores
 TIPO_CORES = ["FFC7CE", "C6EFCE", "FFEB9C", "BDD7EE", "F4CCCC"]
 LINHA_ALTERNADA = ["FFFFFF", "F2F2F2"]
 
-def salvar_producao_diaria(dicionario_produtos, data=datetime.today().date(), nome_arquivo="Loja012_2025.xlsx"):
-    data_str = data.strftime("%d-%m-%Y")
+# Partições: uma pasta por mês, um ficheiro por dia, ao lado do Excel completo.
+#   Loja012_2025.xlsx
+#   Loja012_2025_dias/2025-10/01-10-2025.xlsx
+FORMATO_ABA = "%d-%m-%Y"
+_MARCA_MIGRADO = ".migrado"
+
+
+def pasta_particoes(nome_arquivo) -> Path:
+    p = Path(nome_arquivo)
+    return p.with_name(p.stem + "_dias")
+
+
+def caminho_particao(nome_arquivo, data) -> Path:
+    return pasta_particoes(nome_arquivo) / data.strftime("%Y-%m") / f"{data.strftime(FORMATO_ABA)}.xlsx"
+
+
+def _data_da_aba(titulo):
+    try:
+        return datetime.strptime(titulo, FORMATO_ABA).date()
+    except ValueError:
+        return None
+
+
+def listar_particoes(nome_arquivo, inicio=None, fim=None):
+    """Lista [(data, caminho)] das partições diárias, ordenadas por data (limites inclusivos)."""
+    pasta = pasta_particoes(nome_arquivo)
+    if not pasta.exists():
+        return []
+    resultado = []
+    for mes in pasta.iterdir():
+        if not mes.is_dir():
+            continue
+        # filtra pelo mês antes de olhar para os ficheiros
+        try:
+            ano_mes = datetime.strptime(mes.name, "%Y-%m").date()
+        except ValueError:
+            continue
+        if fim is not None and ano_mes > fim:
+            continue
+        if inicio is not None and (ano_mes.year, ano_mes.month) < (inicio.year, inicio.month):
+            continue
+        for f in mes.glob("*.xlsx"):
+            d = _data_da_aba(f.stem)
+            if d is None:
+                continue
+            if (inicio is None or d >= inicio) and (fim is None or d <= fim):
+                resultado.append((d, f))
+    resultado.sort()
+    return resultado
+
 
-    # Abrir ou criar arquivo
+def _copiar_aba(origem, destino, estilos_partilhados=()):
+    """
+    Copia valores, estilos, larguras e alturas entre abas de workbooks diferentes.
+    Células com um NamedStyle já registado no destino reutilizam-no pelo nome.
+    """
+    for row in origem.iter_rows():
+        for c in row:
+            if c.value is None and not c.has_style:
+                continue
+            d = destino.cell(row=c.row, column=c.column, value=c.value)
+            if c.has_style and c.style in estilos_partilhados:
+                d.style = c.style
+            elif c.has_style:
+                d.font = copy(c.font)
+                d.fill = copy(c.fill)
+                d.border = copy(c.border)
+                d.alignment = copy(c.alignment)
+                d.number_format = c.number_format
+    for letra, dim in origem.column_dimensions.items():
+        if dim.width:
+            destino.column_dimensions[letra].width = dim.width
+    for idx, dim in origem.row_dimensions.items():
+        if dim.height:
+            destino.row_dimensions[idx].height = dim.height
+
+
+def migrar_workbook_legado(nome_arquivo):
+    """
+    Corre uma vez: parte o Excel antigo (uma aba por dia) em partições diárias.
+    As partições já existentes não são substituídas.
+    """
+    pasta = pasta_particoes(nome_arquivo)
+    marca = pasta / _MARCA_MIGRADO
+    if marca.exists():
+        return
+    pasta.mkdir(parents=True, exist_ok=True)
     if os.path.exists(nome_arquivo):
         wb = openpyxl.load_workbook(nome_arquivo)
-    else:
-        wb = openpyxl.Workbook()
-        wb.remove(wb.active)
+        for ws in wb.worksheets:
+            d = _data_da_aba(ws.title)
+            if d is None:
+                continue
+            destino = caminho_particao(nome_arquivo, d)
+            if destino.exists():
+                continue
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            novo = openpyxl.Workbook()
+            novo.active.title = ws.title
+            _copiar_aba(ws, novo.active)
+            gravar_atomico(destino, novo.save, binario=True, sufixo=".tmp")
+    marca.touch()
+
+
+def montar_workbook_completo(nome_arquivo="Loja012_2025.xlsx", inicio=None, fim=None, destino=None) -> str:
+    """
+    Junta as partições diárias num único Excel (uma aba por dia), só quando é preciso
+    (ex.: exportação). Sem `destino`, grava por cima de `nome_arquivo`.
+    Devolve o caminho do ficheiro gerado.
+    """
+    migrar_workbook_legado(nome_arquivo)
+    destino = Path(destino or nome_arquivo)
+    particoes = listar_particoes(nome_arquivo, inicio, fim)
+
+    # nada mudou desde a última montagem completa: reaproveita o ficheiro
+    completo = inicio is None and fim is None
+    if completo and destino.exists() and particoes:
+        mtime_destino = destino.stat().st_mtime
+        if all(p.stat().st_mtime <= mtime_destino for _, p in particoes):
+            return str(destino)
+
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    _registar_estilos(wb)
+    partilhados = set(wb.named_styles)
+    for d, caminho in particoes:
+        origem = openpyxl.load_workbook(caminho)
+        # 1.ª aba = dia; as restantes (ex.: "Mapa dd-mm-aaaa") mantêm o título
+        for n, aba in enumerate(origem.worksheets):
+            ws = wb.create_sheet(title=d.strftime(FORMATO_ABA) if n == 0 else aba.title)
+            _copiar_aba(aba, ws, partilhados)
+    if not wb.worksheets:
+        wb.create_sheet(title=(fim or date.today()).strftime(FORMATO_ABA))
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    gravar_atomico(destino, wb.save, binario=True, sufixo=".tmp")
+    return str(destino)
+
+
+# ---------------------- Renderização da aba do dia ----------------------
+# Estilos partilhados: registados uma vez por workbook como NamedStyle,
+# em vez de criar Font/PatternFill/Border/Alignment por célula.
+CABECALHOS = ["Nome", "Tipo", "Quantidade"]
+LARGURAS = [20, 15, 12]
+LINHA_INICIAL = 3
+COLUNA_INICIAL = 5  # Coluna E
 
-    # Abrir ou criar aba
-    if data_str in wb.sheetnames:
-        ws = wb[data_str]
-    else:
-        ws = wb.create_sheet(title=data_str)
+ALTURA_LINHA = 18
+ALTURA_TOTAL_TIPO = 20
+ALTURA_TOTAL_GERAL = 22
 
-    # Preparar dados
+
+def _estilo(nome, fill=None, font=None, horizontal="center"):
+    lado = Side(style="thin")
+    ns = NamedStyle(name=nome)
+    ns.border = Border(left=lado, right=lado, top=lado, bottom=lado)
+    ns.alignment = Alignment(horizontal=horizontal, vertical="center")
+    if fill:
+        ns.fill = PatternFill(start_color=fill, end_color=fill, fill_type="solid")
+    if font:
+        ns.font = font
+    return ns
+
+
+def _criar_estilos():
+    """Lista dos NamedStyle usados na aba do dia (nomes com prefixo `nb_`)."""
+    estilos = [
+        _estilo("nb_cabecalho", "4F81BD", Font(bold=True, color="FFFFFF", size=11)),
+        _estilo("nb_total_geral", "000000", Font(bold=True, color="FFFFFF", size=12)),
+        _estilo("nb_total_geral_qtd", "000000", Font(bold=True, color="FFFFFF", size=12), "right"),
+    ]
+    for i, cor in enumerate(LINHA_ALTERNADA):
+        estilos.append(_estilo(f"nb_linha_{i}", cor, copy(DEFAULT_FONT)))
+    for i, cor in enumerate(TIPO_CORES):
+        estilos.append(_estilo(f"nb_total_tipo_{i}", cor, Font(bold=True, size=11)))
+        estilos.append(_estilo(f"nb_total_tipo_{i}_qtd", cor, Font(bold=True, size=11), "right"))
+    return estilos
+
+
+def _registar_estilos(wb):
+    for ns in _criar_estilos():
+        wb.add_named_style(ns)
+
+
+def agrupar_por_tipo(dicionario_produtos):
+    """{tipo: [(nome, quantidade), ...]} com produtos ordenados por quantidade (decrescente)."""
     existentes = {}
     for produto in dicionario_produtos.values():
         nome = produto.getnome()
@@ -35,70 +212,96 @@ def salvar_producao_diaria(dicionario_produtos, data=datetime.today().date(), no
         else:
             existentes[nome] = {'tipo': tipo, 'quantidade': quantidade}
 
-    # Agrupar por tipo e ordenar decrescente
     por_tipo = defaultdict(list)
     for nome, info in existentes.items():
         por_tipo[info['tipo']].append((nome, info['quantidade']))
     for tipo in por_tipo:
         por_tipo[tipo].sort(key=lambda x: x[1], reverse=True)
+    return por_tipo
+
+
+def renderizar_aba_dia(wb, titulo, por_tipo):
+    """
+    Escreve a aba do dia num workbook em modo write-only (linhas em streaming).
+    Mesmo aspeto de sempre: agrupado por tipo, linhas em zebra, totais por tipo e TOTAL GERAL.
+    """
+    ws = wb.create_sheet(title=titulo)
+    # larguras têm de ser definidas antes da primeira linha
+    for offset, largura in enumerate(LARGURAS):
+        ws.column_dimensions[get_column_letter(COLUNA_INICIAL + offset)].width = largura
+
+    vazio = [None] * (COLUNA_INICIAL - 1)
+    linha_atual = 1
+
+    def escrever(valores, estilos, altura=None):
+        nonlocal linha_atual
+        if altura:
+            # no modo write-only a altura tem de existir antes de a linha ser escrita
+            ws.row_dimensions[linha_atual].height = altura
+        celulas = []
+        for valor, estilo in zip(valores, estilos):
+            c = WriteOnlyCell(ws, value=valor)
+            c.style = estilo
+            celulas.append(c)
+        ws.append(vazio + celulas)
+        linha_atual += 1
+
+    while linha_atual < LINHA_INICIAL:
+        ws.append([])
+        linha_atual += 1
+
+    escrever(CABECALHOS, ["nb_cabecalho"] * 3)
 
-    # Configurações da tabela
-    headers = ["Nome", "Tipo", "Quantidade"]
-    start_row = 3
-    start_col = 5  # Coluna E
-
-    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                         top=Side(style='thin'), bottom=Side(style='thin'))
-
-    # Cabeçalho
-    for col_offset, header in enumerate(headers):
-        cell = ws.cell(row=start_row, column=start_col + col_offset, value=header)
-        cell.font = Font(bold=True, color="FFFFFF", size=11)
-        cell.fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-        cell.border = thin_border
-        ws.column_dimensions[openpyxl.utils.get_column_letter(start_col + col_offset)].width = [20, 15, 12][col_offset]
-
-    # Inserir dados
-    current_row = start_row + 1
     total_geral = 0
-    cor_index = 0
-    for tipo in sorted(por_tipo.keys()):
-        cor_fill = PatternFill(start_color=TIPO_CORES[cor_index % len(TIPO_CORES)],
-                               end_color=TIPO_CORES[cor_index % len(TIPO_CORES)],
-                               fill_type="solid")
+    for cor_index, tipo in enumerate(sorted(por_tipo.keys())):
         total_tipo = 0
         for i, (nome, quantidade) in enumerate(por_tipo[tipo]):
-            for col_offset, value in enumerate([nome, tipo, quantidade]):
-                cell = ws.cell(row=current_row, column=start_col + col_offset, value=value)
-                fill = PatternFill(start_color=LINHA_ALTERNADA[i % 2], end_color=LINHA_ALTERNADA[i % 2], fill_type="solid")
-                cell.fill = fill
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-            ws.row_dimensions[current_row].height = 18  # Altura da linha
+            estilo = f"nb_linha_{i % 2}"
+            escrever([nome, tipo, quantidade], (estilo, estilo, estilo), ALTURA_LINHA)
             total_tipo += quantidade
-            total_geral += quantidade
-            current_row += 1
-
-        # Total por tipo
-        for col_offset, value in enumerate([f"Total {tipo}", "", total_tipo]):
-            cell = ws.cell(row=current_row, column=start_col + col_offset, value=value)
-            cell.font = Font(bold=True, size=11)
-            cell.fill = cor_fill
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal="center" if col_offset != 2 else "right", vertical="center")
-        ws.row_dimensions[current_row].height = 20
-        current_row += 1
-        cor_index += 1
-
-    # Total geral
-    for col_offset, value in enumerate(["TOTAL GERAL", "", total_geral]):
-        cell = ws.cell(row=current_row, column=start_col + col_offset, value=value)
-        cell.font = Font(bold=True, color="FFFFFF", size=12)
-        cell.fill = PatternFill(start_color="000000", end_color="000000", fill_type="solid")
-        cell.border = thin_border
-        cell.alignment = Alignment(horizontal="center" if col_offset != 2 else "right", vertical="center")
-    ws.row_dimensions[current_row].height = 22
-
-    wb.save(nome_arquivo)
-    print(f"✅ Planilha atualizada na aba '{data_str}' a partir de E3 → {nome_arquivo}")
+        total_geral += total_tipo
+
+        k = cor_index % len(TIPO_CORES)
+        escrever(
+            [f"Total {tipo}", "", total_tipo],
+            (f"nb_total_tipo_{k}", f"nb_total_tipo_{k}", f"nb_total_tipo_{k}_qtd"),
+            ALTURA_TOTAL_TIPO,
+        )
+
+    escrever(
+        ["TOTAL GERAL", "", total_geral],
+        ("nb_total_geral", "nb_total_geral", "nb_total_geral_qtd"),
+        ALTURA_TOTAL_GERAL,
+    )
+    return ws
+
+
+@cronometrar("excel.salvar_producao_diaria")
+def salvar_producao_diaria(dicionario_produtos=None, data=datetime.today().date(), nome_arquivo="Loja012_2025.xlsx",
+                           abas_extra=(), por_tipo=None):
+    """
+    Grava a produção do dia na sua própria partição (um ficheiro pequeno por dia),
+    por isso o custo não cresce com o número de dias do ano.
+    O Excel completo é montado à parte por `montar_workbook_completo`.
+    `por_tipo`: {tipo: [(nome, qtd)]} já agrupado, ex.: `BaseDados.producao_por_tipo(dia)`;
+    sem ele, agrupa `dicionario_produtos`.
+    `abas_extra`: callables(wb) que acrescentam abas depois da do dia (ex.: mapa de produção).
+    """
+    if por_tipo is None:
+        por_tipo = agrupar_por_tipo(dicionario_produtos)
+    data_str = data.strftime(FORMATO_ABA)
+    migrar_workbook_legado(nome_arquivo)
+    destino = caminho_particao(nome_arquivo, data)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+
+    # A aba do dia é sempre reescrita por inteiro: workbook novo em streaming, sem ler nada do disco
+    wb = openpyxl.Workbook(write_only=True)
+    _registar_estilos(wb)
+    renderizar_aba_dia(wb, data_str, por_tipo)
+    for renderizar in abas_extra:
+        renderizar(wb)
+
+    # grava num temporário e troca: nunca fica uma partição meio escrita
+    gravar_atomico(destino, wb.save, binario=True, sufixo=".tmp")
+    print(f"✅ Planilha atualizada na aba '{data_str}' a partir de E3 → {destino}")
+    return str(destino)
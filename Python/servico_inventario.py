@@ -0,0 +1,377 @@
+# servico_inventario.py
+# Serviço local (HTTP + WebSocket, asyncio/aiohttp) com o estado de produção da loja:
+# várias tablets ligam-se ao mesmo NucleoProducao em vez de cada uma ter o seu catálogo
+# e o seu Excel. Todas as alterações correm no event loop (um só escritor): os ajustes
+# que chegam juntos são aplicados num único lote (uma transação SQLite em eventos e
+# catalogo, ver base_dados.py) e as mudanças são enviadas a todas as tablets,
+# agrupadas a cada `intervalo_push`.
+#
+# Uso:  python servico_inventario.py [--host 0.0.0.0] [--port 8765] [--sem-sheets]
+#
+#   GET  /estado     catálogo completo {"versao", "itens": {nome: {tipo, quantidade}}}
+#   GET  /resumo     resumo por tipo (ver nucleo_producao.resumo_catalogo)
+#   POST /ajustes    {"nome", "direcao": 1|-1, "valor"} ou uma lista destes
+#   POST /lote       {"lote": LoteAjustes.composicao(), "ignorar_desconhecidos"}  (tudo ou nada)
+#   POST /exportar   {"periodo", "comprimir"}  -> e-mail pela caixa de saída do serviço
+#   POST /sincronizar {"delta", "relogio"?}  troca de contadores PN (ver contadores.py)
+#   GET  /ws         WebSocket: recebe "estado"/"alteracao"; aceita as mesmas ações
+#                    como {"id", "acao": "ajustes"|"lote"|"exportar"|"sincronizar", ...}
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+from typing import List, Optional, Set
+
+from aiohttp import WSMsgType, web
+
+from product_store import ErroLote, LOTE_AUMENTAR, LOTE_DIMINUIR, LoteAjustes
+from exportacao import PERIODOS
+from nucleo_producao import NucleoProducao, resumo_catalogo
+
+
+class ErroPedido(Exception):
+    """Pedido inválido: `status` HTTP e, para lotes, os erros por linha."""
+
+    def __init__(self, status: int, mensagem: str, erros=None, total: int = 0):
+        super().__init__(mensagem)
+        self.status = status
+        self.erros = erros or []
+        self.total = total
+
+    def para_json(self) -> dict:
+        dados = {"ok": False, "erro": str(self)}
+        if self.erros:
+            dados.update(erros=self.erros, total=self.total)
+        return dados
+
+
+class ServicoInventario:
+    """
+    - Só o event loop mexe no catálogo: cada pedido é aplicado sem `await` a meio,
+      por isso dois "+1" simultâneos nunca se perdem.
+    - `_confirmar` junta os ajustes pendentes num LoteAjustes (ordem de chegada
+      preservada) e aplica-os de uma vez; cada pedido recebe a quantidade final.
+    - Notificações: os nomes alterados acumulam-se e seguem numa só mensagem
+      por intervalo; um catálogo novo vai como "estado" completo.
+    """
+
+    def __init__(self, nucleo: NucleoProducao, intervalo_push: float = 0.05, timeout_envio: float = 5.0):
+        self.nucleo = nucleo
+        self.intervalo_push = intervalo_push
+        self.timeout_envio = timeout_envio
+
+        self._clientes: Set[web.WebSocketResponse] = set()
+        self._pendentes: List[tuple] = []          # (op, nome, valor, future)
+        self._ha_pendentes: Optional[asyncio.Event] = None
+        self._alterados: Set[str] = set()
+        self._catalogo_mudou = False
+        self._push_agendado = False
+        self._tarefas: Set[asyncio.Task] = set()
+
+        # estatísticas (diagnóstico / teste de carga)
+        self.lotes_confirmados = 0
+        self.ajustes_confirmados = 0
+        self.mensagens_enviadas = 0
+
+        nucleo.ouvir(self._ao_alterar)
+
+    # ---------------- aplicação aiohttp ----------------
+    def criar_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.get("/estado", self._get_estado),
+            web.get("/resumo", self._get_resumo),
+            web.post("/ajustes", self._post_ajustes),
+            web.post("/lote", self._post_lote),
+            web.post("/exportar", self._post_exportar),
+            web.post("/sincronizar", self._post_sincronizar),
+            web.get("/ws", self._websocket),
+        ])
+        app.on_startup.append(self._ao_arrancar)
+        app.on_shutdown.append(self._ao_desligar)
+        return app
+
+    async def _ao_arrancar(self, app):
+        self._ha_pendentes = asyncio.Event()
+        self._tarefa(self._confirmar())
+
+    async def _ao_desligar(self, app):
+        for ws in list(self._clientes):
+            await ws.close()
+        for t in list(self._tarefas):
+            t.cancel()
+
+    def _tarefa(self, coro) -> asyncio.Task:
+        # o loop só guarda referências fracas às tarefas: ficam aqui até terminarem
+        t = asyncio.ensure_future(coro)
+        self._tarefas.add(t)
+        t.add_done_callback(self._tarefas.discard)
+        return t
+
+    # ---------------- mensagens ----------------
+    def _estado(self) -> dict:
+        store = self.nucleo.store
+        # o relógio dos contadores deixa a tablet mandar só o que fez offline
+        return {
+            "tipo": "estado", "versao": store.versao, "itens": store.para_itens(),
+            "relogio": self.nucleo.contadores.relogio(),
+        }
+
+    # ---------------- ações (HTTP e WebSocket) ----------------
+    async def _acao_ajustes(self, dados) -> dict:
+        pedidos = dados if isinstance(dados, list) else [dados]
+        store = self.nucleo.store
+        validos = []
+        for p in pedidos:
+            if not isinstance(p, dict):
+                raise ErroPedido(400, "ajuste inválido")
+            nome = p.get("nome")
+            if not isinstance(nome, str):
+                raise ErroPedido(400, f"nome inválido: {nome!r}")
+            try:
+                direcao, valor = int(p.get("direcao", 1)), int(p.get("valor", 0))
+            except (ValueError, TypeError):
+                raise ErroPedido(400, f"valor inválido para {nome!r}")
+            if nome not in store:
+                raise ErroPedido(404, f"produto desconhecido: {nome!r}")
+            if valor <= 0 or direcao not in (1, -1):
+                raise ErroPedido(400, f"ajuste inválido para {nome!r}")
+            validos.append((LOTE_AUMENTAR if direcao == 1 else LOTE_DIMINUIR, nome, valor))
+
+        loop = asyncio.get_running_loop()
+        futuros = []
+        for op, nome, valor in validos:
+            fut = loop.create_future()
+            self._pendentes.append((op, nome, valor, fut))
+            futuros.append(fut)
+        self._ha_pendentes.set()
+        resultados = await asyncio.gather(*futuros)
+        return {"ok": True, "produtos": {nome: qtd for (_, nome, _), qtd in zip(validos, resultados)}}
+
+    async def _acao_lote(self, dados) -> dict:
+        dados = dados or {}
+        if not isinstance(dados, dict):
+            raise ErroPedido(400, "pedido de lote inválido (esperado um objeto)")
+        composicao = dados.get("lote") or {}
+        if not isinstance(composicao, dict):
+            raise ErroPedido(400, "lote inválido (esperado {nome: [fixo, piso, delta]})")
+        for nome, f in composicao.items():
+            # uma string com 3 letras também se desempacotaria em (fixo, piso, delta)
+            if not isinstance(f, list) or len(f) != 3:
+                raise ErroPedido(400, f"ajuste inválido para {nome!r}: {f!r}")
+        ignorar = dados.get("ignorar_desconhecidos", False)
+        if not isinstance(ignorar, bool):
+            raise ErroPedido(400, "ignorar_desconhecidos deve ser true/false")
+        lote = LoteAjustes.de_composicao(composicao)
+        try:
+            alterados = self.nucleo.aplicar_lote(lote, ignorar)
+        except ErroLote as e:
+            raise ErroPedido(422, str(e), erros=e.erros, total=e.total)
+        return {"ok": True, "alterados": {n: list(v) for n, v in alterados.items()}}
+
+    async def _acao_exportar(self, dados) -> dict:
+        dados = dados or {}
+        if not isinstance(dados, dict):
+            raise ErroPedido(400, "pedido de exportação inválido (esperado um objeto)")
+        periodo = dados.get("periodo", "hoje")
+        if not isinstance(periodo, str) or periodo not in PERIODOS:
+            raise ErroPedido(400, f"período desconhecido: {periodo!r}")
+        # bloqueante (flush do Excel + fila em disco): fora do event loop
+        job_id = await asyncio.get_running_loop().run_in_executor(
+            None, self.nucleo.exportar, periodo, bool(dados.get("comprimir"))
+        )
+        return {"ok": True, "job": job_id}
+
+    async def _acao_sincronizar(self, dados) -> dict:
+        dados = dados or {}
+        if not isinstance(dados, dict):
+            raise ErroPedido(400, "pedido de sincronização inválido (esperado um objeto)")
+        try:
+            # a forma do delta e do relógio é validada antes de fundir: nada fica a meio
+            resposta = self.nucleo.sincronizar(dados.get("delta") or {}, dados.get("relogio"))
+        except ValueError as e:
+            raise ErroPedido(400, f"delta inválido: {e}")
+        return {"ok": True, **resposta}
+
+    _ACOES = {
+        "ajustes": _acao_ajustes, "lote": _acao_lote,
+        "exportar": _acao_exportar, "sincronizar": _acao_sincronizar,
+    }
+
+    async def _executar(self, acao: str, dados) -> dict:
+        fn = self._ACOES.get(acao) if isinstance(acao, str) else None
+        if fn is None:
+            raise ErroPedido(400, f"ação desconhecida: {acao!r}")
+        if not self.nucleo.carregado:
+            raise ErroPedido(503, "catálogo ainda não carregado")
+        return await fn(self, dados)
+
+    async def _confirmar(self):
+        """Único ponto onde os ajustes individuais entram no catálogo (group commit)."""
+        while True:
+            await self._ha_pendentes.wait()
+            self._ha_pendentes.clear()
+            pedidos, self._pendentes = self._pendentes, []
+            if not pedidos:
+                continue
+            lote = LoteAjustes((op, nome, valor) for op, nome, valor, _ in pedidos)
+            try:
+                # um produto removido entretanto (catálogo novo) é simplesmente ignorado
+                self.nucleo.aplicar_lote(lote, ignorar_desconhecidos=True)
+            except Exception as e:
+                print("[serviço] falha ao aplicar ajustes:", e)
+                for *_, fut in pedidos:
+                    if not fut.done():
+                        fut.set_exception(ErroPedido(500, str(e)))
+                continue
+            self.lotes_confirmados += 1
+            self.ajustes_confirmados += len(pedidos)
+            for _, nome, _, fut in pedidos:
+                if not fut.done():
+                    fut.set_result(self.nucleo.quantidade(nome))
+
+    # ---------------- HTTP ----------------
+    @staticmethod
+    async def _json(request):
+        try:
+            return await request.json()
+        except ValueError:
+            raise ErroPedido(400, "JSON inválido")
+
+    async def _responder(self, acao: str, request) -> web.Response:
+        try:
+            return web.json_response(await self._executar(acao, await self._json(request)))
+        except ErroPedido as e:
+            return web.json_response(e.para_json(), status=e.status)
+
+    async def _get_estado(self, request):
+        return web.json_response(self._estado())
+
+    async def _get_resumo(self, request):
+        return web.json_response(resumo_catalogo(self.nucleo.store.atual()))
+
+    async def _post_ajustes(self, request):
+        return await self._responder("ajustes", request)
+
+    async def _post_lote(self, request):
+        return await self._responder("lote", request)
+
+    async def _post_exportar(self, request):
+        return await self._responder("exportar", request)
+
+    async def _post_sincronizar(self, request):
+        return await self._responder("sincronizar", request)
+
+    # ---------------- WebSocket ----------------
+    async def _websocket(self, request):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        # primeiro o estado completo; daqui em diante só as alterações
+        await ws.send_str(json.dumps(self._estado(), ensure_ascii=False))
+        self._clientes.add(ws)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                # cada pedido numa tarefa: um export lento não atrasa os ajustes seguintes
+                self._tarefa(self._pedido_ws(ws, msg.data))
+        finally:
+            self._clientes.discard(ws)
+        return ws
+
+    async def _pedido_ws(self, ws, texto: str):
+        pedido_id = None
+        try:
+            pedido = json.loads(texto)
+            if not isinstance(pedido, dict):
+                raise ErroPedido(400, "mensagem inválida (esperado um objeto)")
+            pedido_id = pedido.get("id")
+            resposta = await self._executar(pedido.get("acao"), pedido.get("dados"))
+        except ErroPedido as e:
+            resposta = e.para_json()
+        except (ValueError, AttributeError, TypeError):
+            resposta = ErroPedido(400, "mensagem inválida").para_json()
+        except Exception as e:
+            # sem resposta a tablet ficaria à espera até ao timeout
+            print("[serviço] falha no pedido:", e)
+            resposta = ErroPedido(500, str(e)).para_json()
+        resposta.update(tipo="resposta", id=pedido_id)
+        if not ws.closed:
+            try:
+                await ws.send_str(json.dumps(resposta, ensure_ascii=False))
+            except ConnectionError:
+                pass
+
+    # ---------------- notificações ----------------
+    def _ao_alterar(self, nomes: Optional[List[str]]):
+        # chamado na thread do event loop (NucleoProducao + agendar = call_soon_threadsafe)
+        if nomes is None:
+            self._catalogo_mudou = True
+        else:
+            self._alterados.update(nomes)
+        if not self._push_agendado:
+            self._push_agendado = True
+            asyncio.get_running_loop().call_later(
+                self.intervalo_push, lambda: self._tarefa(self._enviar_alteracoes())
+            )
+
+    async def _enviar_alteracoes(self):
+        self._push_agendado = False
+        store = self.nucleo.store
+        if self._catalogo_mudou:
+            self._catalogo_mudou = False
+            self._alterados.clear()
+            msg = self._estado()
+        elif self._alterados:
+            nomes, self._alterados = self._alterados, set()
+            msg = {
+                "tipo": "alteracao",
+                "versao": store.versao,
+                "produtos": {n: store.getquantidade(n) for n in nomes if n in store},
+            }
+        else:
+            return
+        texto = json.dumps(msg, ensure_ascii=False)
+        clientes = list(self._clientes)
+        resultados = await asyncio.gather(
+            *(asyncio.wait_for(ws.send_str(texto), self.timeout_envio) for ws in clientes),
+            return_exceptions=True,
+        )
+        for ws, r in zip(clientes, resultados):
+            if isinstance(r, Exception):
+                # tablet lenta ou desligada: ao voltar recebe o estado completo
+                self._clientes.discard(ws)
+                self._tarefa(ws.close())
+            else:
+                self.mensagens_enviadas += 1
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serviço de inventário partilhado pelas tablets da loja.")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--pasta", default=str(Path(__file__).resolve().parent),
+                    help="pasta com a base de dados (natabase.db) e o Excel da loja")
+    ap.add_argument("--sem-sheets", action="store_true", help="não contactar o Google Sheets")
+    args = ap.parse_args()
+
+    async def _arrancar():
+        loop = asyncio.get_running_loop()
+        nucleo = NucleoProducao(
+            Path(args.pasta),
+            agendar=loop.call_soon_threadsafe,
+            ao_aviso=lambda msg: print("[serviço]", msg),
+            ao_erro_gravacao=lambda e: print("[serviço] erro ao gravar:", e),
+        )
+        servico = ServicoInventario(nucleo)
+        app = servico.criar_app()
+        app.on_cleanup.append(lambda app: loop.run_in_executor(None, nucleo.parar))
+        nucleo.iniciar(sheets=not args.sem_sheets)
+        return app
+
+    web.run_app(_arrancar(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
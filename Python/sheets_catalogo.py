@@ -0,0 +1,231 @@
+# sheets_catalogo.py
+# Arranque barato contra o Google Sheets (sentido Sheets -> app).
+# - guarda a key da planilha e o token de acesso entre execuções (sem pesquisa no Drive,
+#   sem nova autenticação enquanto o token for válido);
+# - verifica a versão do menu com uma única leitura de intervalo (Config!B1);
+# - quando a versão muda, lê a 1.ª aba num único pedido e compara hashes por linha
+#   com os guardados localmente: só as linhas diferentes são aplicadas ao catálogo.
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from escrita_atomica import gravar_json
+from metricas import span
+
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive",
+]
+
+# margem para não usar um token que expira a meio do arranque
+_MARGEM_TOKEN = timedelta(minutes=5)
+
+
+def hash_linha(nome: str, tipo: str, quantidade: int) -> str:
+    bruto = json.dumps([nome, tipo, quantidade], ensure_ascii=False)
+    return hashlib.blake2b(bruto.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _aba_inexistente(erro) -> bool:
+    """values_get numa aba que não existe: HTTP 400 "Unable to parse range"."""
+    status = getattr(getattr(erro, "response", None), "status_code", None)
+    return status == 400 and "unable to parse range" in str(erro).lower()
+
+
+def _linha_para_produto(cab: List[str], row: List) -> Optional[Tuple[str, str, int]]:
+    def col(nome, padrao):
+        i = cab.index(nome) if nome in cab else padrao
+        return row[i] if i < len(row) else ""
+
+    nome = str(col("Nome", 0) or "").strip()
+    if not nome:
+        return None
+    tipo = str(col("Tipo", 1) or "").strip() or "Sem Tipo"
+    try:
+        qtd = int(col("Quantidade", 2) or 0)
+    except (ValueError, TypeError):
+        qtd = 0
+    return nome, tipo, qtd
+
+
+class DiffCatalogo:
+    """Diferenças entre o catálogo do Sheets e o último visto (por hash de linha)."""
+
+    def __init__(self):
+        self.alterados: List[Tuple[str, str, int]] = []   # novos ou com tipo/quantidade diferente
+        self.removidos: List[str] = []
+        self.completo: List[Tuple[str, str, int]] = []    # catálogo inteiro, pela ordem do Sheets
+
+    def __bool__(self):
+        return bool(self.alterados or self.removidos)
+
+    def aplicar(self, store):
+        """
+        Aplica só as linhas alteradas a um ProductStore (sem notificar o sync de saída),
+        publicando uma única versão nova no fim.
+        """
+        with store.edicao():
+            for nome in self.removidos:
+                if nome in store:
+                    store.remover(nome)
+            for nome, tipo, qtd in self.alterados:
+                store.adicionar(nome, tipo, qtd)
+
+
+class SessaoSheets:
+    """
+    Ligação ao Sheets com estado guardado em disco (`sheets_estado.json`).
+    Partilhada pelo arranque e pelo envio ao longo do dia (thread do sync): os clientes
+    e a planilha abertos são reutilizados, com um lock à volta da autenticação.
+    """
+
+    def __init__(self, creds_json: Path, titulo: str, caminho_estado: Path):
+        self.creds_json = Path(creds_json)
+        self.titulo = titulo
+        self.caminho_estado = Path(caminho_estado)
+        self._estado = self._ler_estado()
+        self._hashes_pendentes: Optional[Dict[str, str]] = None
+        self._sh = None
+        self._cliente_renovavel = None    # conta de serviço: renova o token sozinho
+        self._ws_producao = None
+        self._lock = Lock()
+
+    # ---------------- estado local ----------------
+    def _ler_estado(self) -> dict:
+        if not self.caminho_estado.exists():
+            return {}
+        try:
+            return json.loads(self.caminho_estado.read_text(encoding="utf-8"))
+        except (ValueError, OSError):
+            return {}
+
+    def _gravar_estado(self):
+        gravar_json(self.caminho_estado, self._estado, ensure_ascii=False)
+
+    def esquecer_hashes(self):
+        """Força a próxima leitura a tratar todas as linhas como alteradas."""
+        with self._lock:
+            self._estado.pop("hashes", None)
+
+    # ---------------- autenticação ----------------
+    def _cliente_token_guardado(self):
+        token = self._estado.get("token")
+        expira = self._estado.get("token_expira")
+        if not token or not expira:
+            return None
+        expira_dt = datetime.fromisoformat(expira)
+        if expira_dt - _MARGEM_TOKEN <= datetime.utcnow():
+            return None
+        import gspread
+        from oauth2client.client import AccessTokenCredentials
+        # só dura até expirar (não renova): serve para o arranque, não para o dia todo
+        return gspread.authorize(AccessTokenCredentials(token, "natabase"))
+
+    def _cliente_service_account(self):
+        """Cliente da conta de serviço (token renovável); criado uma vez por sessão."""
+        if self._cliente_renovavel is not None:
+            return self._cliente_renovavel
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+        creds = ServiceAccountCredentials.from_json_keyfile_name(str(self.creds_json), SCOPE)
+        info = creds.get_access_token()
+        self._estado["token"] = info.access_token
+        self._estado["token_expira"] = (
+            datetime.utcnow() + timedelta(seconds=int(info.expires_in or 0))
+        ).isoformat()
+        self._cliente_renovavel = gspread.authorize(creds)
+        return self._cliente_renovavel
+
+    def _abrir(self, cliente):
+        key = self._estado.get("spreadsheet_key")
+        if key:
+            return cliente.open_by_key(key)
+        sh = cliente.open(self.titulo)
+        self._estado["spreadsheet_key"] = sh.id
+        return sh
+
+    def planilha(self):
+        """Abre a planilha: pela key guardada se existir; senão pelo título (pesquisa no Drive)."""
+        with self._lock:
+            if self._sh is not None:
+                return self._sh
+            with span("sheets.autenticar"):
+                cliente = self._cliente_token_guardado() or self._cliente_service_account()
+            with span("sheets.abrir_planilha"):
+                self._sh = self._abrir(cliente)
+            self._gravar_estado()
+            return self._sh
+
+    def worksheet_producao(self):
+        """1.ª aba com credenciais renováveis (usada pelo envio ao longo do dia)."""
+        with self._lock:
+            if self._ws_producao is not None:
+                return self._ws_producao
+            renovavel = self._cliente_renovavel is None
+            cliente = self._cliente_service_account()
+            if renovavel:
+                self._gravar_estado()
+            # a planilha do arranque só serve se já foi aberta com este cliente
+            sh = self._sh if self._sh is not None and self._sh.client is cliente else self._abrir(cliente)
+            self._ws_producao = sh.sheet1
+            return self._ws_producao
+
+    # ---------------- leituras ----------------
+    def ler_versao(self) -> str:
+        """
+        Versão do menu numa única leitura de intervalo (Config!B1 ou config!B1);
+        "" se nenhuma das abas existir. Outros erros (rede, quota, permissões) sobem.
+        """
+        import gspread
+        sh = self.planilha()
+        for aba in ("Config", "config"):
+            try:
+                with span("sheets.ler_versao"):
+                    resp = sh.values_get(f"'{aba}'!B1")
+            except gspread.exceptions.APIError as e:
+                if not _aba_inexistente(e):
+                    raise
+                continue
+            valores = resp.get("values") or [[""]]
+            return str(valores[0][0] if valores[0] else "")
+        return ""
+
+    def diff_catalogo(self) -> DiffCatalogo:
+        """
+        Lê Nome | Tipo | Quantidade da 1.ª aba num único pedido e compara com os
+        hashes guardados: devolve só as linhas novas/alteradas e as removidas.
+        """
+        sh = self.planilha()
+        with span("sheets.ler_catalogo"):
+            valores = sh.values_get("A:C").get("values") or []
+        cab = [str(c).strip() for c in (valores[0] if valores else [])]
+
+        antigos: Dict[str, str] = self._estado.get("hashes", {})
+        novos: Dict[str, str] = {}
+        diff = DiffCatalogo()
+        for row in valores[1:]:
+            prod = _linha_para_produto(cab, row)
+            if prod is None:
+                continue
+            h = hash_linha(*prod)
+            novos[prod[0]] = h
+            diff.completo.append(prod)
+            if antigos.get(prod[0]) != h:
+                diff.alterados.append(prod)
+        diff.removidos = [nome for nome in antigos if nome not in novos]
+        # só passam a valer depois de o diff ser aplicado (ver confirmar)
+        self._hashes_pendentes = novos
+        return diff
+
+    def confirmar(self):
+        """Grava o estado (hashes/token/key) depois de o diff ter sido aplicado."""
+        # o worker do Sheets também mexe no estado (token) e grava-o com o lock
+        with self._lock:
+            if self._hashes_pendentes is not None:
+                self._estado["hashes"] = self._hashes_pendentes
+                self._hashes_pendentes = None
+            self._gravar_estado()
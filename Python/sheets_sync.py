@@ -0,0 +1,297 @@
+# sheets_sync.py
+# Envio da produção de volta para o Google Sheets (sentido app -> Sheets).
+# Só os produtos alterados ("sujos") são enviados, numa única chamada batch_update
+# por flush, com backoff quando a API responde 429 e uma fila offline em disco.
+
+import json
+import random
+import time
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional, Tuple
+
+from escrita_atomica import gravar_json
+from metricas import contar, span
+
+
+class ErroLimiteTaxa(Exception):
+    """A API recusou o pedido por excesso de chamadas (HTTP 429)."""
+
+
+# ---------------------------- Interface da planilha ----------------------------
+class PlanilhaRemota:
+    """
+    O que o sincronizador precisa de uma folha de cálculo.
+    Implementações: PlanilhaGspread (real) e PlanilhaFalsa (em memória, sem rede).
+    """
+
+    def ler_valores(self) -> List[List]:
+        """Todas as linhas da 1.ª aba, incluindo o cabeçalho (Nome | Tipo | Quantidade)."""
+        raise NotImplementedError
+
+    def batch_update(self, atualizacoes: List[dict]):
+        """Aplica [{"range": "C5", "values": [[10]]}, ...] numa única chamada."""
+        raise NotImplementedError
+
+
+class PlanilhaGspread(PlanilhaRemota):
+    """
+    Adaptador para um `gspread.Worksheet`.
+    Aceita a worksheet já aberta ou `obter_worksheet()`, chamado só no primeiro envio.
+    """
+
+    def __init__(self, worksheet=None, obter_worksheet=None):
+        self._ws = worksheet
+        self._obter_worksheet = obter_worksheet
+
+    @property
+    def ws(self):
+        if self._ws is None:
+            self._ws = self._obter_worksheet()
+        return self._ws
+
+    def _chamar(self, fn):
+        import gspread
+        try:
+            return fn()
+        except gspread.exceptions.APIError as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if status == 429:
+                raise ErroLimiteTaxa(str(e)) from e
+            raise
+
+    def ler_valores(self) -> List[List]:
+        return self._chamar(lambda: self.ws.get_all_values())
+
+    def batch_update(self, atualizacoes: List[dict]):
+        return self._chamar(lambda: self.ws.batch_update(atualizacoes, value_input_option="RAW"))
+
+
+class PlanilhaFalsa(PlanilhaRemota):
+    """
+    Folha de cálculo em memória para testes/simulação, sem rede.
+    `falhas_429` faz as próximas N chamadas falharem com limite de taxa.
+    """
+
+    def __init__(self, linhas: Optional[List[List]] = None, falhas_429: int = 0):
+        self.linhas = [list(r) for r in (linhas or [["Nome", "Tipo", "Quantidade"]])]
+        self.falhas_429 = falhas_429
+        self.chamadas_batch = 0
+        self.celulas_escritas = 0
+        self._lock = Lock()
+
+    def _talvez_falhar(self):
+        if self.falhas_429 > 0:
+            self.falhas_429 -= 1
+            raise ErroLimiteTaxa("429: Quota exceeded (falso)")
+
+    def ler_valores(self) -> List[List]:
+        with self._lock:
+            self._talvez_falhar()
+            return [list(r) for r in self.linhas]
+
+    def batch_update(self, atualizacoes: List[dict]):
+        from openpyxl.utils.cell import column_index_from_string, coordinate_from_string
+
+        with self._lock:
+            self._talvez_falhar()
+            self.chamadas_batch += 1
+            for upd in atualizacoes:
+                letra, linha = coordinate_from_string(upd["range"])
+                col = column_index_from_string(letra)
+                while len(self.linhas) < linha:
+                    self.linhas.append([])
+                row = self.linhas[linha - 1]
+                while len(row) < col:
+                    row.append("")
+                row[col - 1] = upd["values"][0][0]
+                self.celulas_escritas += 1
+
+
+# ---------------------------- Sincronizador ----------------------------
+class SincronizadorSheets:
+    """
+    - `marcar(nome)`: produto alterado (ligado ao ProductStore.ouvir).
+    - Um worker faz `flush()` a cada `intervalo` segundos: junta os sujos à fila
+      offline (gravada em disco), envia só essas células num batch_update e limpa a fila.
+    - Em 429/erros de rede espera com backoff exponencial (com jitter) e tenta de novo;
+      a fila sobrevive a reinícios da app.
+    - A planilha pode abrir a ligação só no primeiro envio (PlanilhaGspread com
+      `obter_worksheet`): sem rede no arranque, o worker volta a tentar com o mesmo backoff.
+    """
+
+    def __init__(
+        self,
+        obter_quantidade,
+        caminho_fila: Path,
+        planilha: Optional[PlanilhaRemota] = None,
+        intervalo: float = 30.0,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+    ):
+        self._obter_quantidade = obter_quantidade   # callable(nome) -> int | None
+        self.caminho_fila = Path(caminho_fila)
+        self._planilha = planilha
+        self.intervalo = intervalo
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = Lock()
+        self._sujos = set()
+        self._fila: Dict[str, int] = self._ler_fila()   # nome -> quantidade por enviar
+        self._linhas: Optional[Dict[str, int]] = None  # nome -> n.º da linha no Sheets
+        self._col_qtd: Optional[int] = None
+
+        self._falhas_seguidas = 0
+        self._proxima_tentativa = 0.0
+        self._acordar = Event()
+        self._parar = Event()
+        self._thread: Optional[Thread] = None
+
+    # ---------------- fila offline ----------------
+    def _ler_fila(self) -> Dict[str, int]:
+        if not self.caminho_fila.exists():
+            return {}
+        try:
+            return {k: int(v) for k, v in json.loads(self.caminho_fila.read_text(encoding="utf-8")).items()}
+        except (ValueError, OSError) as e:
+            print("[sheets-sync] fila offline ilegível:", e)
+            return {}
+
+    def _gravar_fila(self, fila: Dict[str, int]):
+        if not fila:
+            if self.caminho_fila.exists():
+                self.caminho_fila.unlink()
+            return
+        gravar_json(self.caminho_fila, fila, ensure_ascii=False)
+
+    @property
+    def pendentes(self) -> int:
+        with self._lock:
+            return len(self._fila) + len(self._sujos)
+
+    # ---------------- API ----------------
+    def marcar(self, nome: str):
+        with self._lock:
+            self._sujos.add(nome)
+
+    def ligar(self, planilha: PlanilhaRemota):
+        """Liga a planilha (ex.: depois da autenticação no arranque) e tenta enviar já."""
+        with self._lock:
+            self._planilha = planilha
+            self._linhas = None
+        self._acordar.set()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = Thread(target=self._loop, name="sheets-sync", daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: Optional[float] = None):
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        # o que não foi enviado fica em disco para o próximo arranque
+        self._recolher_sujos()
+
+    # ---------------- envio ----------------
+    def _recolher_sujos(self) -> Dict[str, int]:
+        with self._lock:
+            sujos, self._sujos = self._sujos, set()
+            for nome in sujos:
+                qtd = self._obter_quantidade(nome)
+                if qtd is not None:
+                    self._fila[nome] = int(qtd)
+            fila = dict(self._fila)
+        if sujos:
+            self._gravar_fila(fila)
+        return fila
+
+    def _mapear_linhas(self, planilha: PlanilhaRemota) -> Tuple[Dict[str, int], int]:
+        valores = planilha.ler_valores()
+        cab = [str(c).strip() for c in (valores[0] if valores else [])]
+        col_nome = cab.index("Nome") if "Nome" in cab else 0
+        col_qtd = cab.index("Quantidade") if "Quantidade" in cab else 2
+        linhas = {}
+        for n, row in enumerate(valores[1:], start=2):
+            if len(row) > col_nome and row[col_nome]:
+                linhas[str(row[col_nome])] = n
+        with self._lock:
+            # um `ligar` entretanto troca a planilha: este mapa já não lhe serve
+            if self._planilha is planilha:
+                self._linhas, self._col_qtd = linhas, col_qtd + 1
+        return linhas, col_qtd + 1
+
+    def flush(self) -> int:
+        """
+        Envia as alterações pendentes numa única batch_update.
+        Devolve o n.º de células enviadas (0 se nada a enviar ou sem planilha).
+        Lança a exceção da API em caso de falha (a fila fica intacta).
+        """
+        fila = self._recolher_sujos()
+        # `ligar` (noutra thread) pode trocar a planilha e apagar o mapa a meio do envio
+        with self._lock:
+            planilha, linhas, col_qtd = self._planilha, self._linhas, self._col_qtd
+        if not fila or planilha is None:
+            return 0
+
+        if linhas is None or any(nome not in linhas for nome in fila):
+            linhas, col_qtd = self._mapear_linhas(planilha)
+
+        # openpyxl só no primeiro envio (fora do arranque)
+        from openpyxl.utils.cell import get_column_letter
+
+        letra = get_column_letter(col_qtd)
+        atualizacoes = [
+            {"range": f"{letra}{linhas[nome]}", "values": [[qtd]]}
+            for nome, qtd in fila.items()
+            if nome in linhas
+        ]
+        if atualizacoes:
+            planilha.batch_update(atualizacoes)
+
+        # remove da fila só o que foi enviado e não voltou a mudar entretanto
+        with self._lock:
+            for nome, qtd in fila.items():
+                if self._fila.get(nome) == qtd:
+                    del self._fila[nome]
+            restante = dict(self._fila)
+        self._gravar_fila(restante)
+        return len(atualizacoes)
+
+    def _atraso_backoff(self) -> float:
+        atraso = min(self.backoff_max, self.backoff_base * (2 ** (self._falhas_seguidas - 1)))
+        return atraso * (0.5 + random.random() / 2)
+
+    def tentar_flush(self, agora: Optional[float] = None) -> int:
+        """flush() que respeita o backoff; usado pelo worker."""
+        agora = time.monotonic() if agora is None else agora
+        if agora < self._proxima_tentativa:
+            return 0
+        try:
+            with span("sheets_sync.enviar"):
+                enviados = self.flush()
+        except ErroLimiteTaxa as e:
+            self._falhas_seguidas += 1
+            self._proxima_tentativa = agora + self._atraso_backoff()
+            print("[sheets-sync] limite de taxa, nova tentativa mais tarde:", e)
+            contar("sheets_sync.limite_taxa")
+            return 0
+        except Exception as e:
+            self._falhas_seguidas += 1
+            self._proxima_tentativa = agora + self._atraso_backoff()
+            print("[sheets-sync] falha ao enviar (fica na fila offline):", e)
+            contar("sheets_sync.novas_tentativas")
+            return 0
+        self._falhas_seguidas = 0
+        self._proxima_tentativa = 0.0
+        return enviados
+
+    def _loop(self):
+        while not self._parar.is_set():
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            if self._parar.is_set():
+                break
+            self.tentar_flush()
@@ -0,0 +1,62 @@
+# teclado_producao.py
+# Teclado numérico e ecrã de detalhe do produto, sem nada de Kivy: a AppCozinha herda
+# estes métodos e o simulador de turno (benchmarks/simulador_turno.py) corre o mesmo
+# código sem janela.
+
+
+class TecladoProducao:
+    """
+    Lógica do teclado do ecrã de detalhe. Quem herda fornece:
+    - `keypad_value`, `produto_selecionado`, `qtd_atual_display` (na app, propriedades Kivy);
+    - `dicionario_produtos` (o ProductStore em uso) e `_fonte` (NucleoProducao ou
+      ClienteInventario), com `ajustar(nome, direcao, valor)`.
+    """
+
+    def _sync_qtd_display(self):
+        """Atualiza a qtd para a tela de detalhe antes da tela aparecer."""
+        nome = self.produto_selecionado
+        qtd = 0
+        try:
+            if nome in self.dicionario_produtos:
+                qtd = int(self.dicionario_produtos[nome].getquantidade())
+        except Exception:
+            qtd = 0
+        self.qtd_atual_display = qtd
+
+    def confirmar_ajuste_quantidade(self, direcao: int):
+        """
+        Aplica o valor digitado ao produto (direcao: +1 adicionar, -1 subtrair)
+        pela fonte (SQLite local ou, em modo cliente, o serviço) e mantém na tela de detalhe.
+        Evita números negativos.
+        """
+        try:
+            valor = int(self.keypad_value or "0")
+        except ValueError:
+            valor = 0
+
+        if valor <= 0:
+            return
+
+        nome = self.produto_selecionado
+        if nome not in self.dicionario_produtos:
+            return
+
+        # local: aplica já (SQLite + gravação agendada); cliente: segue para o serviço
+        # e o valor novo volta pela notificação (_ao_alterar_produtos)
+        self._fonte.ajustar(nome, direcao, valor)
+
+        # atualiza display e limpa entrada
+        self._sync_qtd_display()
+        self.keypad_value = ""
+
+    # --------------- Teclado numérico ---------------
+    def keypad_add_digit(self, d: str):
+        novo = (self.keypad_value or "") + d
+        if len(novo) <= 6 and novo.isdigit():
+            self.keypad_value = str(int(novo)) if novo != "" else "0"
+
+    def keypad_backspace(self):
+        self.keypad_value = self.keypad_value[:-1] if self.keypad_value else ""
+
+    def keypad_clear(self):
+        self.keypad_value = ""